@@ -260,6 +260,51 @@ class TokenStatsSchema:
         }
     ]
 
+class TokenPlatformSchema:
+    table_name = "LiberandumAggregationTokenPlatform"
+    
+    key_schema = [
+        {
+            'AttributeName': 'id',
+            'KeyType': 'HASH'
+        }
+    ]
+    
+    attribute_definitions = [
+        {
+            'AttributeName': 'id',
+            'AttributeType': 'S'
+        },
+        {
+            'AttributeName': 'token_id',
+            'AttributeType': 'S'
+        }
+    ]
+    
+    provisioned_throughput = {
+        'ReadCapacityUnits': 5,
+        'WriteCapacityUnits': 5
+    }
+    
+    global_secondary_indexes = [
+        {
+            'IndexName': 'token-id-index',
+            'KeySchema': [
+                {
+                    'AttributeName': 'token_id',
+                    'KeyType': 'HASH'
+                }
+            ],
+            'Projection': {
+                'ProjectionType': 'ALL'
+            },
+            'ProvisionedThroughput': {
+                'ReadCapacityUnits': 5,
+                'WriteCapacityUnits': 5
+            }
+        }
+    ]
+
 class ExchangesSchema:
     table_name = "LiberandumAggregationExchanges"
     
@@ -370,9 +415,48 @@ class ExchangeStatsSchema:
         }
     ]
 
+class CountersSchema:
+    table_name = settings.DYNAMODB_COUNTERS_TABLE
+    
+    key_schema = [
+        {
+            'AttributeName': 'id',
+            'KeyType': 'HASH'
+        }
+    ]
+    
+    attribute_definitions = [
+        {
+            'AttributeName': 'id',
+            'AttributeType': 'S'
+        }
+    ]
+    
+    provisioned_throughput = {
+        'ReadCapacityUnits': 5,
+        'WriteCapacityUnits': 5
+    }
+
 users_schema = UsersSchema()
 otp_schema = OTPSchema()
 tokens_schema = TokensSchema()
 token_stats_schema = TokenStatsSchema()
+token_platform_schema = TokenPlatformSchema()
 exchanges_schema = ExchangesSchema()
-exchange_stats_schema = ExchangeStatsSchema()
\ No newline at end of file
+exchange_stats_schema = ExchangeStatsSchema()
+counters_schema = CountersSchema()
+# Реестр схем по имени таблицы - источник информации о ключах и GSI для планировщика запросов
+SCHEMA_REGISTRY = {
+    schema.table_name: schema
+    for schema in [
+        users_schema, otp_schema,
+        tokens_schema, token_stats_schema, token_platform_schema,
+        exchanges_schema, exchange_stats_schema,
+        counters_schema
+    ]
+    if schema.table_name
+}
+
+def get_table_schema(table_name: str):
+
+    return SCHEMA_REGISTRY.get(table_name)
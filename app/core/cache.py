@@ -0,0 +1,444 @@
+import asyncio
+import json
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from app.core.config import settings
+
+
+def _json_default(value: Any):
+
+    # Decimal из DynamoDB сохраняем без потери точности, остальное (datetime, UUID) - строкой
+    if isinstance(value, Decimal):
+        return {'__decimal__': str(value)}
+    if isinstance(value, (set, frozenset, tuple)):
+        return list(value)
+    return str(value)
+
+
+def _json_object_hook(value: Dict[str, Any]):
+
+    if len(value) == 1 and '__decimal__' in value:
+        return Decimal(value['__decimal__'])
+    return value
+
+
+def dumps(value: Any) -> str:
+
+    return json.dumps(value, default=_json_default, separators=(',', ':'))
+
+
+def loads(raw: str) -> Any:
+
+    return json.loads(raw, object_hook=_json_object_hook)
+
+
+# Каналы in-process стенда: имитируют pub/sub сервера для backend "local"
+_LOCAL_CHANNELS: Dict[str, List[Callable[[str], None]]] = {}
+_LOCAL_STORE: Dict[str, Any] = {'entries': OrderedDict(), 'lock': threading.Lock()}
+
+
+class MemoryCacheBackend:
+
+    # LRU + TTL в памяти процесса. Используется как L1, а с shared=True -
+    # как локальный стенд L2 (общий для всех экземпляров в процессе, с pub/sub)
+
+    def __init__(self, max_items: int = 5000, shared: bool = False):
+        self.max_items = max_items
+        if shared:
+            self._entries: OrderedDict = _LOCAL_STORE['entries']
+            self._lock = _LOCAL_STORE['lock']
+        else:
+            self._entries: OrderedDict = OrderedDict()
+            self._lock = threading.Lock()
+
+    def get_nowait(self, key: str) -> Optional[str]:
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set_nowait(self, key: str, value: str, ttl: float):
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_items:
+                self._entries.popitem(last=False)
+
+    def delete_nowait(self, keys: List[str]):
+
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def delete_prefix_nowait(self, prefix: str):
+
+        with self._lock:
+            for key in [key for key in self._entries if key.startswith(prefix)]:
+                del self._entries[key]
+
+    async def get(self, key: str) -> Optional[str]:
+        return self.get_nowait(key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        self.set_nowait(key, value, ttl)
+
+    async def delete(self, keys: List[str]):
+        self.delete_nowait(keys)
+
+    async def delete_prefix(self, prefix: str):
+        self.delete_prefix_nowait(prefix)
+
+    async def publish(self, channel: str, message: str):
+
+        for handler in list(_LOCAL_CHANNELS.get(channel, [])):
+            handler(message)
+
+    async def subscribe(self, channel: str, handler: Callable[[str], None],
+                        on_reconnect: Callable[[], None] = None):
+
+        _LOCAL_CHANNELS.setdefault(channel, []).append(handler)
+        return None
+
+    async def close(self):
+        return None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheBackend:
+
+    # Общий L2 для всех воркеров. Пакет redis - опциональная зависимость
+
+    RECONNECT_BASE_DELAY = 0.5
+    RECONNECT_MAX_DELAY = 30.0
+
+    def __init__(self, url: str):
+        import redis.asyncio as redis_asyncio
+
+        self.url = url
+        self._redis = redis_asyncio.from_url(url, decode_responses=True)
+        self._pubsub = None
+
+    async def get(self, key: str) -> Optional[str]:
+        return await self._redis.get(key)
+
+    async def set(self, key: str, value: str, ttl: float):
+        await self._redis.set(key, value, px=max(1, int(ttl * 1000)))
+
+    async def delete(self, keys: List[str]):
+        if keys:
+            await self._redis.delete(*keys)
+
+    async def delete_prefix(self, prefix: str):
+
+        batch = []
+        async for key in self._redis.scan_iter(match=f"{prefix}*", count=500):
+            batch.append(key)
+            if len(batch) >= 500:
+                await self._redis.delete(*batch)
+                batch = []
+        if batch:
+            await self._redis.delete(*batch)
+
+    async def publish(self, channel: str, message: str):
+        await self._redis.publish(channel, message)
+
+    async def subscribe(self, channel: str, handler: Callable[[str], None],
+                        on_reconnect: Callable[[], None] = None):
+
+        # Первая подписка - синхронно, чтобы ошибка была видна при старте
+        self._pubsub = self._redis.pubsub()
+        await self._pubsub.subscribe(channel)
+
+        async def listen():
+            # Обрыв соединения не должен навсегда отключать инвалидации: переподключаемся с backoff.
+            # Сообщения за время обрыва потеряны - после переподключения вызывается on_reconnect
+            attempt = 0
+            while True:
+                try:
+                    if self._pubsub is None:
+                        self._pubsub = self._redis.pubsub()
+                        await self._pubsub.subscribe(channel)
+                        print(f"[INFO][Cache] - Подписка на {channel} восстановлена")
+                        attempt = 0
+                        if on_reconnect is not None:
+                            on_reconnect()
+                    async for message in self._pubsub.listen():
+                        if message.get('type') == 'message':
+                            handler(message['data'])
+                    raise ConnectionError("поток сообщений закрыт")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    delay = min(self.RECONNECT_MAX_DELAY, self.RECONNECT_BASE_DELAY * (2 ** attempt))
+                    attempt += 1
+                    print(f"[WARNING][Cache] - Подписка на {channel} прервана: {e}; повтор через {delay:.1f} с")
+                    await self._close_pubsub()
+                    await asyncio.sleep(delay)
+
+        return asyncio.create_task(listen())
+
+    async def _close_pubsub(self):
+
+        pubsub, self._pubsub = self._pubsub, None
+        if pubsub is None:
+            return
+        try:
+            await pubsub.aclose()
+        except Exception:
+            pass
+
+    async def close(self):
+
+        await self._close_pubsub()
+        await self._redis.aclose()
+
+
+class TieredCache:
+
+    # L1 (память процесса) + опциональный L2 (общий для воркеров).
+    # Инвалидации уходят в pub/sub канал и сбрасывают L1 на остальных воркерах
+
+    def __init__(self, l1: MemoryCacheBackend, l2=None,
+                 default_ttl: float = 30.0, l1_ttl: float = 5.0,
+                 channel: str = 'cache-invalidation', enabled: bool = True):
+        self.l1 = l1
+        self.l2 = l2
+        self.default_ttl = default_ttl
+        # Без L2 нечего перечитывать - L1 живет полный TTL
+        self.l1_ttl = l1_ttl if l2 is not None else default_ttl
+        self.channel = channel
+        self.enabled = enabled
+        self.instance_id = uuid.uuid4().hex
+
+        self._handlers: Dict[str, List[Callable[[List[Any]], None]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._listener = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'l1_hits': 0,
+            'l2_hits': 0,
+            'misses': 0,
+            'sets': 0,
+            'invalidations_sent': 0,
+            'invalidations_received': 0,
+            'resubscribes': 0,
+            'errors': 0
+        }
+
+    def _count(self, name: str, value: int = 1):
+
+        with self._lock:
+            self._stats[name] += value
+
+    async def start(self):
+
+        self._loop = asyncio.get_running_loop()
+        if self.l2 is None or self._listener is not None:
+            return
+
+        try:
+            self._listener = await self.l2.subscribe(self.channel, self._on_message, self._on_reconnect) or True
+            print(f"[INFO][Cache] - Подписка на инвалидации: {self.channel}")
+        except Exception as e:
+            self._count('errors')
+            print(f"[ERROR][Cache] - Не удалось подписаться на {self.channel}: {e}")
+
+    async def stop(self):
+
+        if isinstance(self._listener, asyncio.Task):
+            self._listener.cancel()
+        self._listener = None
+        if self.l2 is not None:
+            await self.l2.close()
+
+    async def get(self, key: str) -> Any:
+
+        if not self.enabled:
+            return None
+
+        raw = self.l1.get_nowait(key)
+        if raw is not None:
+            self._count('l1_hits')
+            return loads(raw)
+
+        if self.l2 is not None:
+            try:
+                raw = await self.l2.get(key)
+            except Exception as e:
+                self._count('errors')
+                print(f"[WARNING][Cache] - Ошибка чтения L2 {key}: {e}")
+                raw = None
+
+            if raw is not None:
+                self._count('l2_hits')
+                self.l1.set_nowait(key, raw, self.l1_ttl)
+                return loads(raw)
+
+        self._count('misses')
+        return None
+
+    async def set(self, key: str, value: Any, ttl: float = None):
+
+        if not self.enabled or value is None:
+            return
+
+        ttl = ttl or self.default_ttl
+        raw = dumps(value)
+        self.l1.set_nowait(key, raw, min(ttl, self.l1_ttl))
+        self._count('sets')
+
+        if self.l2 is not None:
+            try:
+                await self.l2.set(key, raw, ttl)
+            except Exception as e:
+                self._count('errors')
+                print(f"[WARNING][Cache] - Ошибка записи L2 {key}: {e}")
+
+    async def get_or_set(self, key: str, loader: Callable[[], Awaitable[Any]], ttl: float = None) -> Any:
+
+        value = await self.get(key)
+        if value is None:
+            value = await loader()
+            await self.set(key, value, ttl)
+        return value
+
+    async def _publish(self, namespace: str, keys: List[Any]):
+
+        if self.l2 is None or not keys:
+            return
+
+        message = dumps({'origin': self.instance_id, 'namespace': namespace, 'keys': keys})
+        try:
+            await self.l2.publish(self.channel, message)
+            self._count('invalidations_sent')
+        except Exception as e:
+            self._count('errors')
+            print(f"[WARNING][Cache] - Ошибка публикации инвалидации: {e}")
+
+    async def invalidate(self, *keys: str):
+
+        keys = list(keys)
+        self.l1.delete_nowait(keys)
+        if self.l2 is not None:
+            try:
+                await self.l2.delete(keys)
+            except Exception as e:
+                self._count('errors')
+                print(f"[WARNING][Cache] - Ошибка удаления из L2: {e}")
+        await self._publish('keys', keys)
+
+    async def invalidate_prefix(self, prefix: str):
+
+        self.l1.delete_prefix_nowait(prefix)
+        if self.l2 is not None:
+            try:
+                await self.l2.delete_prefix(prefix)
+            except Exception as e:
+                self._count('errors')
+                print(f"[WARNING][Cache] - Ошибка удаления префикса {prefix} из L2: {e}")
+        await self._publish('prefix', [prefix])
+
+    def on_invalidate(self, namespace: str, handler: Callable[[List[Any]], None]):
+
+        # Подписчики на инвалидации других воркеров (например, кэш элементов DynamoDB)
+        self._handlers.setdefault(namespace, []).append(handler)
+
+    def publish_threadsafe(self, namespace: str, keys: List[Any]):
+
+        # Для синхронного кода в потоках пула: публикация выполняется в event loop
+        loop = self._loop
+        if self.l2 is None or loop is None or loop.is_closed() or not keys:
+            return
+        try:
+            loop.call_soon_threadsafe(lambda: loop.create_task(self._publish(namespace, keys)))
+        except RuntimeError:
+            pass
+
+    def _on_reconnect(self):
+
+        # Инвалидации за время обрыва подписки потеряны - L1 этого воркера больше не доверяем
+        self.l1.delete_prefix_nowait('')
+        self._count('resubscribes')
+
+    def _on_message(self, raw: str):
+
+        try:
+            message = loads(raw)
+        except ValueError:
+            return
+
+        if message.get('origin') == self.instance_id:
+            return
+
+        self._count('invalidations_received')
+        namespace, keys = message.get('namespace'), message.get('keys') or []
+
+        if namespace == 'keys':
+            self.l1.delete_nowait(keys)
+        elif namespace == 'prefix':
+            for prefix in keys:
+                self.l1.delete_prefix_nowait(prefix)
+
+        for handler in self._handlers.get(namespace, []):
+            try:
+                handler(keys)
+            except Exception as e:
+                print(f"[WARNING][Cache] - Ошибка обработчика инвалидации {namespace}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            stats = dict(self._stats)
+
+        lookups = stats['l1_hits'] + stats['l2_hits'] + stats['misses']
+        stats.update({
+            'enabled': self.enabled,
+            'backend': type(self.l2).__name__ if self.l2 is not None else None,
+            'l1_size': len(self.l1),
+            'hit_rate': round((stats['l1_hits'] + stats['l2_hits']) / lookups, 3) if lookups else 0.0
+        })
+        return stats
+
+
+def _create_l2(backend: str):
+
+    if backend == 'redis':
+        try:
+            return RedisCacheBackend(settings.CACHE_REDIS_URL)
+        except ImportError:
+            print("[ERROR][Cache] - Пакет redis не установлен, используется только L1")
+            return None
+    if backend == 'local':
+        return MemoryCacheBackend(max_items=settings.CACHE_L1_MAX_ITEMS, shared=True)
+    return None
+
+
+def create_cache(backend: str = None) -> TieredCache:
+
+    backend = (backend or settings.CACHE_BACKEND).lower()
+    return TieredCache(
+        l1=MemoryCacheBackend(max_items=settings.CACHE_L1_MAX_ITEMS),
+        l2=_create_l2(backend),
+        default_ttl=settings.CACHE_DEFAULT_TTL,
+        l1_ttl=settings.CACHE_L1_TTL,
+        channel=settings.CACHE_INVALIDATION_CHANNEL,
+        enabled=backend != 'none'
+    )
+
+
+shared_cache = create_cache()
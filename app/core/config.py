@@ -19,7 +19,101 @@ class Settings(BaseSettings):
     # Названия таблиц DynamoDB
     DYNAMODB_USERS_TABLE: str = ""
     DYNAMODB_OTP_TABLE: str = ""
-    
+
+    # Общий клиент DynamoDB (пул соединений, ретраи, таймауты)
+    DYNAMODB_MAX_POOL_CONNECTIONS: int = 50
+    DYNAMODB_RETRY_MODE: str = "standard"
+    DYNAMODB_MAX_ATTEMPTS: int = 3  # ретраи botocore - только при выключенном DYNAMODB_CALL_GUARD_ENABLED
+    DYNAMODB_CONNECT_TIMEOUT: float = 5.0
+    DYNAMODB_READ_TIMEOUT: float = 10.0
+
+    # Движок DynamoDB: aws (boto3) | memory (движок в памяти для тестов и бенчмарков)
+    DYNAMODB_ENGINE: str = "aws"
+    DYNAMODB_MEMORY_LATENCY_MS: float = 0  # искусственная задержка каждого запроса
+    DYNAMODB_MEMORY_THROTTLE_RATE: float = 0  # доля запросов, отвечающих троттлингом
+    DYNAMODB_MEMORY_SEED: int = 0
+
+    # Асинхронный доступ к DynamoDB (размер пула потоков, не больше пула соединений)
+    DYNAMODB_ASYNC_MAX_CONCURRENCY: int = 16
+
+    # Количество сегментов для параллельных полных сканов
+    DYNAMODB_SCAN_SEGMENTS: int = 4
+
+    # Пакетные операции (BatchGetItem/BatchWriteItem)
+    DYNAMODB_BATCH_CONCURRENCY: int = 4
+    DYNAMODB_BATCH_MAX_RETRIES: int = 8
+    DYNAMODB_BULK_WRITE_LANES: int = 4
+    DYNAMODB_BULK_TARGET_WCU: float = 0  # 0 - без ограничения
+
+    # Кэш элементов перед GetItem (LRU + TTL, лимит на таблицу). Инвалидация между воркерами
+    # идет через L2 общего кэша, поэтому auto включает кэш только при CACHE_BACKEND=redis;
+    # без него запись на одном воркере видна на остальных лишь по истечении TTL
+    DYNAMODB_ITEM_CACHE_ENABLED: str = "auto"  # auto | true | false
+    DYNAMODB_ITEM_CACHE_TTL: float = 30.0
+    DYNAMODB_ITEM_CACHE_MAX_ITEMS: int = 1000
+    DYNAMODB_ITEM_CACHE_TABLE_LIMITS: str = ""  # "table=limit,table2=limit"
+    DYNAMODB_ITEM_CACHE_EXCLUDED_TABLES: str = ""  # не кэшируются никогда, в дополнение к таблицам пользователей и OTP
+
+    # Агрегатные счетчики (total и поле=значение) вместо COUNT-сканов
+    DYNAMODB_COUNTERS_ENABLED: bool = True
+    DYNAMODB_COUNTERS_TABLE: str = "LiberandumAggregationCounters"
+    DYNAMODB_COUNTERS_TRACKED: str = (
+        "LiberandumAggregationToken=is_halal|is_deleted,"
+        "LiberandumAggregationTokenStats=is_deleted,"
+        "LiberandumAggregationExchanges=is_deleted,"
+        "LiberandumAggregationExchangesStats=is_deleted"
+    )  # "table=field|field2,table2=field"; таблица пользователей с role добавляется автоматически
+    DYNAMODB_COUNTERS_CHECK_INTERVAL: float = 60.0
+    DYNAMODB_COUNTERS_RECONCILE_INTERVAL: float = 3600.0  # полная сверка - один воркер на интервал (аренда в таблице счетчиков)
+
+    # Поток изменений (outbox записей) для инкрементальных представлений
+    DYNAMODB_CHANGE_FEED_ENABLED: bool = True
+    DYNAMODB_CHANGE_FEED_MAX_RECORDS: int = 10000
+    DYNAMODB_CHANGE_FEED_TABLES: str = ""  # "table,table2" в дополнение к таблицам подписчиков; "*" - все таблицы
+    DYNAMODB_CHANGE_FEED_POLL_INTERVAL: float = 1.0
+    DYNAMODB_VIEW_MAX_STALENESS: float = 60.0  # полный пересчет представлений не реже, секунд; 0 - только поток
+
+    # Защита запросов: ретраи троттлинга/временных ошибок и AIMD-лимит параллелизма на таблицу
+    DYNAMODB_CALL_GUARD_ENABLED: bool = True
+    DYNAMODB_CALL_MAX_RETRIES: int = 5
+    DYNAMODB_CALL_BASE_DELAY: float = 0.05
+    DYNAMODB_CALL_MAX_DELAY: float = 5.0
+    DYNAMODB_AIMD_INITIAL_LIMIT: float = 16
+    DYNAMODB_AIMD_MIN_LIMIT: float = 1
+    DYNAMODB_AIMD_MAX_LIMIT: float = 64
+
+    # Клиентский бюджет RCU/WCU по provisioned throughput таблиц (DescribeTable, on-demand - без бюджета):
+    # фоновые задачи уступают пользовательским
+    DYNAMODB_CAPACITY_BUDGET_ENABLED: bool = True
+    DYNAMODB_CAPACITY_BURST_SECONDS: float = 5.0
+    DYNAMODB_CAPACITY_INTERACTIVE_RESERVE: float = 0.5  # доля бюджета, недоступная фоновым задачам
+    DYNAMODB_CAPACITY_MAX_WAIT: float = 0.5  # максимум ожидания интерактивного запроса, секунд
+    DYNAMODB_CAPACITY_BACKGROUND_BURST: int = 10  # фоновых запросов без ожидания резерва за burst_seconds
+    DYNAMODB_CAPACITY_BACKGROUND_MAX_WAIT: float = 2.0  # максимум ожидания фонового запроса, секунд
+
+    # Общий кэш (L1 в процессе + L2 для всех воркеров): memory | local | redis | none
+    CACHE_BACKEND: str = "memory"
+    CACHE_REDIS_URL: str = "redis://localhost:6379/0"
+    CACHE_DEFAULT_TTL: float = 30.0
+    CACHE_L1_TTL: float = 5.0
+    CACHE_L1_MAX_ITEMS: int = 5000
+    CACHE_INVALIDATION_CHANNEL: str = "cache-invalidation"
+    CACHE_MARKET_TTL: float = 15.0
+
+    # Учет вызовов DynamoDB по маршрутам и таблицам (задержка, элементы, ConsumedCapacity)
+    DYNAMODB_METRICS_ENABLED: bool = True
+    DYNAMODB_METRICS_MAX_ROUTES: int = 500
+
+    # Бюджет вызовов DynamoDB на HTTP-запрос и поиск N+1 (ENFORCE - превышение отвечает 500, иначе предупреждение)
+    DYNAMODB_CALL_BUDGET_ENABLED: bool = True
+    DYNAMODB_CALL_BUDGET_ENFORCE: bool = False
+    DYNAMODB_CALL_BUDGET_DEFAULT: int = 50
+    DYNAMODB_CALL_BUDGET_ROUTES: str = ""  # "GET /market/tokens=20,GET /market/exchanges=10"
+    DYNAMODB_N_PLUS_ONE_THRESHOLD: int = 5
+
+    # Склейка одинаковых одновременных чтений (репозитории, CoinGecko) в один вызов
+    SINGLEFLIGHT_ENABLED: bool = True
+
     # Google OAuth настройки
     GOOGLE_CLIENT_ID: str = ""
     GOOGLE_CLIENT_SECRET: str = "l"
@@ -2,11 +2,16 @@ from .base import BaseDynamoDBConnector
 from .repositories.user import UserRepository
 from .repositories.otp import OTPRepository
 from .repositories.generic import GenericRepository
+from .async_base import AsyncDynamoDBConnector, AsyncGenericRepository
 
 def get_db_connector():
     from .connector import get_db_connector as _get_db_connector
     return _get_db_connector()
 
+def get_async_db_connector():
+    from .connector import get_async_db_connector as _get_async_db_connector
+    return _get_async_db_connector()
+
 def get_user_repository():
     from .connector import get_user_repository as _get_user_repository
     return _get_user_repository()
@@ -19,6 +24,10 @@ def get_generic_repository(table_name: str):
     from .connector import get_generic_repository as _get_generic_repository
     return _get_generic_repository(table_name)
 
+def get_async_generic_repository(table_name: str):
+    from .connector import get_async_generic_repository as _get_async_generic_repository
+    return _get_async_generic_repository(table_name)
+
 def get_connector():
     from .connector import connector
     return connector
@@ -27,14 +36,18 @@ connector = property(lambda self: get_connector())
 
 __all__ = [
     'BaseDynamoDBConnector',
+    'AsyncDynamoDBConnector',
     
     'UserRepository',
     'OTPRepository', 
     'GenericRepository',
+    'AsyncGenericRepository',
     
     'get_db_connector',
+    'get_async_db_connector',
     'get_user_repository',
     'get_otp_repository',
     'get_generic_repository',
+    'get_async_generic_repository',
     'get_connector'
 ]
\ No newline at end of file
@@ -0,0 +1,165 @@
+import asyncio
+import contextvars
+import functools
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+from app.core.config import settings
+from app.core.singleflight import freeze, singleflight
+from .base import BaseDynamoDBConnector
+from .call_budget import call_budget
+
+# Чтения без побочных эффектов: одинаковые одновременные вызовы склеиваются в один запрос
+COALESCED_METHODS = {
+    'get_item', 'batch_get_items', 'query_items', 'scan_items', 'scan_page', 'count_items',
+    'get_by_id', 'get_many', 'list_all', 'list_page',
+    'find_by_field', 'find_by_multiple_fields', 'search_by_pattern', 'find_in_date_range', 'find_recent',
+    'count_total', 'count_by_field', 'get_field_values', 'sum_field', 'get_stats'
+}
+# Методы, которые ничего не пишут, но и не склеиваются (генераторы, объяснение плана)
+PASSIVE_METHODS = {'iter_query', 'iter_scan', 'parallel_scan', 'explain_find_by_field', 'get_table'}
+
+
+class AsyncExecutor:
+
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency,
+            thread_name_prefix="dynamodb"
+        )
+        self._lock = threading.Lock()
+
+        self._in_flight = 0
+        self._queued = 0
+        self._max_queued = 0
+        self._total_calls = 0
+        self._total_errors = 0
+        self._total_wait_seconds = 0.0
+        self._total_run_seconds = 0.0
+
+    def _on_submit(self):
+
+        with self._lock:
+            self._queued += 1
+            self._max_queued = max(self._max_queued, self._queued)
+
+    def _run_tracked(self, submitted_at: float, func: Callable, *args, **kwargs):
+
+        started_at = time.perf_counter()
+        with self._lock:
+            self._queued -= 1
+            self._in_flight += 1
+            self._total_wait_seconds += started_at - submitted_at
+
+        failed = False
+        try:
+            return func(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self._total_calls += 1
+                self._total_run_seconds += time.perf_counter() - started_at
+                if failed:
+                    self._total_errors += 1
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+
+        self._on_submit()
+        call = functools.partial(
+            context.run, self._run_tracked, time.perf_counter(), func, *args, **kwargs
+        )
+        return await loop.run_in_executor(self._executor, call)
+
+    def get_metrics(self) -> Dict[str, Any]:
+
+        with self._lock:
+            calls = self._total_calls
+            return {
+                'max_concurrency': self.max_concurrency,
+                'in_flight': self._in_flight,
+                'queue_depth': self._queued,
+                'max_queue_depth': self._max_queued,
+                'total_calls': calls,
+                'total_errors': self._total_errors,
+                'avg_queue_wait_ms': round(self._total_wait_seconds / calls * 1000, 3) if calls else 0.0,
+                'avg_call_ms': round(self._total_run_seconds / calls * 1000, 3) if calls else 0.0
+            }
+
+
+class AsyncDynamoDBConnector:
+
+    # Awaitable-обертка над синхронным коннектором: те же имена методов,
+    # но каждый вызов boto3 уходит в ограниченный пул потоков и не блокирует event loop
+
+    def __init__(self, connector: BaseDynamoDBConnector, executor: AsyncExecutor = None):
+        self._connector = connector
+        self._executor = executor or dynamodb_executor
+
+    @property
+    def sync(self) -> BaseDynamoDBConnector:
+        return self._connector
+
+    def __getattr__(self, name: str):
+
+        attr = getattr(self._connector, name)
+        if not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        async def _call(*args, **kwargs):
+            # Стек вызывающего кода фиксируется здесь: в потоке пула виден только коннектор
+            with call_budget.call_site():
+                return await self._dispatch(name, attr, args, kwargs)
+
+        return _call
+
+    async def _dispatch(self, name: str, attr, args: tuple, kwargs: dict):
+
+        namespace = self._flight_namespace(args)
+        if name in COALESCED_METHODS and namespace and not kwargs.get('consistent'):
+            try:
+                key = (name, freeze(args), freeze(kwargs))
+            except TypeError:
+                # Аргумент без стабильного ключа - чтение выполняется без склейки
+                return await self._executor.run(attr, *args, **kwargs)
+            return await singleflight.do(
+                namespace, key, lambda: self._executor.run(attr, *args, **kwargs)
+            )
+        if name in PASSIVE_METHODS:
+            return await self._executor.run(attr, *args, **kwargs)
+
+        try:
+            return await self._executor.run(attr, *args, **kwargs)
+        finally:
+            # Запись (или неизвестный метод): следующие чтения таблицы идут заново
+            singleflight.forget(namespace or 'dynamodb:')
+
+    def _flight_namespace(self, args: tuple) -> Optional[str]:
+
+        # Репозиторий привязан к таблице, у методов коннектора она первым аргументом
+        table_name = getattr(self._connector, 'table_name', None)
+        if table_name is None and args and isinstance(args[0], str):
+            table_name = args[0]
+        return f"dynamodb:{table_name}" if table_name else None
+
+
+class AsyncGenericRepository(AsyncDynamoDBConnector):
+
+    @property
+    def table_name(self) -> str:
+        return self._connector.table_name
+
+
+dynamodb_executor = AsyncExecutor(settings.DYNAMODB_ASYNC_MAX_CONCURRENCY)
+
+def get_async_executor_metrics() -> Dict[str, Any]:
+    return dynamodb_executor.get_metrics()
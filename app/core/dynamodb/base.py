@@ -1,59 +1,145 @@
 
 import boto3
+from boto3.dynamodb.conditions import Attr
+from boto3.dynamodb.types import TypeDeserializer
+from botocore.config import Config
 from botocore.exceptions import ClientError, NoCredentialsError
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Tuple
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from datetime import datetime
+import contextvars
+import time
 import uuid
 
 from app.core.config import settings
+from .bulk_writer import BulkWriter
+from .call_budget import call_budget
+from .capacity import BACKGROUND, capacity_budgeter, capacity_lane
+from .change_feed import EVENT_MODIFY, EVENT_REMOVE, change_feed
+from .counters import aggregate_counters
+from .exceptions import (
+    ConflictError, DynamoDBError, InvalidRequestError, ItemNotFoundError, RequestFailedError,
+    TableNotFoundError, ThrottledError, TransactionCanceledError, VersionConflictError
+)
+from .expressions import apply_projection, apply_update, build_update_expression
+from .item_cache import item_cache
+from .metrics import dynamodb_metrics
+from .pagination import paginate_scan
+from .parallel_scan import ParallelScan
+from .planner import query_planner
+from .retry import backoff_delay, chunked
+from .throttling import call_guard, table_name_of
+from .transactions import MAX_TRANSACTION_ITEMS, VERSION_ATTRIBUTE
+
+_deserializer = TypeDeserializer()
+
 
 class BaseDynamoDBConnector:
 
     
     def __init__(self):
+        self.session = None
         self.client = None
         self.dynamodb = None
         self._initialized = False
         self._tables = {}  # Кэш таблиц
     
+    def _build_client_config(self) -> Config:
+
+        # Ретраи троттлинга делает call_guard (с AIMD-лимитом и счетчиками). Ретраи botocore под ним
+        # умножили бы попытки и спрятали бы троттлинг от AIMD - при включенной защите одна попытка
+        max_attempts = 1 if settings.DYNAMODB_CALL_GUARD_ENABLED else settings.DYNAMODB_MAX_ATTEMPTS
+        return Config(
+            max_pool_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS,
+            connect_timeout=settings.DYNAMODB_CONNECT_TIMEOUT,
+            read_timeout=settings.DYNAMODB_READ_TIMEOUT,
+            retries={
+                'mode': settings.DYNAMODB_RETRY_MODE,
+                'max_attempts': max_attempts
+            }
+        )
+
     def _init_clients(self):
 
         try:
 
+            if settings.DYNAMODB_ENGINE == 'memory':
+                # Движок в памяти с тем же интерфейсом resource/client - для тестов и бенчмарков
+                from .memory import get_memory_engine
 
-            self.client = boto3.client(
-                'dynamodb',
-                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-                region_name=settings.AWS_REGION
-            )
-            
+                engine = get_memory_engine()
+                self.session = None
+                self.dynamodb = engine.resource
+                self.client = engine.client
+                return
 
-            self.dynamodb = boto3.resource(
-                'dynamodb',
+            self.session = boto3.session.Session(
                 aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
                 aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
                 region_name=settings.AWS_REGION
             )
-            
- 
+
+            resource_params = {'config': self._build_client_config()}
+            if settings.AWS_ENDPOINT_URL:
+                resource_params['endpoint_url'] = settings.AWS_ENDPOINT_URL
+
+            # Один клиент и один пул HTTP-соединений на ресурс и низкоуровневые вызовы.
+            # Клиент ресурса принимает обычные python-типы (без {'S': ...})
+            self.dynamodb = self.session.resource('dynamodb', **resource_params)
+            self.client = self.dynamodb.meta.client
+
             self._test_connection()
 
 
         except Exception as e:
             print(f"[ERROR][DynamoDB] - Ошибка инициализации клиентов: {e}")
             raise e
-    
+
+    def use_clients(self, client, dynamodb):
+
+        # Подключает уже созданные клиенты коннектора без нового сетевого запроса
+        self.client = client
+        self.dynamodb = dynamodb
+        self._initialized = True
+        return self
+
     def _test_connection(self):
 
         try:
 
-            list(self.dynamodb.tables.all())
+            self.client.list_tables(Limit=1)
 
         except Exception as e:
             print(f"[ERROR][DynamoDB] - Тест подключения: ОШИБКА - {e}")
             raise e
-    
+
+    def _call(self, operation, **params) -> Dict[str, Any]:
+
+        # Каждый запрос к DynamoDB - через бюджет емкости таблицы (полосы interactive/background)
+        # и защиту от троттлинга (ретраи, AIMD-лимит, счетчики).
+        # Исчерпанные ретраи - ThrottledError/ServiceUnavailableError, а не пустой результат.
+        # Снаружи - учет вызова (задержка, элементы, ConsumedCapacity) по маршруту и таблице.
+        # До вызова - счетчик запроса: повторы одной формы (N+1) и бюджет вызовов маршрута
+        table_name = table_name_of(operation, params)
+        call_budget.record(table_name, operation, params)
+        return dynamodb_metrics.call(
+            table_name, operation, params,
+            lambda: capacity_budgeter.call(table_name, operation, params, call_guard.call)
+        )
+
+    def _request_failed(self, table_name: str, action: str, error: ClientError) -> RequestFailedError:
+
+        # Ошибка, которую call_guard не повторяет: наружу типизированное исключение, а не пустой результат
+        code = error.response.get('Error', {}).get('Code')
+        print(f"[ERROR][DynamoDB] - Ошибка {action} {table_name}: {error}")
+        if code == 'ResourceNotFoundException':
+            error_class = TableNotFoundError
+        elif code == 'ValidationException':
+            error_class = InvalidRequestError
+        else:
+            error_class = RequestFailedError
+        return error_class(f"Ошибка {action} {table_name}: {error}", table_name=table_name, code=code)
+
     def get_table(self, table_name: str):
 
         if table_name not in self._tables:
@@ -107,145 +193,615 @@ class BaseDynamoDBConnector:
             return False
     
     
-    def create_item(self, table_name: str, item: Dict[str, Any]) -> Dict[str, Any]:
+    def create_item(self, table_name: str, item: Dict[str, Any], versioned: bool = False) -> Dict[str, Any]:
 
         try:
 
+            if versioned:
+                item.setdefault(VERSION_ATTRIBUTE, 1)
             if 'created_at' not in item:
                 item['created_at'] = datetime.utcnow().isoformat()
             if 'updated_at' not in item:
                 item['updated_at'] = datetime.utcnow().isoformat()
             
             table = self.get_table(table_name)
-            table.put_item(Item=item)
+            key = self._key_of(table_name, item)
+            if aggregate_counters.tracks(table_name) or change_feed.captures(table_name):
+                # ALL_OLD: перезапись существующего элемента не должна увеличить total,
+                # а поток изменений отличает INSERT от MODIFY
+                response = self._call(table.put_item, Item=item, ReturnValues='ALL_OLD')
+                aggregate_counters.record_write(self, table_name, response.get('Attributes'), item)
+                change_feed.emit(table_name, key, response.get('Attributes'), item)
+            else:
+                self._call(table.put_item, Item=item)
+            item_cache.invalidate(table_name, key)
             
 
             return item
             
         except ClientError as e:
-            print(f"[ERROR][DynamoDB] - Ошибка создания элемента в {table_name}: {e}")
-            raise e
+            raise self._request_failed(table_name, 'создания элемента в', e) from e
     
-    def get_item(self, table_name: str, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _key_of(self, table_name: str, item: Dict[str, Any]) -> Dict[str, Any]:
+
+        key_names = query_planner.key_attributes(table_name, self.client)
+        return {name: item[name] for name in key_names if name in item}
+
+    def get_item(self, table_name: str, key: Dict[str, Any],
+                 projection: List[str] = None, consistent: bool = False) -> Optional[Dict[str, Any]]:
+
+        # consistent=True - строго согласованное чтение мимо кэша (для read-modify-write)
+        cached = None if consistent else item_cache.get(table_name, key)
+        if cached is not None:
+            # Проекцию отдаем из полного закэшированного элемента
+            if projection:
+                return {field: cached[field] for field in projection if field in cached}
+            return cached
 
         try:
+            generation = item_cache.generation(table_name)
             table = self.get_table(table_name)
-            response = table.get_item(Key=key)
-            return response.get('Item')
+            params = apply_projection({'Key': key}, projection)
+            if consistent:
+                params['ConsistentRead'] = True
+            response = self._call(table.get_item, **params)
+            item = response.get('Item')
+            # Частичные элементы (с проекцией) не кэшируем
+            if not projection:
+                item_cache.set(table_name, key, item, generation=generation)
+            return item
             
         except ClientError as e:
-            print(f"[ERROR][DynamoDB] - Ошибка получения элемента из {table_name}: {e}")
-            return None
+            raise self._request_failed(table_name, 'получения элемента из', e) from e
     
-    def update_item(self, table_name: str, key: Dict[str, Any], updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def _write_condition(self, key: Dict[str, Any], condition: Any = None,
+                         require_exists: bool = False) -> Any:
+
+        if require_exists:
+            exists = Attr(next(iter(key))).exists()
+            condition = exists & condition if condition is not None else exists
+        return condition
+
+    def _raise_condition_failed(self, table_name: str, key: Dict[str, Any], error: ClientError,
+                                expected_version: int = None):
+
+        # С ReturnValuesOnConditionCheckFailure=ALL_OLD в ошибке приходит текущий элемент:
+        # нет элемента - не найден, есть - не выполнено условие (конфликт)
+        current_item = error.response.get('Item')
+        if current_item is None:
+            raise ItemNotFoundError(f"Элемент {key} не найден в {table_name}") from error
+
+        current_item = self._deserialize_item(current_item)
+        current_version = int(current_item.get(VERSION_ATTRIBUTE, 0))
+        if expected_version is not None and current_version != expected_version:
+            raise VersionConflictError(
+                f"Элемент {key} в {table_name} изменен: версия {current_version}, ожидалась {expected_version}",
+                current_item=current_item,
+                expected_version=expected_version,
+                current_version=current_version
+            ) from error
+        raise ConflictError(
+            f"Условие записи для {key} в {table_name} не выполнено",
+            current_item=current_item
+        ) from error
+
+    def _deserialize_item(self, item: Dict[str, Any]) -> Dict[str, Any]:
+
+        # Тело ошибки не проходит через десериализацию ресурса boto3 - приходит в формате {'S': ...}
+        try:
+            return {name: _deserializer.deserialize(value) for name, value in item.items()}
+        except (TypeError, KeyError, AttributeError):
+            return item
+
+    def _version_condition(self, expected_version: int) -> Any:
 
+        # Версия 0 - элемент еще ни разу не обновлялся с версионированием
+        if expected_version == 0:
+            return Attr(VERSION_ATTRIBUTE).not_exists() | Attr(VERSION_ATTRIBUTE).eq(0)
+        return Attr(VERSION_ATTRIBUTE).eq(expected_version)
+
+    def update_item(self, table_name: str, key: Dict[str, Any], updates: Dict[str, Any],
+                    condition: Any = None, require_exists: bool = False,
+                    expected_version: int = None,
+                    remove: List[str] = None, add: Dict[str, Any] = None,
+                    set_if_not_exists: Dict[str, Any] = None,
+                    return_values: str = 'ALL_NEW') -> Optional[Dict[str, Any]]:
+
+        # return_values='NONE' для путей, которым не нужен результат: успех -> {}, ошибка - исключение
         try:
 
-            updates['updated_at'] = datetime.utcnow().isoformat()
-            
+            # Ключевые атрибуты изменять нельзя; версию ведет только сервер
+            set_values = {
+                field: value for field, value in updates.items()
+                if field not in key and field != VERSION_ATTRIBUTE
+            }
+            set_values['updated_at'] = datetime.utcnow().isoformat()
+
+            # Версия растет при каждом обновлении, а не только при проверке expected_version:
+            # иначе запись без проверки не меняет версию и read-modify-write ее перезатирает
+            add = dict(add or {})
+            add[VERSION_ATTRIBUTE] = 1
+
+            # Старый элемент (ALL_OLD) нужен счетчикам и потоку изменений; ALL_NEW для вызывающего
+            # собирается по нему локально - без лишнего GetItem
+            counted = aggregate_counters.tracks(table_name) and (
+                not require_exists or aggregate_counters.touches(
+                    table_name, [*set_values, *(remove or []), *add, *(set_if_not_exists or {})]
+                )
+            )
+            with_old = counted or change_feed.captures(table_name)
+            if with_old and return_values not in ('ALL_NEW', 'NONE'):
+                if counted:
+                    aggregate_counters.mark_dirty(table_name, self)
+                with_old = False
+
+            update_params = {
+                'Key': key,
+                'ReturnValues': 'ALL_OLD' if with_old else return_values,
+                **build_update_expression(
+                    set_values=set_values,
+                    remove=remove,
+                    add=add,
+                    set_if_not_exists=set_if_not_exists
+                )
+            }
+            if expected_version is not None:
+                version_condition = self._version_condition(expected_version)
+                condition = condition & version_condition if condition is not None else version_condition
+
+            condition = self._write_condition(key, condition, require_exists)
+            if condition is not None:
+                update_params['ConditionExpression'] = condition
+                update_params['ReturnValuesOnConditionCheckFailure'] = 'ALL_OLD'
 
-            update_expression = "SET "
-            expression_values = {}
-            
-            for field, value in updates.items():
-                update_expression += f"{field} = :{field}, "
-                expression_values[f":{field}"] = value
-            
-            update_expression = update_expression.rstrip(", ")
-            
             table = self.get_table(table_name)
-            response = table.update_item(
-                Key=key,
-                UpdateExpression=update_expression,
-                ExpressionAttributeValues=expression_values,
-                ReturnValues='ALL_NEW'
-            )
-            
-            return response.get('Attributes')
+            response = self._call(table.update_item, **update_params)
+            item_cache.invalidate(table_name, key)
+
+            if with_old:
+                old_item = response.get('Attributes')
+                new_item = apply_update(old_item, key, set_values, remove, add, set_if_not_exists)
+                aggregate_counters.record_write(self, table_name, old_item, new_item)
+                change_feed.emit(table_name, key, old_item, new_item)
+                return new_item if return_values == 'ALL_NEW' else {}
+
+            change_feed.emit(table_name, key, event_name=EVENT_MODIFY)
+            return response.get('Attributes', {})
             
         except ClientError as e:
-            print(f"[ERROR][DynamoDB] - Ошибка обновления элемента в {table_name}: {e}")
-            return None
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                self._raise_condition_failed(table_name, key, e, expected_version=expected_version)
+            raise self._request_failed(table_name, 'обновления элемента в', e) from e
     
-    def delete_item(self, table_name: str, key: Dict[str, Any]) -> bool:
+    def delete_item(self, table_name: str, key: Dict[str, Any],
+                    condition: Any = None, require_exists: bool = False) -> bool:
 
         try:
+            delete_params = {'Key': key}
+            condition = self._write_condition(key, condition, require_exists)
+            if condition is not None:
+                delete_params['ConditionExpression'] = condition
+                delete_params['ReturnValuesOnConditionCheckFailure'] = 'ALL_OLD'
+
+            with_old = aggregate_counters.tracks(table_name) or change_feed.captures(table_name)
+            if with_old:
+                delete_params['ReturnValues'] = 'ALL_OLD'
+
             table = self.get_table(table_name)
-            table.delete_item(Key=key)
+            response = self._call(table.delete_item, **delete_params)
+            item_cache.invalidate(table_name, key)
+            if with_old and response.get('Attributes'):
+                aggregate_counters.record_write(self, table_name, response['Attributes'], None)
+                change_feed.emit(table_name, key, response['Attributes'], None)
 
             return True
             
         except ClientError as e:
-            print(f"[ERROR][DynamoDB] - Ошибка удаления элемента из {table_name}: {e}")
-            return False
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                self._raise_condition_failed(table_name, key, e)
+            raise self._request_failed(table_name, 'удаления элемента из', e) from e
     
-    def query_items(self, table_name: str, key_condition: Any, 
-                   index_name: str = None, filter_expression: Any = None, 
-                   limit: int = None) -> List[Dict[str, Any]]:
+    def transact_write(self, operations: List[Dict[str, Any]], client_token: str = None) -> bool:
+
+        # Все операции (put_op/update_op/delete_op/check_op) применяются атомарно за один запрос:
+        # либо записаны все, либо ни одна (TransactionCanceledError с причинами по каждой операции)
+        if not operations:
+            return True
+        if len(operations) > MAX_TRANSACTION_ITEMS:
+            raise ValueError(f"Не более {MAX_TRANSACTION_ITEMS} операций в транзакции, передано {len(operations)}")
+
+        # Повтор с тем же токеном в течение 10 минут не применяет транзакцию второй раз. Без токена
+        # вызывающего - свой на вызов: ретраи call_guard после сетевой ошибки остаются идемпотентными
+        params = {'TransactItems': operations, 'ClientRequestToken': client_token or str(uuid.uuid4())}
+
+        touched = []
+        for operation in operations:
+            (action, body), = operation.items()
+            key = self._key_of(body['TableName'], body['Item']) if action == 'Put' else body['Key']
+            if action != 'ConditionCheck':
+                touched.append((body['TableName'], key))
+
+        try:
+            self._call(self.client.transact_write_items, **params)
+            for table_name in {table_name for table_name, _ in touched}:
+                aggregate_counters.mark_dirty(table_name, self)
+            for operation in operations:
+                (action, body), = operation.items()
+                if action == 'Put':
+                    change_feed.emit(body['TableName'], self._key_of(body['TableName'], body['Item']),
+                                     new_image=body['Item'], event_name=EVENT_MODIFY)
+                elif action == 'Update':
+                    change_feed.emit(body['TableName'], body['Key'], event_name=EVENT_MODIFY)
+                elif action == 'Delete':
+                    change_feed.emit(body['TableName'], body['Key'], event_name=EVENT_REMOVE)
+            return True
+
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'TransactionCanceledException':
+                reasons = [
+                    {
+                        'table_name': body['TableName'],
+                        'operation': action,
+                        'code': reason.get('Code'),
+                        'message': reason.get('Message')
+                    }
+                    for operation, reason in zip(operations, e.response.get('CancellationReasons', []))
+                    for action, body in operation.items()
+                ]
+                failed = [reason for reason in reasons if reason['code'] not in (None, 'None')]
+                raise TransactionCanceledError(
+                    f"Транзакция отменена: {failed or e.response['Error'].get('Message')}",
+                    reasons=reasons
+                ) from e
+            print(f"[ERROR][DynamoDB] - Ошибка транзакционной записи: {e}")
+            raise e
+
+        finally:
+            # Отмененная транзакция ничего не записала, но сброс кэша безопасен в обоих случаях
+            for table_name, key in touched:
+                item_cache.invalidate(table_name, key)
+
+    def _iter_pages(self, operation, params: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+
+        # Проходит все страницы запроса по LastEvaluatedKey, пока вызывающий не остановится
+        params = dict(params)
+        while True:
+            response = self._call(operation, **params)
+            yield response
+
+            last_key = response.get('LastEvaluatedKey')
+            if not last_key:
+                return
+            params['ExclusiveStartKey'] = last_key
+
+    def _iter_items(self, operation, params: Dict[str, Any],
+                    max_items: int = None) -> Iterator[Dict[str, Any]]:
+
+        returned = 0
+        for response in self._iter_pages(operation, params):
+            for item in response.get('Items', []):
+                yield item
+                returned += 1
+                if max_items and returned >= max_items:
+                    return
+
+    def iter_query(self, table_name: str, key_condition: Any,
+                   index_name: str = None, filter_expression: Any = None,
+                   page_size: int = None, max_items: int = None,
+                   projection: List[str] = None) -> Iterator[Dict[str, Any]]:
+
+        query_params = {
+            'KeyConditionExpression': key_condition
+        }
+
+        if index_name:
+            query_params['IndexName'] = index_name
+        if filter_expression:
+            query_params['FilterExpression'] = filter_expression
+        if page_size:
+            query_params['Limit'] = page_size
+        apply_projection(query_params, projection)
 
         try:
             table = self.get_table(table_name)
-            
-            query_params = {
-                'KeyConditionExpression': key_condition
-            }
-            
-            if index_name:
-                query_params['IndexName'] = index_name
-            if filter_expression:
-                query_params['FilterExpression'] = filter_expression
-            if limit:
-                query_params['Limit'] = limit
-            
-            response = table.query(**query_params)
-            return response.get('Items', [])
-            
+            yield from self._iter_items(table.query, query_params, max_items)
+
         except ClientError as e:
-            print(f"[ERROR][DynamoDB] - Ошибка запроса к {table_name}: {e}")
-            return []
+            raise self._request_failed(table_name, 'запроса к', e) from e
+
+    def iter_scan(self, table_name: str, filter_expression: Any = None,
+                  page_size: int = None, max_items: int = None,
+                  projection: List[str] = None) -> Iterator[Dict[str, Any]]:
+
+        scan_params = {}
+        if filter_expression:
+            scan_params['FilterExpression'] = filter_expression
+        if page_size:
+            scan_params['Limit'] = page_size
+        apply_projection(scan_params, projection)
+
+        try:
+            table = self.get_table(table_name)
+            yield from self._iter_items(table.scan, scan_params, max_items)
+
+        except ClientError as e:
+            raise self._request_failed(table_name, 'сканирования', e) from e
+
+    def query_items(self, table_name: str, key_condition: Any, 
+                   index_name: str = None, filter_expression: Any = None, 
+                   limit: int = None, projection: List[str] = None) -> List[Dict[str, Any]]:
+
+        return list(self.iter_query(
+            table_name,
+            key_condition,
+            index_name=index_name,
+            filter_expression=filter_expression,
+            page_size=None if filter_expression else limit,
+            max_items=limit,
+            projection=projection
+        ))
     
     def scan_items(self, table_name: str, filter_expression: Any = None, 
-                  limit: int = None) -> List[Dict[str, Any]]:
+                  limit: int = None, projection: List[str] = None) -> List[Dict[str, Any]]:
+
+        return list(self.iter_scan(
+            table_name,
+            filter_expression=filter_expression,
+            page_size=None if filter_expression else limit,
+            max_items=limit,
+            projection=projection
+        ))
+
+    def parallel_scan(self, table_name: str, segments: int = None,
+                      filter_expression: Any = None,
+                      projection: List[str] = None,
+                      page_size: int = None,
+                      on_progress=None,
+                      lane: str = None) -> ParallelScan:
+
+        return ParallelScan(
+            self,
+            table_name,
+            segments=segments or settings.DYNAMODB_SCAN_SEGMENTS,
+            filter_expression=filter_expression,
+            projection=projection,
+            page_size=page_size,
+            on_progress=on_progress,
+            lane=lane
+        )
+
+    def scan_page(self, table_name: str, limit: int, cursor: str = None,
+                  filter_expression: Any = None,
+                  projection: List[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+
+        # Курсор строится из ключа последнего элемента, поэтому ключ всегда попадает в проекцию
+        key_names = query_planner.key_attributes(table_name, self.client)
+        if projection:
+            projection = list(key_names) + [field for field in projection if field not in key_names]
 
         try:
             table = self.get_table(table_name)
-            
-            scan_params = {}
-            if filter_expression:
-                scan_params['FilterExpression'] = filter_expression
-            if limit:
-                scan_params['Limit'] = limit
-            
-            response = table.scan(**scan_params)
-            return response.get('Items', [])
-            
+            return paginate_scan(
+                table,
+                limit,
+                cursor=cursor,
+                filter_expression=filter_expression,
+                key_attributes=key_names,
+                extra_params=apply_projection({}, projection),
+                call=self._call
+            )
+
         except ClientError as e:
-            print(f"[ERROR][DynamoDB] - Ошибка сканирования {table_name}: {e}")
-            return []
-    
-    def batch_write_items(self, table_name: str, items: List[Dict[str, Any]]) -> bool:
+            raise self._request_failed(table_name, 'постраничного сканирования', e) from e
+
+    def count_items(self, table_name: str, filter_expression: Any = None) -> int:
+
+        scan_params = {'Select': 'COUNT'}
+        if filter_expression:
+            scan_params['FilterExpression'] = filter_expression
 
         try:
             table = self.get_table(table_name)
-            
+            return sum(
+                response.get('Count', 0)
+                for response in self._iter_pages(table.scan, scan_params)
+            )
+
+        except ClientError as e:
+            raise self._request_failed(table_name, 'подсчета элементов в', e) from e
+    
+    def _batch_get_chunk(self, table_name: str, keys: List[Dict[str, Any]],
+                         projection: List[str] = None) -> List[Dict[str, Any]]:
+
+        request = apply_projection({'Keys': keys}, projection)
+
+        request_items = {table_name: request}
+        items = []
+
+        for attempt in range(settings.DYNAMODB_BATCH_MAX_RETRIES + 1):
+            response = self._call(self.dynamodb.batch_get_item, RequestItems=request_items)
+            items.extend(response.get('Responses', {}).get(table_name, []))
+
+            request_items = response.get('UnprocessedKeys') or {}
+            if not request_items:
+                return items
+
+            call_guard.record_throttle(table_name)
+            time.sleep(backoff_delay(attempt))
+
+        # Необработанные ключи выглядели бы как отсутствующие элементы - это ошибка, а не пустой ответ
+        unprocessed = len(request_items.get(table_name, {}).get('Keys', []))
+        raise ThrottledError(
+            f"BatchGetItem {table_name}: {unprocessed} ключей не обработано после ретраев",
+            table_name=table_name, retry_after=settings.DYNAMODB_CALL_MAX_DELAY
+        )
+
+    def batch_get_items(self, table_name: str, keys: List[Dict[str, Any]],
+                        projection: List[str] = None,
+                        key_attributes: Tuple[str, ...] = ('id',)) -> List[Optional[Dict[str, Any]]]:
+
+        # BatchGetItem по 100 ключей, чанки параллельно; результат в порядке входных ключей
+        if not keys:
+            return []
+
+        def key_of(item: Dict[str, Any]) -> Tuple:
+            return tuple(item.get(name) for name in key_attributes)
+
+        unique_keys = list({key_of(key): key for key in keys}.values())
+        if projection:
+            projection = list(dict.fromkeys(list(key_attributes) + list(projection)))
+
+        chunks = list(chunked(unique_keys, 100))
+        found: Dict[Tuple, Dict[str, Any]] = {}
+
+        try:
+            if len(chunks) == 1:
+                results = [self._batch_get_chunk(table_name, chunks[0], projection)]
+            else:
+                workers = min(len(chunks), settings.DYNAMODB_BATCH_CONCURRENCY)
+
+                def get_chunk(chunk: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+                    return self._batch_get_chunk(table_name, chunk, projection)
+
+                # Контекст вызывающего (маршрут, полоса емкости, счетчик запроса) - в каждый поток
+                with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-get") as executor:
+                    futures = [executor.submit(contextvars.copy_context().run, get_chunk, chunk) for chunk in chunks]
+                    results = [future.result() for future in futures]
+
+            for chunk_items in results:
+                for item in chunk_items:
+                    found[key_of(item)] = item
 
-            batch_size = 25
-            
-            for i in range(0, len(items), batch_size):
-                batch = items[i:i + batch_size]
-                
-                with table.batch_writer() as batch_writer:
-                    for item in batch:
-
-                        if 'created_at' not in item:
-                            item['created_at'] = datetime.utcnow().isoformat()
-                        if 'updated_at' not in item:
-                            item['updated_at'] = datetime.utcnow().isoformat()
-                        
-                        batch_writer.put_item(Item=item)
-            
-            return True
-            
         except ClientError as e:
-            print(f"[ERROR][DynamoDB] - Ошибка массовой записи в {table_name}: {e}")
-            return False
\ No newline at end of file
+            raise self._request_failed(table_name, 'пакетного чтения из', e) from e
+
+        return [found.get(key_of(key)) for key in keys]
+
+    def _batch_write_chunk(self, table_name: str, requests: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+
+        # Один BatchWriteItem (до 25 запросов) с ретраями UnprocessedItems; возвращает необработанные
+        request_items = {table_name: requests}
+
+        for attempt in range(settings.DYNAMODB_BATCH_MAX_RETRIES + 1):
+            response = self._call(self.dynamodb.batch_write_item, RequestItems=request_items)
+
+            request_items = response.get('UnprocessedItems') or {}
+            if not request_items:
+                return []
+
+            call_guard.record_throttle(table_name)
+            time.sleep(backoff_delay(attempt))
+
+        return request_items.get(table_name, [])
+
+    def _iter_key_chunks(self, keys: Iterable[Dict[str, Any]], size: int,
+                         key_attributes: Tuple[str, ...]) -> Iterator[List[Dict[str, Any]]]:
+
+        # Ключи могут прийти целыми элементами из скана - оставляем только ключевые атрибуты.
+        # BatchWriteItem не принимает дубликаты ключей в одном запросе
+        chunk = {}
+        for key in keys:
+            key = {name: key[name] for name in key_attributes}
+            chunk[tuple(key.values())] = key
+            if len(chunk) >= size:
+                yield list(chunk.values())
+                chunk = {}
+        if chunk:
+            yield list(chunk.values())
+
+    def batch_delete_items(self, table_name: str, keys: Iterable[Dict[str, Any]],
+                           key_attributes: Tuple[str, ...] = ('id',)) -> Dict[str, Any]:
+
+        # BatchWriteItem не сообщает, существовал ли элемент: processed - ключи, принятые DynamoDB
+        # к удалению (включая отсутствующие), а не число реально удаленных элементов
+        started_at = time.perf_counter()
+        report = {
+            'table_name': table_name,
+            'requested': 0,
+            'processed': 0,
+            'failed': 0,
+            'failed_keys': []
+        }
+
+        def delete_chunk(chunk: List[Dict[str, Any]]) -> Tuple[int, List[Dict[str, Any]]]:
+            # Массовое удаление - фоновая работа, уступает емкость пользовательским запросам
+            try:
+                with capacity_lane(BACKGROUND):
+                    unprocessed = self._batch_write_chunk(
+                        table_name,
+                        [{'DeleteRequest': {'Key': key}} for key in chunk]
+                    )
+                failed_keys = [r['DeleteRequest']['Key'] for r in unprocessed]
+                change_feed.emit_items(
+                    table_name, [key for key in chunk if key not in failed_keys], key_attributes, EVENT_REMOVE
+                )
+                return len(chunk) - len(unprocessed), failed_keys
+            except (ClientError, DynamoDBError) as e:
+                print(f"[ERROR][DynamoDB] - Ошибка пакетного удаления из {table_name}: {e}")
+                return 0, chunk
+            finally:
+                item_cache.invalidate_items(table_name, chunk, key_attributes)
+
+        def collect(futures):
+            for future in futures:
+                processed, failed_keys = future.result()
+                report['processed'] += processed
+                report['failed'] += len(failed_keys)
+                report['failed_keys'].extend(failed_keys)
+
+        workers = max(1, settings.DYNAMODB_BATCH_CONCURRENCY)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch-delete") as executor:
+            pending = set()
+            for chunk in self._iter_key_chunks(keys, 25, key_attributes):
+                report['requested'] += len(chunk)
+                pending.add(executor.submit(contextvars.copy_context().run, delete_chunk, chunk))
+
+                # Ограничиваем число чанков в полете, чтобы не держать в памяти весь поток ключей
+                if len(pending) >= workers * 2:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    collect(done)
+
+            collect(wait(pending).done)
+
+        # BatchWriteItem не возвращает удаленных элементов - счетчики поправит сверка
+        aggregate_counters.mark_dirty(table_name, self)
+        report['elapsed_seconds'] = round(time.perf_counter() - started_at, 3)
+        return report
+
+    def bulk_write(self, table_name: str, items: Iterable[Dict[str, Any]],
+                   lanes: int = None, target_wcu: float = None) -> Dict[str, Any]:
+
+        writer = BulkWriter(self, table_name, lanes=lanes, target_wcu=target_wcu)
+        try:
+            return writer.write(items)
+        finally:
+            aggregate_counters.mark_dirty(table_name, self)
+
+    async def bulk_write_async(self, table_name: str, items,
+                               lanes: int = None, target_wcu: float = None) -> Dict[str, Any]:
+
+        writer = BulkWriter(self, table_name, lanes=lanes, target_wcu=target_wcu)
+        try:
+            return await writer.write_async(items)
+        finally:
+            aggregate_counters.mark_dirty(table_name, self)
+
+    def batch_write_items(self, table_name: str, items: List[Dict[str, Any]]) -> bool:
+
+        stats = self.bulk_write(table_name, items)
+        if stats['failed']:
+            print(f"[ERROR][DynamoDB] - Массовая запись в {table_name}: {stats['failed']} элементов не записано")
+        return stats['failed'] == 0
+
+
+class BaseRepository(BaseDynamoDBConnector):
+
+    # Репозиторий одной таблицы: self.table - ресурс Table, берется после подключения клиентов (use_clients)
+
+    def __init__(self, table_name: str):
+        super().__init__()
+        self.table_name = table_name
+
+    @property
+    def table(self):
+        return self.get_table(self.table_name)
@@ -0,0 +1,226 @@
+import asyncio
+import contextvars
+import json
+import math
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+from .capacity import BACKGROUND, capacity_lane
+from .change_feed import EVENT_MODIFY, change_feed
+from .exceptions import DynamoDBError
+from .item_cache import item_cache
+from .rate_limit import TokenBucket
+from .retry import backoff_delay
+from .throttling import call_guard
+
+
+_LANE_DONE = object()
+
+
+class BulkWriter:
+
+    # Массовая запись: несколько параллельных "полос" BatchWriteItem по 25 элементов,
+    # ретраи UnprocessedItems с джиттером и опциональный потолок по WCU
+
+    def __init__(self, connector, table_name: str,
+                 lanes: int = None,
+                 target_wcu: float = None,
+                 key_attributes: Tuple[str, ...] = ('id',),
+                 stamp_timestamps: bool = True):
+        self.connector = connector
+        self.table_name = table_name
+        self.lanes = max(1, lanes or settings.DYNAMODB_BULK_WRITE_LANES)
+        self.key_attributes = key_attributes
+        self.stamp_timestamps = stamp_timestamps
+
+        target_wcu = target_wcu if target_wcu is not None else settings.DYNAMODB_BULK_TARGET_WCU
+        self._limiter = TokenBucket(target_wcu) if target_wcu and target_wcu > 0 else None
+
+        self._queue: queue.Queue = queue.Queue(maxsize=self.lanes * 4)
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._timestamp: Optional[str] = None
+        self._started_at: Optional[float] = None
+        self._stats = {
+            'submitted': 0,
+            'written': 0,
+            'failed': 0,
+            'batches': 0,
+            'throttled_retries': 0,
+            'throttled_items': 0,
+            'rate_limited_seconds': 0.0
+        }
+        self.failed_items: List[Dict[str, Any]] = []
+
+    def _estimate_wcu(self, chunk: List[Dict[str, Any]]) -> float:
+
+        # 1 WCU на каждый начатый 1 KB элемента
+        return sum(
+            max(1, math.ceil(len(json.dumps(item, default=str)) / 1024))
+            for item in chunk
+        )
+
+    def _write_chunk(self, chunk: List[Dict[str, Any]]):
+
+        if self._limiter:
+            waited = self._limiter.acquire(self._estimate_wcu(chunk))
+            with self._lock:
+                self._stats['rate_limited_seconds'] += waited
+
+        request_items = {self.table_name: [{'PutRequest': {'Item': item}} for item in chunk]}
+        pending = len(chunk)
+
+        try:
+            for attempt in range(settings.DYNAMODB_BATCH_MAX_RETRIES + 1):
+                response = self.connector._call(self.connector.dynamodb.batch_write_item, RequestItems=request_items)
+
+                request_items = response.get('UnprocessedItems') or {}
+                unprocessed = len(request_items.get(self.table_name, []))
+
+                with self._lock:
+                    self._stats['batches'] += 1
+                    self._stats['written'] += pending - unprocessed
+                    if unprocessed:
+                        self._stats['throttled_retries'] += 1
+                        self._stats['throttled_items'] += unprocessed
+
+                if not unprocessed:
+                    item_cache.invalidate_items(self.table_name, chunk, self.key_attributes)
+                    change_feed.emit_items(self.table_name, chunk, self.key_attributes, EVENT_MODIFY)
+                    return
+
+                pending = unprocessed
+                call_guard.record_throttle(self.table_name)
+                time.sleep(backoff_delay(attempt))
+
+            failed = [request['PutRequest']['Item'] for request in request_items[self.table_name]]
+
+        except (ClientError, DynamoDBError) as e:
+            # Исчерпанные ретраи троттлинга - элементы чанка попадают в отчет как незаписанные
+            print(f"[ERROR][DynamoDB] - Ошибка массовой записи в {self.table_name}: {e}")
+            failed = [request['PutRequest']['Item'] for request in request_items.get(self.table_name, [])]
+
+        item_cache.invalidate_items(self.table_name, chunk, self.key_attributes)
+        change_feed.emit_items(
+            self.table_name, [item for item in chunk if item not in failed], self.key_attributes, EVENT_MODIFY
+        )
+        with self._lock:
+            self._stats['failed'] += len(failed)
+            self.failed_items.extend(failed)
+
+    def _lane(self):
+
+        # Полосы записи идут фоновой полосой бюджета емкости - не вытесняют пользовательские запросы
+        with capacity_lane(BACKGROUND):
+            while True:
+                chunk = self._queue.get()
+                if chunk is _LANE_DONE:
+                    return
+                self._write_chunk(chunk)
+
+    def _start(self):
+
+        self._started_at = time.perf_counter()
+        # Одна метка времени на весь вызов вместо datetime.utcnow() на каждый элемент
+        self._timestamp = datetime.utcnow().isoformat()
+
+        for lane in range(self.lanes):
+            # Записи полос учитываются на маршрут и запрос, которые запустили массовую запись
+            thread = threading.Thread(
+                target=contextvars.copy_context().run,
+                args=(self._lane,),
+                name=f"bulk-{self.table_name}-{lane}",
+                daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+
+    def _prepare(self, item: Dict[str, Any]) -> Dict[str, Any]:
+
+        if self.stamp_timestamps:
+            item.setdefault('created_at', self._timestamp)
+            item.setdefault('updated_at', self._timestamp)
+        return item
+
+    def _chunks(self, items: Iterable[Dict[str, Any]]):
+
+        # Повтор ключа внутри одного BatchWriteItem запрещен - последний элемент побеждает
+        chunk = {}
+        for item in items:
+            item = self._prepare(item)
+            chunk[tuple(item.get(name) for name in self.key_attributes)] = item
+            if len(chunk) >= 25:
+                yield list(chunk.values())
+                chunk = {}
+        if chunk:
+            yield list(chunk.values())
+
+    def _enqueue(self, chunk: List[Dict[str, Any]]):
+
+        with self._lock:
+            self._stats['submitted'] += len(chunk)
+        self._queue.put(chunk)
+
+    def _finish(self) -> Dict[str, Any]:
+
+        for _ in self._threads:
+            self._queue.put(_LANE_DONE)
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        return self.get_stats()
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            stats = dict(self._stats)
+
+        elapsed = time.perf_counter() - self._started_at if self._started_at else 0.0
+        stats.update({
+            'table_name': self.table_name,
+            'lanes': self.lanes,
+            'target_wcu': self._limiter.rate if self._limiter else None,
+            'elapsed_seconds': round(elapsed, 3),
+            'items_per_second': round(stats['written'] / elapsed, 1) if elapsed else 0.0,
+            'rate_limited_seconds': round(stats['rate_limited_seconds'], 3)
+        })
+        return stats
+
+    def write(self, items: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+
+        self._start()
+        try:
+            for chunk in self._chunks(items):
+                self._enqueue(chunk)
+        finally:
+            stats = self._finish()
+        return stats
+
+    async def write_async(self, items) -> Dict[str, Any]:
+
+        # Принимает обычный iterable или async iterable; блокирующие операции - вне event loop
+        if not hasattr(items, '__aiter__'):
+            return await asyncio.to_thread(self.write, items)
+
+        loop = asyncio.get_running_loop()
+        self._start()
+        try:
+            chunk = {}
+            async for item in items:
+                item = self._prepare(item)
+                chunk[tuple(item.get(name) for name in self.key_attributes)] = item
+                if len(chunk) >= 25:
+                    await loop.run_in_executor(None, self._enqueue, list(chunk.values()))
+                    chunk = {}
+            if chunk:
+                await loop.run_in_executor(None, self._enqueue, list(chunk.values()))
+        finally:
+            stats = await loop.run_in_executor(None, self._finish)
+        return stats
@@ -0,0 +1,288 @@
+import os
+import sys
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import AttributeBase, ConditionBase
+
+from app.core.config import settings
+from .exceptions import CallBudgetExceededError
+
+# Параметры, которые определяют форму запроса (значения ключей и плейсхолдеров - нет)
+_SHAPE_EXPRESSIONS = ('KeyConditionExpression', 'FilterExpression', 'ConditionExpression', 'UpdateExpression', 'ProjectionExpression')
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# Внутренности доступа к данным не интересны в сводке - нужен код, который их вызвал
+# (репозитории, сервисы, роуты)
+_INTERNAL_PATHS = (
+    os.path.join(_APP_ROOT, 'core', 'dynamodb') + os.sep,
+    os.path.join(_APP_ROOT, 'core', 'singleflight.py')
+)
+_REPOSITORIES_PATH = os.path.join(_APP_ROOT, 'core', 'dynamodb', 'repositories') + os.sep
+
+_FAN_OUT = ('fan_out',)
+_CHUNKED_OPERATIONS = {'batch_get_item', 'batch_write_item'}
+
+_request_calls: ContextVar[Optional['RequestCalls']] = ContextVar('dynamodb_request_calls', default=None)
+_call_site: ContextVar[Optional[Tuple[str, ...]]] = ContextVar('dynamodb_call_site', default=None)
+
+
+def _parse_route_budgets(raw: str) -> Dict[str, int]:
+
+    # "GET /market/tokens=20,GET /market/exchanges=10" -> {'GET /market/tokens': 20, ...}
+    budgets = {}
+    for part in (raw or '').split(','):
+        if '=' not in part:
+            continue
+        route, budget = part.rsplit('=', 1)
+        try:
+            budgets[route.strip()] = int(budget)
+        except ValueError:
+            print(f"[WARNING][DynamoDB] - Некорректный бюджет вызовов для маршрута: {part}")
+    return budgets
+
+
+def condition_shape(condition: Any) -> Hashable:
+
+    # Форма условия boto3: операторы и имена атрибутов без значений.
+    # Строковое выражение уже с плейсхолдерами - оно и есть форма
+    if isinstance(condition, str):
+        return condition
+    return _operand_shape(condition)
+
+
+def _operand_shape(operand: Any) -> Hashable:
+
+    if isinstance(operand, ConditionBase):
+        expression = operand.get_expression()
+        return (expression['operator'], tuple(_operand_shape(value) for value in expression['values']))
+    if isinstance(operand, AttributeBase):
+        return operand.name
+    return '?'
+
+
+def call_shape(table_name: str, operation: Callable, params: Dict[str, Any]) -> Tuple:
+
+    shape = [getattr(operation, '__name__', 'unknown'), table_name, params.get('IndexName')]
+    if 'ExclusiveStartKey' in params or 'Segment' in params or shape[0] in _CHUNKED_OPERATIONS:
+        # Страницы, сегменты и чанки одного логического чтения или записи:
+        # считаются в бюджет, но не в N+1
+        return tuple(shape) + (_FAN_OUT,)
+    for name in _SHAPE_EXPRESSIONS:
+        if name in params:
+            shape.append((name, condition_shape(params[name])))
+    if isinstance(params.get('Key'), dict):
+        shape.append(('Key', tuple(sorted(params['Key']))))
+    return tuple(shape)
+
+
+def capture_call_site(limit: int = 4) -> Tuple[str, ...]:
+
+    # Ближайшие кадры кода приложения (сервисы, роуты), без внутренностей доступа к данным
+    frames = []
+    frame = sys._getframe(1)
+    while frame is not None and len(frames) < limit:
+        filename = frame.f_code.co_filename
+        internal = filename.startswith(_INTERNAL_PATHS) and not filename.startswith(_REPOSITORIES_PATH)
+        if filename.startswith(_APP_ROOT) and not internal:
+            frames.append(f"{os.path.relpath(filename, os.path.dirname(_APP_ROOT))}:{frame.f_lineno} {frame.f_code.co_name}")
+        frame = frame.f_back
+    return tuple(frames)
+
+
+class RequestCalls:
+
+    # Вызовы DynamoDB одного HTTP-запроса: общее число и повторы одной формы (кандидаты в N+1)
+
+    def __init__(self, route: str, budget: int):
+        self.route = route
+        self.budget = budget
+        self.calls = 0
+        self.budget_exceeded = False
+        self.shapes: Dict[Tuple, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def over_budget(self) -> bool:
+        return self.calls > self.budget > 0
+
+    def add(self, shape: Tuple, site: Tuple[str, ...]) -> int:
+
+        with self._lock:
+            self.calls += 1
+            entry = self.shapes.get(shape)
+            if entry is None:
+                entry = self.shapes[shape] = {'count': 0, 'sites': {}}
+            entry['count'] += 1
+            entry['sites'][site] = entry['sites'].get(site, 0) + 1
+            return self.calls
+
+    def repeated(self, threshold: int) -> List[Dict[str, Any]]:
+
+        with self._lock:
+            return [
+                {
+                    'operation': shape[0],
+                    'table': shape[1],
+                    'index': shape[2],
+                    'count': entry['count'],
+                    'shape': repr(shape[3:]),
+                    'sites': [
+                        {'stack': list(site), 'count': count}
+                        for site, count in sorted(entry['sites'].items(), key=lambda pair: -pair[1])[:3]
+                    ]
+                }
+                for shape, entry in self.shapes.items()
+                if entry['count'] >= threshold and shape[3:] != (_FAN_OUT,)
+            ]
+
+
+class CallBudgetTracker:
+
+    # Счетчик вызовов DynamoDB на запрос: повторы одной формы (N+1) попадают в сводку со стеком
+    # вызывающего кода, превышение бюджета маршрута при enforce - исключение,
+    # иначе - предупреждение и счетчик
+
+    def __init__(self, enabled: bool = True, default_budget: int = 50,
+                 route_budgets: Dict[str, int] = None, n_plus_one_threshold: int = 5,
+                 enforce: bool = False):
+        self.enabled = enabled
+        self.default_budget = default_budget
+        self.route_budgets = route_budgets or {}
+        self.n_plus_one_threshold = max(2, n_plus_one_threshold)
+        self.enforce = enforce
+
+        self._routes: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def budget_for(self, route: str) -> int:
+
+        return self.route_budgets.get(route, self.default_budget)
+
+    @contextmanager
+    def track(self, route: str):
+
+        if not self.enabled:
+            yield None
+            return
+
+        calls = RequestCalls(route, self.budget_for(route))
+        token = _request_calls.set(calls)
+        try:
+            yield calls
+        finally:
+            _request_calls.reset(token)
+            self._finish(calls)
+
+    @contextmanager
+    def call_site(self):
+
+        # Вызов из async-кода: стек корутин виден только здесь, в потоке пула его уже нет
+        if _request_calls.get() is None:
+            yield
+            return
+        token = _call_site.set(capture_call_site())
+        try:
+            yield
+        finally:
+            _call_site.reset(token)
+
+    def record(self, table_name: str, operation: Callable, params: Dict[str, Any]):
+
+        calls = _request_calls.get()
+        if calls is None:
+            return
+
+        site = _call_site.get() or capture_call_site()
+        total = calls.add(call_shape(table_name, operation, params), site)
+        if total <= calls.budget or calls.budget <= 0:
+            return
+
+        if self.enforce:
+            raise CallBudgetExceededError(
+                f"Маршрут {calls.route} превысил бюджет вызовов DynamoDB: {total} > {calls.budget}. "
+                f"Повторы: {self._describe(calls)}",
+                route=calls.route, calls=total, budget=calls.budget
+            )
+        if not calls.budget_exceeded:
+            calls.budget_exceeded = True
+            print(
+                f"[WARNING][DynamoDB] - Маршрут {calls.route} превысил бюджет вызовов: "
+                f"больше {calls.budget}. Повторы: {self._describe(calls)}"
+            )
+
+    def _describe(self, calls: RequestCalls) -> str:
+
+        repeated = sorted(calls.repeated(2), key=lambda entry: -entry['count'])[:3]
+        return '; '.join(
+            f"{entry['operation']} {entry['table']}"
+            f"{'/' + entry['index'] if entry['index'] else ''} x{entry['count']}"
+            f" из {entry['sites'][0]['stack'][0] if entry['sites'] and entry['sites'][0]['stack'] else '?'}"
+            for entry in repeated
+        ) or 'нет'
+
+    def _finish(self, calls: RequestCalls):
+
+        repeated = calls.repeated(self.n_plus_one_threshold)
+        for entry in repeated:
+            stack = ' <- '.join(entry['sites'][0]['stack']) if entry['sites'] else '?'
+            print(
+                f"[WARNING][DynamoDB] - Возможный N+1 в {calls.route}: {entry['operation']} {entry['table']}"
+                f"{'/' + entry['index'] if entry['index'] else ''} x{entry['count']} одной формы; {stack}"
+            )
+
+        with self._lock:
+            stats = self._routes.setdefault(calls.route, {
+                'requests': 0,
+                'calls': 0,
+                'max_calls': 0,
+                'budget': calls.budget,
+                'budget_exceeded': 0,
+                'n_plus_one_requests': 0,
+                'n_plus_one': {}
+            })
+            stats['requests'] += 1
+            stats['calls'] += calls.calls
+            stats['max_calls'] = max(stats['max_calls'], calls.calls)
+            stats['budget_exceeded'] += int(calls.over_budget)
+            stats['n_plus_one_requests'] += int(bool(repeated))
+            for entry in repeated:
+                # Последний пример каждой формы - с количеством и стеком вызывающего кода
+                key = f"{entry['operation']} {entry['table']}{'/' + entry['index'] if entry['index'] else ''}"
+                seen = stats['n_plus_one'].get(key, {'occurrences': 0})
+                stats['n_plus_one'][key] = {**entry, 'occurrences': seen['occurrences'] + 1}
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            routes = {
+                route: {
+                    **{name: value for name, value in stats.items() if name != 'n_plus_one'},
+                    'avg_calls': round(stats['calls'] / stats['requests'], 2) if stats['requests'] else 0.0,
+                    'n_plus_one': dict(stats['n_plus_one'])
+                }
+                for route, stats in self._routes.items()
+            }
+        return {
+            'enabled': self.enabled,
+            'enforce': self.enforce,
+            'default_budget': self.default_budget,
+            'n_plus_one_threshold': self.n_plus_one_threshold,
+            'routes': dict(sorted(routes.items(), key=lambda entry: -entry[1]['max_calls']))
+        }
+
+    def reset(self):
+
+        with self._lock:
+            self._routes.clear()
+
+
+call_budget = CallBudgetTracker(
+    enabled=settings.DYNAMODB_CALL_BUDGET_ENABLED,
+    default_budget=settings.DYNAMODB_CALL_BUDGET_DEFAULT,
+    route_budgets=_parse_route_budgets(settings.DYNAMODB_CALL_BUDGET_ROUTES),
+    n_plus_one_threshold=settings.DYNAMODB_N_PLUS_ONE_THRESHOLD,
+    enforce=settings.DYNAMODB_CALL_BUDGET_ENFORCE
+)
@@ -0,0 +1,281 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from app.core.config import settings
+from .rate_limit import TokenBucket
+
+INTERACTIVE = 'interactive'
+BACKGROUND = 'background'
+
+READ_OPERATIONS = {'get_item', 'query', 'scan', 'batch_get_item', 'transact_get_items'}
+WRITE_OPERATIONS = {'put_item', 'update_item', 'delete_item', 'batch_write_item', 'transact_write_items'}
+
+_current_lane: ContextVar[str] = ContextVar('dynamodb_capacity_lane', default=INTERACTIVE)
+
+
+def current_lane() -> str:
+
+    return _current_lane.get()
+
+
+@contextmanager
+def capacity_lane(lane: str):
+
+    # Все запросы внутри блока (в этом потоке/контексте) идут по указанной полосе
+    token = _current_lane.set(lane)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+class CapacityBudget:
+
+    # Бюджет единиц емкости одной таблицы (или GSI) по provisioned throughput.
+    # Фоновая полоса запускается, только пока в бюджете есть резерв и нет ждущих
+    # интерактивных запросов, но ждет не дольше background_max_wait; интерактивная
+    # ждет погашения долга не дольше max_wait.
+    # Небольшие фоновые запросы (удаление пары ключей из админки) проходят сразу из
+    # отдельного запаса background_burst, если бюджет не в долгу
+
+    def __init__(self, name: str, rate: float, burst_seconds: float = 5.0,
+                 reserve_fraction: float = 0.5, max_wait: float = 0.5,
+                 background_burst: int = 10, background_max_wait: float = 2.0):
+        self.name = name
+        self.bucket = TokenBucket(rate, rate * max(1.0, burst_seconds))
+        self.reserve = self.bucket.capacity * min(max(reserve_fraction, 0.0), 1.0)
+        self.max_wait = max_wait
+        self.background_max_wait = background_max_wait
+        # Запас фоновых запросов без ожидания резерва; восполняется за burst_seconds
+        self.background_burst = TokenBucket(
+            background_burst / max(1.0, burst_seconds), background_burst
+        ) if background_burst > 0 else None
+
+        self._interactive_waiting = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            INTERACTIVE: {'requests': 0, 'consumed': 0.0, 'waited_seconds': 0.0},
+            BACKGROUND: {'requests': 0, 'consumed': 0.0, 'waited_seconds': 0.0, 'forced': 0}
+        }
+
+    def _sleep_for(self, level: float) -> float:
+
+        # Ждем пополнения до level, но просыпаемся часто, чтобы заметить интерактивные запросы
+        deficit = level - self.bucket.available
+        return min(max(deficit / self.bucket.rate, 0.005), 0.1)
+
+    def wait(self, lane: str) -> float:
+
+        started_at = time.monotonic()
+        if lane == BACKGROUND:
+            burst = (
+                self.background_burst is not None
+                and not self._interactive_waiting
+                and self.bucket.available > 0
+                and self.background_burst.try_acquire()
+            )
+            # Один скан-страница в 1 МБ стоит ~128 RCU: без потолка фоновая задача ждала бы десятки секунд
+            deadline = started_at + self.background_max_wait
+            while not burst and (self.bucket.available < self.reserve or self._interactive_waiting):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    with self._lock:
+                        self._stats[BACKGROUND]['forced'] += 1
+                    break
+                time.sleep(min(self._sleep_for(self.reserve), remaining))
+        elif self.bucket.available < 0:
+            with self._lock:
+                self._interactive_waiting += 1
+            try:
+                deadline = started_at + self.max_wait
+                while self.bucket.available < 0 and time.monotonic() < deadline:
+                    time.sleep(min(self._sleep_for(0), max(deadline - time.monotonic(), 0)))
+            finally:
+                with self._lock:
+                    self._interactive_waiting -= 1
+
+        waited = time.monotonic() - started_at
+        with self._lock:
+            self._stats[lane]['requests'] += 1
+            self._stats[lane]['waited_seconds'] += waited
+        return waited
+
+    def charge(self, lane: str, units: float):
+
+        self.bucket.consume(units)
+        with self._lock:
+            self._stats[lane]['consumed'] += units
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            lanes = {
+                lane: {**stats, 'waited_seconds': round(stats['waited_seconds'], 3), 'consumed': round(stats['consumed'], 1)}
+                for lane, stats in self._stats.items()
+            }
+        return {
+            'rate': self.bucket.rate,
+            'available': round(self.bucket.available, 1),
+            'reserve': self.reserve,
+            'lanes': lanes
+        }
+
+
+class CapacityBudgeter:
+
+    # Клиентский бюджет RCU/WCU по фактической емкости таблиц (DescribeTable): фоновые сканы,
+    # пересчеты и массовые записи уступают емкость пользовательским запросам, а не троттлят их.
+    # Таблицы on-demand (PAY_PER_REQUEST) не ограничиваются
+
+    def __init__(self, enabled: bool = True, burst_seconds: float = 5.0,
+                 reserve_fraction: float = 0.5, max_wait: float = 0.5,
+                 background_burst: int = 10, background_max_wait: float = 2.0):
+        self.enabled = enabled
+        self.burst_seconds = burst_seconds
+        self.reserve_fraction = reserve_fraction
+        self.max_wait = max_wait
+        self.background_burst = background_burst
+        self.background_max_wait = background_max_wait
+
+        self._budgets: Dict[Tuple[str, Optional[str], str], Optional[CapacityBudget]] = {}
+        self._descriptions: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def _describe(self, table_name: str, client) -> Optional[Dict[str, Any]]:
+
+        # Один DescribeTable на таблицу за время жизни процесса, мимо call_guard и самого бюджета
+        with self._lock:
+            if table_name in self._descriptions:
+                return self._descriptions[table_name]
+
+        description = None
+        if client is not None:
+            try:
+                description = client.describe_table(TableName=table_name)['Table']
+            except (ClientError, BotoCoreError) as e:
+                print(f"[WARNING][DynamoDB] - Емкость {table_name} неизвестна, бюджет не применяется: {e}")
+
+        with self._lock:
+            return self._descriptions.setdefault(table_name, description)
+
+    def _provisioned(self, table_name: str, index_name: Optional[str], client) -> Optional[Dict[str, Any]]:
+
+        description = self._describe(table_name, client)
+        if description is None:
+            return None
+        # Старые provisioned-таблицы возвращаются без BillingModeSummary
+        billing_mode = (description.get('BillingModeSummary') or {}).get('BillingMode', 'PROVISIONED')
+        if billing_mode == 'PAY_PER_REQUEST':
+            return None
+        if index_name is None:
+            return description.get('ProvisionedThroughput')
+        for index in description.get('GlobalSecondaryIndexes') or []:
+            if index['IndexName'] == index_name:
+                return index.get('ProvisionedThroughput')
+        return None
+
+    def budget(self, table_name: str, kind: str, index_name: str = None, client=None) -> Optional[CapacityBudget]:
+
+        # None - таблица без известной емкости (нет описания или on-demand): не ограничиваем
+        key = (table_name, index_name, kind)
+        with self._lock:
+            if key in self._budgets:
+                return self._budgets[key]
+
+        throughput = self._provisioned(table_name, index_name, client)
+        units = (throughput or {}).get('ReadCapacityUnits' if kind == 'read' else 'WriteCapacityUnits')
+        name = f"{table_name}/{index_name}" if index_name else table_name
+        budget = CapacityBudget(
+            name, units, self.burst_seconds, self.reserve_fraction, self.max_wait,
+            self.background_burst, self.background_max_wait
+        ) if units else None
+
+        with self._lock:
+            return self._budgets.setdefault(key, budget)
+
+    @staticmethod
+    def _client_of(operation: Callable):
+
+        # Метод ресурса Table -> его клиент (table.meta.client); метод клиента -> сам клиент
+        owner = getattr(operation, '__self__', None)
+        client = getattr(getattr(owner, 'meta', None), 'client', None)
+        if client is not None:
+            return client
+        return owner if hasattr(owner, 'describe_table') else None
+
+    def _kind(self, operation: Callable) -> Optional[str]:
+
+        name = getattr(operation, '__name__', '')
+        if name in READ_OPERATIONS:
+            return 'read'
+        if name in WRITE_OPERATIONS:
+            return 'write'
+        return None
+
+    def _consumed(self, response: Dict[str, Any], kind: str, default_table: str,
+                  index_name: Optional[str]) -> List[Tuple[str, Optional[str], float]]:
+
+        consumed = response.get('ConsumedCapacity') if isinstance(response, dict) else None
+        if consumed:
+            entries = consumed if isinstance(consumed, list) else [consumed]
+            return [
+                (entry.get('TableName', default_table), index_name, float(entry.get('CapacityUnits', 0)))
+                for entry in entries
+            ]
+
+        # Без ConsumedCapacity - оценка: 0.5 RCU на прочитанный элемент, 1 WCU на запись
+        if kind == 'read':
+            scanned = response.get('ScannedCount', response.get('Count', 1)) if isinstance(response, dict) else 1
+            return [(default_table, index_name, max(0.5, 0.5 * scanned))]
+        return [(default_table, index_name, 1.0)]
+
+    def call(self, table_name: str, operation: Callable, params: Dict[str, Any],
+             invoke: Callable) -> Any:
+
+        kind = self._kind(operation) if self.enabled else None
+        if kind is None:
+            return invoke(table_name, operation, **params)
+
+        lane = current_lane()
+        index_name = params.get('IndexName')
+        client = self._client_of(operation)
+        budget = self.budget(table_name, kind, index_name, client)
+        if budget:
+            budget.wait(lane)
+
+        params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+        response = invoke(table_name, operation, **params)
+
+        for consumed_table, consumed_index, units in self._consumed(response, kind, table_name, index_name):
+            consumed_budget = self.budget(consumed_table, kind, consumed_index, client)
+            if consumed_budget:
+                consumed_budget.charge(lane, units)
+        return response
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            budgets = [(key, budget) for key, budget in self._budgets.items() if budget]
+
+        return {
+            'enabled': self.enabled,
+            'budgets': {
+                f"{budget.name}:{kind}": budget.get_stats()
+                for (_, _, kind), budget in budgets
+            }
+        }
+
+
+capacity_budgeter = CapacityBudgeter(
+    enabled=settings.DYNAMODB_CAPACITY_BUDGET_ENABLED,
+    burst_seconds=settings.DYNAMODB_CAPACITY_BURST_SECONDS,
+    reserve_fraction=settings.DYNAMODB_CAPACITY_INTERACTIVE_RESERVE,
+    max_wait=settings.DYNAMODB_CAPACITY_MAX_WAIT,
+    background_burst=settings.DYNAMODB_CAPACITY_BACKGROUND_BURST,
+    background_max_wait=settings.DYNAMODB_CAPACITY_BACKGROUND_MAX_WAIT
+)
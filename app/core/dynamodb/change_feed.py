@@ -0,0 +1,279 @@
+import asyncio
+import copy
+import itertools
+import threading
+import uuid
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.config import settings
+
+
+EVENT_INSERT = 'INSERT'
+EVENT_MODIFY = 'MODIFY'
+EVENT_REMOVE = 'REMOVE'
+
+
+def _parse_tables(raw: str) -> Optional[set]:
+
+    tables = {table_name.strip() for table_name in (raw or '').split(',') if table_name.strip()}
+    return tables or None
+
+
+def make_record(table_name: str, keys: Dict[str, Any],
+                old_image: Optional[Dict[str, Any]] = None,
+                new_image: Optional[Dict[str, Any]] = None,
+                event_name: str = None) -> Dict[str, Any]:
+
+    # Формат близок к записи DynamoDB Streams (NEW_AND_OLD_IMAGES), только в snake_case
+    # и с обычными Python-значениями. Образов может не быть (пакетные записи, транзакции) -
+    # тогда это запись KEYS_ONLY и потребитель сам перечитывает элемент
+    if event_name is None:
+        if new_image is None:
+            event_name = EVENT_REMOVE
+        elif old_image is None:
+            event_name = EVENT_INSERT
+        else:
+            event_name = EVENT_MODIFY
+
+    return {
+        'event_id': uuid.uuid4().hex,
+        'event_name': event_name,
+        'table_name': table_name,
+        'keys': dict(keys),
+        'old_image': copy.deepcopy(old_image),
+        'new_image': copy.deepcopy(new_image),
+        'created_at': datetime.utcnow().isoformat()
+    }
+
+
+class InMemoryChangeStream:
+
+    # Стенд для DynamoDB Streams: упорядоченный лог с номерами последовательности и
+    # ограниченным сроком хранения (старые записи вытесняются, как 24 часа у Streams)
+
+    def __init__(self, max_records: int = 10000):
+        self.max_records = max(1, max_records)
+        self._records: deque = deque()
+        self._sequence = itertools.count(1)
+        self._lock = threading.Lock()
+        self.trimmed = 0
+
+    def append(self, record: Dict[str, Any]) -> int:
+
+        with self._lock:
+            sequence_number = next(self._sequence)
+            self._records.append((sequence_number, record))
+            while len(self._records) > self.max_records:
+                self._records.popleft()
+                self.trimmed += 1
+        return sequence_number
+
+    def latest_sequence(self) -> int:
+
+        with self._lock:
+            return self._records[-1][0] if self._records else 0
+
+    def oldest_sequence(self) -> int:
+
+        with self._lock:
+            return self._records[0][0] if self._records else 0
+
+    def read(self, after_sequence: int, limit: int = 1000) -> List[Tuple[int, Dict[str, Any]]]:
+
+        with self._lock:
+            if not self._records or self._records[-1][0] <= after_sequence:
+                return []
+            # Номера идут подряд - позицию находим без перебора
+            start = max(0, after_sequence - self._records[0][0] + 1)
+            return list(itertools.islice(self._records, start, start + limit))
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+
+class ChangeFeed:
+
+    # Outbox записей BaseDynamoDBConnector: каждая запись элемента добавляет запись в поток,
+    # потребители читают его со своей позиции (at-least-once, как у DynamoDB Streams)
+
+    def __init__(self, stream: InMemoryChangeStream = None, enabled: bool = True,
+                 tables: Optional[set] = None):
+        self.stream = stream or InMemoryChangeStream()
+        self.enabled = enabled
+        self.tables = tables
+
+        self._consumers: Dict[str, Dict[str, Any]] = {}
+        self._subscribed_tables: set = set()
+        self._lock = threading.Lock()
+        self._stats = {
+            'emitted': 0,
+            'delivered': 0,
+            'handler_errors': 0
+        }
+
+    def captures(self, table_name: str) -> bool:
+
+        # Пишутся только таблицы, на которые подписаны потребители, и явно заданные в настройках:
+        # запись в поток требует ReturnValues=ALL_OLD и копирует образы элементов (в т.ч. users)
+        if not self.enabled:
+            return False
+        tables = self._subscribed_tables | (self.tables or set())
+        return '*' in tables or table_name in tables
+
+    def emit(self, table_name: str, keys: Dict[str, Any],
+             old_image: Optional[Dict[str, Any]] = None,
+             new_image: Optional[Dict[str, Any]] = None,
+             event_name: str = None):
+
+        if not self.captures(table_name):
+            return
+        self.stream.append(make_record(table_name, keys, old_image, new_image, event_name))
+        with self._lock:
+            self._stats['emitted'] += 1
+
+    def emit_items(self, table_name: str, items: Iterable[Dict[str, Any]],
+                   key_attributes: Tuple[str, ...], event_name: str):
+
+        # Пакетные записи: старых образов нет, новый есть только у PutRequest
+        if not self.captures(table_name):
+            return
+        for item in items:
+            keys = {name: item[name] for name in key_attributes if name in item}
+            new_image = item if event_name != EVENT_REMOVE else None
+            self.emit(table_name, keys, None, new_image, event_name)
+
+    def subscribe(self, name: str, handler: Callable[[List[Dict[str, Any]]], None],
+                  tables: Iterable[str] = None, from_latest: bool = True):
+
+        # handler получает пачку записей; исключение - пачка будет доставлена повторно
+        with self._lock:
+            self._consumers[name] = {
+                'handler': handler,
+                'tables': set(tables) if tables else None,
+                'position': self.stream.latest_sequence() if from_latest else 0,
+                'delivered': 0,
+                'errors': 0,
+                'lagged': False,
+                'lock': threading.Lock()
+            }
+            self._refresh_subscribed_tables()
+
+    def unsubscribe(self, name: str):
+
+        with self._lock:
+            self._consumers.pop(name, None)
+            self._refresh_subscribed_tables()
+
+    def _refresh_subscribed_tables(self):
+
+        # Потребитель без списка таблиц читает все - тогда пишутся все таблицы
+        tables = set()
+        for consumer in self._consumers.values():
+            tables |= consumer['tables'] if consumer['tables'] is not None else {'*'}
+        self._subscribed_tables = tables
+
+    def seek(self, name: str, position: int):
+
+        with self._lock:
+            consumer = self._consumers[name]
+            consumer['position'] = position
+            consumer['lagged'] = False
+
+    def poll(self, name: str, limit: int = 1000) -> int:
+
+        # Доставляет потребителю накопившиеся записи; возвращает их количество
+        consumer = self._consumers.get(name)
+        if consumer is None:
+            return 0
+
+        # Одного потребителя не опрашивают параллельно (фоновая доставка и чтение представления)
+        with consumer['lock']:
+            return self._poll(name, consumer, limit)
+
+    def _poll(self, name: str, consumer: Dict[str, Any], limit: int) -> int:
+
+        delivered = 0
+        while True:
+            position = consumer['position']
+            if position < self.stream.oldest_sequence() - 1:
+                # Потребитель отстал дольше срока хранения - часть изменений потеряна
+                consumer['lagged'] = True
+
+            batch = self.stream.read(position, limit)
+            if not batch:
+                return delivered
+
+            records = [
+                record for _, record in batch
+                if consumer['tables'] is None or record['table_name'] in consumer['tables']
+            ]
+            try:
+                if records:
+                    consumer['handler'](records)
+            except Exception as e:
+                consumer['errors'] += 1
+                with self._lock:
+                    self._stats['handler_errors'] += 1
+                print(f"[ERROR][ChangeFeed] - Ошибка потребителя {name}: {e}")
+                return delivered
+
+            consumer['position'] = batch[-1][0]
+            consumer['delivered'] += len(records)
+            delivered += len(records)
+            with self._lock:
+                self._stats['delivered'] += len(records)
+
+    def is_lagged(self, name: str) -> bool:
+
+        consumer = self._consumers.get(name)
+        return bool(consumer and consumer['lagged'])
+
+    def drain(self) -> int:
+
+        return sum(self.poll(name) for name in list(self._consumers))
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        latest = self.stream.latest_sequence()
+        with self._lock:
+            return {
+                **self._stats,
+                'enabled': self.enabled,
+                'tables': sorted(self._subscribed_tables | (self.tables or set())),
+                'retained': len(self.stream),
+                'trimmed': self.stream.trimmed,
+                'latest_sequence': latest,
+                'consumers': {
+                    name: {
+                        'position': consumer['position'],
+                        'lag': latest - consumer['position'],
+                        'delivered': consumer['delivered'],
+                        'errors': consumer['errors'],
+                        'lagged': consumer['lagged']
+                    }
+                    for name, consumer in self._consumers.items()
+                }
+            }
+
+
+change_feed = ChangeFeed(
+    stream=InMemoryChangeStream(settings.DYNAMODB_CHANGE_FEED_MAX_RECORDS),
+    enabled=settings.DYNAMODB_CHANGE_FEED_ENABLED,
+    tables=_parse_tables(settings.DYNAMODB_CHANGE_FEED_TABLES)
+)
+
+
+async def run_dispatch_loop(interval: float = None):
+
+    # Фоновая доставка записей всем потребителям (аналог опроса шардов Streams)
+    from .async_base import dynamodb_executor
+
+    interval = interval or settings.DYNAMODB_CHANGE_FEED_POLL_INTERVAL
+    while True:
+        try:
+            await dynamodb_executor.run(change_feed.drain)
+        except Exception as e:
+            print(f"[ERROR][ChangeFeed] - Ошибка доставки изменений: {e}")
+        await asyncio.sleep(interval)
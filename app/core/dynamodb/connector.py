@@ -1,19 +1,31 @@
 from typing import Dict, Any, Optional
 
+from app.core.cache import shared_cache
+from app.core.singleflight import singleflight
 from app.core.dynamodb.repositories.otp import OTPRepository
 from .base import BaseDynamoDBConnector
 from .repositories.user import UserRepository
 from .repositories.generic import GenericRepository
+from .capacity import capacity_budgeter
+from .change_feed import change_feed
+from .counters import aggregate_counters
+from .async_base import AsyncDynamoDBConnector, AsyncGenericRepository, get_async_executor_metrics
+from .expressions import update_template_cache_info
+from .item_cache import item_cache
+from .planner import query_planner
+from .throttling import call_guard
+from .views import view_registry
 
 class DynamoDBConnector(BaseDynamoDBConnector):
-    
+
     def __init__(self):
         super().__init__()
-        
+
         self.users: Optional[UserRepository] = None
         self.otp: Optional[OTPRepository] = None
-        
+
         self._generic_repositories: Dict[str, GenericRepository] = {}
+        self._async_repositories: Dict[str, AsyncGenericRepository] = {}
     
     def initiate_connection(self) -> 'DynamoDBConnector':
 
@@ -33,8 +45,9 @@ class DynamoDBConnector(BaseDynamoDBConnector):
 
             from app.aws.table_schemas import (
                 users_schema, otp_schema,
-                tokens_schema, token_stats_schema,
-                exchanges_schema, exchange_stats_schema
+                tokens_schema, token_stats_schema, token_platform_schema,
+                exchanges_schema, exchange_stats_schema,
+                counters_schema
             )
             
             schemas = [
@@ -42,8 +55,10 @@ class DynamoDBConnector(BaseDynamoDBConnector):
                 (otp_schema, 'otp_codes'),
                 (tokens_schema, 'tokens'),
                 (token_stats_schema, 'token_stats'),
+                (token_platform_schema, 'token_platforms'),
                 (exchanges_schema, 'exchanges'),
-                (exchange_stats_schema, 'exchange_stats')
+                (exchange_stats_schema, 'exchange_stats'),
+                (counters_schema, 'counters')
             ]
             
             for schema, description in schemas:
@@ -63,12 +78,10 @@ class DynamoDBConnector(BaseDynamoDBConnector):
         try:
 
             self.users = UserRepository(settings.DYNAMODB_USERS_TABLE)
-            self.users._init_clients()
-            self.users._initialized = True
+            self.users.use_clients(self.client, self.dynamodb)
             
             self.otp = OTPRepository(settings.DYNAMODB_OTP_TABLE)
-            self.otp._init_clients()
-            self.otp._initialized = True
+            self.otp.use_clients(self.client, self.dynamodb)
             
             print("[INFO][DynamoDB] - Репозитории инициализированы")
             
@@ -81,13 +94,21 @@ class DynamoDBConnector(BaseDynamoDBConnector):
 
         if table_name not in self._generic_repositories:
             repo = GenericRepository(table_name)
-            repo._init_clients()
-            repo._initialized = True
+            repo.use_clients(self.client, self.dynamodb)
             self._generic_repositories[table_name] = repo
             print(f"[INFO][DynamoDB] - Создан универсальный репозиторий для таблицы: {table_name}")
         
         return self._generic_repositories[table_name]
-    
+
+    def get_async_repository(self, table_name: str) -> AsyncGenericRepository:
+
+        if table_name not in self._async_repositories:
+            self._async_repositories[table_name] = AsyncGenericRepository(
+                self.get_repository(table_name)
+            )
+
+        return self._async_repositories[table_name]
+
     def create_custom_table(self, table_name: str, 
                           key_schema: list, 
                           attribute_definitions: list,
@@ -119,6 +140,7 @@ class DynamoDBConnector(BaseDynamoDBConnector):
             
             waiter = self.client.get_waiter('table_exists')
             waiter.wait(TableName=table_name)
+            query_planner.invalidate(table_name)
             
             return True
             
@@ -137,7 +159,8 @@ class DynamoDBConnector(BaseDynamoDBConnector):
             repo_info = {
                 'users': bool(self.users),
                 'otp': bool(self.otp),
-                'generic_repositories': list(self._generic_repositories.keys())
+                'generic_repositories': list(self._generic_repositories.keys()),
+                'async_repositories': list(self._async_repositories.keys())
             }
             
             return {
@@ -147,7 +170,19 @@ class DynamoDBConnector(BaseDynamoDBConnector):
                 'total_tables': len(table_names),
                 'table_names': table_names,
                 'repositories': repo_info,
-                'cached_tables': len(self._tables)
+                'cached_tables': len(self._tables),
+                'max_pool_connections': self.client.meta.config.max_pool_connections,
+                'async_executor': get_async_executor_metrics(),
+                'query_planner': query_planner.get_stats(),
+                'item_cache': item_cache.get_stats(),
+                'shared_cache': shared_cache.get_stats(),
+                'update_templates': update_template_cache_info(),
+                'counters': aggregate_counters.get_stats(),
+                'change_feed': change_feed.get_stats(),
+                'views': view_registry.get_stats(),
+                'call_guard': call_guard.get_stats(),
+                'capacity': capacity_budgeter.get_stats(),
+                'singleflight': singleflight.get_stats()
             }
             
         except Exception as e:
@@ -219,6 +254,10 @@ def get_db_connector() -> DynamoDBConnector:
             return None
     return connector
 
+def get_async_db_connector() -> AsyncDynamoDBConnector:
+    conn = get_db_connector()
+    return AsyncDynamoDBConnector(conn) if conn else None
+
 def get_user_repository() -> UserRepository:
     conn = get_db_connector()
     return conn.users if conn else None
@@ -229,4 +268,8 @@ def get_otp_repository() -> OTPRepository:
 
 def get_generic_repository(table_name: str) -> GenericRepository:
     conn = get_db_connector()
-    return conn.get_repository(table_name) if conn else None
\ No newline at end of file
+    return conn.get_repository(table_name) if conn else None
+
+def get_async_generic_repository(table_name: str) -> AsyncGenericRepository:
+    conn = get_db_connector()
+    return conn.get_async_repository(table_name) if conn else None
\ No newline at end of file
@@ -0,0 +1,433 @@
+import asyncio
+import os
+import socket
+import threading
+import time
+import uuid
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, Iterable, List, Optional
+
+from boto3.dynamodb.conditions import Attr
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+from .capacity import BACKGROUND
+from .exceptions import DynamoDBError, TableNotFoundError
+from .expressions import build_update_expression
+
+TOTAL_COUNTER = 'total'
+# Служебные атрибуты элемента счетчиков: номер изменения (растет с каждым ADD и пометкой)
+# и пометка "нужна сверка", общая для всех воркеров
+REVISION_ATTRIBUTE = 'revision'
+DIRTY_ATTRIBUTE = 'dirty_at'
+# Элемент таблицы счетчиков, через который воркеры договариваются, кто делает полную сверку
+RECONCILE_LEASE_ID = '__reconcile_lease__'
+
+
+def _parse_tracked_fields(raw: str) -> Dict[str, List[str]]:
+
+    # "LiberandumAggregationToken=is_halal|is_deleted,users=role" -> {'LiberandumAggregationToken': ['is_halal', 'is_deleted'], ...}
+    tracked = {}
+    for part in (raw or '').split(','):
+        if not part.strip():
+            continue
+        table_name, _, fields = part.partition('=')
+        tracked[table_name.strip()] = [field.strip() for field in fields.split('|') if field.strip()]
+    return tracked
+
+
+def is_counter(name: str) -> bool:
+
+    return name == TOTAL_COUNTER or '=' in name
+
+
+def counter_name(field_name: str, value: Any) -> str:
+
+    # Один атрибут счетчика на пару поле/значение: is_halal=true, role=admin
+    if isinstance(value, bool):
+        value = 'true' if value else 'false'
+    return f"{field_name}={value}"
+
+
+class AggregateCounters:
+
+    # Таблица агрегатных счетчиков: один элемент на таблицу (id = имя таблицы) с атрибутами
+    # total и поле=значение. Записи через репозитории меняют их атомарным ADD, периодическая
+    # сверка пересчитывает сканом - так подсчет становится одним GetItem вместо COUNT-скана
+
+    def __init__(self, table_name: str, tracked: Dict[str, List[str]], enabled: bool = True):
+        self.table_name = table_name
+        self.tracked = dict(tracked)
+        self.enabled = enabled and bool(table_name)
+
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._last_reconcile: Dict[str, Dict[str, Any]] = {}
+        self._stats = {
+            'increments': 0,
+            'increment_errors': 0,
+            'reads': 0,
+            'fallbacks': 0,
+            'dirty_fallbacks': 0,
+            'reconciles': 0,
+            'reconcile_conflicts': 0
+        }
+
+    def _count(self, name: str):
+
+        with self._lock:
+            self._stats[name] += 1
+
+    def track(self, table_name: str, fields: Iterable[str] = ()):
+
+        self.tracked[table_name] = list(dict.fromkeys([*self.tracked.get(table_name, []), *fields]))
+
+    def tracks(self, table_name: str) -> bool:
+
+        return self.enabled and table_name in self.tracked
+
+    def fields(self, table_name: str) -> List[str]:
+
+        return self.tracked.get(table_name, [])
+
+    def touches(self, table_name: str, field_names: Iterable[str]) -> bool:
+
+        return any(field in self.tracked.get(table_name, ()) for field in field_names)
+
+    def mark_dirty(self, table_name: str, connector=None):
+
+        # Пакетные записи не возвращают старых элементов - счетчики таблицы исправит ближайшая сверка,
+        # до нее подсчеты идут COUNT-сканом (get_counts -> None). Пометка пишется в таблицу счетчиков,
+        # чтобы ее видели все воркеры; локальный набор - только быстрый путь этого процесса
+        if not self.tracks(table_name):
+            return
+        with self._lock:
+            self._dirty.add(table_name)
+        if connector is None:
+            return
+
+        try:
+            connector._call(
+                connector.get_table(self.table_name).update_item,
+                Key={'id': table_name},
+                **build_update_expression(
+                    set_values={DIRTY_ATTRIBUTE: datetime.utcnow().isoformat()},
+                    add={REVISION_ATTRIBUTE: 1}
+                )
+            )
+        except (ClientError, DynamoDBError) as e:
+            print(f"[WARNING][DynamoDB] - Не удалось сохранить пометку сверки счетчиков {table_name}: {e}")
+
+    def is_dirty(self, table_name: str) -> bool:
+
+        with self._lock:
+            return table_name in self._dirty
+
+    def dirty_tables(self, connector) -> List[str]:
+
+        # Таблицы с пометкой в таблице счетчиков (от любого воркера) и локальные пометки
+        with self._lock:
+            tables = set(self._dirty)
+        tracked = list(self.tracked)
+        if tracked:
+            items = connector.batch_get_items(
+                self.table_name, [{'id': table_name} for table_name in tracked],
+                projection=[DIRTY_ATTRIBUTE]
+            )
+            tables.update(item['id'] for item in items if item and DIRTY_ATTRIBUTE in item)
+        return sorted(tables)
+
+    def _deltas(self, table_name: str, old_item: Optional[Dict[str, Any]],
+                new_item: Optional[Dict[str, Any]]) -> Dict[str, int]:
+
+        deltas: Dict[str, int] = {}
+
+        def bump(name: str, value: int):
+            deltas[name] = deltas.get(name, 0) + value
+
+        bump(TOTAL_COUNTER, int(new_item is not None) - int(old_item is not None))
+        for field in self.fields(table_name):
+            if old_item and field in old_item:
+                bump(counter_name(field, old_item[field]), -1)
+            if new_item and field in new_item:
+                bump(counter_name(field, new_item[field]), 1)
+
+        return {name: value for name, value in deltas.items() if value}
+
+    def record_write(self, connector, table_name: str, old_item: Optional[Dict[str, Any]],
+                     new_item: Optional[Dict[str, Any]]):
+
+        if not self.tracks(table_name):
+            return
+
+        deltas = self._deltas(table_name, old_item, new_item)
+        if not deltas:
+            return
+
+        try:
+            connector._call(
+                connector.get_table(self.table_name).update_item,
+                Key={'id': table_name},
+                **build_update_expression(add={**deltas, REVISION_ATTRIBUTE: 1})
+            )
+            self._count('increments')
+        except (ClientError, DynamoDBError) as e:
+            # Запись элемента уже прошла - не откатываем ее, а помечаем счетчики на пересчет
+            self._count('increment_errors')
+            self.mark_dirty(table_name, connector)
+            print(f"[WARNING][DynamoDB] - Не удалось обновить счетчики {table_name}: {e}")
+
+    def get_counts(self, connector, table_name: str) -> Optional[Dict[str, int]]:
+
+        # None - счетчиков нет (таблица не отслеживается или еще ни разу не сверялась)
+        # или они заведомо устарели после пакетной записи (пометка этого или другого воркера)
+        if not self.tracks(table_name):
+            return None
+        if self.is_dirty(table_name):
+            self._count('dirty_fallbacks')
+            return None
+
+        try:
+            table = connector.get_table(self.table_name)
+            item = connector._call(table.get_item, Key={'id': table_name}).get('Item')
+        except ClientError as e:
+            print(f"[WARNING][DynamoDB] - Ошибка чтения счетчиков {table_name}: {e}")
+            item = None
+
+        if not item or 'reconciled_at' not in item:
+            self._count('fallbacks')
+            self.mark_dirty(table_name)
+            return None
+        if DIRTY_ATTRIBUTE in item:
+            self._count('dirty_fallbacks')
+            return None
+
+        self._count('reads')
+        return {
+            name: int(value) for name, value in item.items()
+            if is_counter(name) and isinstance(value, Decimal)
+        }
+
+    def count(self, connector, table_name: str, field_name: str = None,
+              value: Any = None) -> Optional[int]:
+
+        if field_name is not None and field_name not in self.fields(table_name):
+            return None
+
+        counts = self.get_counts(connector, table_name)
+        if counts is None:
+            return None
+        if field_name is None:
+            return counts.get(TOTAL_COUNTER, 0)
+        return counts.get(counter_name(field_name, value), 0)
+
+    def reconcile(self, connector, table_name: str) -> Dict[str, Any]:
+
+        # Полный пересчет сканом (только ключи и отслеживаемые поля). Результат пишется условно по
+        # номеру изменения, прочитанному до скана: если во время скана счетчики менялись, неизвестно,
+        # видел ли скан эти записи, - сверка не применяется, пометка остается до следующей
+        started_at = time.perf_counter()
+        fields = self.fields(table_name)
+        counts: Dict[str, int] = {TOTAL_COUNTER: 0}
+
+        # Сбрасываем до скана: пометка от записи во время скана переживет эту сверку
+        with self._lock:
+            self._dirty.discard(table_name)
+
+        counters_table = connector.get_table(self.table_name)
+        before = connector._call(counters_table.get_item, Key={'id': table_name}, ConsistentRead=True).get('Item') or {}
+        revision = before.get(REVISION_ATTRIBUTE)
+
+        scan = connector.parallel_scan(table_name, projection=['id', *fields], lane=BACKGROUND)
+        try:
+            for item in scan:
+                counts[TOTAL_COUNTER] += 1
+                for field in fields:
+                    if field in item:
+                        name = counter_name(field, item[field])
+                        counts[name] = counts.get(name, 0) + 1
+
+            # Неполный скан не записываем: нули вместо счетчиков хуже, чем устаревшие счетчики
+            failed = [segment for segment in scan.progress.values() if segment['error'] or not segment['done']]
+            if failed:
+                raise DynamoDBError(
+                    f"Скан {table_name} для сверки счетчиков не завершен: сегментов с ошибкой {len(failed)}"
+                )
+        except TableNotFoundError:
+            # Таблицы нет - считать нечего, повторная сверка каждые check_interval ничего не даст
+            raise
+        except DynamoDBError:
+            self.mark_dirty(table_name)
+            raise
+
+        # Счетчики значений, которых больше нет в таблице, обнуляются
+        stale = {name: 0 for name in before if is_counter(name) and name not in counts}
+        unchanged = (
+            Attr(REVISION_ATTRIBUTE).not_exists() if revision is None
+            else Attr(REVISION_ATTRIBUTE).eq(revision)
+        )
+        applied = True
+        try:
+            connector._call(
+                counters_table.update_item,
+                Key={'id': table_name},
+                ConditionExpression=unchanged,
+                **build_update_expression(
+                    set_values={**stale, **counts, 'reconciled_at': datetime.utcnow().isoformat()},
+                    remove=[DIRTY_ATTRIBUTE],
+                    add={REVISION_ATTRIBUTE: 1}
+                )
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+                raise
+            applied = False
+            self._count('reconcile_conflicts')
+            self.mark_dirty(table_name)
+            print(f"[WARNING][DynamoDB] - Счетчики {table_name} изменились во время сверки, она будет повторена")
+
+        report = {
+            'table_name': table_name,
+            'counts': counts,
+            'applied': applied,
+            'elapsed_seconds': round(time.perf_counter() - started_at, 3),
+            'finished_at': datetime.utcnow().isoformat()
+        }
+        with self._lock:
+            self._last_reconcile[table_name] = report
+        if applied:
+            self._count('reconciles')
+        return report
+
+    def reconciled_at(self, connector, table_name: str) -> Optional[str]:
+
+        item = connector._call(connector.get_table(self.table_name).get_item, Key={'id': table_name}).get('Item')
+        return item.get('reconciled_at') if item else None
+
+    def acquire_lease(self, connector, duration: float, lease_id: str = RECONCILE_LEASE_ID) -> bool:
+
+        # Условная запись аренды: полную сверку делает один воркер на интервал, а не каждый при старте.
+        # Аренда не продлевается - после истечения ее берет первый, кто попросит
+        now = time.time()
+        try:
+            connector._call(
+                connector.get_table(self.table_name).put_item,
+                Item={
+                    'id': lease_id,
+                    'owner': self.worker_id,
+                    'expires_at': Decimal(str(round(now + duration, 3)))
+                },
+                ConditionExpression=Attr('id').not_exists() | Attr('expires_at').lt(Decimal(str(round(now, 3))))
+            )
+            return True
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                return False
+            raise
+
+    def reconcile_all(self, connector, only_dirty: bool = False,
+                      only_missing: bool = False, lease_duration: float = None) -> List[Dict[str, Any]]:
+
+        # only_missing - только таблицы, для которых счетчики еще ни разу не сверялись (старт воркера).
+        # lease_duration - помеченную таблицу сверяет один воркер на этот срок, а не все сразу
+        if only_dirty:
+            tables = self.dirty_tables(connector)
+            if lease_duration:
+                tables = [
+                    table_name for table_name in tables
+                    if self.acquire_lease(connector, lease_duration, f"{RECONCILE_LEASE_ID}{table_name}")
+                ]
+        else:
+            tables = list(self.tracked)
+
+        if only_missing:
+            missing = []
+            for table_name in tables:
+                try:
+                    if self.reconciled_at(connector, table_name) is None:
+                        missing.append(table_name)
+                except (ClientError, DynamoDBError) as e:
+                    print(f"[ERROR][DynamoDB] - Ошибка чтения счетчиков {table_name}: {e}")
+            tables = missing
+
+        reports = []
+        for table_name in tables:
+            try:
+                reports.append(self.reconcile(connector, table_name))
+            except (ClientError, DynamoDBError) as e:
+                print(f"[ERROR][DynamoDB] - Ошибка сверки счетчиков {table_name}: {e}")
+        return reports
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            return {
+                **self._stats,
+                'enabled': self.enabled,
+                'table_name': self.table_name,
+                'tracked': dict(self.tracked),
+                'dirty': sorted(self._dirty),
+                'last_reconcile': {
+                    table_name: {key: value for key, value in report.items() if key != 'counts'}
+                    for table_name, report in self._last_reconcile.items()
+                }
+            }
+
+
+aggregate_counters = AggregateCounters(
+    table_name=settings.DYNAMODB_COUNTERS_TABLE,
+    tracked=_parse_tracked_fields(settings.DYNAMODB_COUNTERS_TRACKED),
+    enabled=settings.DYNAMODB_COUNTERS_ENABLED
+)
+
+
+async def run_reconcile_loop(check_interval: float = None, full_interval: float = None):
+
+    # Фоновая сверка: каждые check_interval секунд пересчитываются помеченные таблицы (пометки любого воркера).
+    # При старте - только таблицы без счетчиков, раз в full_interval - все отслеживаемые;
+    # обе полные сверки делает один воркер, получивший аренду
+    from .async_base import dynamodb_executor
+    from .connector import get_db_connector
+
+    check_interval = check_interval or settings.DYNAMODB_COUNTERS_CHECK_INTERVAL
+    full_interval = full_interval or settings.DYNAMODB_COUNTERS_RECONCILE_INTERVAL
+    started = False
+    last_full = time.monotonic()
+
+    while True:
+        connector = get_db_connector()
+        if connector:
+            try:
+                if not started and not await dynamodb_executor.run(connector.table_exists, aggregate_counters.table_name):
+                    # Таблицу создает общая настройка таблиц коннектора; без нее подсчеты идут COUNT-сканами,
+                    # а записи перестают обновлять счетчики
+                    print(
+                        f"[ERROR][DynamoDB] - Таблица счетчиков {aggregate_counters.table_name} не найдена: "
+                        f"агрегатные счетчики отключены"
+                    )
+                    aggregate_counters.enabled = False
+                    return
+                full = time.monotonic() - last_full >= full_interval
+                if (not started or full) and await dynamodb_executor.run(
+                    aggregate_counters.acquire_lease, connector, full_interval
+                ):
+                    await dynamodb_executor.run(
+                        aggregate_counters.reconcile_all, connector, False, not started
+                    )
+                else:
+                    await dynamodb_executor.run(
+                        aggregate_counters.reconcile_all, connector, True, False, check_interval
+                    )
+                started = True
+                if full:
+                    last_full = time.monotonic()
+            except Exception as e:
+                print(f"[ERROR][DynamoDB] - Ошибка фоновой сверки счетчиков: {e}")
+
+        await asyncio.sleep(check_interval)
+
+# Пользователи по ролям и активности
+if settings.DYNAMODB_USERS_TABLE:
+    aggregate_counters.track(settings.DYNAMODB_USERS_TABLE, ['role', 'is_active'])
@@ -0,0 +1,80 @@
+class DynamoDBError(Exception):
+    pass
+
+
+class InvalidCursorError(DynamoDBError, ValueError):
+    pass
+
+
+class ItemNotFoundError(DynamoDBError, LookupError):
+    pass
+
+
+class ConflictError(DynamoDBError):
+
+    # Условная запись не прошла, хотя элемент существует; current_item - его состояние на момент отказа
+    def __init__(self, message: str, current_item=None):
+        super().__init__(message)
+        self.current_item = current_item
+
+
+class VersionConflictError(ConflictError):
+
+    def __init__(self, message: str, current_item=None,
+                 expected_version: int = None, current_version: int = None):
+        super().__init__(message, current_item=current_item)
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+class TransactionCanceledError(ConflictError):
+
+    # Транзакция отменена целиком; reasons - причины по каждой операции в порядке запроса
+    def __init__(self, message: str, reasons=None):
+        super().__init__(message)
+        self.reasons = reasons or []
+
+
+class RequestFailedError(DynamoDBError):
+
+    # Неповторяемая ошибка запроса (валидация, нет таблицы, доступ); code - код ошибки AWS
+    def __init__(self, message: str, table_name: str = None, code: str = None):
+        super().__init__(message)
+        self.table_name = table_name
+        self.code = code
+
+
+class TableNotFoundError(RequestFailedError, LookupError):
+    pass
+
+
+class InvalidRequestError(RequestFailedError, ValueError):
+    pass
+
+
+class ThrottledError(DynamoDBError):
+
+    # Троттлинг не прошел после всех ретраев; retry_after - рекомендуемая пауза в секундах
+    def __init__(self, message: str, table_name: str = None, retry_after: float = None):
+        super().__init__(message)
+        self.table_name = table_name
+        self.retry_after = retry_after
+
+
+class ServiceUnavailableError(DynamoDBError):
+
+    # Временные ошибки сервиса или сети не прошли после всех ретраев
+    def __init__(self, message: str, table_name: str = None, retry_after: float = None):
+        super().__init__(message)
+        self.table_name = table_name
+        self.retry_after = retry_after
+
+
+class CallBudgetExceededError(DynamoDBError):
+
+    # Запрос превысил бюджет вызовов DynamoDB своего маршрута (только при DYNAMODB_CALL_BUDGET_ENFORCE)
+    def __init__(self, message: str, route: str = None, calls: int = None, budget: int = None):
+        super().__init__(message)
+        self.route = route
+        self.calls = calls
+        self.budget = budget
@@ -0,0 +1,138 @@
+import copy
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def build_projection(fields: Optional[Iterable[str]],
+                     prefix: str = '#pj') -> Tuple[Optional[str], Dict[str, str]]:
+
+    # Плейсхолдеры для имен атрибутов, чтобы не ломаться на зарезервированных словах (name, status...)
+    if not fields:
+        return None, {}
+
+    names = {}
+    placeholders = []
+    for field in dict.fromkeys(fields):
+        placeholder = f"{prefix}{len(names)}"
+        names[placeholder] = field
+        placeholders.append(placeholder)
+
+    return ", ".join(placeholders), names
+
+
+def apply_projection(params: Dict[str, Any], fields: Optional[Iterable[str]]) -> Dict[str, Any]:
+
+    # Добавляет ProjectionExpression к параметрам запроса, не затирая чужие ExpressionAttributeNames
+    projection_expression, attribute_names = build_projection(fields)
+    if projection_expression:
+        params['ProjectionExpression'] = projection_expression
+        params.setdefault('ExpressionAttributeNames', {}).update(attribute_names)
+    return params
+
+
+@lru_cache(maxsize=1024)
+def _compile_update(set_fields: Tuple[str, ...], remove_fields: Tuple[str, ...],
+                    add_fields: Tuple[str, ...],
+                    if_not_exists_fields: Tuple[str, ...]) -> Tuple[str, Dict[str, str], Tuple[str, ...]]:
+
+    # Шаблон выражения для набора полей компилируется один раз; значения подставляются по порядку
+    names = {}
+    value_placeholders = []
+
+    def name_of(field: str) -> str:
+        placeholder = f"#u{len(names)}"
+        names[placeholder] = field
+        return placeholder
+
+    def value_of() -> str:
+        placeholder = f":u{len(value_placeholders)}"
+        value_placeholders.append(placeholder)
+        return placeholder
+
+    set_clauses = [f"{name_of(field)} = {value_of()}" for field in set_fields]
+    for field in if_not_exists_fields:
+        name = name_of(field)
+        set_clauses.append(f"{name} = if_not_exists({name}, {value_of()})")
+
+    sections = []
+    if set_clauses:
+        sections.append("SET " + ", ".join(set_clauses))
+    if remove_fields:
+        sections.append("REMOVE " + ", ".join(name_of(field) for field in remove_fields))
+    if add_fields:
+        sections.append("ADD " + ", ".join(f"{name_of(field)} {value_of()}" for field in add_fields))
+
+    return " ".join(sections), names, tuple(value_placeholders)
+
+
+def build_update_expression(set_values: Dict[str, Any] = None,
+                            remove: Iterable[str] = None,
+                            add: Dict[str, Any] = None,
+                            set_if_not_exists: Dict[str, Any] = None) -> Dict[str, Any]:
+
+    # Параметры UpdateItem с плейсхолдерами (#u*, :u*) - зарезервированные слова (name, status...) не ломают запрос
+    set_values = set_values or {}
+    add = add or {}
+    set_if_not_exists = set_if_not_exists or {}
+    remove = tuple(field for field in (remove or ()) if field not in set_values)
+
+    expression, names, value_placeholders = _compile_update(
+        tuple(set_values), remove, tuple(add), tuple(set_if_not_exists)
+    )
+    if not expression:
+        raise ValueError("Пустое выражение обновления")
+
+    values = [*set_values.values(), *set_if_not_exists.values(), *add.values()]
+    params = {
+        'UpdateExpression': expression,
+        # Копия: boto3 дописывает в словарь имена из ConditionExpression
+        'ExpressionAttributeNames': dict(names)
+    }
+    if values:
+        params['ExpressionAttributeValues'] = dict(zip(value_placeholders, values))
+    return params
+
+
+def update_template_cache_info() -> Dict[str, int]:
+
+    return _compile_update.cache_info()._asdict()
+
+
+def _normalize(value: Any) -> Any:
+
+    # Локально собранный элемент приводим к виду, в котором его вернул бы DynamoDB (int -> Decimal)
+    return _deserializer.deserialize(_serializer.serialize(value))
+
+
+def apply_update(old_item: Optional[Dict[str, Any]], key: Dict[str, Any],
+                 set_values: Dict[str, Any] = None, remove: Iterable[str] = None,
+                 add: Dict[str, Any] = None,
+                 set_if_not_exists: Dict[str, Any] = None) -> Dict[str, Any]:
+
+    # Элемент после UpdateItem по его старому состоянию (ALL_OLD) - чтобы за один запрос
+    # знать и старые значения для счетчиков, и новые для ответа вызывающему
+    item = copy.deepcopy(old_item) if old_item else {}
+    item.update(key)
+
+    for field, value in (set_values or {}).items():
+        item[field] = _normalize(value)
+    for field, value in (set_if_not_exists or {}).items():
+        item.setdefault(field, _normalize(value))
+    for field in remove or ():
+        if field not in (set_values or {}):
+            item.pop(field, None)
+    for field, value in (add or {}).items():
+        value = _normalize(value)
+        if field not in item:
+            item[field] = value
+        elif isinstance(value, set):
+            item[field] = item[field] | value
+        else:
+            item[field] = item[field] + value
+
+    return item
@@ -0,0 +1,257 @@
+import copy
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from app.core.cache import shared_cache
+from app.core.config import settings
+
+
+def _parse_table_limits(raw: str) -> Dict[str, int]:
+
+    # "LiberandumAggregationTokenStats=5000,users=2000" -> {'LiberandumAggregationTokenStats': 5000, ...}
+    limits = {}
+    for part in (raw or '').split(','):
+        if '=' not in part:
+            continue
+        table_name, limit = part.split('=', 1)
+        try:
+            limits[table_name.strip()] = int(limit)
+        except ValueError:
+            print(f"[WARNING][DynamoDB] - Некорректный лимит кэша для таблицы: {part}")
+    return limits
+
+
+def make_cache_key(key: Dict[str, Any]) -> Tuple:
+
+    return tuple(sorted(key.items()))
+
+
+class ItemCache:
+
+    # In-process LRU/TTL кэш элементов по (таблица, ключ) перед GetItem.
+    # Отдельный LRU на таблицу, чтобы горячая таблица не вытесняла остальные
+
+    def __init__(self, enabled: bool = True, ttl: float = 30.0, max_items: int = 1000,
+                 table_limits: Dict[str, int] = None, excluded_tables: Iterable[str] = ()):
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_items = max_items
+        self.table_limits = dict(table_limits or {})
+        # Таблицы с данными аутентификации (пользователи, OTP) не кэшируются: смена пароля,
+        # блокировка или использованный код должны быть видны сразу на всех воркерах
+        self.excluded_tables = set(excluded_tables)
+
+        self._tables: Dict[str, OrderedDict] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self._generations: Dict[str, int] = {}
+        self._listeners: List[Callable[[str, List[Dict[str, Any]]], None]] = []
+
+    def _table(self, table_name: str) -> OrderedDict:
+
+        if table_name not in self._tables:
+            self._tables[table_name] = OrderedDict()
+            self._stats[table_name] = {
+                'hits': 0,
+                'misses': 0,
+                'sets': 0,
+                'evictions': 0,
+                'expirations': 0,
+                'invalidations': 0
+            }
+        return self._tables[table_name]
+
+    def _limit(self, table_name: str) -> int:
+
+        if table_name in self.excluded_tables:
+            return 0
+        return self.table_limits.get(table_name, self.max_items)
+
+    def configure_table(self, table_name: str, max_items: int):
+
+        with self._lock:
+            self.table_limits[table_name] = max_items
+            entries = self._table(table_name)
+            while len(entries) > max(0, max_items):
+                entries.popitem(last=False)
+                self._stats[table_name]['evictions'] += 1
+
+    def get(self, table_name: str, key: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+
+        # Возвращает копию элемента или None; копия - чтобы вызывающий не испортил кэш
+        if not self.enabled or table_name in self.excluded_tables:
+            return None
+
+        cache_key = make_cache_key(key)
+        with self._lock:
+            entries = self._table(table_name)
+            entry = entries.get(cache_key)
+
+            if entry is None:
+                self._stats[table_name]['misses'] += 1
+                return None
+
+            expires_at, item = entry
+            if expires_at <= time.monotonic():
+                del entries[cache_key]
+                self._stats[table_name]['expirations'] += 1
+                self._stats[table_name]['misses'] += 1
+                return None
+
+            entries.move_to_end(cache_key)
+            self._stats[table_name]['hits'] += 1
+
+        return copy.deepcopy(item)
+
+    def generation(self, table_name: str) -> int:
+
+        # Счетчик записей в таблицу: читатель запоминает его до GetItem и кладет результат
+        # в кэш, только если за это время в таблицу никто не писал (иначе можно закэшировать старое)
+        return self._generations.get(table_name, 0)
+
+    def set(self, table_name: str, key: Dict[str, Any], item: Dict[str, Any],
+            generation: int = None):
+
+        limit = self._limit(table_name)
+        if not self.enabled or limit <= 0 or item is None:
+            return
+
+        cache_key = make_cache_key(key)
+        entry = (time.monotonic() + self.ttl, copy.deepcopy(item))
+
+        with self._lock:
+            if generation is not None and generation != self._generations.get(table_name, 0):
+                return
+            entries = self._table(table_name)
+            entries[cache_key] = entry
+            entries.move_to_end(cache_key)
+            self._stats[table_name]['sets'] += 1
+
+            while len(entries) > limit:
+                entries.popitem(last=False)
+                self._stats[table_name]['evictions'] += 1
+
+    def add_listener(self, listener: Callable[[str, List[Dict[str, Any]]], None]):
+
+        # Уведомления об инвалидациях (рассылка на другие воркеры через общий кэш)
+        self._listeners.append(listener)
+
+    def _notify(self, table_name: str, keys: List[Dict[str, Any]]):
+
+        for listener in self._listeners:
+            try:
+                listener(table_name, keys)
+            except Exception as e:
+                print(f"[WARNING][DynamoDB] - Ошибка уведомления об инвалидации кэша {table_name}: {e}")
+
+    def invalidate(self, table_name: str, key: Dict[str, Any], notify: bool = True):
+
+        if not self.enabled:
+            return
+
+        self._drop(table_name, key)
+        if notify:
+            self._notify(table_name, [key])
+
+    def _drop(self, table_name: str, key: Dict[str, Any]):
+
+        with self._lock:
+            self._generations[table_name] = self._generations.get(table_name, 0) + 1
+            if table_name not in self._tables:
+                return
+            if self._tables[table_name].pop(make_cache_key(key), None) is not None:
+                self._stats[table_name]['invalidations'] += 1
+
+    def invalidate_items(self, table_name: str, items: Iterable[Dict[str, Any]],
+                         key_attributes: Tuple[str, ...]):
+
+        if not self.enabled:
+            return
+
+        keys = [{name: item[name] for name in key_attributes if name in item} for item in items]
+        for key in keys:
+            self._drop(table_name, key)
+        self._notify(table_name, keys)
+
+    def clear(self, table_name: str = None):
+
+        with self._lock:
+            if table_name is None:
+                self._tables.clear()
+                self._stats.clear()
+            else:
+                self._tables.pop(table_name, None)
+                self._stats.pop(table_name, None)
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            tables = {
+                table_name: {
+                    **stats,
+                    'size': len(self._tables[table_name]),
+                    'max_items': self._limit(table_name),
+                    'hit_rate': round(stats['hits'] / (stats['hits'] + stats['misses']), 3)
+                    if stats['hits'] + stats['misses'] else 0.0
+                }
+                for table_name, stats in self._stats.items()
+            }
+
+        return {
+            'enabled': self.enabled,
+            'ttl_seconds': self.ttl,
+            'excluded_tables': sorted(self.excluded_tables),
+            'hits': sum(stats['hits'] for stats in tables.values()),
+            'misses': sum(stats['misses'] for stats in tables.values()),
+            'tables': tables
+        }
+
+
+def _resolve_enabled(raw: str, cache_backend: str) -> bool:
+
+    # auto - только с общим L2 (redis): без него инвалидация не доходит до других воркеров
+    value = (raw or 'auto').strip().lower()
+    if value == 'auto':
+        return (cache_backend or '').strip().lower() == 'redis'
+    return value in ('1', 'true', 'yes', 'on')
+
+
+def _excluded_tables() -> List[str]:
+
+    # Таблицы аутентификации берутся из настроек, а не по литеральным именам
+    names = [settings.DYNAMODB_USERS_TABLE, settings.DYNAMODB_OTP_TABLE]
+    names.extend(settings.DYNAMODB_ITEM_CACHE_EXCLUDED_TABLES.split(','))
+    return [name.strip() for name in names if name and name.strip()]
+
+
+item_cache = ItemCache(
+    enabled=_resolve_enabled(settings.DYNAMODB_ITEM_CACHE_ENABLED, settings.CACHE_BACKEND),
+    ttl=settings.DYNAMODB_ITEM_CACHE_TTL,
+    max_items=settings.DYNAMODB_ITEM_CACHE_MAX_ITEMS,
+    table_limits=_parse_table_limits(settings.DYNAMODB_ITEM_CACHE_TABLE_LIMITS),
+    excluded_tables=_excluded_tables()
+)
+
+if item_cache.enabled and settings.CACHE_BACKEND.lower() != 'redis':
+    print(
+        f"[WARNING][Cache] - Кэш элементов включен без Redis: записи других воркеров "
+        f"видны только через {settings.DYNAMODB_ITEM_CACHE_TTL} с (TTL)"
+    )
+
+
+def _publish_invalidation(table_name: str, keys: List[Dict[str, Any]]):
+
+    shared_cache.publish_threadsafe('dynamodb-items', [{'table': table_name, 'key': key} for key in keys])
+
+
+def _apply_remote_invalidation(entries: List[Dict[str, Any]]):
+
+    for entry in entries:
+        item_cache.invalidate(entry['table'], entry['key'], notify=False)
+
+
+# Записи на одном воркере сбрасывают кэш элементов на остальных
+item_cache.add_listener(_publish_invalidation)
+shared_cache.on_invalidate('dynamodb-items', _apply_remote_invalidation)
@@ -0,0 +1,62 @@
+import threading
+from typing import Optional
+
+from .engine import InMemoryDynamoDB, MemoryDynamoDBClient, MemoryDynamoDBResource, MemoryTable
+
+_engine: Optional[InMemoryDynamoDB] = None
+_engine_lock = threading.Lock()
+
+
+def get_memory_engine() -> InMemoryDynamoDB:
+
+    # Один движок на процесс: все коннекторы видят одни и те же таблицы
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            from app.core.config import settings
+
+            _engine = InMemoryDynamoDB(
+                latency_ms=settings.DYNAMODB_MEMORY_LATENCY_MS,
+                throttle_rate=settings.DYNAMODB_MEMORY_THROTTLE_RATE,
+                seed=settings.DYNAMODB_MEMORY_SEED,
+                region_name=settings.AWS_REGION,
+                max_pool_connections=settings.DYNAMODB_MAX_POOL_CONNECTIONS
+            )
+            _create_schema_tables(_engine)
+        return _engine
+
+
+def _create_schema_tables(engine: InMemoryDynamoDB):
+
+    # Таблицы приложения из app/aws/table_schemas.py - в памяти их некому создать заранее
+    from app.aws.table_schemas import SCHEMA_REGISTRY
+
+    for table_name, schema in SCHEMA_REGISTRY.items():
+        params = {
+            'TableName': table_name,
+            'KeySchema': schema.key_schema,
+            'AttributeDefinitions': schema.attribute_definitions,
+            'ProvisionedThroughput': schema.provisioned_throughput
+        }
+        if getattr(schema, 'global_secondary_indexes', None):
+            params['GlobalSecondaryIndexes'] = schema.global_secondary_indexes
+        engine.client.create_table(**params)
+
+
+def reset_memory_engine():
+
+    # Очистка всех таблиц между тестами/прогонами бенчмарка (таблицы схем создаются заново)
+    with _engine_lock:
+        if _engine is not None:
+            _engine.reset()
+            _create_schema_tables(_engine)
+
+
+__all__ = [
+    'InMemoryDynamoDB',
+    'MemoryDynamoDBClient',
+    'MemoryDynamoDBResource',
+    'MemoryTable',
+    'get_memory_engine',
+    'reset_memory_engine'
+]
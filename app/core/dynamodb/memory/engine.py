@@ -0,0 +1,1058 @@
+import bisect
+import copy
+import math
+import random
+import threading
+import time
+import zlib
+from datetime import datetime, timezone
+from decimal import Decimal
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import ConditionExpressionBuilder
+from boto3.dynamodb.types import Binary, TypeDeserializer, TypeSerializer
+from botocore.exceptions import ClientError
+
+from .expressions import (
+    MISSING,
+    ExpressionContext,
+    ExpressionError,
+    apply_update,
+    compile_condition,
+    evaluate_condition,
+    get_path,
+    project,
+    type_code
+)
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+# Лимиты DynamoDB, которые влияют на поведение клиентов (пагинация, размер пачек)
+MAX_PAGE_BYTES = 1024 * 1024
+MAX_BATCH_GET_KEYS = 100
+MAX_BATCH_WRITE_ITEMS = 25
+MAX_TRANSACTION_ITEMS = 100
+IDEMPOTENCY_WINDOW_SECONDS = 600
+
+DATA_OPERATIONS = {
+    'get_item', 'put_item', 'update_item', 'delete_item', 'query', 'scan',
+    'batch_get_item', 'batch_write_item', 'transact_write_items', 'transact_get_items'
+}
+
+
+def _operation_name(operation: str) -> str:
+
+    # get_item -> GetItem, как в сообщениях botocore
+    return ''.join(part.capitalize() for part in operation.split('_'))
+
+
+def _error(operation: str, code: str, message: str, **extra) -> ClientError:
+
+    response = {
+        'Error': {'Code': code, 'Message': message},
+        'ResponseMetadata': {'HTTPStatusCode': 400, 'RetryAttempts': 0}
+    }
+    response.update(extra)
+    return ClientError(response, _operation_name(operation))
+
+
+def normalize(value: Any) -> Any:
+
+    # Значения хранятся так, как их вернул бы DynamoDB (int -> Decimal); float отвергается, как в boto3
+    return _deserializer.deserialize(_serializer.serialize(value))
+
+
+def serialize_item(item: Dict[str, Any]) -> Dict[str, Any]:
+
+    return {name: _serializer.serialize(value) for name, value in item.items()}
+
+
+def _value_size(value: Any) -> int:
+
+    if isinstance(value, str):
+        return len(value.encode('utf-8'))
+    if isinstance(value, (bytes, bytearray)):
+        return len(value)
+    if isinstance(value, Binary):
+        return len(value.value)
+    if isinstance(value, bool) or value is None:
+        return 1
+    if isinstance(value, Decimal):
+        digits = len(value.as_tuple().digits)
+        return (digits + 1) // 2 + 1
+    if isinstance(value, dict):
+        return 3 + sum(len(name.encode('utf-8')) + _value_size(item) + 1 for name, item in value.items())
+    if isinstance(value, (list, set, frozenset)):
+        return 3 + sum(_value_size(item) + 1 for item in value)
+    return len(str(value))
+
+
+def item_size(item: Optional[Dict[str, Any]]) -> int:
+
+    if not item:
+        return 0
+    return sum(len(name.encode('utf-8')) + _value_size(value) for name, value in item.items())
+
+
+def _order_value(value: Any) -> Tuple:
+
+    # Ключ сортировки для значений одного ключевого атрибута (S, N или B)
+    if value is None:
+        return ('',)
+    if isinstance(value, Binary):
+        return ('B', value.value)
+    return (type_code(value), value)
+
+
+class MemoryTableData:
+
+    def __init__(self, params: Dict[str, Any]):
+        self.name = params['TableName']
+        self.key_schema = copy.deepcopy(params['KeySchema'])
+        self.attribute_definitions = copy.deepcopy(params.get('AttributeDefinitions', []))
+        self.provisioned_throughput = copy.deepcopy(params.get('ProvisionedThroughput') or {})
+        self.billing_mode = params.get('BillingMode', 'PROVISIONED')
+        self.created_at = datetime.now(timezone.utc)
+
+        self.attribute_types = {
+            definition['AttributeName']: definition['AttributeType']
+            for definition in self.attribute_definitions
+        }
+        self.hash_key, self.range_key = self._key_names(self.key_schema)
+
+        self.indexes: Dict[str, Dict[str, Any]] = {}
+        for index in params.get('GlobalSecondaryIndexes') or []:
+            hash_key, range_key = self._key_names(index['KeySchema'])
+            projection = index.get('Projection') or {}
+            self.indexes[index['IndexName']] = {
+                'definition': copy.deepcopy(index),
+                'hash_key': hash_key,
+                'range_key': range_key,
+                'projection_type': projection.get('ProjectionType', 'ALL'),
+                'non_key_attributes': projection.get('NonKeyAttributes', []),
+                'partitions': {}
+            }
+
+        self.items: Dict[Tuple, Dict[str, Any]] = {}
+        self.partitions: Dict[Any, set] = {}
+        self._sorted: Optional[List[Tuple]] = None
+        self.size_bytes = 0
+
+    @staticmethod
+    def _key_names(key_schema: List[Dict[str, str]]) -> Tuple[Optional[str], Optional[str]]:
+
+        hash_key = next((key['AttributeName'] for key in key_schema if key['KeyType'] == 'HASH'), None)
+        range_key = next((key['AttributeName'] for key in key_schema if key['KeyType'] == 'RANGE'), None)
+        return hash_key, range_key
+
+    @property
+    def key_attributes(self) -> Tuple[str, ...]:
+
+        return tuple(name for name in (self.hash_key, self.range_key) if name)
+
+    def primary_key(self, item: Dict[str, Any]) -> Tuple:
+
+        return tuple(item.get(name) for name in self.key_attributes)
+
+    def key_of(self, item: Dict[str, Any], index_name: str = None) -> Dict[str, Any]:
+
+        names = list(self.key_attributes)
+        if index_name:
+            index = self.indexes[index_name]
+            names += [name for name in (index['hash_key'], index['range_key']) if name and name not in names]
+        return {name: item[name] for name in names if name in item}
+
+    def _index_entry(self, index: Dict[str, Any], item: Dict[str, Any]) -> Optional[Any]:
+
+        # Разреженный индекс: элемент без ключевых атрибутов индекса в него не попадает
+        if index['hash_key'] not in item:
+            return None
+        if index['range_key'] and index['range_key'] not in item:
+            return None
+        return item[index['hash_key']]
+
+    def store(self, item: Optional[Dict[str, Any]], primary_key: Tuple):
+
+        old_item = self.items.pop(primary_key, None)
+        if old_item is not None:
+            self.size_bytes -= item_size(old_item)
+            self.partitions.get(primary_key[0], set()).discard(primary_key)
+            for index in self.indexes.values():
+                hash_value = self._index_entry(index, old_item)
+                if hash_value is not None:
+                    index['partitions'].get(hash_value, set()).discard(primary_key)
+
+        if item is None:
+            self._sorted = None
+            return
+
+        self.items[primary_key] = item
+        self.size_bytes += item_size(item)
+        self.partitions.setdefault(primary_key[0], set()).add(primary_key)
+        for index in self.indexes.values():
+            hash_value = self._index_entry(index, item)
+            if hash_value is not None:
+                index['partitions'].setdefault(hash_value, set()).add(primary_key)
+        if old_item is None:
+            self._sorted = None
+
+    def sorted_keys(self) -> List[Tuple]:
+
+        if self._sorted is None:
+            self._sorted = sorted(self.items, key=self.order_key)
+        return self._sorted
+
+    @staticmethod
+    def order_key(primary_key: Tuple) -> Tuple:
+
+        return tuple(_order_value(value) for value in primary_key)
+
+    def describe(self) -> Dict[str, Any]:
+
+        description = {
+            'TableName': self.name,
+            'TableStatus': 'ACTIVE',
+            'TableArn': f"arn:aws:dynamodb:local:000000000000:table/{self.name}",
+            'KeySchema': copy.deepcopy(self.key_schema),
+            'AttributeDefinitions': copy.deepcopy(self.attribute_definitions),
+            'CreationDateTime': self.created_at,
+            'ItemCount': len(self.items),
+            'TableSizeBytes': self.size_bytes,
+            'BillingModeSummary': {'BillingMode': self.billing_mode}
+        }
+        if self.provisioned_throughput:
+            description['ProvisionedThroughput'] = {
+                **self.provisioned_throughput,
+                'NumberOfDecreasesToday': 0
+            }
+        if self.indexes:
+            description['GlobalSecondaryIndexes'] = [
+                {
+                    **copy.deepcopy(index['definition']),
+                    'IndexStatus': 'ACTIVE',
+                    'ItemCount': sum(len(keys) for keys in index['partitions'].values())
+                }
+                for index in self.indexes.values()
+            ]
+        return description
+
+
+class InMemoryDynamoDB:
+
+    # Локальный движок с семантикой DynamoDB для тестов и бенчмарков: таблицы и GSI,
+    # выражения условий/обновлений/проекций, пагинация с лимитом 1 МБ, пакеты, транзакции,
+    # ConsumedCapacity и (опционально) искусственные задержка и троттлинг.
+    # Снаружи - те же client/resource, что у boto3, поэтому коннектор работает без изменений
+
+    def __init__(self, latency_ms: float = 0.0, throttle_rate: float = 0.0, seed: int = 0,
+                 region_name: str = 'local', max_pool_connections: int = 50):
+        self.latency_ms = max(0.0, latency_ms)
+        self.throttle_rate = min(max(throttle_rate, 0.0), 1.0)
+        self.region_name = region_name or 'local'
+        self.max_pool_connections = max_pool_connections
+
+        self._tables: Dict[str, MemoryTableData] = {}
+        self._idempotency: Dict[str, Tuple[float, str]] = {}
+        self._random = random.Random(seed)
+        self._lock = threading.RLock()
+        self._stats: Dict[str, int] = {'throttled': 0}
+
+        self.client = MemoryDynamoDBClient(self)
+        self.resource = MemoryDynamoDBResource(self)
+
+    # --- служебное ---
+
+    def reset(self):
+
+        with self._lock:
+            self._tables.clear()
+            self._idempotency.clear()
+            self._stats = {'throttled': 0}
+
+    def _simulate(self, operation: str):
+
+        if operation not in DATA_OPERATIONS:
+            return
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+        if self.throttle_rate:
+            with self._lock:
+                throttled = self._random.random() < self.throttle_rate
+                if throttled:
+                    self._stats['throttled'] += 1
+            if throttled:
+                raise _error(
+                    operation, 'ProvisionedThroughputExceededException',
+                    'The level of configured provisioned throughput for the table was exceeded'
+                )
+
+    def _partial_throttle(self) -> bool:
+
+        # Для пакетов троттлинг частичный: отдельные элементы возвращаются как необработанные
+        if not self.throttle_rate:
+            return False
+        throttled = self._random.random() < self.throttle_rate
+        if throttled:
+            self._stats['throttled'] += 1
+        return throttled
+
+    def execute(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        self._simulate(operation)
+        handler = getattr(self, f"_{operation}")
+        with self._lock:
+            self._stats[operation] = self._stats.get(operation, 0) + 1
+            try:
+                return handler(operation, params)
+            except ExpressionError as e:
+                raise _error(operation, 'ValidationException', str(e))
+
+    def _table(self, operation: str, table_name: str) -> MemoryTableData:
+
+        table = self._tables.get(table_name)
+        if table is None:
+            raise _error(operation, 'ResourceNotFoundException', 'Requested resource not found')
+        return table
+
+    def _key(self, operation: str, table: MemoryTableData, key: Dict[str, Any]) -> Tuple[Dict[str, Any], Tuple]:
+
+        if not isinstance(key, dict) or set(key) != set(table.key_attributes):
+            raise _error(operation, 'ValidationException', 'The provided key element does not match the schema')
+        key = {name: normalize(value) for name, value in key.items()}
+        for name, value in key.items():
+            expected = table.attribute_types.get(name)
+            if expected and type_code(value) != expected:
+                raise _error(operation, 'ValidationException', 'The provided key element does not match the schema')
+        return key, table.primary_key(key)
+
+    def _item(self, operation: str, table: MemoryTableData, item: Dict[str, Any]) -> Tuple[Dict[str, Any], Tuple]:
+
+        item = {name: normalize(value) for name, value in item.items()}
+        self._key(operation, table, {name: item.get(name) for name in table.key_attributes if name in item})
+        for index in table.indexes.values():
+            for name in (index['hash_key'], index['range_key']):
+                expected = table.attribute_types.get(name)
+                if name and name in item and expected and type_code(item[name]) != expected:
+                    raise _error(
+                        operation, 'ValidationException',
+                        f"One or more parameter values were invalid: Type mismatch for Index Key {name}"
+                    )
+        return item, table.primary_key(item)
+
+    def _context(self, params: Dict[str, Any]) -> Tuple[ExpressionContext, ConditionExpressionBuilder]:
+
+        context = ExpressionContext(
+            dict(params.get('ExpressionAttributeNames') or {}),
+            {name: normalize(value) for name, value in (params.get('ExpressionAttributeValues') or {}).items()}
+        )
+        return context, ConditionExpressionBuilder()
+
+    def _expression(self, expression: Any, context: ExpressionContext, builder: ConditionExpressionBuilder,
+                    is_key_condition: bool = False) -> Optional[str]:
+
+        # Условия boto3 (Attr/Key) раскрываются в строку так же, как это делает ресурс boto3
+        if expression is None or isinstance(expression, str):
+            return expression
+        built = builder.build_expression(expression, is_key_condition=is_key_condition)
+        context.names.update(built.attribute_name_placeholders)
+        context.values.update({
+            name: normalize(value) for name, value in built.attribute_value_placeholders.items()
+        })
+        return built.condition_expression
+
+    def _check_condition(self, operation: str, params: Dict[str, Any], old_item: Optional[Dict[str, Any]],
+                         context: ExpressionContext, builder: ConditionExpressionBuilder) -> Optional[ClientError]:
+
+        expression = self._expression(params.get('ConditionExpression'), context, builder)
+        if expression is None or evaluate_condition(compile_condition(expression), old_item, context):
+            return None
+
+        extra = {}
+        if params.get('ReturnValuesOnConditionCheckFailure') == 'ALL_OLD' and old_item:
+            extra['Item'] = serialize_item(old_item)
+        return _error(operation, 'ConditionalCheckFailedException', 'The conditional request failed', **extra)
+
+    def _consumed(self, params: Dict[str, Any], table_name: str, units: float) -> Dict[str, Any]:
+
+        if params.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            return {'ConsumedCapacity': {'TableName': table_name, 'CapacityUnits': units}}
+        return {}
+
+    @staticmethod
+    def _read_units(size: int, consistent: bool) -> float:
+
+        return max(1, math.ceil(size / 4096)) * (1.0 if consistent else 0.5)
+
+    @staticmethod
+    def _write_units(*items: Optional[Dict[str, Any]]) -> float:
+
+        return float(max(1, math.ceil(max(item_size(item) for item in items) / 1024)))
+
+    # --- таблицы ---
+
+    def _create_table(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        table_name = params['TableName']
+        if table_name in self._tables:
+            raise _error(operation, 'ResourceInUseException', f"Table already exists: {table_name}")
+
+        defined = {definition['AttributeName'] for definition in params.get('AttributeDefinitions', [])}
+        key_names = [key['AttributeName'] for key in params['KeySchema']]
+        for index in params.get('GlobalSecondaryIndexes') or []:
+            key_names += [key['AttributeName'] for key in index['KeySchema']]
+        missing = [name for name in key_names if name not in defined]
+        if missing:
+            raise _error(
+                operation, 'ValidationException',
+                f"One or more parameter values were invalid: Some index key attributes are not defined in AttributeDefinitions: {missing}"
+            )
+
+        table = MemoryTableData(params)
+        self._tables[table_name] = table
+        return {'TableDescription': table.describe()}
+
+    def _delete_table(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        table = self._table(operation, params['TableName'])
+        del self._tables[table.name]
+        return {'TableDescription': table.describe()}
+
+    def _describe_table(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        return {'Table': self._table(operation, params['TableName']).describe()}
+
+    def _list_tables(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        names = sorted(self._tables)
+        start = params.get('ExclusiveStartTableName')
+        if start:
+            names = names[bisect.bisect_right(names, start):]
+        limit = params.get('Limit') or 100
+        response = {'TableNames': names[:limit]}
+        if len(names) > limit:
+            response['LastEvaluatedTableName'] = names[limit - 1]
+        return response
+
+    # --- элементы ---
+
+    def _get_item(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        table = self._table(operation, params['TableName'])
+        _, primary_key = self._key(operation, table, params['Key'])
+        context, _ = self._context(params)
+
+        item = table.items.get(primary_key)
+        consistent = bool(params.get('ConsistentRead'))
+        response = self._consumed(params, table.name, self._read_units(item_size(item), consistent))
+        if item is not None:
+            projection = params.get('ProjectionExpression')
+            response['Item'] = project(item, projection, context) if projection else copy.deepcopy(item)
+        return response
+
+    def _put_item(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        table = self._table(operation, params['TableName'])
+        item, primary_key = self._item(operation, table, params['Item'])
+        context, builder = self._context(params)
+
+        old_item = table.items.get(primary_key)
+        error = self._check_condition(operation, params, old_item, context, builder)
+        if error:
+            raise error
+
+        table.store(item, primary_key)
+        response = self._consumed(params, table.name, self._write_units(old_item, item))
+        if params.get('ReturnValues', 'NONE') == 'ALL_OLD' and old_item is not None:
+            response['Attributes'] = old_item
+        return response
+
+    def _updated_item(self, operation: str, table: MemoryTableData, key: Dict[str, Any],
+                      old_item: Optional[Dict[str, Any]], params: Dict[str, Any],
+                      context: ExpressionContext) -> Dict[str, Any]:
+
+        if 'UpdateExpression' not in params:
+            raise _error(operation, 'ValidationException', 'UpdateExpression is required (AttributeUpdates is not supported)')
+
+        new_item = apply_update(copy.deepcopy(old_item) if old_item else dict(key), params['UpdateExpression'], context)
+        for name in table.key_attributes:
+            if new_item.get(name) != key[name]:
+                raise _error(
+                    operation, 'ValidationException',
+                    f"One or more parameter values were invalid: Cannot update attribute {name}. This attribute is part of the key"
+                )
+        return new_item
+
+    def _update_item(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        table = self._table(operation, params['TableName'])
+        key, primary_key = self._key(operation, table, params['Key'])
+        context, builder = self._context(params)
+
+        old_item = table.items.get(primary_key)
+        error = self._check_condition(operation, params, old_item, context, builder)
+        if error:
+            raise error
+
+        new_item = self._updated_item(operation, table, key, old_item, params, context)
+        new_item, _ = self._item(operation, table, new_item)
+        table.store(new_item, primary_key)
+
+        response = self._consumed(params, table.name, self._write_units(old_item, new_item))
+        return_values = params.get('ReturnValues', 'NONE')
+        if return_values == 'ALL_NEW':
+            response['Attributes'] = copy.deepcopy(new_item)
+        elif return_values == 'ALL_OLD' and old_item is not None:
+            response['Attributes'] = old_item
+        elif return_values in ('UPDATED_NEW', 'UPDATED_OLD'):
+            source = new_item if return_values == 'UPDATED_NEW' else (old_item or {})
+            changed = {
+                name for name in set(new_item) | set(old_item or {})
+                if (old_item or {}).get(name, MISSING) != new_item.get(name, MISSING)
+            }
+            attributes = {name: copy.deepcopy(source[name]) for name in changed if name in source}
+            if attributes:
+                response['Attributes'] = attributes
+        return response
+
+    def _delete_item(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        table = self._table(operation, params['TableName'])
+        _, primary_key = self._key(operation, table, params['Key'])
+        context, builder = self._context(params)
+
+        old_item = table.items.get(primary_key)
+        error = self._check_condition(operation, params, old_item, context, builder)
+        if error:
+            raise error
+
+        table.store(None, primary_key)
+        response = self._consumed(params, table.name, self._write_units(old_item))
+        if params.get('ReturnValues', 'NONE') == 'ALL_OLD' and old_item is not None:
+            response['Attributes'] = old_item
+        return response
+
+    # --- чтение диапазонов ---
+
+    def _index_view(self, table: MemoryTableData, index_name: Optional[str],
+                    item: Dict[str, Any]) -> Dict[str, Any]:
+
+        # Атрибуты, которые хранит GSI согласно его Projection
+        if not index_name:
+            return item
+        index = table.indexes[index_name]
+        if index['projection_type'] == 'ALL':
+            return item
+        names = set(table.key_of(item, index_name))
+        if index['projection_type'] == 'INCLUDE':
+            names |= set(index['non_key_attributes'])
+        return {name: value for name, value in item.items() if name in names}
+
+    def _read_page(self, operation: str, table: MemoryTableData, index_name: Optional[str],
+                   primary_keys: Iterable[Tuple], params: Dict[str, Any], context: ExpressionContext,
+                   filter_expression: Optional[str]) -> Dict[str, Any]:
+
+        # Общая часть Query/Scan: Limit считает прочитанные элементы (до фильтра),
+        # страница обрывается на 1 МБ, LastEvaluatedKey - ключ последнего прочитанного
+        limit = params.get('Limit')
+        if limit is not None and limit < 1:
+            raise _error(operation, 'ValidationException', 'Limit must be greater than or equal to 1')
+
+        filter_node = compile_condition(filter_expression) if filter_expression else None
+        projection = params.get('ProjectionExpression')
+        count_only = params.get('Select') == 'COUNT'
+
+        items, scanned, page_bytes = [], 0, 0
+        last_item = None
+        iterator = iter(primary_keys)
+        for primary_key in iterator:
+            item = self._index_view(table, index_name, table.items[primary_key])
+            scanned += 1
+            page_bytes += item_size(item)
+            last_item = item
+
+            if filter_node is None or evaluate_condition(filter_node, item, context):
+                if not count_only:
+                    items.append(project(item, projection, context) if projection else copy.deepcopy(item))
+                else:
+                    items.append(None)
+
+            if (limit and scanned >= limit) or page_bytes >= MAX_PAGE_BYTES:
+                break
+        else:
+            last_item = None
+
+        # Оборвались на лимите, но дальше ничего нет - LastEvaluatedKey не нужен
+        if last_item is not None and next(iterator, None) is None:
+            last_item = None
+
+        consistent = bool(params.get('ConsistentRead'))
+        response = {
+            'Count': len(items),
+            'ScannedCount': scanned,
+            **self._consumed(params, table.name, self._read_units(page_bytes, consistent))
+        }
+        if not count_only:
+            response['Items'] = items
+        if last_item is not None:
+            response['LastEvaluatedKey'] = table.key_of(last_item, index_name)
+        return response
+
+    def _check_index(self, operation: str, table: MemoryTableData, params: Dict[str, Any]) -> Optional[str]:
+
+        index_name = params.get('IndexName')
+        if index_name is None:
+            return None
+        if index_name not in table.indexes:
+            raise _error(
+                operation, 'ValidationException',
+                f"The table does not have the specified index: {index_name}"
+            )
+        if params.get('ConsistentRead'):
+            raise _error(operation, 'ValidationException', 'Consistent reads are not supported on global secondary indexes')
+        return index_name
+
+    def _query(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        table = self._table(operation, params['TableName'])
+        index_name = self._check_index(operation, table, params)
+        context, builder = self._context(params)
+
+        key_expression = self._expression(params.get('KeyConditionExpression'), context, builder, is_key_condition=True)
+        if not key_expression:
+            raise _error(operation, 'ValidationException', 'Either the KeyConditions or KeyConditionExpression parameter must be specified')
+        filter_expression = self._expression(params.get('FilterExpression'), context, builder)
+        key_node = compile_condition(key_expression)
+
+        if index_name:
+            index = table.indexes[index_name]
+            hash_key, range_key, partitions = index['hash_key'], index['range_key'], index['partitions']
+        else:
+            hash_key, range_key, partitions = table.hash_key, table.range_key, table.partitions
+
+        hash_value = self._hash_value(key_node, hash_key, context)
+        if hash_value is MISSING:
+            raise _error(operation, 'ValidationException', f"Query condition missed key schema element: {hash_key}")
+
+        def sort_key(primary_key: Tuple) -> Tuple:
+            item = table.items[primary_key]
+            return (_order_value(item.get(range_key)) if range_key else ('',), table.order_key(primary_key))
+
+        candidates = [
+            primary_key for primary_key in partitions.get(hash_value, ())
+            if evaluate_condition(key_node, table.items[primary_key], context)
+        ]
+        candidates.sort(key=sort_key, reverse=params.get('ScanIndexForward', True) is False)
+
+        start_key = params.get('ExclusiveStartKey')
+        if start_key:
+            start_key = {name: normalize(value) for name, value in start_key.items()}
+            start = (
+                _order_value(start_key.get(range_key)) if range_key else ('',),
+                table.order_key(table.primary_key(start_key))
+            )
+            forward = params.get('ScanIndexForward', True) is not False
+            candidates = [
+                primary_key for primary_key in candidates
+                if (sort_key(primary_key) > start if forward else sort_key(primary_key) < start)
+            ]
+
+        return self._read_page(operation, table, index_name, candidates, params, context, filter_expression)
+
+    @staticmethod
+    def _hash_value(node: Tuple, hash_key: str, context: ExpressionContext) -> Any:
+
+        # Значение ключа партиции из условия вида hash = :v (возможно, в цепочке AND)
+        if node[0] == 'and':
+            value = InMemoryDynamoDB._hash_value(node[1], hash_key, context)
+            return value if value is not MISSING else InMemoryDynamoDB._hash_value(node[2], hash_key, context)
+        if node[0] == 'compare' and node[1] == '=':
+            left, right = node[2], node[3]
+            if left[0] == 'value':
+                left, right = right, left
+            if left[0] == 'path' and right[0] == 'value' and context.resolve(left) == (hash_key,):
+                return context.value(right[1])
+        return MISSING
+
+    def _scan(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        table = self._table(operation, params['TableName'])
+        index_name = self._check_index(operation, table, params)
+        context, builder = self._context(params)
+        filter_expression = self._expression(params.get('FilterExpression'), context, builder)
+
+        primary_keys = table.sorted_keys()
+        start_key = params.get('ExclusiveStartKey')
+        if start_key:
+            start_key = {name: normalize(value) for name, value in start_key.items()}
+            position = bisect.bisect_right(
+                [table.order_key(primary_key) for primary_key in primary_keys],
+                table.order_key(table.primary_key(start_key))
+            )
+            primary_keys = primary_keys[position:]
+
+        total_segments = params.get('TotalSegments')
+        if total_segments is not None:
+            segment = params.get('Segment', 0)
+            if not 0 <= segment < total_segments:
+                raise _error(operation, 'ValidationException', 'Segment must be less than TotalSegments')
+            # Сегмент определяется ключом партиции - стабильно между страницами
+            primary_keys = [
+                primary_key for primary_key in primary_keys
+                if zlib.crc32(repr(primary_key[0]).encode()) % total_segments == segment
+            ]
+
+        if index_name:
+            index = table.indexes[index_name]
+            primary_keys = [
+                primary_key for primary_key in primary_keys
+                if table._index_entry(index, table.items[primary_key]) is not None
+            ]
+
+        return self._read_page(operation, table, index_name, primary_keys, params, context, filter_expression)
+
+    # --- пакеты ---
+
+    def _batch_get_item(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        request_items = params.get('RequestItems') or {}
+        total = sum(len(request.get('Keys', [])) for request in request_items.values())
+        if total > MAX_BATCH_GET_KEYS:
+            raise _error(operation, 'ValidationException', f"Too many items requested for the BatchGetItem call")
+
+        responses, unprocessed, consumed = {}, {}, []
+        for table_name, request in request_items.items():
+            table = self._table(operation, table_name)
+            context, _ = self._context(request)
+            projection = request.get('ProjectionExpression')
+            consistent = bool(request.get('ConsistentRead'))
+            seen, units = set(), 0.0
+            responses[table_name] = []
+
+            for key in request.get('Keys', []):
+                _, primary_key = self._key(operation, table, key)
+                if primary_key in seen:
+                    raise _error(operation, 'ValidationException', 'Provided list of item keys contains duplicates')
+                seen.add(primary_key)
+
+                if self._partial_throttle():
+                    unprocessed.setdefault(table_name, {**{
+                        name: value for name, value in request.items() if name != 'Keys'
+                    }, 'Keys': []})['Keys'].append(key)
+                    continue
+
+                item = table.items.get(primary_key)
+                units += self._read_units(item_size(item), consistent)
+                if item is not None:
+                    responses[table_name].append(project(item, projection, context) if projection else copy.deepcopy(item))
+            consumed.append({'TableName': table_name, 'CapacityUnits': units})
+
+        response = {'Responses': responses, 'UnprocessedKeys': unprocessed}
+        if params.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            response['ConsumedCapacity'] = consumed
+        return response
+
+    def _batch_write_item(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        request_items = params.get('RequestItems') or {}
+        total = sum(len(requests) for requests in request_items.values())
+        if total > MAX_BATCH_WRITE_ITEMS:
+            raise _error(operation, 'ValidationException', 'Too many items requested for the BatchWriteItem call')
+
+        # Сначала проверяем весь пакет: некорректный запрос не применяется частично
+        planned = []
+        for table_name, requests in request_items.items():
+            table = self._table(operation, table_name)
+            seen = set()
+            for request in requests:
+                if 'PutRequest' in request:
+                    item, primary_key = self._item(operation, table, request['PutRequest']['Item'])
+                else:
+                    item = None
+                    _, primary_key = self._key(operation, table, request['DeleteRequest']['Key'])
+                if primary_key in seen:
+                    raise _error(operation, 'ValidationException', 'Provided list of item keys contains duplicates')
+                seen.add(primary_key)
+                planned.append((table, request, item, primary_key))
+
+        unprocessed, units = {}, {}
+        for table, request, item, primary_key in planned:
+            if self._partial_throttle():
+                unprocessed.setdefault(table.name, []).append(request)
+                continue
+            old_item = table.items.get(primary_key)
+            table.store(item, primary_key)
+            units[table.name] = units.get(table.name, 0.0) + self._write_units(old_item, item)
+
+        response = {'UnprocessedItems': unprocessed}
+        if params.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            response['ConsumedCapacity'] = [
+                {'TableName': table_name, 'CapacityUnits': value} for table_name, value in units.items()
+            ]
+        return response
+
+    # --- транзакции ---
+
+    def _transact_write_items(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        transact_items = params.get('TransactItems') or []
+        if not transact_items or len(transact_items) > MAX_TRANSACTION_ITEMS:
+            raise _error(
+                operation, 'ValidationException',
+                f"Member must have length less than or equal to {MAX_TRANSACTION_ITEMS} and greater than or equal to 1"
+            )
+
+        token = params.get('ClientRequestToken')
+        fingerprint = repr(transact_items)
+        now = time.monotonic()
+        if token:
+            seen = self._idempotency.get(token)
+            if seen and now - seen[0] < IDEMPOTENCY_WINDOW_SECONDS:
+                if seen[1] != fingerprint:
+                    raise _error(operation, 'IdempotentParameterMismatchException',
+                                 'The request uses the same client token as a previous, but non-identical request')
+                # Повтор уже примененной транзакции - успех без повторной записи
+                return {}
+
+        planned, reasons, targets = [], [], set()
+        for transact_item in transact_items:
+            (action, body), = transact_item.items()
+            table = self._table(operation, body['TableName'])
+            context, builder = self._context(body)
+
+            if action == 'Put':
+                item, primary_key = self._item(operation, table, body['Item'])
+            else:
+                key, primary_key = self._key(operation, table, body['Key'])
+
+            if (table.name, primary_key) in targets:
+                raise _error(operation, 'ValidationException',
+                             'Transaction request cannot include multiple operations on one item')
+            targets.add((table.name, primary_key))
+
+            old_item = table.items.get(primary_key)
+            error = self._check_condition(operation, body, old_item, context, builder)
+            if error:
+                reason = {'Code': 'ConditionalCheckFailed', 'Message': 'The conditional request failed'}
+                if 'Item' in error.response:
+                    reason['Item'] = error.response['Item']
+                reasons.append(reason)
+                continue
+            reasons.append({'Code': 'None'})
+
+            if action == 'Put':
+                planned.append((table, primary_key, old_item, item))
+            elif action == 'Update':
+                new_item = self._updated_item(operation, table, key, old_item, body, context)
+                new_item, _ = self._item(operation, table, new_item)
+                planned.append((table, primary_key, old_item, new_item))
+            elif action == 'Delete':
+                planned.append((table, primary_key, old_item, None))
+
+        if any(reason['Code'] != 'None' for reason in reasons):
+            codes = ', '.join(reason['Code'] for reason in reasons)
+            raise _error(
+                operation, 'TransactionCanceledException',
+                f"Transaction cancelled, please refer cancellation reasons for specific reasons [{codes}]",
+                CancellationReasons=reasons
+            )
+
+        units = {}
+        for table, primary_key, old_item, new_item in planned:
+            table.store(new_item, primary_key)
+            # Транзакционная запись стоит вдвое дороже обычной
+            units[table.name] = units.get(table.name, 0.0) + 2 * self._write_units(old_item, new_item)
+
+        if token:
+            self._idempotency[token] = (now, fingerprint)
+
+        response = {}
+        if params.get('ReturnConsumedCapacity') in ('TOTAL', 'INDEXES'):
+            response['ConsumedCapacity'] = [
+                {'TableName': table_name, 'CapacityUnits': value} for table_name, value in units.items()
+            ]
+        return response
+
+    def _transact_get_items(self, operation: str, params: Dict[str, Any]) -> Dict[str, Any]:
+
+        responses = []
+        for transact_item in params.get('TransactItems') or []:
+            body = transact_item['Get']
+            table = self._table(operation, body['TableName'])
+            _, primary_key = self._key(operation, table, body['Key'])
+            context, _ = self._context(body)
+            item = table.items.get(primary_key)
+            projection = body.get('ProjectionExpression')
+            if item is None:
+                responses.append({})
+            else:
+                responses.append({'Item': project(item, projection, context) if projection else copy.deepcopy(item)})
+        return {'Responses': responses}
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            return {
+                'tables': {name: len(table.items) for name, table in self._tables.items()},
+                'latency_ms': self.latency_ms,
+                'throttle_rate': self.throttle_rate,
+                'calls': dict(self._stats)
+            }
+
+
+class _Waiter:
+
+    def __init__(self, engine: InMemoryDynamoDB, name: str):
+        self._engine = engine
+        self._name = name
+
+    def wait(self, TableName: str, **kwargs):
+
+        # Таблицы в памяти создаются и удаляются мгновенно - ждать нечего, только проверяем итог
+        exists = TableName in self._engine._tables
+        if exists != (self._name == 'table_exists'):
+            raise _error('describe_table', 'ResourceNotFoundException' if not exists else 'ResourceInUseException',
+                         f"Waiter {self._name} failed for {TableName}")
+
+
+class MemoryDynamoDBClient:
+
+    # Аналог boto3 resource.meta.client: принимает и возвращает обычные python-значения
+
+    def __init__(self, engine: InMemoryDynamoDB):
+        self._engine = engine
+        self._client_config = SimpleNamespace(
+            region_name=engine.region_name,
+            max_pool_connections=engine.max_pool_connections
+        )
+        self.meta = SimpleNamespace(config=self._client_config, region_name=engine.region_name)
+
+    def create_table(self, **params):
+        return self._engine.execute('create_table', params)
+
+    def delete_table(self, **params):
+        return self._engine.execute('delete_table', params)
+
+    def describe_table(self, **params):
+        return self._engine.execute('describe_table', params)
+
+    def list_tables(self, **params):
+        return self._engine.execute('list_tables', params)
+
+    def get_waiter(self, name: str) -> _Waiter:
+        return _Waiter(self._engine, name)
+
+    def get_item(self, **params):
+        return self._engine.execute('get_item', params)
+
+    def put_item(self, **params):
+        return self._engine.execute('put_item', params)
+
+    def update_item(self, **params):
+        return self._engine.execute('update_item', params)
+
+    def delete_item(self, **params):
+        return self._engine.execute('delete_item', params)
+
+    def query(self, **params):
+        return self._engine.execute('query', params)
+
+    def scan(self, **params):
+        return self._engine.execute('scan', params)
+
+    def batch_get_item(self, **params):
+        return self._engine.execute('batch_get_item', params)
+
+    def batch_write_item(self, **params):
+        return self._engine.execute('batch_write_item', params)
+
+    def transact_write_items(self, **params):
+        return self._engine.execute('transact_write_items', params)
+
+    def transact_get_items(self, **params):
+        return self._engine.execute('transact_get_items', params)
+
+
+class MemoryTable:
+
+    # Аналог boto3 resource.Table: методы без TableName, имя таблицы - в атрибуте name
+
+    def __init__(self, engine: InMemoryDynamoDB, name: str):
+        self._engine = engine
+        self.name = name
+        self.table_name = name
+        self.meta = SimpleNamespace(client=engine.client)
+
+    def _describe(self) -> Dict[str, Any]:
+        return self._engine.execute('describe_table', {'TableName': self.name})['Table']
+
+    @property
+    def table_status(self) -> str:
+        return self._describe()['TableStatus']
+
+    @property
+    def item_count(self) -> int:
+        return self._describe()['ItemCount']
+
+    @property
+    def key_schema(self) -> List[Dict[str, str]]:
+        return self._describe()['KeySchema']
+
+    @property
+    def global_secondary_indexes(self) -> Optional[List[Dict[str, Any]]]:
+        return self._describe().get('GlobalSecondaryIndexes')
+
+    def get_item(self, **params):
+        return self._engine.execute('get_item', {**params, 'TableName': self.name})
+
+    def put_item(self, **params):
+        return self._engine.execute('put_item', {**params, 'TableName': self.name})
+
+    def update_item(self, **params):
+        return self._engine.execute('update_item', {**params, 'TableName': self.name})
+
+    def delete_item(self, **params):
+        return self._engine.execute('delete_item', {**params, 'TableName': self.name})
+
+    def query(self, **params):
+        return self._engine.execute('query', {**params, 'TableName': self.name})
+
+    def scan(self, **params):
+        return self._engine.execute('scan', {**params, 'TableName': self.name})
+
+
+class _TableCollection:
+
+    def __init__(self, engine: InMemoryDynamoDB):
+        self._engine = engine
+
+    def all(self) -> List[MemoryTable]:
+
+        with self._engine._lock:
+            names = sorted(self._engine._tables)
+        return [MemoryTable(self._engine, name) for name in names]
+
+
+class MemoryDynamoDBResource:
+
+    # Аналог boto3 resource('dynamodb')
+
+    def __init__(self, engine: InMemoryDynamoDB):
+        self._engine = engine
+        self.meta = SimpleNamespace(client=engine.client)
+        self.tables = _TableCollection(engine)
+
+    def Table(self, name: str) -> MemoryTable:
+        return MemoryTable(self._engine, name)
+
+    def create_table(self, **params) -> MemoryTable:
+
+        self._engine.execute('create_table', params)
+        return MemoryTable(self._engine, params['TableName'])
+
+    def batch_get_item(self, **params):
+        return self._engine.execute('batch_get_item', params)
+
+    def batch_write_item(self, **params):
+        return self._engine.execute('batch_write_item', params)
@@ -0,0 +1,581 @@
+import copy
+import re
+from decimal import Decimal
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from boto3.dynamodb.types import Binary
+
+# Отсутствующий атрибут: отличается от NULL (None) и пустых значений
+MISSING = object()
+
+_TOKEN = re.compile(
+    r"(?P<name>#[A-Za-z0-9_]+)|(?P<value>:[A-Za-z0-9_]+)|(?P<number>\d+)"
+    r"|(?P<ident>[A-Za-z_][A-Za-z0-9_]*)|(?P<op><>|<=|>=|[=<>(),.\[\]+\-])"
+)
+_COMPARATORS = {'=', '<>', '<', '<=', '>', '>='}
+_CONDITION_FUNCTIONS = {'attribute_exists', 'attribute_not_exists', 'attribute_type', 'begins_with', 'contains'}
+_UPDATE_CLAUSES = {'SET', 'REMOVE', 'ADD', 'DELETE'}
+
+
+class ExpressionError(ValueError):
+    pass
+
+
+def _tokenize(expression: str) -> List[Tuple[str, str]]:
+
+    tokens = []
+    position = 0
+    while position < len(expression):
+        if expression[position].isspace():
+            position += 1
+            continue
+        match = _TOKEN.match(expression, position)
+        if not match:
+            raise ExpressionError(f"Invalid syntax: token near '{expression[position:position + 10]}'")
+        tokens.append((match.lastgroup, match.group(match.lastgroup)))
+        position = match.end()
+    return tokens
+
+
+class _Parser:
+
+    # Рекурсивный спуск по грамматике выражений DynamoDB (условия, обновления, проекции)
+
+    def __init__(self, expression: str):
+        self.expression = expression
+        self.tokens = _tokenize(expression)
+        self.position = 0
+
+    def peek(self, offset: int = 0) -> Optional[Tuple[str, str]]:
+
+        index = self.position + offset
+        return self.tokens[index] if index < len(self.tokens) else None
+
+    def next(self) -> Tuple[str, str]:
+
+        token = self.peek()
+        if token is None:
+            raise ExpressionError(f"Invalid syntax: unexpected end of expression: {self.expression}")
+        self.position += 1
+        return token
+
+    def is_op(self, value: str, offset: int = 0) -> bool:
+
+        return self.peek(offset) == ('op', value)
+
+    def is_keyword(self, value: str) -> bool:
+
+        token = self.peek()
+        return token is not None and token[0] == 'ident' and token[1].upper() == value
+
+    def expect_op(self, value: str):
+
+        token = self.next()
+        if token != ('op', value):
+            raise ExpressionError(f"Invalid syntax: expected '{value}', got '{token[1]}': {self.expression}")
+
+    def done(self):
+
+        if self.peek() is not None:
+            raise ExpressionError(f"Invalid syntax: unexpected token '{self.peek()[1]}': {self.expression}")
+
+    # --- пути и операнды ---
+
+    def path(self) -> Tuple:
+
+        kind, value = self.next()
+        if kind not in ('name', 'ident'):
+            raise ExpressionError(f"Invalid syntax: expected attribute name, got '{value}': {self.expression}")
+        elements = [('name', value)]
+        while True:
+            if self.is_op('.'):
+                self.next()
+                kind, value = self.next()
+                if kind not in ('name', 'ident'):
+                    raise ExpressionError(f"Invalid syntax: expected attribute name after '.': {self.expression}")
+                elements.append(('name', value))
+            elif self.is_op('['):
+                self.next()
+                kind, value = self.next()
+                if kind != 'number':
+                    raise ExpressionError(f"Invalid syntax: expected list index: {self.expression}")
+                self.expect_op(']')
+                elements.append(('index', int(value)))
+            else:
+                return ('path', tuple(elements))
+
+    def operand(self) -> Tuple:
+
+        token = self.peek()
+        if token is None:
+            raise ExpressionError(f"Invalid syntax: unexpected end of expression: {self.expression}")
+        if token[0] == 'value':
+            self.next()
+            return ('value', token[1])
+        if token[0] == 'ident' and token[1].lower() == 'size' and self.is_op('(', 1):
+            self.next()
+            self.expect_op('(')
+            path = self.path()
+            self.expect_op(')')
+            return ('size', path)
+        return self.path()
+
+    # --- условия ---
+
+    def condition(self) -> Tuple:
+
+        node = self.conjunction()
+        while self.is_keyword('OR'):
+            self.next()
+            node = ('or', node, self.conjunction())
+        return node
+
+    def conjunction(self) -> Tuple:
+
+        node = self.negation()
+        while self.is_keyword('AND'):
+            self.next()
+            node = ('and', node, self.negation())
+        return node
+
+    def negation(self) -> Tuple:
+
+        if self.is_keyword('NOT'):
+            self.next()
+            return ('not', self.negation())
+        return self.primary()
+
+    def primary(self) -> Tuple:
+
+        if self.is_op('('):
+            self.next()
+            node = self.condition()
+            self.expect_op(')')
+            return node
+
+        token = self.peek()
+        if token and token[0] == 'ident' and token[1].lower() in _CONDITION_FUNCTIONS and self.is_op('(', 1):
+            self.next()
+            self.expect_op('(')
+            args = [self.operand()]
+            while self.is_op(','):
+                self.next()
+                args.append(self.operand())
+            self.expect_op(')')
+            return ('function', token[1].lower(), tuple(args))
+
+        left = self.operand()
+        token = self.peek()
+        if token and token[0] == 'op' and token[1] in _COMPARATORS:
+            self.next()
+            return ('compare', token[1], left, self.operand())
+        if self.is_keyword('BETWEEN'):
+            self.next()
+            low = self.operand()
+            if not self.is_keyword('AND'):
+                raise ExpressionError(f"Invalid syntax: BETWEEN without AND: {self.expression}")
+            self.next()
+            return ('between', left, low, self.operand())
+        if self.is_keyword('IN'):
+            self.next()
+            self.expect_op('(')
+            options = [self.operand()]
+            while self.is_op(','):
+                self.next()
+                options.append(self.operand())
+            self.expect_op(')')
+            return ('in', left, tuple(options))
+
+        raise ExpressionError(f"Invalid syntax: expected comparison: {self.expression}")
+
+    # --- обновления ---
+
+    def update_value(self) -> Tuple:
+
+        node = self.update_term()
+        if self.is_op('+') or self.is_op('-'):
+            operator = self.next()[1]
+            node = ('plus' if operator == '+' else 'minus', node, self.update_term())
+        return node
+
+    def update_term(self) -> Tuple:
+
+        token = self.peek()
+        if token and token[0] == 'ident' and self.is_op('(', 1):
+            function = token[1].lower()
+            if function == 'if_not_exists':
+                self.next()
+                self.expect_op('(')
+                path = self.path()
+                self.expect_op(',')
+                default = self.update_value()
+                self.expect_op(')')
+                return ('if_not_exists', path, default)
+            if function == 'list_append':
+                self.next()
+                self.expect_op('(')
+                first = self.update_value()
+                self.expect_op(',')
+                second = self.update_value()
+                self.expect_op(')')
+                return ('list_append', first, second)
+        return self.operand()
+
+    def update(self) -> Tuple:
+
+        actions = []
+        seen_clauses = set()
+        while self.peek() is not None:
+            token = self.next()
+            clause = token[1].upper() if token[0] == 'ident' else None
+            if clause not in _UPDATE_CLAUSES or clause in seen_clauses:
+                raise ExpressionError(f"Invalid UpdateExpression: unexpected token '{token[1]}'")
+            seen_clauses.add(clause)
+
+            while True:
+                path = self.path()
+                if clause == 'SET':
+                    self.expect_op('=')
+                    actions.append(('set', path, self.update_value()))
+                elif clause == 'REMOVE':
+                    actions.append(('remove', path))
+                else:
+                    actions.append((clause.lower(), path, self.operand()))
+                if not self.is_op(','):
+                    break
+                self.next()
+
+        if not actions:
+            raise ExpressionError("Invalid UpdateExpression: empty expression")
+        return tuple(actions)
+
+    def projection(self) -> Tuple:
+
+        paths = [self.path()]
+        while self.is_op(','):
+            self.next()
+            paths.append(self.path())
+        return tuple(paths)
+
+
+@lru_cache(maxsize=1024)
+def compile_condition(expression: str) -> Tuple:
+
+    parser = _Parser(expression)
+    node = parser.condition()
+    parser.done()
+    return node
+
+
+@lru_cache(maxsize=1024)
+def compile_update(expression: str) -> Tuple:
+
+    parser = _Parser(expression)
+    node = parser.update()
+    parser.done()
+    return node
+
+
+@lru_cache(maxsize=1024)
+def compile_projection(expression: str) -> Tuple:
+
+    parser = _Parser(expression)
+    node = parser.projection()
+    parser.done()
+    return node
+
+
+class ExpressionContext:
+
+    # Плейсхолдеры запроса: ExpressionAttributeNames и (нормализованные) ExpressionAttributeValues
+    def __init__(self, names: Dict[str, str] = None, values: Dict[str, Any] = None):
+        self.names = names or {}
+        self.values = values or {}
+        self.used_names = set()
+        self.used_values = set()
+
+    def resolve(self, path: Tuple) -> Tuple:
+
+        keys = []
+        for kind, value in path[1]:
+            if kind == 'name' and value.startswith('#'):
+                if value not in self.names:
+                    raise ExpressionError(f"An expression attribute name used in the document path is not defined; attribute name: {value}")
+                self.used_names.add(value)
+                value = self.names[value]
+            keys.append(value)
+        return tuple(keys)
+
+    def value(self, placeholder: str) -> Any:
+
+        if placeholder not in self.values:
+            raise ExpressionError(f"An expression attribute value used in expression is not defined; attribute value: {placeholder}")
+        self.used_values.add(placeholder)
+        return self.values[placeholder]
+
+
+def get_path(item: Any, keys: Tuple) -> Any:
+
+    value = item
+    for key in keys:
+        if isinstance(key, int):
+            if not isinstance(value, list) or key >= len(value):
+                return MISSING
+            value = value[key]
+        else:
+            if not isinstance(value, dict) or key not in value:
+                return MISSING
+            value = value[key]
+    return value
+
+
+def set_path(item: Dict[str, Any], keys: Tuple, value: Any):
+
+    parent = get_path(item, keys[:-1]) if len(keys) > 1 else item
+    last = keys[-1]
+    if isinstance(last, int):
+        if not isinstance(parent, list):
+            raise ExpressionError("The document path provided in the update expression is invalid for update")
+        if last < len(parent):
+            parent[last] = value
+        else:
+            parent.append(value)
+    else:
+        if not isinstance(parent, dict):
+            raise ExpressionError("The document path provided in the update expression is invalid for update")
+        parent[last] = value
+
+
+def remove_path(item: Dict[str, Any], keys: Tuple):
+
+    parent = get_path(item, keys[:-1]) if len(keys) > 1 else item
+    last = keys[-1]
+    if isinstance(last, int):
+        if isinstance(parent, list) and last < len(parent):
+            parent.pop(last)
+    elif isinstance(parent, dict):
+        parent.pop(last, None)
+
+
+def type_code(value: Any) -> Optional[str]:
+
+    if isinstance(value, bool):
+        return 'BOOL'
+    if value is None:
+        return 'NULL'
+    if isinstance(value, Decimal):
+        return 'N'
+    if isinstance(value, str):
+        return 'S'
+    if isinstance(value, (bytes, bytearray, Binary)):
+        return 'B'
+    if isinstance(value, dict):
+        return 'M'
+    if isinstance(value, list):
+        return 'L'
+    if isinstance(value, (set, frozenset)) and value:
+        sample = next(iter(value))
+        return {'N': 'NS', 'S': 'SS', 'B': 'BS'}.get(type_code(sample))
+    return None
+
+
+def _comparable(left: Any, right: Any) -> bool:
+
+    # Упорядочиваются только значения одного скалярного типа (N, S, B)
+    left_type, right_type = type_code(left), type_code(right)
+    return left_type == right_type and left_type in ('N', 'S', 'B')
+
+
+def _as_bytes(value: Any) -> Any:
+
+    return value.value if isinstance(value, Binary) else value
+
+
+def _equal(left: Any, right: Any) -> bool:
+
+    # true и 1 в Python равны, в DynamoDB это разные типы (BOOL и N)
+    if left is MISSING or right is MISSING:
+        return False
+    return type_code(left) == type_code(right) and left == right
+
+
+def _compare(operator: str, left: Any, right: Any) -> bool:
+
+    if operator == '=':
+        return _equal(left, right)
+    if operator == '<>':
+        return not _equal(left, right)
+    if left is MISSING or right is MISSING or not _comparable(left, right):
+        return False
+
+    left, right = _as_bytes(left), _as_bytes(right)
+    if operator == '<':
+        return left < right
+    if operator == '<=':
+        return left <= right
+    if operator == '>':
+        return left > right
+    return left >= right
+
+
+def evaluate_operand(node: Tuple, item: Dict[str, Any], context: ExpressionContext) -> Any:
+
+    kind = node[0]
+    if kind == 'value':
+        return context.value(node[1])
+    if kind == 'path':
+        return get_path(item, context.resolve(node))
+    if kind == 'size':
+        value = get_path(item, context.resolve(node[1]))
+        if value is MISSING or not hasattr(_as_bytes(value), '__len__'):
+            return MISSING
+        return Decimal(len(_as_bytes(value)))
+    raise ExpressionError(f"Unsupported operand: {kind}")
+
+
+def evaluate_condition(node: Tuple, item: Optional[Dict[str, Any]], context: ExpressionContext) -> bool:
+
+    item = item or {}
+    kind = node[0]
+
+    if kind == 'and':
+        return evaluate_condition(node[1], item, context) and evaluate_condition(node[2], item, context)
+    if kind == 'or':
+        return evaluate_condition(node[1], item, context) or evaluate_condition(node[2], item, context)
+    if kind == 'not':
+        return not evaluate_condition(node[1], item, context)
+    if kind == 'compare':
+        return _compare(node[1], evaluate_operand(node[2], item, context), evaluate_operand(node[3], item, context))
+    if kind == 'between':
+        value, low, high = (evaluate_operand(operand, item, context) for operand in node[1:])
+        return _compare('>=', value, low) and _compare('<=', value, high)
+    if kind == 'in':
+        value = evaluate_operand(node[1], item, context)
+        return any(_compare('=', value, evaluate_operand(option, item, context)) for option in node[2])
+
+    name, args = node[1], node[2]
+    if args[0][0] != 'path':
+        raise ExpressionError(f"Invalid function operand for {name}: must be a document path")
+    value = evaluate_operand(args[0], item, context)
+    if name == 'attribute_exists':
+        return value is not MISSING
+    if name == 'attribute_not_exists':
+        return value is MISSING
+    if len(args) != 2:
+        raise ExpressionError(f"Incorrect number of operands for function {name}")
+
+    argument = evaluate_operand(args[1], item, context)
+    if value is MISSING or argument is MISSING:
+        return False
+    if name == 'attribute_type':
+        return type_code(value) == argument
+    if name == 'begins_with':
+        return _comparable(value, argument) and type_code(value) in ('S', 'B') and \
+            _as_bytes(value).startswith(_as_bytes(argument))
+    # contains: подстрока, элемент множества или списка
+    if isinstance(value, str):
+        return isinstance(argument, str) and argument in value
+    if isinstance(value, (set, frozenset, list)):
+        return argument in value
+    if isinstance(value, (bytes, Binary)):
+        return isinstance(argument, (bytes, Binary)) and _as_bytes(argument) in _as_bytes(value)
+    return False
+
+
+def _update_value(node: Tuple, original: Dict[str, Any], context: ExpressionContext) -> Any:
+
+    kind = node[0]
+    if kind == 'if_not_exists':
+        current = get_path(original, context.resolve(node[1]))
+        return current if current is not MISSING else _update_value(node[2], original, context)
+    if kind == 'list_append':
+        first, second = _update_value(node[1], original, context), _update_value(node[2], original, context)
+        if not isinstance(first, list) or not isinstance(second, list):
+            raise ExpressionError("Incorrect operand type for operator or function; operator or function: list_append")
+        return first + second
+    if kind in ('plus', 'minus'):
+        left, right = _update_value(node[1], original, context), _update_value(node[2], original, context)
+        if not isinstance(left, Decimal) or not isinstance(right, Decimal):
+            raise ExpressionError(f"Incorrect operand type for operator or function; operator: {'+' if kind == 'plus' else '-'}")
+        return left + right if kind == 'plus' else left - right
+
+    value = evaluate_operand(node, original, context)
+    if value is MISSING:
+        raise ExpressionError("The provided expression refers to an attribute that does not exist in the item")
+    return value
+
+
+def apply_update(item: Dict[str, Any], expression: str, context: ExpressionContext) -> Dict[str, Any]:
+
+    # Все правые части считаются по элементу до обновления, как в DynamoDB
+    original = copy.deepcopy(item)
+    actions = compile_update(expression)
+    planned = []
+    for action in actions:
+        keys = context.resolve(action[1])
+        if action[0] == 'set':
+            planned.append(('set', keys, _update_value(action[2], original, context)))
+        elif action[0] == 'remove':
+            planned.append(('remove', keys, None))
+        else:
+            planned.append((action[0], keys, evaluate_operand(action[2], original, context)))
+
+    paths = [keys for _, keys, _ in planned]
+    for index, keys in enumerate(paths):
+        for other in paths[index + 1:]:
+            shorter = min(len(keys), len(other))
+            if keys[:shorter] == other[:shorter]:
+                raise ExpressionError(f"Two document paths overlap with each other: {list(keys)}, {list(other)}")
+
+    for action, keys, value in planned:
+        if action == 'set':
+            set_path(item, keys, copy.deepcopy(value))
+        elif action == 'remove':
+            remove_path(item, keys)
+        elif action == 'add':
+            current = get_path(item, keys)
+            if current is MISSING:
+                set_path(item, keys, copy.deepcopy(value))
+            elif isinstance(current, Decimal) and isinstance(value, Decimal):
+                set_path(item, keys, current + value)
+            elif isinstance(current, (set, frozenset)) and isinstance(value, (set, frozenset)):
+                set_path(item, keys, set(current) | set(value))
+            else:
+                raise ExpressionError("An operand in the update expression has an incorrect data type")
+        else:
+            current = get_path(item, keys)
+            if current is MISSING:
+                continue
+            if not isinstance(current, (set, frozenset)) or not isinstance(value, (set, frozenset)):
+                raise ExpressionError("An operand in the update expression has an incorrect data type")
+            remaining = set(current) - set(value)
+            if remaining:
+                set_path(item, keys, remaining)
+            else:
+                remove_path(item, keys)
+
+    return item
+
+
+def project(item: Dict[str, Any], expression: str, context: ExpressionContext) -> Dict[str, Any]:
+
+    result: Dict[str, Any] = {}
+    for path in compile_projection(expression):
+        keys = context.resolve(path)
+        value = get_path(item, keys)
+        if value is MISSING:
+            continue
+        target = result
+        for key, next_key in zip(keys[:-1], keys[1:]):
+            default = [] if isinstance(next_key, int) else {}
+            if isinstance(target, list):
+                target.append(default)
+                target = target[-1]
+            else:
+                target = target.setdefault(key, default)
+        if isinstance(target, list):
+            target.append(copy.deepcopy(value))
+        else:
+            target[keys[-1]] = copy.deepcopy(value)
+    return result
@@ -0,0 +1,312 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from botocore.exceptions import ClientError
+
+from app.core.config import settings
+from .capacity import READ_OPERATIONS, WRITE_OPERATIONS
+
+# Вызовы вне HTTP-запроса (фоновые циклы, скрипты) попадают в этот маршрут
+NO_ROUTE = 'background'
+
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+ITEMS_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000)
+CAPACITY_BUCKETS = (0.5, 1, 2, 5, 10, 50, 100, 500, 1000)
+
+_current_route: ContextVar[str] = ContextVar('dynamodb_route', default=NO_ROUTE)
+
+
+def current_route() -> str:
+
+    return _current_route.get()
+
+
+@contextmanager
+def route_scope(route: str):
+
+    # Все вызовы DynamoDB внутри блока учитываются на этот маршрут (шаблон пути, а не сам путь)
+    token = _current_route.set(route)
+    try:
+        yield
+    finally:
+        _current_route.reset(token)
+
+
+class Histogram:
+
+    # Гистограмма с фиксированными границами: квантили оцениваются верхней границей корзины
+
+    def __init__(self, bounds: Tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+
+        index = len(self.bounds)
+        for position, bound in enumerate(self.bounds):
+            if value <= bound:
+                index = position
+                break
+        self.counts[index] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q: float) -> float:
+
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for position, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.bounds[position], self.max) if position < len(self.bounds) else self.max
+        return self.max
+
+    def snapshot(self) -> Dict[str, Any]:
+
+        buckets = {f"le_{bound:g}": count for bound, count in zip(self.bounds, self.counts)}
+        buckets['inf'] = self.counts[-1]
+        return {
+            'count': self.count,
+            'sum': round(self.total, 3),
+            'mean': round(self.total / self.count, 3) if self.count else 0.0,
+            'p50': round(self.quantile(0.5), 3),
+            'p90': round(self.quantile(0.9), 3),
+            'p99': round(self.quantile(0.99), 3),
+            'max': round(self.max, 3),
+            'buckets': buckets
+        }
+
+
+class CallStats:
+
+    # Агрегат вызовов одного среза (маршрут, таблица или маршрут x таблица)
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.error_codes: Dict[str, int] = {}
+        self.operations: Dict[str, int] = {}
+        self.items_returned = 0
+        self.items_scanned = 0
+        self.read_units = 0.0
+        self.write_units = 0.0
+        self.latency_ms = Histogram(LATENCY_BUCKETS_MS)
+        self.returned = Histogram(ITEMS_BUCKETS)
+        self.scanned = Histogram(ITEMS_BUCKETS)
+        self.capacity = Histogram(CAPACITY_BUCKETS)
+
+    def add(self, operation: str, latency_ms: float, returned: int, scanned: int,
+            read_units: float, write_units: float, error: Optional[str]):
+
+        self.calls += 1
+        self.operations[operation] = self.operations.get(operation, 0) + 1
+        self.latency_ms.observe(latency_ms)
+        if error:
+            self.errors += 1
+            self.error_codes[error] = self.error_codes.get(error, 0) + 1
+            return
+        self.items_returned += returned
+        self.items_scanned += scanned
+        self.read_units += read_units
+        self.write_units += write_units
+        self.returned.observe(returned)
+        self.scanned.observe(scanned)
+        self.capacity.observe(read_units + write_units)
+
+    def snapshot(self) -> Dict[str, Any]:
+
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'error_codes': dict(self.error_codes),
+            'operations': dict(self.operations),
+            'items_returned': self.items_returned,
+            'items_scanned': self.items_scanned,
+            # Во сколько раз прочитано больше, чем отдано: главный признак лишних сканов
+            'scan_amplification': round(self.items_scanned / self.items_returned, 2) if self.items_returned else None,
+            'read_capacity_units': round(self.read_units, 2),
+            'write_capacity_units': round(self.write_units, 2),
+            'latency_ms': self.latency_ms.snapshot(),
+            'items_returned_per_call': self.returned.snapshot(),
+            'items_scanned_per_call': self.scanned.snapshot(),
+            'capacity_units_per_call': self.capacity.snapshot()
+        }
+
+
+def _consumed_units(response: Dict[str, Any]) -> float:
+
+    consumed = response.get('ConsumedCapacity')
+    if not consumed:
+        return 0.0
+    entries = consumed if isinstance(consumed, list) else [consumed]
+    return sum(float(entry.get('CapacityUnits', 0)) for entry in entries)
+
+
+def _item_counts(response: Dict[str, Any]) -> Tuple[int, int]:
+
+    # (возвращено, прочитано) для ответа любой операции
+    if 'Items' in response or 'Count' in response:
+        returned = response.get('Count', len(response.get('Items', [])))
+        return returned, response.get('ScannedCount', returned)
+    if 'Responses' in response:
+        responses = response['Responses']
+        if isinstance(responses, dict):
+            returned = sum(len(items) for items in responses.values())
+        else:
+            returned = sum(1 for entry in responses if entry.get('Item'))
+        return returned, returned
+    returned = 1 if response.get('Item') or response.get('Attributes') else 0
+    return returned, returned
+
+
+def error_code(error: Exception) -> str:
+
+    if isinstance(error, ClientError):
+        return error.response.get('Error', {}).get('Code', 'ClientError')
+    return type(error).__name__
+
+
+class DynamoDBMetrics:
+
+    # Учет каждого запроса коннектора: операция, таблица/индекс, задержка, возвращено и прочитано
+    # элементов, ConsumedCapacity. Агрегаты по маршрутам, таблицам и маршрут x таблица
+
+    def __init__(self, enabled: bool = True, max_routes: int = 500):
+        self.enabled = enabled
+        self.max_routes = max_routes
+
+        self._routes: Dict[str, CallStats] = {}
+        self._tables: Dict[str, CallStats] = {}
+        self._route_tables: Dict[Tuple[str, str], CallStats] = {}
+        self._requests: Dict[str, Dict[str, Any]] = {}
+        self._started_at = time.time()
+        self._lock = threading.Lock()
+
+    def call(self, table_name: str, operation: Callable, params: Dict[str, Any],
+             invoke: Callable[[], Any]) -> Any:
+
+        if not self.enabled:
+            return invoke()
+
+        name = getattr(operation, '__name__', 'unknown')
+        if name in READ_OPERATIONS or name in WRITE_OPERATIONS:
+            params.setdefault('ReturnConsumedCapacity', 'TOTAL')
+
+        started_at = time.perf_counter()
+        try:
+            response = invoke()
+        except Exception as e:
+            self.record(table_name, params.get('IndexName'), name, time.perf_counter() - started_at, None, e)
+            raise
+        self.record(table_name, params.get('IndexName'), name, time.perf_counter() - started_at, response)
+        return response
+
+    def _slot(self, bucket: Dict, key: Any) -> CallStats:
+
+        stats = bucket.get(key)
+        if stats is None:
+            stats = bucket[key] = CallStats()
+        return stats
+
+    def record(self, table_name: str, index_name: Optional[str], operation: str, seconds: float,
+               response: Optional[Dict[str, Any]], error: Exception = None):
+
+        route = current_route()
+        table_key = f"{table_name}/{index_name}" if index_name else table_name
+        returned = scanned = 0
+        units = 0.0
+        if isinstance(response, dict):
+            returned, scanned = _item_counts(response)
+            units = _consumed_units(response)
+        read_units = units if operation in READ_OPERATIONS else 0.0
+        write_units = units if operation in WRITE_OPERATIONS else 0.0
+        values = (operation, seconds * 1000, returned, scanned, read_units, write_units,
+                  error_code(error) if error else None)
+
+        with self._lock:
+            # Ограничение числа маршрутов: неизвестные пути (сканеры, 404) не раздувают память
+            if route not in self._routes and len(self._routes) >= self.max_routes:
+                route = 'other'
+            for stats in (
+                self._slot(self._routes, route),
+                self._slot(self._tables, table_key),
+                self._slot(self._route_tables, (route, table_key))
+            ):
+                stats.add(*values)
+
+    def record_request(self, route: str, seconds: float, status_code: int):
+
+        if not self.enabled:
+            return
+        with self._lock:
+            if route not in self._requests and len(self._requests) >= self.max_routes:
+                route = 'other'
+            request = self._requests.setdefault(route, {
+                'requests': 0, 'errors': 0, 'latency_ms': Histogram(LATENCY_BUCKETS_MS)
+            })
+            request['requests'] += 1
+            request['errors'] += int(status_code >= 500)
+            request['latency_ms'].observe(seconds * 1000)
+
+    def reset(self):
+
+        with self._lock:
+            self._routes.clear()
+            self._tables.clear()
+            self._route_tables.clear()
+            self._requests.clear()
+            self._started_at = time.time()
+
+    def get_stats(self, sort_by: str = 'read_capacity_units') -> Dict[str, Any]:
+
+        def ordered(snapshots: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+            return dict(sorted(snapshots.items(), key=lambda entry: entry[1].get(sort_by) or 0, reverse=True))
+
+        with self._lock:
+            routes = {}
+            # Маршруты без вызовов DynamoDB тоже видны - с нулевым расходом
+            for route in set(self._routes) | set(self._requests):
+                stats = self._routes.get(route) or CallStats()
+                snapshot = stats.snapshot()
+                request = self._requests.get(route)
+                if request:
+                    snapshot['requests'] = request['requests']
+                    snapshot['request_errors'] = request['errors']
+                    snapshot['calls_per_request'] = round(stats.calls / request['requests'], 2)
+                    snapshot['read_units_per_request'] = round(stats.read_units / request['requests'], 3)
+                    snapshot['request_latency_ms'] = request['latency_ms'].snapshot()
+                snapshot['tables'] = {
+                    table_key: {
+                        'calls': table_stats.calls,
+                        'items_returned': table_stats.items_returned,
+                        'items_scanned': table_stats.items_scanned,
+                        'read_capacity_units': round(table_stats.read_units, 2),
+                        'write_capacity_units': round(table_stats.write_units, 2)
+                    }
+                    for (table_route, table_key), table_stats in self._route_tables.items()
+                    if table_route == route
+                }
+                routes[route] = snapshot
+            tables = {table_key: stats.snapshot() for table_key, stats in self._tables.items()}
+
+        return {
+            'enabled': self.enabled,
+            'since': self._started_at,
+            'routes': ordered(routes),
+            'tables': ordered(tables)
+        }
+
+
+dynamodb_metrics = DynamoDBMetrics(
+    enabled=settings.DYNAMODB_METRICS_ENABLED,
+    max_routes=settings.DYNAMODB_METRICS_MAX_ROUTES
+)
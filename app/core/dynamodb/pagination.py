@@ -0,0 +1,80 @@
+import base64
+import json
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from boto3.dynamodb.types import TypeDeserializer, TypeSerializer
+
+from .exceptions import InvalidCursorError
+from .planner import query_planner
+
+
+_serializer = TypeSerializer()
+_deserializer = TypeDeserializer()
+
+
+def encode_cursor(key: Optional[Dict[str, Any]]) -> Optional[str]:
+
+    # ExclusiveStartKey -> непрозрачная строка для клиента (типы DynamoDB сохраняются)
+    if not key:
+        return None
+
+    typed_key = {name: _serializer.serialize(value) for name, value in key.items()}
+    raw = json.dumps(typed_key, separators=(',', ':'), sort_keys=True).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        typed_key = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return {name: _deserializer.deserialize(value) for name, value in typed_key.items()}
+    except Exception as e:
+        raise InvalidCursorError(f"Некорректный курсор пагинации: {e}")
+
+
+def paginate_scan(table, limit: int, cursor: Optional[str] = None,
+                  filter_expression: Any = None,
+                  key_attributes: Optional[Sequence[str]] = None,
+                  extra_params: Dict[str, Any] = None,
+                  call: Callable = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+
+    # Keyset-пагинация: читаем страницы от курсора, пока не наберем limit элементов.
+    # Если остановились посреди страницы - курсор строится из ключа последнего отданного элемента
+    params = dict(extra_params or {})
+    params['Limit'] = limit
+    if filter_expression:
+        params['FilterExpression'] = filter_expression
+
+    # Ключ курсора - первичный ключ таблицы из реестра схем, если вызывающий не задал его явно
+    if key_attributes is None:
+        key_attributes = query_planner.key_attributes(table.name, table.meta.client)
+
+    start_key = decode_cursor(cursor)
+    if start_key:
+        params['ExclusiveStartKey'] = start_key
+
+    items: List[Dict[str, Any]] = []
+    while True:
+        # call - обертка коннектора над запросом (ретраи троттлинга)
+        response = call(table.scan, **params) if call else table.scan(**params)
+        page_items = response.get('Items', [])
+        remaining = limit - len(items)
+
+        if len(page_items) > remaining:
+            items.extend(page_items[:remaining])
+            last_item = items[-1]
+            return items, encode_cursor({name: last_item[name] for name in key_attributes})
+
+        items.extend(page_items)
+        last_key = response.get('LastEvaluatedKey')
+
+        if not last_key:
+            return items, None
+        if len(items) >= limit:
+            return items, encode_cursor(last_key)
+
+        params['ExclusiveStartKey'] = last_key
@@ -0,0 +1,176 @@
+import contextvars
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from botocore.exceptions import ClientError
+
+from .capacity import capacity_lane, current_lane
+from .exceptions import DynamoDBError
+from .expressions import apply_projection
+
+
+_SEGMENT_DONE = object()
+
+
+class ParallelScan:
+
+    # Сегментированный скан (Segment/TotalSegments): каждый сегмент читается своим потоком,
+    # результаты сливаются в один поток элементов через ограниченную очередь
+
+    def __init__(self, connector, table_name: str, segments: int,
+                 filter_expression: Any = None,
+                 projection: Optional[List[str]] = None,
+                 page_size: int = None,
+                 on_progress: Callable[[Dict[str, Any]], None] = None,
+                 buffer_size: int = 1000,
+                 lane: str = None):
+        self.connector = connector
+        self.table_name = table_name
+        self.segments = max(1, segments)
+        self.filter_expression = filter_expression
+        self.projection = projection
+        self.page_size = page_size
+        self.on_progress = on_progress
+
+        self._queue: queue.Queue = queue.Queue(maxsize=buffer_size)
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self.progress: Dict[int, Dict[str, Any]] = {
+            segment: {
+                'segment': segment,
+                'pages': 0,
+                'scanned_count': 0,
+                'returned_count': 0,
+                'done': False,
+                'error': None
+            }
+            for segment in range(self.segments)
+        }
+        self.started_at = None
+        self.finished_at = None
+        self._error: Optional[DynamoDBError] = None
+        # Полоса бюджета емкости для потоков сегментов; по умолчанию - полоса вызывающего
+        self.lane = lane or current_lane()
+
+    def _scan_params(self, segment: int) -> Dict[str, Any]:
+
+        params = {
+            'Segment': segment,
+            'TotalSegments': self.segments
+        }
+        if self.filter_expression:
+            params['FilterExpression'] = self.filter_expression
+        if self.page_size:
+            params['Limit'] = self.page_size
+
+        return apply_projection(params, self.projection)
+
+    def _put(self, value) -> bool:
+
+        while not self._stop.is_set():
+            try:
+                self._queue.put(value, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _report(self, segment: int, **changes):
+
+        with self._lock:
+            self.progress[segment].update(changes)
+            snapshot = dict(self.progress[segment])
+
+        if self.on_progress:
+            try:
+                self.on_progress(snapshot)
+            except Exception as e:
+                print(f"[WARNING][DynamoDB] - Ошибка callback прогресса скана {self.table_name}: {e}")
+
+    def _scan_segment(self, segment: int):
+
+        # Отдельный объект Table на поток: клиент потокобезопасен, ресурсы boto3 - нет
+        table = self.connector.dynamodb.Table(self.table_name)
+        state = self.progress[segment]
+
+        try:
+            with capacity_lane(self.lane):
+                for response in self.connector._iter_pages(table.scan, self._scan_params(segment)):
+                    items = response.get('Items', [])
+                    self._report(
+                        segment,
+                        pages=state['pages'] + 1,
+                        scanned_count=state['scanned_count'] + response.get('ScannedCount', len(items)),
+                        returned_count=state['returned_count'] + len(items)
+                    )
+
+                    for item in items:
+                        if not self._put(item):
+                            return
+
+                    if self._stop.is_set():
+                        return
+
+        except ClientError as e:
+            # Неповторяемая ошибка сегмента: скан без его элементов - не полный результат
+            self._report(segment, error=str(e))
+            self._error = self.connector._request_failed(self.table_name, f"сегмента {segment} скана", e)
+
+        except DynamoDBError as e:
+            # Троттлинг после всех ретраев: неполный скан не выдаем за полный
+            print(f"[ERROR][DynamoDB] - Сегмент {segment} скана {self.table_name} прерван: {e}")
+            self._report(segment, error=str(e))
+            self._error = e
+
+        finally:
+            self._report(segment, done=True)
+            self._put(_SEGMENT_DONE)
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+
+        self.started_at = time.perf_counter()
+        executor = ThreadPoolExecutor(
+            max_workers=self.segments,
+            thread_name_prefix=f"scan-{self.table_name}"
+        )
+
+        try:
+            for segment in range(self.segments):
+                # Маршрут и счетчик запроса вызывающего видны в потоках сегментов
+                executor.submit(contextvars.copy_context().run, self._scan_segment, segment)
+
+            remaining = self.segments
+            while remaining:
+                value = self._queue.get()
+                if value is _SEGMENT_DONE:
+                    if self._error:
+                        raise self._error
+                    remaining -= 1
+                    continue
+                yield value
+
+        finally:
+            # Вызывающий мог остановиться раньше - останавливаем оставшиеся сегменты
+            self._stop.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+            self.finished_at = time.perf_counter()
+
+    def get_progress(self) -> Dict[str, Any]:
+
+        with self._lock:
+            segments = [dict(state) for state in self.progress.values()]
+
+        finished_at = self.finished_at or time.perf_counter()
+        return {
+            'table_name': self.table_name,
+            'total_segments': self.segments,
+            'completed_segments': sum(1 for state in segments if state['done']),
+            'scanned_count': sum(state['scanned_count'] for state in segments),
+            'returned_count': sum(state['returned_count'] for state in segments),
+            'errors': [state['error'] for state in segments if state['error']],
+            'elapsed_seconds': round(finished_at - self.started_at, 3) if self.started_at else 0.0,
+            'segments': segments
+        }
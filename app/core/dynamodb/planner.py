@@ -0,0 +1,222 @@
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+
+STRATEGY_GET_ITEM = 'get_item'
+STRATEGY_QUERY_TABLE = 'query_table'
+STRATEGY_QUERY_INDEX = 'query_index'
+STRATEGY_SCAN = 'scan'
+
+
+def _key_names(key_schema: List[Dict[str, str]]) -> Dict[str, Optional[str]]:
+
+    keys = {'hash_key': None, 'range_key': None}
+    for key in key_schema or []:
+        if key['KeyType'] == 'HASH':
+            keys['hash_key'] = key['AttributeName']
+        elif key['KeyType'] == 'RANGE':
+            keys['range_key'] = key['AttributeName']
+    return keys
+
+
+def _describe_layout(key_schema: List[Dict[str, str]],
+                     global_secondary_indexes: List[Dict[str, Any]]) -> Dict[str, Any]:
+
+    layout = _key_names(key_schema)
+    layout['indexes'] = []
+
+    for index in global_secondary_indexes or []:
+        projection = index.get('Projection', {})
+        layout['indexes'].append({
+            'index_name': index['IndexName'],
+            'projection_type': projection.get('ProjectionType', 'ALL'),
+            'non_key_attributes': projection.get('NonKeyAttributes', []),
+            **_key_names(index['KeySchema'])
+        })
+
+    return layout
+
+
+class QueryPlanner:
+
+    # Выбирает способ выполнить поиск по равенству поля: GetItem по первичному ключу,
+    # Query по таблице/GSI из реестра схем, и только если ничего не подходит - Scan
+
+    def __init__(self):
+        self._layouts: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._plans: Dict[tuple, Dict[str, Any]] = {}
+        self._stats: Dict[str, int] = {
+            STRATEGY_GET_ITEM: 0,
+            STRATEGY_QUERY_TABLE: 0,
+            STRATEGY_QUERY_INDEX: 0,
+            STRATEGY_SCAN: 0
+        }
+        self._lock = threading.Lock()
+
+    def _load_layout(self, table_name: str, client=None) -> Optional[Dict[str, Any]]:
+
+        from app.aws.table_schemas import get_table_schema
+
+        schema = get_table_schema(table_name)
+        if schema:
+            return _describe_layout(
+                schema.key_schema,
+                getattr(schema, 'global_secondary_indexes', [])
+            )
+
+        # Таблицы вне реестра (создаваемые через /data API) - читаем структуру из DescribeTable
+        if client is None:
+            return None
+
+        try:
+            table = client.describe_table(TableName=table_name)['Table']
+            return _describe_layout(table['KeySchema'], table.get('GlobalSecondaryIndexes', []))
+        except ClientError as e:
+            print(f"[WARNING][DynamoDB] - Не удалось получить схему таблицы {table_name}: {e}")
+            return None
+
+    def get_layout(self, table_name: str, client=None) -> Optional[Dict[str, Any]]:
+
+        if table_name not in self._layouts:
+            layout = self._load_layout(table_name, client)
+            with self._lock:
+                self._layouts[table_name] = layout
+        return self._layouts[table_name]
+
+    def key_attributes(self, table_name: str, client=None) -> Tuple[str, ...]:
+
+        # Атрибуты первичного ключа по реестру схем (или DescribeTable); без схемы - 'id'
+        layout = self.get_layout(table_name, client)
+        if not layout:
+            return ('id',)
+        return tuple(name for name in (layout['hash_key'], layout['range_key']) if name)
+
+    def _index_covers(self, index: Dict[str, Any], layout: Dict[str, Any],
+                      fields: Optional[Iterable[str]]) -> bool:
+
+        if index['projection_type'] == 'ALL':
+            return True
+        # KEYS_ONLY/INCLUDE подходят только если запрошенные поля есть в индексе
+        if not fields:
+            return False
+
+        available = {
+            layout['hash_key'], layout['range_key'],
+            index['hash_key'], index['range_key'],
+            *index['non_key_attributes']
+        }
+        return set(fields) <= available
+
+    def _build_plan(self, table_name: str, field_name: str,
+                    fields: Optional[List[str]], client=None) -> Dict[str, Any]:
+
+        plan = {
+            'table_name': table_name,
+            'field_name': field_name,
+            'strategy': STRATEGY_SCAN,
+            'index_name': None,
+            'reason': 'схема таблицы неизвестна'
+        }
+
+        layout = self.get_layout(table_name, client)
+        if not layout:
+            return plan
+
+        if layout['hash_key'] == field_name:
+            if layout['range_key']:
+                plan.update(strategy=STRATEGY_QUERY_TABLE, reason='партиционный ключ таблицы')
+            else:
+                plan.update(strategy=STRATEGY_GET_ITEM, reason='первичный ключ таблицы')
+            return plan
+
+        for index in layout['indexes']:
+            if index['hash_key'] != field_name:
+                continue
+            if not self._index_covers(index, layout, fields):
+                continue
+            plan.update(
+                strategy=STRATEGY_QUERY_INDEX,
+                index_name=index['index_name'],
+                reason=f"GSI {index['index_name']} ({index['projection_type']})"
+            )
+            return plan
+
+        plan['reason'] = 'нет подходящего ключа или GSI'
+        return plan
+
+    def plan_equality(self, table_name: str, field_name: str,
+                      fields: Optional[List[str]] = None, client=None,
+                      record: bool = True) -> Dict[str, Any]:
+
+        cache_key = (table_name, field_name, tuple(sorted(fields)) if fields else None)
+        plan = self._plans.get(cache_key)
+
+        if plan is None:
+            plan = self._build_plan(table_name, field_name, fields, client)
+            with self._lock:
+                self._plans[cache_key] = plan
+            if plan['strategy'] == STRATEGY_SCAN:
+                print(f"[WARNING][DynamoDB] - {table_name}.{field_name}: {plan['reason']}, используется scan")
+
+        if record:
+            with self._lock:
+                self._stats[plan['strategy']] += 1
+
+        return dict(plan)
+
+    def invalidate(self, table_name: str = None):
+
+        with self._lock:
+            if table_name is None:
+                self._layouts.clear()
+                self._plans.clear()
+                return
+            self._layouts.pop(table_name, None)
+            self._plans = {key: plan for key, plan in self._plans.items() if key[0] != table_name}
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            return {
+                'strategies': dict(self._stats),
+                'known_tables': [name for name, layout in self._layouts.items() if layout],
+                'cached_plans': len(self._plans)
+            }
+
+
+query_planner = QueryPlanner()
+
+
+def find_first(table, field_name: str, field_value: Any,
+               filter_expression: Any = None) -> Optional[Dict[str, Any]]:
+
+    # Первый элемент с field_name == field_value для типизированных репозиториев (boto3 Table)
+    plan = query_planner.plan_equality(table.name, field_name, client=table.meta.client)
+
+    if plan['strategy'] == STRATEGY_GET_ITEM and filter_expression is None:
+        return table.get_item(Key={field_name: field_value}).get('Item')
+
+    if plan['strategy'] == STRATEGY_SCAN:
+        condition = Attr(field_name).eq(field_value)
+        params = {'FilterExpression': condition & filter_expression if filter_expression is not None else condition}
+        operation = table.scan
+    else:
+        params = {'KeyConditionExpression': Key(field_name).eq(field_value)}
+        if plan['index_name']:
+            params['IndexName'] = plan['index_name']
+        if filter_expression is not None:
+            params['FilterExpression'] = filter_expression
+        operation = table.query
+
+    # Фильтр применяется после чтения страницы - совпадение может быть на любой странице
+    while True:
+        response = operation(**params)
+        if response.get('Items'):
+            return response['Items'][0]
+        if 'LastEvaluatedKey' not in response:
+            return None
+        params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
@@ -0,0 +1,60 @@
+import threading
+import time
+
+
+class TokenBucket:
+
+    # Простой потокобезопасный token bucket: rate единиц в секунду, запас до capacity
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+        self._updated_at = now
+
+    @property
+    def available(self) -> float:
+
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def try_acquire(self, units: float = 1.0) -> bool:
+
+        with self._lock:
+            self._refill()
+            if self._tokens >= units:
+                self._tokens -= units
+                return True
+            return False
+
+    def acquire(self, units: float = 1.0) -> float:
+
+        # Блокирует поток до появления units токенов; запрос больше capacity уходит в долг,
+        # чтобы крупные пачки не зависали навсегда. Возвращает время ожидания
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                needed = min(units, self.capacity)
+                if self._tokens >= needed:
+                    self._tokens -= units
+                    return waited
+                delay = (needed - self._tokens) / self.rate
+
+            time.sleep(delay)
+            waited += delay
+
+    def consume(self, units: float):
+
+        # Списание без ожидания (фактический расход известен только после запроса) - может уйти в долг
+        with self._lock:
+            self._refill()
+            self._tokens -= units
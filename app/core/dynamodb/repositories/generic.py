@@ -1,9 +1,18 @@
-from typing import Dict, Any, Optional, List, Union
+from typing import Callable, Dict, Any, Optional, List, Union
 from boto3.dynamodb.conditions import Key, Attr
+import heapq
 import uuid
 from datetime import datetime
 
-from ..base import BaseDynamoDBConnector
+from ..base import BaseDynamoDBConnector, VERSION_ATTRIBUTE
+from ..capacity import BACKGROUND
+from ..counters import aggregate_counters
+from ..exceptions import ConflictError, ItemNotFoundError
+from ..retry import retry_on_conflict
+from ..planner import (
+    query_planner,
+    STRATEGY_GET_ITEM, STRATEGY_QUERY_TABLE, STRATEGY_QUERY_INDEX
+)
 
 class GenericRepository(BaseDynamoDBConnector):
 
@@ -13,51 +22,160 @@ class GenericRepository(BaseDynamoDBConnector):
         self.table_name = table_name
     
     
-    def create(self, data: Dict[str, Any], auto_id: bool = True) -> Dict[str, Any]:
+    def create(self, data: Dict[str, Any], auto_id: bool = True, versioned: bool = False) -> Dict[str, Any]:
 
         if auto_id and 'id' not in data:
             data['id'] = str(uuid.uuid4())
         
-        return self.create_item(self.table_name, data)
+        return self.create_item(self.table_name, data, versioned=versioned)
     
-    def get_by_id(self, item_id: str) -> Optional[Dict[str, Any]]:
+    def get_by_id(self, item_id: str, fields: List[str] = None) -> Optional[Dict[str, Any]]:
 
-        return self.get_item(self.table_name, {'id': item_id})
+        return self.get_item(self.table_name, {'id': item_id}, projection=fields)
+
+    def get_many(self, item_ids: List[str], fields: List[str] = None) -> List[Optional[Dict[str, Any]]]:
+
+        return self.batch_get_items(
+            self.table_name,
+            [{'id': item_id} for item_id in item_ids],
+            projection=fields
+        )
     
-    def update_by_id(self, item_id: str, updates: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    def update_by_id(self, item_id: str, updates: Dict[str, Any],
+                     condition: Any = None, must_exist: bool = False,
+                     expected_version: int = None,
+                     remove: List[str] = None, add: Dict[str, Any] = None,
+                     return_values: str = 'ALL_NEW') -> Optional[Dict[str, Any]]:
 
+        # must_exist=True: один UpdateItem с attribute_exists(id) вместо get_by_id + update;
+        # отсутствующий элемент -> ItemNotFoundError, невыполненное condition -> ConflictError,
+        # несовпадение expected_version -> VersionConflictError
         return self.update_item(
             self.table_name,
             key={'id': item_id},
-            updates=updates
+            updates=updates,
+            condition=condition,
+            require_exists=must_exist,
+            expected_version=expected_version,
+            remove=remove,
+            add=add,
+            return_values=return_values
         )
+
+    def read_modify_write(self, item_id: str,
+                          mutate: Callable[[Dict[str, Any]], Optional[Dict[str, Any]]],
+                          attempts: int = 5) -> Optional[Dict[str, Any]]:
+
+        # mutate получает актуальный элемент и возвращает изменения; при конкурентной записи
+        # цикл повторяется с перечитыванием элемента
+        def attempt() -> Optional[Dict[str, Any]]:
+            current = self.get_item(self.table_name, {'id': item_id}, consistent=True)
+            if current is None:
+                raise ItemNotFoundError(f"Элемент {item_id} не найден в {self.table_name}")
+
+            updates = mutate(dict(current))
+            if not updates:
+                return current
+
+            return self.update_by_id(
+                item_id,
+                updates,
+                must_exist=True,
+                expected_version=int(current.get(VERSION_ATTRIBUTE, 0))
+            )
+
+        return retry_on_conflict(attempt, attempts=attempts)
     
-    def delete_by_id(self, item_id: str) -> bool:
+    def delete_by_id(self, item_id: str, condition: Any = None, must_exist: bool = False) -> bool:
+
+        return self.delete_item(
+            self.table_name,
+            {'id': item_id},
+            condition=condition,
+            require_exists=must_exist
+        )
+
+    def soft_delete(self, item_id: str, updates: Dict[str, Any] = None,
+                    condition: Any = None, return_values: str = 'ALL_NEW') -> Optional[Dict[str, Any]]:
+
+        # Уже удаленный элемент считается не найденным
+        not_deleted = Attr('is_deleted').not_exists() | Attr('is_deleted').eq(False)
+        marks = {
+            'is_deleted': True,
+            'deleted_at': datetime.utcnow().isoformat(),
+            **(updates or {})
+        }
 
-        return self.delete_item(self.table_name, {'id': item_id})
+        try:
+            return self.update_by_id(
+                item_id,
+                marks,
+                condition=not_deleted & condition if condition is not None else not_deleted,
+                must_exist=True,
+                return_values=return_values
+            )
+        except ConflictError as e:
+            if e.current_item and e.current_item.get('is_deleted'):
+                raise ItemNotFoundError(f"Элемент {item_id} уже удален из {self.table_name}") from e
+            raise
     
-    def list_all(self, limit: int = None) -> List[Dict[str, Any]]:
+    def list_all(self, limit: int = None, fields: List[str] = None) -> List[Dict[str, Any]]:
+
+        return self.scan_items(self.table_name, limit=limit, projection=fields)
+
+    def list_page(self, limit: int = 50, cursor: str = None,
+                  filter_expression: Any = None, fields: List[str] = None) -> Dict[str, Any]:
 
-        return self.scan_items(self.table_name, limit=limit)
+        items, next_cursor = self.scan_page(
+            self.table_name,
+            limit,
+            cursor=cursor,
+            filter_expression=filter_expression,
+            projection=fields
+        )
+        return {
+            'items': items,
+            'next_cursor': next_cursor
+        }
     
  
     
+    def explain_find_by_field(self, field_name: str, fields: List[str] = None) -> Dict[str, Any]:
+
+        return query_planner.plan_equality(
+            self.table_name, field_name, fields, client=self.client, record=False
+        )
+
     def find_by_field(self, field_name: str, field_value: Any, 
-                     index_name: str = None) -> List[Dict[str, Any]]:
+                     index_name: str = None, fields: List[str] = None) -> List[Dict[str, Any]]:
 
+        # Явно указанный индекс важнее плана; иначе планировщик выбирает ключ/GSI по реестру схем
         if index_name:
+            strategy = STRATEGY_QUERY_INDEX
+        else:
+            plan = query_planner.plan_equality(self.table_name, field_name, fields, client=self.client)
+            strategy, index_name = plan['strategy'], plan['index_name']
+
+        if strategy == STRATEGY_GET_ITEM:
+            item = self.get_item(self.table_name, {field_name: field_value}, projection=fields)
+            return [item] if item else []
+
+        if strategy in (STRATEGY_QUERY_TABLE, STRATEGY_QUERY_INDEX):
             return self.query_items(
                 self.table_name,
                 key_condition=Key(field_name).eq(field_value),
-                index_name=index_name
-            )
-        else:
-            return self.scan_items(
-                self.table_name,
-                filter_expression=Attr(field_name).eq(field_value)
+                index_name=index_name,
+                projection=fields
             )
+
+        return self.scan_items(
+            self.table_name,
+            filter_expression=Attr(field_name).eq(field_value),
+            projection=fields
+        )
     
-    def find_by_multiple_fields(self, filters: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def find_by_multiple_fields(self, filters: Dict[str, Any],
+                                fields: List[str] = None) -> List[Dict[str, Any]]:
 
         filter_expressions = []
         for field, value in filters.items():
@@ -67,13 +185,15 @@ class GenericRepository(BaseDynamoDBConnector):
         for expr in filter_expressions[1:]:
             combined_filter = combined_filter & expr
         
-        return self.scan_items(self.table_name, filter_expression=combined_filter)
+        return self.scan_items(self.table_name, filter_expression=combined_filter, projection=fields)
     
-    def search_by_pattern(self, field_name: str, pattern: str) -> List[Dict[str, Any]]:
+    def search_by_pattern(self, field_name: str, pattern: str,
+                          fields: List[str] = None) -> List[Dict[str, Any]]:
 
         return self.scan_items(
             self.table_name,
-            filter_expression=Attr(field_name).contains(pattern)
+            filter_expression=Attr(field_name).contains(pattern),
+            projection=fields
         )
     
     def find_in_date_range(self, date_field: str, start_date: str, end_date: str) -> List[Dict[str, Any]]:
@@ -85,65 +205,98 @@ class GenericRepository(BaseDynamoDBConnector):
     
     def find_recent(self, date_field: str = 'created_at', limit: int = 10) -> List[Dict[str, Any]]:
 
-
-        items = self.scan_items(self.table_name)
-        
-        try:
-            sorted_items = sorted(
-                items, 
-                key=lambda x: x.get(date_field, ''), 
-                reverse=True
-            )
-            return sorted_items[:limit]
-        except:
-            return items[:limit]
+        # Держим в памяти только limit последних элементов, а не всю таблицу
+        return heapq.nlargest(
+            limit,
+            self.iter_scan(self.table_name),
+            key=lambda x: str(x.get(date_field, ''))
+        )
     
     
     def count_total(self) -> int:
 
-        response = self.get_table(self.table_name).scan(Select='COUNT')
-        return response.get('Count', 0)
+        # Один GetItem по таблице счетчиков; COUNT-скан - только если счетчиков еще нет
+        total = aggregate_counters.count(self, self.table_name)
+        if total is not None:
+            return total
+        return self.count_items(self.table_name)
     
     def count_by_field(self, field_name: str, field_value: Any) -> int:
 
-        items = self.find_by_field(field_name, field_value)
-        return len(items)
+        count = aggregate_counters.count(self, self.table_name, field_name, field_value)
+        if count is not None:
+            return count
+        return self.count_items(self.table_name, filter_expression=Attr(field_name).eq(field_value))
+
+    def reconcile_counters(self) -> Dict[str, Any]:
+
+        return aggregate_counters.reconcile(self, self.table_name)
     
     def get_field_values(self, field_name: str) -> List[Any]:
 
-        items = self.scan_items(self.table_name)
         values = set()
-        for item in items:
+        for item in self.iter_scan(self.table_name):
             if field_name in item:
                 values.add(item[field_name])
         return list(values)
+
+    def sum_field(self, field_name: str) -> float:
+
+        total = 0.0
+        # Полный скан - фоновая полоса: агрегат не должен вытеснять пользовательские чтения
+        for item in self.parallel_scan(self.table_name, projection=[field_name], lane=BACKGROUND):
+            value = item.get(field_name)
+            if not value:
+                continue
+            try:
+                total += float(value)
+            except (TypeError, ValueError):
+                continue
+        return total
     
-    def get_stats(self) -> Dict[str, Any]:
+    def get_stats(self, detailed: bool = False) -> Dict[str, Any]:
 
-        items = self.scan_items(self.table_name)
-        
-        if not items:
+        # Без detailed - счетчики одним GetItem; полный анализ полей требует скана
+        counts = None if detailed else aggregate_counters.get_counts(self, self.table_name)
+        if counts is not None:
             return {
-                'total_items': 0,
                 'table_name': self.table_name,
-                'created_at': datetime.utcnow().isoformat()
+                'total_items': counts.pop('total', 0),
+                'counters': counts,
+                'analysis_timestamp': datetime.utcnow().isoformat()
             }
-        
+
+        total_items = 0
         field_counts = {}
-        for item in items:
+        oldest_record = None
+        newest_record = None
+
+        # Полный скан статистики - фоновая полоса бюджета емкости, не вытесняет пользовательские чтения
+        for item in self.parallel_scan(self.table_name, lane=BACKGROUND):
+            total_items += 1
             for field in item.keys():
                 field_counts[field] = field_counts.get(field, 0) + 1
+
+            created_at = item.get('created_at', '')
+            if oldest_record is None or created_at < oldest_record:
+                oldest_record = created_at
+            if newest_record is None or created_at > newest_record:
+                newest_record = created_at
         
-        oldest_item = min(items, key=lambda x: x.get('created_at', ''), default={})
-        newest_item = max(items, key=lambda x: x.get('created_at', ''), default={})
+        if not total_items:
+            return {
+                'total_items': 0,
+                'table_name': self.table_name,
+                'created_at': datetime.utcnow().isoformat()
+            }
         
         return {
             'table_name': self.table_name,
-            'total_items': len(items),
+            'total_items': total_items,
             'fields': list(field_counts.keys()),
             'field_coverage': field_counts,
-            'oldest_record': oldest_item.get('created_at'),
-            'newest_record': newest_item.get('created_at'),
+            'oldest_record': oldest_record or None,
+            'newest_record': newest_record or None,
             'analysis_timestamp': datetime.utcnow().isoformat()
         }
     
@@ -160,11 +313,15 @@ class GenericRepository(BaseDynamoDBConnector):
     
     def bulk_delete_by_ids(self, item_ids: List[str]) -> int:
 
-        deleted_count = 0
-        for item_id in item_ids:
-            if self.delete_by_id(item_id):
-                deleted_count += 1
-        return deleted_count
+        return self.bulk_delete_report(item_ids)['processed']
+
+    def bulk_delete_report(self, item_ids: List[str]) -> Dict[str, Any]:
+
+        # То же удаление пакетами, но с полным отчетом (запрошено/обработано/ошибки/время)
+        return self.batch_delete_items(
+            self.table_name,
+            ({'id': item_id} for item_id in item_ids)
+        )
     
     def cleanup_old_records(self, date_field: str = 'created_at', 
                           days_old: int = 30) -> int:
@@ -173,22 +330,24 @@ class GenericRepository(BaseDynamoDBConnector):
         
         cutoff_date = (datetime.utcnow() - timedelta(days=days_old)).isoformat()
         
-        old_items = self.scan_items(
+        old_items = self.parallel_scan(
             self.table_name,
-            filter_expression=Attr(date_field).lt(cutoff_date)
+            filter_expression=Attr(date_field).lt(cutoff_date),
+            projection=['id'],
+            lane=BACKGROUND
         )
         
-        deleted_count = 0
-        for item in old_items:
-            if self.delete_by_id(item['id']):
-                deleted_count += 1
+        report = self.batch_delete_items(self.table_name, old_items)
         
-        return deleted_count
+        return report['processed']
     
     
     def export_to_dict(self, limit: int = None) -> Dict[str, Any]:
 
-        items = self.list_all(limit)
+        if limit:
+            items = self.list_all(limit)
+        else:
+            items = list(self.parallel_scan(self.table_name, lane=BACKGROUND))
         
         return {
             'table_name': self.table_name,
@@ -202,17 +361,22 @@ class GenericRepository(BaseDynamoDBConnector):
 
         try:
             if clear_existing:
-                existing_items = self.list_all()
-                for item in existing_items:
-                    self.delete_by_id(item['id'])
-                print(f"[INFO] Удалено {len(existing_items)} существующих записей")
+                report = self.batch_delete_items(
+                    self.table_name,
+                    self.parallel_scan(self.table_name, projection=['id'], lane=BACKGROUND)
+                )
+                print(f"[INFO] Отправлено на удаление {report['processed']} существующих записей")
+                if report['failed']:
+                    print(f"[WARNING] Не удалось удалить {report['failed']} записей из {self.table_name}")
             
             items = data.get('items', [])
             if items:
-                success = self.bulk_create(items, auto_id=False)
-                if success:
-                    print(f"[INFO] Импортировано {len(items)} записей в {self.table_name}")
-                return success
+                stats = self.bulk_write(self.table_name, items)
+                print(
+                    f"[INFO] Импортировано {stats['written']} записей в {self.table_name} "
+                    f"({stats['items_per_second']} записей/с, ретраев из-за троттлинга: {stats['throttled_retries']})"
+                )
+                return stats['failed'] == 0
             
             return True
             
@@ -3,7 +3,8 @@ from uuid import UUID
 from decimal import Decimal
 import logging
 
-from app.core.dynamodb.repositories.generic import GenericRepository
+from app.core.dynamodb.async_base import AsyncGenericRepository
+from app.core.dynamodb.views import MarketTotalsView, view_registry
 from app.models.market import Token, TokenStats, Exchange, ExchangesStats
 
 logger = logging.getLogger(__name__)
@@ -11,32 +12,58 @@ logger = logging.getLogger(__name__)
 class MarketRepository:
     
     def __init__(self):
-        self.tokens_repo = GenericRepository("tokens")
-        self.token_stats_repo = GenericRepository("token_stats")
-        self.exchanges_repo = GenericRepository("exchanges")
-        self.exchange_stats_repo = GenericRepository("exchange_stats")
+        self.tokens_table = "tokens"
+        self.token_stats_table = "token_stats"
+        self.exchanges_table = "exchanges"
+        self.exchange_stats_table = "exchange_stats"
+
+        # Суммы по статистике токенов поддерживаются по потоку изменений, а не сканом на каждый запрос
+        self.market_totals_view = view_registry.register(MarketTotalsView(self.token_stats_table))
+
+    def _get_repository(self, table_name: str) -> AsyncGenericRepository:
+
+        from app.core.dynamodb.connector import get_async_generic_repository
+
+        repo = get_async_generic_repository(table_name)
+        if not repo:
+            raise RuntimeError(f"Репозиторий для таблицы {table_name} недоступен")
+        return repo
+
+    @property
+    def tokens_repo(self) -> AsyncGenericRepository:
+        return self._get_repository(self.tokens_table)
+
+    @property
+    def token_stats_repo(self) -> AsyncGenericRepository:
+        return self._get_repository(self.token_stats_table)
+
+    @property
+    def exchanges_repo(self) -> AsyncGenericRepository:
+        return self._get_repository(self.exchanges_table)
+
+    @property
+    def exchange_stats_repo(self) -> AsyncGenericRepository:
+        return self._get_repository(self.exchange_stats_table)
     
     async def count_total_tokens(self) -> int:
         try:
-            return self.tokens_repo.count_total()
+            return await self.tokens_repo.count_total()
         except Exception as e:
             logger.error(f"Error counting total tokens: {e}")
             return 0
     
     async def count_halal_tokens(self) -> int:
         try:
-            halal_tokens = self.tokens_repo.find_by_field("is_halal", True)
-            return len(halal_tokens)
+            return await self.tokens_repo.count_by_field("is_halal", True)
         except Exception as e:
             logger.error(f"Error counting halal tokens: {e}")
             return 0
     
     async def get_total_market_cap(self) -> Dict[str, float]:
         try:
-            all_stats = self.token_stats_repo.list_all()
-            
-            total_btc = sum(float(stat.get("market_cap", 0)) * 0.0000143 for stat in all_stats if stat.get("market_cap"))
-            total_usd = sum(float(stat.get("market_cap", 0)) for stat in all_stats if stat.get("market_cap"))
+            totals = await view_registry.read_async(self.market_totals_view)
+            total_usd = totals['total_market_cap']
+            total_btc = total_usd * 0.0000143
             
             return {
                 "btc": total_btc,
@@ -52,9 +79,8 @@ class MarketRepository:
     
     async def get_total_volume(self) -> Dict[str, float]:
         try:
-            all_stats = self.token_stats_repo.list_all()
-            
-            total_usd = sum(float(stat.get("trading_volume_24h", 0)) for stat in all_stats if stat.get("trading_volume_24h"))
+            totals = await view_registry.read_async(self.market_totals_view)
+            total_usd = totals['total_volume']
             
             return {
                 "btc": total_usd * 0.0000143,
@@ -97,13 +123,13 @@ class MarketRepository:
         sort: Optional[str] = None
     ) -> List[Tuple[Token, Optional[TokenStats]]]:
         try:
-            tokens = self.tokens_repo.list_all(limit=limit + offset)[offset:]
+            tokens = (await self.tokens_repo.list_all(limit=limit + offset))[offset:]
             
             results = []
             for token_data in tokens:
                 token = Token(**token_data)
                 
-                stats_data = self.token_stats_repo.find_by_field("symbol", token.symbol)
+                stats_data = await self.token_stats_repo.find_by_field("symbol", token.symbol)
                 stats = None
                 if stats_data:
                     stats = TokenStats(**stats_data[0])
@@ -122,11 +148,11 @@ class MarketRepository:
     
     async def get_token_by_id_or_coingecko_id(self, token_id: str) -> Optional[Token]:
         try:
-            token_data = self.tokens_repo.get_by_id(token_id)
+            token_data = await self.tokens_repo.get_by_id(token_id)
             if token_data:
                 return Token(**token_data)
             
-            tokens_by_coingecko = self.tokens_repo.find_by_field("coingecko_id", token_id)
+            tokens_by_coingecko = await self.tokens_repo.find_by_field("coingecko_id", token_id)
             if tokens_by_coingecko:
                 return Token(**tokens_by_coingecko[0])
             
@@ -137,7 +163,7 @@ class MarketRepository:
     
     async def get_token_stats_by_symbol(self, symbol: str) -> Optional[TokenStats]:
         try:
-            stats_data = self.token_stats_repo.find_by_field("symbol", symbol)
+            stats_data = await self.token_stats_repo.find_by_field("symbol", symbol)
             if stats_data:
                 return TokenStats(**stats_data[0])
             return None
@@ -147,7 +173,7 @@ class MarketRepository:
     
     async def get_token_halal_status(self, token_id: UUID) -> Dict[str, bool]:
         try:
-            token_data = self.tokens_repo.get_by_id(str(token_id))
+            token_data = await self.tokens_repo.get_by_id(str(token_id))
             if token_data:
                 return {
                     "is_halal": token_data.get("is_halal", False),
@@ -160,13 +186,13 @@ class MarketRepository:
     
     async def get_exchanges_with_stats(self) -> List[Tuple[Exchange, Optional[ExchangesStats]]]:
         try:
-            exchanges = self.exchanges_repo.list_all()
+            exchanges = await self.exchanges_repo.list_all()
             
             results = []
             for exchange_data in exchanges:
                 exchange = Exchange(**exchange_data)
                 
-                stats_data = self.exchange_stats_repo.find_by_field("exchange_id", str(exchange.id))
+                stats_data = await self.exchange_stats_repo.find_by_field("exchange_id", str(exchange.id))
                 stats = None
                 if stats_data:
                     stats = ExchangesStats(**stats_data[0])
@@ -180,7 +206,7 @@ class MarketRepository:
     
     async def get_exchange_by_id(self, exchange_id: str) -> Optional[Exchange]:
         try:
-            exchange_data = self.exchanges_repo.get_by_id(exchange_id)
+            exchange_data = await self.exchanges_repo.get_by_id(exchange_id)
             if exchange_data:
                 return Exchange(**exchange_data)
             return None
@@ -190,7 +216,7 @@ class MarketRepository:
     
     async def get_exchange_stats_by_id(self, exchange_id: UUID) -> Optional[ExchangesStats]:
         try:
-            stats_data = self.exchange_stats_repo.find_by_field("exchange_id", str(exchange_id))
+            stats_data = await self.exchange_stats_repo.find_by_field("exchange_id", str(exchange_id))
             if stats_data:
                 return ExchangesStats(**stats_data[0])
             return None
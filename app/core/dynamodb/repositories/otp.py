@@ -4,6 +4,7 @@ from datetime import datetime
 import uuid
 
 from ..base import BaseDynamoDBConnector
+from ..exceptions import ConflictError, ItemNotFoundError
 
 class OTPRepository(BaseDynamoDBConnector):
     
@@ -43,11 +44,18 @@ class OTPRepository(BaseDynamoDBConnector):
     
     def mark_otp_as_used(self, otp_id: str) -> bool:
 
-        updated_item = self.update_item(
-            self.table_name,
-            key={'id': otp_id},
-            updates={'is_used': True}
-        )
+        # Условная запись: один и тот же код нельзя использовать дважды при параллельных запросах
+        try:
+            updated_item = self.update_item(
+                self.table_name,
+                key={'id': otp_id},
+                updates={'is_used': True},
+                condition=Attr('is_used').eq(False),
+                require_exists=True,
+                return_values='NONE'
+            )
+        except (ItemNotFoundError, ConflictError):
+            return False
         return updated_item is not None
     
     def get_otps_by_email(self, email: str, otp_type: str = None) -> List[Dict[str, Any]]:
@@ -67,10 +75,7 @@ class OTPRepository(BaseDynamoDBConnector):
         """Удаляет старые OTP коды для определенного емаила"""
         items = self.get_otps_by_email(email, otp_type)
         
-        deleted_count = 0
-        for item in items:
-            if self.delete_item(self.table_name, {'id': item['id']}):
-                deleted_count += 1
+        deleted_count = self.batch_delete_items(self.table_name, items)['processed'] if items else 0
         
         if deleted_count > 0:
             print(f"[INFO][OTP] - Удалено {deleted_count} старых OTP для {email}")
@@ -81,15 +86,12 @@ class OTPRepository(BaseDynamoDBConnector):
 
         current_time = datetime.utcnow().isoformat()
         
-        expired_items = self.scan_items(
+        expired_items = self.iter_scan(
             self.table_name,
             filter_expression=Attr('expires_at').lt(current_time)
         )
         
-        deleted_count = 0
-        for item in expired_items:
-            if self.delete_item(self.table_name, {'id': item['id']}):
-                deleted_count += 1
+        deleted_count = self.batch_delete_items(self.table_name, expired_items)['processed']
         
         if deleted_count > 0:
             print(f"[INFO][OTP] - Удалено {deleted_count} истекших OTP кодов")
@@ -115,12 +117,15 @@ class OTPRepository(BaseDynamoDBConnector):
                 'expired_otps': total - used - active
             }
         else:
-            all_otps = self.scan_items(self.table_name)
             current_time = datetime.utcnow().isoformat()
             
-            total = len(all_otps)
-            used = len([otp for otp in all_otps if otp.get('is_used', False)])
-            expired = len([otp for otp in all_otps if otp.get('expires_at', '') < current_time])
+            total = used = expired = 0
+            for otp in self.iter_scan(self.table_name):
+                total += 1
+                if otp.get('is_used', False):
+                    used += 1
+                if otp.get('expires_at', '') < current_time:
+                    expired += 1
             active = total - used - expired
             
             return {
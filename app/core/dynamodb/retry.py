@@ -0,0 +1,31 @@
+import random
+import time
+from typing import Callable, Iterator, List, Sequence, TypeVar
+
+from .exceptions import ConflictError
+
+T = TypeVar('T')
+
+
+def backoff_delay(attempt: int, base: float = 0.05, cap: float = 5.0) -> float:
+
+    # Экспоненциальная задержка с полным джиттером (attempt начинается с 0)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def chunked(items: Sequence[T], size: int) -> Iterator[List[T]]:
+
+    for i in range(0, len(items), size):
+        yield list(items[i:i + size])
+
+
+def retry_on_conflict(operation: Callable[[], T], attempts: int = 5, base: float = 0.02) -> T:
+
+    # Повтор цикла read-modify-write при конфликте версий; после attempts попыток конфликт пробрасывается
+    for attempt in range(attempts):
+        try:
+            return operation()
+        except ConflictError:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(backoff_delay(attempt, base=base))
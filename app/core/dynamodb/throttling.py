@@ -0,0 +1,259 @@
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from botocore.exceptions import (
+    ClientError,
+    ConnectionClosedError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError
+)
+
+from app.core.config import settings
+from .exceptions import ServiceUnavailableError, ThrottledError
+from .retry import backoff_delay
+
+THROTTLING_ERROR_CODES = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded'
+}
+TRANSIENT_ERROR_CODES = {
+    'InternalServerError',
+    'InternalFailure',
+    'ServiceUnavailable',
+    'TransactionInProgressException'
+}
+NETWORK_ERRORS = (EndpointConnectionError, ConnectionClosedError, ConnectTimeoutError, ReadTimeoutError)
+# Запрос ушел, а ответа нет: неизвестно, применила ли его DynamoDB
+AMBIGUOUS_NETWORK_ERRORS = (ConnectionClosedError, ReadTimeoutError)
+# ADD и арифметика в SET меняют значение относительно текущего - повтор применит их второй раз
+_NON_IDEMPOTENT_UPDATE = re.compile(r'\bADD\b|\s[+-]\s')
+
+# Не чаще одного уменьшения лимита за окно: пачка отказов от одной перегрузки - это один сигнал
+_DECREASE_COOLDOWN = 0.2
+
+
+def error_kind(error: Exception) -> Optional[str]:
+
+    # 'throttled' / 'transient' - ошибку имеет смысл повторить, None - нет
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code')
+        if code in THROTTLING_ERROR_CODES:
+            return 'throttled'
+        if code in TRANSIENT_ERROR_CODES:
+            return 'transient'
+        return None
+    if isinstance(error, NETWORK_ERRORS):
+        return 'transient'
+    return None
+
+
+def is_idempotent(operation: Callable, params: Dict[str, Any]) -> bool:
+
+    # Можно ли повторить запрос, который, возможно, уже был применен
+    name = getattr(operation, '__name__', '')
+    if name == 'update_item':
+        return not _NON_IDEMPOTENT_UPDATE.search(params.get('UpdateExpression') or '')
+    if name == 'transact_write_items':
+        return bool(params.get('ClientRequestToken'))
+    return True
+
+
+def table_name_of(operation: Callable, params: Dict[str, Any]) -> str:
+
+    # Метод ресурса Table знает свою таблицу, у методов клиента она в параметрах
+    table_name = getattr(getattr(operation, '__self__', None), 'name', None)
+    if isinstance(table_name, str):
+        return table_name
+    if 'TableName' in params:
+        return params['TableName']
+    if params.get('RequestItems'):
+        return next(iter(params['RequestItems']))
+    if 'TransactItems' in params:
+        return 'transactions'
+    return 'default'
+
+
+class AdaptiveConcurrency:
+
+    # AIMD-лимит одновременных запросов к таблице: +1/limit за каждый успешный запрос,
+    # уменьшение в decrease_factor раз при троттлинге (как окно перегрузки TCP)
+
+    def __init__(self, initial: float, minimum: float = 1, maximum: float = 64,
+                 decrease_factor: float = 0.5):
+        self.minimum = max(1.0, minimum)
+        self.maximum = max(self.minimum, maximum)
+        self.limit = min(self.maximum, max(self.minimum, initial))
+        self.decrease_factor = decrease_factor
+        self.in_flight = 0
+
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self):
+
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self):
+
+        with self._condition:
+            self.in_flight -= 1
+            self._condition.notify()
+
+    def on_success(self):
+
+        with self._condition:
+            previous = int(self.limit)
+            self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            if int(self.limit) > previous:
+                self._condition.notify()
+
+    def on_throttle(self):
+
+        with self._condition:
+            now = time.monotonic()
+            if now - self._last_decrease < _DECREASE_COOLDOWN:
+                return
+            self._last_decrease = now
+            self.limit = max(self.minimum, self.limit * self.decrease_factor)
+
+
+class CallGuard:
+
+    # Все запросы к DynamoDB идут через guard: повтор троттлинга и временных ошибок
+    # с экспоненциальной задержкой, адаптивный лимит параллелизма и счетчики по таблицам.
+    # При включенном guard клиент botocore создается с одной попыткой (base._build_client_config),
+    # иначе его ретраи умножали бы попытки guard и прятали троттлинг от AIMD
+
+    def __init__(self, enabled: bool = True, max_retries: int = 5, base_delay: float = 0.05,
+                 max_delay: float = 5.0, initial_limit: float = 16, min_limit: float = 1,
+                 max_limit: float = 64):
+        self.enabled = enabled
+        self.max_retries = max(0, max_retries)
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.initial_limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+
+        self._limiters: Dict[str, AdaptiveConcurrency] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def _limiter(self, table_name: str) -> AdaptiveConcurrency:
+
+        with self._lock:
+            if table_name not in self._limiters:
+                self._limiters[table_name] = AdaptiveConcurrency(
+                    self.initial_limit, self.min_limit, self.max_limit
+                )
+                self._stats[table_name] = {
+                    'calls': 0,
+                    'throttled': 0,
+                    'transient_errors': 0,
+                    'retries': 0,
+                    'exhausted': 0,
+                    'not_retried': 0,
+                    'backoff_seconds': 0.0
+                }
+            return self._limiters[table_name]
+
+    def _count(self, table_name: str, name: str, value: float = 1):
+
+        with self._lock:
+            self._stats[table_name][name] += value
+
+    def record_throttle(self, table_name: str):
+
+        # Частичный троттлинг пакетных запросов (UnprocessedItems/UnprocessedKeys)
+        self._limiter(table_name).on_throttle()
+        self._count(table_name, 'throttled')
+
+    def call(self, table_name: str, operation: Callable, *args, **kwargs) -> Any:
+
+        if not self.enabled:
+            return operation(*args, **kwargs)
+
+        limiter = self._limiter(table_name)
+        for attempt in range(self.max_retries + 1):
+            limiter.acquire()
+            try:
+                self._count(table_name, 'calls')
+                result = operation(*args, **kwargs)
+            except (ClientError, *NETWORK_ERRORS) as e:
+                kind = error_kind(e)
+                if kind is None:
+                    raise
+                if isinstance(e, AMBIGUOUS_NETWORK_ERRORS) and not is_idempotent(operation, kwargs):
+                    # Счетчик мог уже увеличиться - повтор посчитал бы его дважды
+                    self._count(table_name, 'not_retried')
+                    raise ServiceUnavailableError(
+                        f"Ответ DynamoDB для {table_name} потерян, неидемпотентный запрос не повторяется: {e}",
+                        table_name=table_name, retry_after=self.max_delay
+                    ) from e
+                error = e
+            else:
+                limiter.on_success()
+                return result
+            finally:
+                limiter.release()
+
+            if kind == 'throttled':
+                limiter.on_throttle()
+                self._count(table_name, 'throttled')
+            else:
+                self._count(table_name, 'transient_errors')
+
+            if attempt == self.max_retries:
+                break
+
+            delay = backoff_delay(attempt, base=self.base_delay, cap=self.max_delay)
+            self._count(table_name, 'retries')
+            self._count(table_name, 'backoff_seconds', delay)
+            time.sleep(delay)
+
+        self._count(table_name, 'exhausted')
+        retry_after = self.max_delay
+        if kind == 'throttled':
+            raise ThrottledError(
+                f"Запросы к {table_name} троттлятся, попыток: {self.max_retries + 1}",
+                table_name=table_name, retry_after=retry_after
+            ) from error
+        raise ServiceUnavailableError(
+            f"DynamoDB недоступен для {table_name} после {self.max_retries + 1} попыток: {error}",
+            table_name=table_name, retry_after=retry_after
+        ) from error
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'max_retries': self.max_retries,
+                'tables': {
+                    table_name: {
+                        **stats,
+                        'backoff_seconds': round(stats['backoff_seconds'], 3),
+                        'concurrency_limit': round(self._limiters[table_name].limit, 2),
+                        'in_flight': self._limiters[table_name].in_flight
+                    }
+                    for table_name, stats in self._stats.items()
+                }
+            }
+
+
+call_guard = CallGuard(
+    enabled=settings.DYNAMODB_CALL_GUARD_ENABLED,
+    max_retries=settings.DYNAMODB_CALL_MAX_RETRIES,
+    base_delay=settings.DYNAMODB_CALL_BASE_DELAY,
+    max_delay=settings.DYNAMODB_CALL_MAX_DELAY,
+    initial_limit=settings.DYNAMODB_AIMD_INITIAL_LIMIT,
+    min_limit=settings.DYNAMODB_AIMD_MIN_LIMIT,
+    max_limit=settings.DYNAMODB_AIMD_MAX_LIMIT
+)
@@ -0,0 +1,102 @@
+from decimal import Decimal
+from typing import Any, Dict, List
+
+from boto3.dynamodb.conditions import Attr, ConditionExpressionBuilder
+
+from .expressions import build_update_expression
+
+
+# Ограничение TransactWriteItems на количество операций в одном запросе
+MAX_TRANSACTION_ITEMS = 100
+
+# Атрибут оптимистической блокировки: увеличивается при каждом обновлении через репозитории
+VERSION_ATTRIBUTE = 'version'
+
+_KEY_TYPES = {'S': str, 'N': (int, float, Decimal), 'B': (bytes, bytearray)}
+
+
+def key_attribute_errors(table_name: str, item: Dict[str, Any]) -> List[str]:
+
+    # Ключи таблицы и GSI по схеме: None, пустая строка или значение не того типа в ключе индекса
+    # отменяют всю транзакцию ValidationException - проверяем до запроса
+    from app.aws.table_schemas import get_table_schema
+
+    schema = get_table_schema(table_name)
+    if schema is None:
+        return []
+
+    table_keys = {key['AttributeName'] for key in schema.key_schema}
+    errors = []
+    for definition in schema.attribute_definitions:
+        name, attribute_type = definition['AttributeName'], definition['AttributeType']
+        if name not in item:
+            if name in table_keys:
+                errors.append(f"{table_name}: нет ключевого атрибута {name}")
+            continue
+        value = item[name]
+        if isinstance(value, bool) or not isinstance(value, _KEY_TYPES.get(attribute_type, object)) or value == '':
+            errors.append(f"{table_name}: атрибут {name} - ключ таблицы или индекса, ожидается тип {attribute_type}, передано {value!r}")
+    return errors
+
+
+# Операции для BaseDynamoDBConnector.transact_write. Значения передаются как есть (str, Decimal...) -
+# их сериализует клиент ресурса boto3. Условия Attr(...) внутри TransactItems он не разворачивает,
+# поэтому выражение собирается здесь
+
+def _with_condition(operation: Dict[str, Any], condition: Any) -> Dict[str, Any]:
+
+    if condition is None:
+        return operation
+
+    built = ConditionExpressionBuilder().build_expression(condition)
+    operation['ConditionExpression'] = built.condition_expression
+    if built.attribute_name_placeholders:
+        operation.setdefault('ExpressionAttributeNames', {}).update(built.attribute_name_placeholders)
+    if built.attribute_value_placeholders:
+        operation.setdefault('ExpressionAttributeValues', {}).update(built.attribute_value_placeholders)
+    return operation
+
+
+def put_op(table_name: str, item: Dict[str, Any], condition: Any = None,
+           if_not_exists: bool = False) -> Dict[str, Any]:
+
+    errors = key_attribute_errors(table_name, item)
+    if errors:
+        raise ValueError('; '.join(errors))
+
+    if if_not_exists:
+        not_exists = Attr('id').not_exists()
+        condition = not_exists & condition if condition is not None else not_exists
+
+    return {'Put': _with_condition({'TableName': table_name, 'Item': item}, condition)}
+
+
+def update_op(table_name: str, key: Dict[str, Any], updates: Dict[str, Any],
+              condition: Any = None, require_exists: bool = False) -> Dict[str, Any]:
+
+    if require_exists:
+        exists = Attr(next(iter(key))).exists()
+        condition = exists & condition if condition is not None else exists
+
+    operation = {
+        'TableName': table_name,
+        'Key': key,
+        **build_update_expression(
+            set_values={
+                field: value for field, value in updates.items()
+                if field not in key and field != VERSION_ATTRIBUTE
+            },
+            add={VERSION_ATTRIBUTE: 1}
+        )
+    }
+    return {'Update': _with_condition(operation, condition)}
+
+
+def delete_op(table_name: str, key: Dict[str, Any], condition: Any = None) -> Dict[str, Any]:
+
+    return {'Delete': _with_condition({'TableName': table_name, 'Key': key}, condition)}
+
+
+def check_op(table_name: str, key: Dict[str, Any], condition: Any) -> Dict[str, Any]:
+
+    return {'ConditionCheck': _with_condition({'TableName': table_name, 'Key': key}, condition)}
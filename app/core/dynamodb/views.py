@@ -0,0 +1,257 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from .capacity import BACKGROUND
+from .change_feed import EVENT_REMOVE, ChangeFeed, change_feed
+
+
+def _to_float(value: Any) -> float:
+
+    # В таблицах статистики числа встречаются и строками ("1,234.5")
+    if value in (None, ''):
+        return 0.0
+    try:
+        return float(str(value).replace(',', ''))
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _key_of(keys: Dict[str, Any]) -> Tuple:
+
+    return tuple(sorted(keys.items()))
+
+
+class MaterializedView(ABC):
+
+    # Производные данные, которые поддерживаются по записям потока изменений.
+    # Состояние хранится по ключу элемента: повторная доставка записи (at-least-once)
+    # и наложение изменений, попавших и в начальный скан, не искажают результат.
+    # Поток видит только записи этого процесса - таблицы, которые пишут внешний агрегатор
+    # и другие воркеры, догоняются полным пересчетом не реже max_staleness секунд
+
+    name: str = ''
+    # Атрибуты, нужные представлению при начальном построении (None - весь элемент)
+    projection: Optional[List[str]] = None
+
+    def __init__(self, *tables: str, max_staleness: float = None):
+        self.tables = tables
+        self.max_staleness = settings.DYNAMODB_VIEW_MAX_STALENESS if max_staleness is None else max_staleness
+        self.ready = False
+        self.rebuilt_at: Optional[str] = None
+        self.rebuilt_monotonic: Optional[float] = None
+        self.applied = 0
+        self._lock = threading.RLock()
+
+    @property
+    def is_stale(self) -> bool:
+
+        # max_staleness <= 0 - только поток изменений, без периодического пересчета
+        if self.rebuilt_monotonic is None or self.max_staleness <= 0:
+            return False
+        return time.monotonic() - self.rebuilt_monotonic > self.max_staleness
+
+    @abstractmethod
+    def reset(self):
+        pass
+
+    @abstractmethod
+    def upsert(self, table_name: str, key: Tuple, item: Dict[str, Any]):
+        pass
+
+    @abstractmethod
+    def remove(self, table_name: str, key: Tuple):
+        pass
+
+    @abstractmethod
+    def snapshot(self, **kwargs) -> Any:
+        pass
+
+
+class MarketTotalsView(MaterializedView):
+
+    # Суммарная капитализация и объем торгов по неудаленной статистике токенов
+
+    name = 'market_totals'
+    projection = ['id', 'market_cap', 'trading_volume_24h', 'is_deleted']
+
+    def reset(self):
+
+        self._contributions: Dict[Tuple, Tuple[float, float]] = {}
+        self._market_cap = 0.0
+        self._volume = 0.0
+
+    def upsert(self, table_name: str, key: Tuple, item: Dict[str, Any]):
+
+        if item.get('is_deleted'):
+            self.remove(table_name, key)
+            return
+
+        market_cap, volume = _to_float(item.get('market_cap')), _to_float(item.get('trading_volume_24h'))
+        old_market_cap, old_volume = self._contributions.get(key, (0.0, 0.0))
+        self._contributions[key] = (market_cap, volume)
+        self._market_cap += market_cap - old_market_cap
+        self._volume += volume - old_volume
+
+    def remove(self, table_name: str, key: Tuple):
+
+        market_cap, volume = self._contributions.pop(key, (0.0, 0.0))
+        self._market_cap -= market_cap
+        self._volume -= volume
+
+    def snapshot(self) -> Dict[str, Any]:
+
+        return {
+            'total_market_cap': self._market_cap,
+            'total_volume': self._volume,
+            'tokens': len(self._contributions)
+        }
+
+
+class ExchangeRankingView(MaterializedView):
+
+    # Неудаленная статистика бирж, упорядоченная по объему торгов за 24 часа
+
+    name = 'exchange_ranking'
+
+    def reset(self):
+
+        self._items: Dict[Tuple, Dict[str, Any]] = {}
+
+    def upsert(self, table_name: str, key: Tuple, item: Dict[str, Any]):
+
+        if item.get('is_deleted'):
+            self._items.pop(key, None)
+        else:
+            self._items[key] = item
+
+    def remove(self, table_name: str, key: Tuple):
+
+        self._items.pop(key, None)
+
+    def snapshot(self, limit: int = None) -> List[Dict[str, Any]]:
+
+        ranking = sorted(
+            self._items.values(),
+            key=lambda item: _to_float(item.get('trading_volume_24h')),
+            reverse=True
+        )
+        return [dict(item) for item in ranking[:limit]]
+
+
+class ViewRegistry:
+
+    # Регистрирует представления как потребителей потока изменений. Первое чтение строит
+    # представление одним сканом, дальше оно догоняет поток - O(изменений), а не O(таблицы)
+
+    def __init__(self, feed: ChangeFeed):
+        self.feed = feed
+        self._views: Dict[str, MaterializedView] = {}
+        self._lock = threading.Lock()
+
+    def _consumer_name(self, view: MaterializedView) -> str:
+
+        return f"view:{view.name}:{','.join(view.tables)}"
+
+    def register(self, view: MaterializedView) -> MaterializedView:
+
+        name = self._consumer_name(view)
+        with self._lock:
+            if name in self._views:
+                return self._views[name]
+            self._views[name] = view
+
+        view.reset()
+        self.feed.subscribe(name, lambda records: self._apply(view, records), tables=view.tables)
+        return view
+
+    def _connector(self):
+
+        from .connector import get_db_connector
+        return get_db_connector()
+
+    def _apply(self, view: MaterializedView, records: List[Dict[str, Any]]):
+
+        with view._lock:
+            if not view.ready:
+                # До начального построения записи не нужны - их учтет скан
+                return
+
+            for record in records:
+                key = _key_of(record['keys'])
+                item = record['new_image']
+
+                if record['event_name'] != EVENT_REMOVE and item is None:
+                    # Запись без образа (транзакция) - перечитываем элемент
+                    item = self._connector().get_item(record['table_name'], record['keys'], consistent=True)
+
+                if record['event_name'] == EVENT_REMOVE or item is None:
+                    view.remove(record['table_name'], key)
+                else:
+                    view.upsert(record['table_name'], key, item)
+                view.applied += 1
+
+    def rebuild(self, view: MaterializedView):
+
+        connector = self._connector()
+        name = self._consumer_name(view)
+
+        with view._lock:
+            # Позицию запоминаем до скана: изменения во время скана будут наложены повторно,
+            # что безопасно для состояния по ключу
+            position = self.feed.stream.latest_sequence()
+            view.reset()
+            for table_name in view.tables:
+                # Пересчет представления - фоновая работа, уступает емкость пользовательским запросам
+                for item in connector.parallel_scan(table_name, projection=view.projection, lane=BACKGROUND):
+                    view.upsert(table_name, _key_of(connector._key_of(table_name, item)), item)
+
+            self.feed.seek(name, position)
+            view.ready = True
+            view.rebuilt_at = datetime.utcnow().isoformat()
+            view.rebuilt_monotonic = time.monotonic()
+
+    def _needs_rebuild(self, view: MaterializedView, name: str) -> bool:
+
+        # Без потока изменений по таблицам представления оно не обновляется - только полный пересчет
+        follows_feed = all(self.feed.captures(table_name) for table_name in view.tables)
+        return not view.ready or not follows_feed or self.feed.is_lagged(name) or view.is_stale
+
+    def read(self, view: MaterializedView, **kwargs) -> Any:
+
+        name = self._consumer_name(view)
+        if self._needs_rebuild(view, name):
+            with view._lock:
+                # Параллельные читатели ждали того же пересчета - повторно не сканируем
+                if self._needs_rebuild(view, name):
+                    self.rebuild(view)
+
+        self.feed.poll(name)
+        with view._lock:
+            return view.snapshot(**kwargs)
+
+    async def read_async(self, view: MaterializedView, **kwargs) -> Any:
+
+        from .async_base import dynamodb_executor
+        return await dynamodb_executor.run(self.read, view, **kwargs)
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            views = list(self._views.items())
+
+        return {
+            name: {
+                'ready': view.ready,
+                'rebuilt_at': view.rebuilt_at,
+                'max_staleness': view.max_staleness,
+                'applied': view.applied
+            }
+            for name, view in views
+        }
+
+
+view_registry = ViewRegistry(change_feed)
@@ -0,0 +1,103 @@
+import asyncio
+import copy
+import threading
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+
+from boto3.dynamodb.conditions import ConditionBase, ConditionExpressionBuilder
+
+from app.core.config import settings
+
+
+def freeze(value: Any) -> Hashable:
+
+    # Ключ из аргументов вызова: словари/списки/множества приводятся к неизменяемым аналогам,
+    # условия boto3 - к собранному выражению с именами и значениями. Для прочих объектов без хеша
+    # стабильного ключа нет (id переиспользуется после сборки мусора) - TypeError, такой вызов не склеивается
+    if isinstance(value, dict):
+        return tuple(sorted((str(name), freeze(item)) for name, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset(freeze(item) for item in value)
+    if isinstance(value, ConditionBase):
+        built = ConditionExpressionBuilder().build_expression(value)
+        return (
+            '__condition__',
+            built.condition_expression,
+            freeze(built.attribute_name_placeholders),
+            freeze(built.attribute_value_placeholders)
+        )
+    hash(value)
+    return value
+
+
+class SingleFlight:
+
+    # Склейка одинаковых одновременных вызовов: первый вызывающий выполняет работу,
+    # остальные ждут его результат (или исключение). Работа идет отдельной задачей -
+    # отмена одного из ожидающих не отменяет ее для остальных
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self._flights: Dict[Tuple[str, Hashable], Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+
+    def _count(self, namespace: str, name: str):
+
+        with self._lock:
+            stats = self._stats.setdefault(namespace, {'calls': 0, 'executed': 0, 'coalesced': 0, 'errors': 0})
+            stats[name] += 1
+
+    async def do(self, namespace: str, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+
+        if not self.enabled:
+            return await loader()
+
+        loop = asyncio.get_running_loop()
+        flight_key = (namespace, key)
+
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            leader = flight is None or flight['loop'] is not loop
+            if leader:
+                flight = {'loop': loop, 'task': loop.create_task(loader()), 'followers': 0}
+                self._flights[flight_key] = flight
+                flight['task'].add_done_callback(lambda task: self._finish(namespace, flight_key, task))
+            else:
+                flight['followers'] += 1
+
+        self._count(namespace, 'calls')
+        self._count(namespace, 'executed' if leader else 'coalesced')
+        result = await asyncio.shield(flight['task'])
+        # Результат общий - при склейке каждый получает копию, чтобы изменения одного не видели другие
+        return copy.deepcopy(result) if flight['followers'] else result
+
+    def _finish(self, namespace: str, flight_key: Tuple[str, Hashable], task: asyncio.Task):
+
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            if flight is not None and flight['task'] is task:
+                del self._flights[flight_key]
+        if not task.cancelled() and task.exception() is not None:
+            self._count(namespace, 'errors')
+
+    def forget(self, prefix: str):
+
+        # После записи новые чтения не должны присоединяться к начатым до нее.
+        # Сбрасываются все пространства с этим префиксом (лишний сброс безопасен)
+        with self._lock:
+            for flight_key in [flight_key for flight_key in self._flights if flight_key[0].startswith(prefix)]:
+                del self._flights[flight_key]
+
+    def get_stats(self) -> Dict[str, Any]:
+
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'in_flight': len(self._flights),
+                'namespaces': {namespace: dict(stats) for namespace, stats in self._stats.items()}
+            }
+
+
+singleflight = SingleFlight(enabled=settings.SINGLEFLIGHT_ENABLED)
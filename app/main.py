@@ -1,8 +1,16 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
+from starlette.routing import Match
 from datetime import datetime
+import time
 import uvicorn
 
+from app.core.config import settings
+from app.core.dynamodb.call_budget import call_budget
+from app.core.dynamodb.exceptions import CallBudgetExceededError, ServiceUnavailableError, ThrottledError
+from app.core.dynamodb.metrics import dynamodb_metrics, route_scope
+
 app = FastAPI(
     title="Liberandun API",
     description="API для работы с криптовалютными данными, биржами и токенами",
@@ -21,6 +29,61 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def route_template(request: Request) -> str:
+
+    # Шаблон пути (/admin/tokens/{token_id}), а не сам путь - иначе каждый id станет отдельным маршрутом
+    for route in request.app.router.routes:
+        match, _ = route.matches(request.scope)
+        if match == Match.FULL:
+            return f"{request.method} {getattr(route, 'path', request.url.path)}"
+    return f"{request.method} unmatched"
+
+def call_budget_response(route: str, calls: int, budget: int, detail: str = None) -> JSONResponse:
+
+    return JSONResponse(
+        status_code=500,
+        content={
+            "detail": detail or f"Маршрут {route} превысил бюджет вызовов DynamoDB: {calls} > {budget}",
+            "route": route,
+            "calls": calls,
+            "budget": budget
+        }
+    )
+
+@app.middleware("http")
+async def dynamodb_metrics_middleware(request: Request, call_next):
+
+    # Вызовы DynamoDB внутри запроса учитываются на его маршрут и считаются против его бюджета
+    route = route_template(request)
+    started_at = time.perf_counter()
+    status_code = 500
+    with route_scope(route), call_budget.track(route) as calls:
+        try:
+            response = await call_next(request)
+            if calls is not None and calls.over_budget and call_budget.enforce:
+                # Исключение бюджета могло быть проглочено сервисом (except Exception) - ответ все равно ошибка
+                response = call_budget_response(calls.route, calls.calls, calls.budget)
+            status_code = response.status_code
+            if calls is not None and settings.DEVELOPMENT_MODE:
+                response.headers["X-DynamoDB-Calls"] = str(calls.calls)
+            return response
+        finally:
+            dynamodb_metrics.record_request(route, time.perf_counter() - started_at, status_code)
+
+@app.exception_handler(ThrottledError)
+@app.exception_handler(ServiceUnavailableError)
+async def dynamodb_unavailable_handler(request: Request, exc):
+
+    # DynamoDB троттлит или недоступен и после ретраев - 503 вместо пустого ответа
+    headers = {"Retry-After": str(max(1, round(exc.retry_after or 1)))}
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers=headers)
+
+@app.exception_handler(CallBudgetExceededError)
+async def call_budget_exceeded_handler(request: Request, exc: CallBudgetExceededError):
+
+    # Только при DYNAMODB_CALL_BUDGET_ENFORCE: маршрут делает слишком много вызовов DynamoDB (скорее всего N+1)
+    return call_budget_response(exc.route, exc.calls, exc.budget, str(exc))
+
 @app.get("/")
 async def root():
     """Главная страница API"""
@@ -74,6 +137,12 @@ except Exception as e:
 @app.on_event("startup")
 async def startup_event():
     
+    try:
+        from app.core.cache import shared_cache
+        await shared_cache.start()
+    except Exception as e:
+        print(f"[ERROR][APP] - Ошибка запуска общего кэша: {e}")
+
     try:
         from app.core.dynamodb.connector import get_db_connector
         connector = get_db_connector()
@@ -89,6 +158,34 @@ async def startup_event():
     except Exception as e:
         print(f"[ERROR][APP] - Ошибка инициализации: {e}")
 
+    try:
+        import asyncio
+        from app.core.dynamodb.counters import aggregate_counters, run_reconcile_loop
+        if aggregate_counters.enabled:
+            app.state.counters_task = asyncio.create_task(run_reconcile_loop())
+    except Exception as e:
+        print(f"[ERROR][APP] - Ошибка запуска сверки счетчиков: {e}")
+
+    try:
+        import asyncio
+        from app.core.dynamodb.change_feed import change_feed, run_dispatch_loop
+        if change_feed.enabled:
+            app.state.change_feed_task = asyncio.create_task(run_dispatch_loop())
+    except Exception as e:
+        print(f"[ERROR][APP] - Ошибка запуска доставки изменений: {e}")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+
+    for task_name in ('counters_task', 'change_feed_task'):
+        task = getattr(app.state, task_name, None)
+        if task:
+            task.cancel()
+
+    from app.core.cache import shared_cache
+    await shared_cache.stop()
+
 
 
 if __name__ == "__main__":
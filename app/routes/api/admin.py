@@ -4,18 +4,33 @@ from datetime import datetime
 from decimal import Decimal
 import uuid
 
+from boto3.dynamodb.conditions import Attr
+
+from app.core.cache import shared_cache
 from app.core.permissions import require_admin
-from app.core.dynamodb.connector import get_generic_repository, get_db_connector
+from app.core.dynamodb.call_budget import call_budget
+from app.core.dynamodb.connector import get_async_db_connector, get_async_generic_repository, get_db_connector
+from app.core.dynamodb.exceptions import InvalidCursorError, ItemNotFoundError, TransactionCanceledError, VersionConflictError
+from app.core.dynamodb.metrics import dynamodb_metrics
+from app.core.dynamodb.transactions import put_op
 from app.core.security import get_admin_user
 from app.models.market import Token, TokenStats, Exchange, ExchangesStats
 from app.crud.user import update_user_role
 
 router = APIRouter()
 
+NOT_DELETED_FILTER = Attr('is_deleted').not_exists() | Attr('is_deleted').eq(False)
+ACTIVE_USER_FILTER = Attr('is_active').not_exists() | Attr('is_active').eq(True)
+
+async def invalidate_market_cache():
+
+    # Изменения токенов/бирж сбрасывают закэшированные ответы /market на всех воркерах
+    await shared_cache.invalidate_prefix("market:")
+
 @router.post("/tokens")
 async def create_token(token_data: Dict[str, Any], current_user = Depends(require_admin)):
     try:
-        repo = get_generic_repository("LiberandumAggregationToken")
+        repo = get_async_generic_repository("LiberandumAggregationToken")
         
         token_data.update({
             'id': str(uuid.uuid4()),
@@ -25,7 +40,9 @@ async def create_token(token_data: Dict[str, Any], current_user = Depends(requir
             'created_by_admin': current_user['id']
         })
         
-        created_token = repo.create(token_data, auto_id=False)
+        created_token = await repo.create(token_data, auto_id=False)
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Токен создан",
@@ -35,26 +52,96 @@ async def create_token(token_data: Dict[str, Any], current_user = Depends(requir
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка создания токена: {str(e)}")
 
+@router.post("/tokens/full")
+async def create_token_full(payload: Dict[str, Any], current_user = Depends(require_admin)):
+    try:
+        # {"token": {...}, "stats": {...}, "platforms": [{...}, ...]} - одна транзакция на все таблицы,
+        # без осиротевшей статистики при ошибке на середине
+        token_data = dict(payload.get('token') or {})
+        stats_data = payload.get('stats')
+        platforms = payload.get('platforms') or []
+
+        if not token_data:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Не переданы данные токена")
+
+        now = datetime.now().isoformat()
+        audit = {
+            'created_at': now,
+            'updated_at': now,
+            'is_deleted': False,
+            'created_by_admin': current_user['id']
+        }
+
+        token_data.update({'id': str(uuid.uuid4()), **audit})
+        operations = [put_op("LiberandumAggregationToken", token_data, if_not_exists=True)]
+
+        if stats_data:
+            # symbol и coingecko_id - ключи GSI статистики: копируем только заданные значения,
+            # None в ключе индекса отменил бы всю транзакцию
+            inherited = {
+                field: token_data[field] for field in ('symbol', 'coingecko_id')
+                if token_data.get(field) is not None
+            }
+            stats_data = {
+                **inherited,
+                **stats_data,
+                'id': str(uuid.uuid4()),
+                'token_id': token_data['id'],
+                **audit
+            }
+            operations.append(put_op("LiberandumAggregationTokenStats", stats_data, if_not_exists=True))
+
+        platform_items = []
+        for platform in platforms:
+            platform_item = {**platform, 'id': str(uuid.uuid4()), 'token_id': token_data['id'], **audit}
+            platform_items.append(platform_item)
+            operations.append(put_op("LiberandumAggregationTokenPlatform", platform_item, if_not_exists=True))
+
+        # Токен идемпотентности - один на запрос: повторы этого же вызова (ретраи после таймаута)
+        # не применят транзакцию второй раз
+        await get_async_db_connector().transact_write(operations, client_token=str(uuid.uuid4()))
+
+        await invalidate_market_cache()
+
+        return {
+            "message": "Токен создан вместе со статистикой и платформами",
+            "token": token_data,
+            "stats": stats_data,
+            "platforms": platform_items,
+            "admin": current_user['email']
+        }
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except TransactionCanceledError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail={"message": str(e), "reasons": e.reasons})
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка создания токена: {str(e)}")
+
 @router.get("/tokens")
-async def list_tokens(limit: Optional[int] = Query(default=500), current_user = Depends(get_admin_user)):
+async def list_tokens(limit: Optional[int] = Query(default=500, ge=1), cursor: Optional[str] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationToken")
-        items = repo.scan_items("LiberandumAggregationToken", limit=limit)
-        active_tokens = [token for token in items if not token.get('is_deleted', False)]
+        repo = get_async_generic_repository("LiberandumAggregationToken")
+        page = await repo.list_page(limit=limit, cursor=cursor, filter_expression=NOT_DELETED_FILTER)
+        active_tokens = page['items']
         
         return {
             "total": len(active_tokens),
             "tokens": active_tokens,
+            "next_cursor": page['next_cursor'],
             "admin": current_user['email']
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения токенов: {str(e)}")
 
 @router.get("/tokens/{token_id}")
 async def get_token(token_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationToken")
-        token = repo.get_by_id(token_id)
+        repo = get_async_generic_repository("LiberandumAggregationToken")
+        token = await repo.get_by_id(token_id)
         
         if not token:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Токен не найден")
@@ -69,20 +156,18 @@ async def get_token(token_id: str, current_user = Depends(get_admin_user)):
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения токена: {str(e)}")
 
 @router.put("/tokens/{token_id}")
-async def update_token(token_id: str, updates: Dict[str, Any], current_user = Depends(get_admin_user)):
+async def update_token(token_id: str, updates: Dict[str, Any], expected_version: Optional[int] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationToken")
-        
-        existing_token = repo.get_by_id(token_id)
-        if not existing_token:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Токен не найден")
+        repo = get_async_generic_repository("LiberandumAggregationToken")
         
         updates.update({
             'updated_at': datetime.now().isoformat(),
             'updated_by_admin': current_user['id']
         })
         
-        updated_token = repo.update_by_id(token_id, updates)
+        updated_token = await repo.update_by_id(token_id, updates, must_exist=True, expected_version=expected_version)
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Токен обновлен",
@@ -91,23 +176,24 @@ async def update_token(token_id: str, updates: Dict[str, Any], current_user = De
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Токен не найден")
+    except VersionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка обновления токена: {str(e)}")
 
 @router.delete("/tokens/{token_id}")
 async def delete_token(token_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationToken")
+        repo = get_async_generic_repository("LiberandumAggregationToken")
         
-        existing_token = repo.get_by_id(token_id)
-        if not existing_token:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Токен не найден")
-        
-        repo.update_by_id(token_id, {
-            'is_deleted': True,
+        await repo.soft_delete(token_id, {
             'deleted_at': datetime.now().isoformat(),
             'deleted_by_admin': current_user['id']
-        })
+        }, return_values='NONE')
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Токен удален",
@@ -116,13 +202,15 @@ async def delete_token(token_id: str, current_user = Depends(get_admin_user)):
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Токен не найден")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка удаления токена: {str(e)}")
 
 @router.post("/token-stats")
 async def create_token_stats(stats_data: Dict[str, Any], current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationTokenStats")
+        repo = get_async_generic_repository("LiberandumAggregationTokenStats")
         
         stats_data.update({
             'id': str(uuid.uuid4()),
@@ -132,7 +220,9 @@ async def create_token_stats(stats_data: Dict[str, Any], current_user = Depends(
             'created_by_admin': current_user['id']
         })
         
-        created_stats = repo.create(stats_data, auto_id=False)
+        created_stats = await repo.create(stats_data, auto_id=False)
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Статистика токена создана",
@@ -143,25 +233,28 @@ async def create_token_stats(stats_data: Dict[str, Any], current_user = Depends(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка создания статистики: {str(e)}")
 
 @router.get("/token-stats")
-async def list_token_stats(limit: Optional[int] = Query(default=500), current_user = Depends(get_admin_user)):
+async def list_token_stats(limit: Optional[int] = Query(default=500, ge=1), cursor: Optional[str] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationTokenStats")
-        items = repo.scan_items("LiberandumAggregationTokenStats", limit=limit)
-        active_stats = [stats for stats in items if not stats.get('is_deleted', False)]
+        repo = get_async_generic_repository("LiberandumAggregationTokenStats")
+        page = await repo.list_page(limit=limit, cursor=cursor, filter_expression=NOT_DELETED_FILTER)
+        active_stats = page['items']
         
         return {
             "total": len(active_stats),
             "token_stats": active_stats,
+            "next_cursor": page['next_cursor'],
             "admin": current_user['email']
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения статистики: {str(e)}")
 
 @router.get("/token-stats/{stats_id}")
 async def get_token_stats(stats_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationTokenStats")
-        stats = repo.get_by_id(stats_id)
+        repo = get_async_generic_repository("LiberandumAggregationTokenStats")
+        stats = await repo.get_by_id(stats_id)
         
         if not stats:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
@@ -176,20 +269,18 @@ async def get_token_stats(stats_id: str, current_user = Depends(get_admin_user))
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения статистики: {str(e)}")
 
 @router.put("/token-stats/{stats_id}")
-async def update_token_stats(stats_id: str, updates: Dict[str, Any], current_user = Depends(get_admin_user)):
+async def update_token_stats(stats_id: str, updates: Dict[str, Any], expected_version: Optional[int] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationTokenStats")
-        
-        existing_stats = repo.get_by_id(stats_id)
-        if not existing_stats:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
+        repo = get_async_generic_repository("LiberandumAggregationTokenStats")
         
         updates.update({
             'updated_at': datetime.now().isoformat(),
             'updated_by_admin': current_user['id']
         })
         
-        updated_stats = repo.update_by_id(stats_id, updates)
+        updated_stats = await repo.update_by_id(stats_id, updates, must_exist=True, expected_version=expected_version)
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Статистика обновлена",
@@ -198,23 +289,24 @@ async def update_token_stats(stats_id: str, updates: Dict[str, Any], current_use
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
+    except VersionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка обновления статистики: {str(e)}")
 
 @router.delete("/token-stats/{stats_id}")
 async def delete_token_stats(stats_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationTokenStats")
+        repo = get_async_generic_repository("LiberandumAggregationTokenStats")
         
-        existing_stats = repo.get_by_id(stats_id)
-        if not existing_stats:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
-        
-        repo.update_by_id(stats_id, {
-            'is_deleted': True,
+        await repo.soft_delete(stats_id, {
             'deleted_at': datetime.now().isoformat(),
             'deleted_by_admin': current_user['id']
-        })
+        }, return_values='NONE')
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Статистика удалена",
@@ -223,13 +315,15 @@ async def delete_token_stats(stats_id: str, current_user = Depends(get_admin_use
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка удаления статистики: {str(e)}")
 
 @router.post("/exchanges")
 async def create_exchange(exchange_data: Dict[str, Any], current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchanges")
+        repo = get_async_generic_repository("LiberandumAggregationExchanges")
         
         exchange_data.update({
             'id': str(uuid.uuid4()),
@@ -239,7 +333,9 @@ async def create_exchange(exchange_data: Dict[str, Any], current_user = Depends(
             'created_by_admin': current_user['id']
         })
         
-        created_exchange = repo.create(exchange_data, auto_id=False)
+        created_exchange = await repo.create(exchange_data, auto_id=False)
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Биржа создана",
@@ -250,25 +346,28 @@ async def create_exchange(exchange_data: Dict[str, Any], current_user = Depends(
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка создания биржи: {str(e)}")
 
 @router.get("/exchanges")
-async def list_exchanges(limit: Optional[int] = Query(default=250), current_user = Depends(get_admin_user)):
+async def list_exchanges(limit: Optional[int] = Query(default=250, ge=1), cursor: Optional[str] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchanges")
-        items = repo.scan_items("LiberandumAggregationExchanges", limit=limit)
-        active_exchanges = [exchange for exchange in items if not exchange.get('is_deleted', False)]
+        repo = get_async_generic_repository("LiberandumAggregationExchanges")
+        page = await repo.list_page(limit=limit, cursor=cursor, filter_expression=NOT_DELETED_FILTER)
+        active_exchanges = page['items']
         
         return {
             "total": len(active_exchanges),
             "exchanges": active_exchanges,
+            "next_cursor": page['next_cursor'],
             "admin": current_user['email']
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения бирж: {str(e)}")
 
 @router.get("/exchanges/{exchange_id}")
 async def get_exchange(exchange_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchanges")
-        exchange = repo.get_by_id(exchange_id)
+        repo = get_async_generic_repository("LiberandumAggregationExchanges")
+        exchange = await repo.get_by_id(exchange_id)
         
         if not exchange:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Биржа не найдена")
@@ -283,20 +382,18 @@ async def get_exchange(exchange_id: str, current_user = Depends(get_admin_user))
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения биржи: {str(e)}")
 
 @router.put("/exchanges/{exchange_id}")
-async def update_exchange(exchange_id: str, updates: Dict[str, Any], current_user = Depends(get_admin_user)):
+async def update_exchange(exchange_id: str, updates: Dict[str, Any], expected_version: Optional[int] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchanges")
-        
-        existing_exchange = repo.get_by_id(exchange_id)
-        if not existing_exchange:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Биржа не найдена")
+        repo = get_async_generic_repository("LiberandumAggregationExchanges")
         
         updates.update({
             'updated_at': datetime.now().isoformat(),
             'updated_by_admin': current_user['id']
         })
         
-        updated_exchange = repo.update_by_id(exchange_id, updates)
+        updated_exchange = await repo.update_by_id(exchange_id, updates, must_exist=True, expected_version=expected_version)
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Биржа обновлена",
@@ -305,23 +402,24 @@ async def update_exchange(exchange_id: str, updates: Dict[str, Any], current_use
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Биржа не найдена")
+    except VersionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка обновления биржи: {str(e)}")
 
 @router.delete("/exchanges/{exchange_id}")
 async def delete_exchange(exchange_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchanges")
-        
-        existing_exchange = repo.get_by_id(exchange_id)
-        if not existing_exchange:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Биржа не найдена")
+        repo = get_async_generic_repository("LiberandumAggregationExchanges")
         
-        repo.update_by_id(exchange_id, {
-            'is_deleted': True,
+        await repo.soft_delete(exchange_id, {
             'deleted_at': datetime.now().isoformat(),
             'deleted_by_admin': current_user['id']
-        })
+        }, return_values='NONE')
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Биржа удалена",
@@ -330,13 +428,15 @@ async def delete_exchange(exchange_id: str, current_user = Depends(get_admin_use
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Биржа не найдена")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка удаления биржи: {str(e)}")
 
 @router.post("/exchange-stats")
 async def create_exchange_stats(stats_data: Dict[str, Any], current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchangesStats")
+        repo = get_async_generic_repository("LiberandumAggregationExchangesStats")
         
         stats_data.update({
             'id': str(uuid.uuid4()),
@@ -346,7 +446,9 @@ async def create_exchange_stats(stats_data: Dict[str, Any], current_user = Depen
             'created_by_admin': current_user['id']
         })
         
-        created_stats = repo.create(stats_data, auto_id=False)
+        created_stats = await repo.create(stats_data, auto_id=False)
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Статистика биржи создана",
@@ -357,25 +459,28 @@ async def create_exchange_stats(stats_data: Dict[str, Any], current_user = Depen
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка создания статистики: {str(e)}")
 
 @router.get("/exchange-stats")
-async def list_exchange_stats(limit: Optional[int] = Query(default=50), current_user = Depends(get_admin_user)):
+async def list_exchange_stats(limit: Optional[int] = Query(default=50, ge=1), cursor: Optional[str] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchangesStats")
-        items = repo.scan_items("LiberandumAggregationExchangesStats", limit=limit)
-        active_stats = [stats for stats in items if not stats.get('is_deleted', False)]
+        repo = get_async_generic_repository("LiberandumAggregationExchangesStats")
+        page = await repo.list_page(limit=limit, cursor=cursor, filter_expression=NOT_DELETED_FILTER)
+        active_stats = page['items']
         
         return {
             "total": len(active_stats),
             "exchange_stats": active_stats,
+            "next_cursor": page['next_cursor'],
             "admin": current_user['email']
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения статистики: {str(e)}")
 
 @router.get("/exchange-stats/{stats_id}")
 async def get_exchange_stats(stats_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchangesStats")
-        stats = repo.get_by_id(stats_id)
+        repo = get_async_generic_repository("LiberandumAggregationExchangesStats")
+        stats = await repo.get_by_id(stats_id)
         
         if not stats:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
@@ -390,20 +495,18 @@ async def get_exchange_stats(stats_id: str, current_user = Depends(get_admin_use
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения статистики: {str(e)}")
 
 @router.put("/exchange-stats/{stats_id}")
-async def update_exchange_stats(stats_id: str, updates: Dict[str, Any], current_user = Depends(get_admin_user)):
+async def update_exchange_stats(stats_id: str, updates: Dict[str, Any], expected_version: Optional[int] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchangesStats")
-        
-        existing_stats = repo.get_by_id(stats_id)
-        if not existing_stats:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
+        repo = get_async_generic_repository("LiberandumAggregationExchangesStats")
         
         updates.update({
             'updated_at': datetime.now().isoformat(),
             'updated_by_admin': current_user['id']
         })
         
-        updated_stats = repo.update_by_id(stats_id, updates)
+        updated_stats = await repo.update_by_id(stats_id, updates, must_exist=True, expected_version=expected_version)
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Статистика обновлена",
@@ -412,23 +515,24 @@ async def update_exchange_stats(stats_id: str, updates: Dict[str, Any], current_
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
+    except VersionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка обновления статистики: {str(e)}")
 
 @router.delete("/exchange-stats/{stats_id}")
 async def delete_exchange_stats(stats_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("LiberandumAggregationExchangesStats")
-        
-        existing_stats = repo.get_by_id(stats_id)
-        if not existing_stats:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
+        repo = get_async_generic_repository("LiberandumAggregationExchangesStats")
         
-        repo.update_by_id(stats_id, {
-            'is_deleted': True,
+        await repo.soft_delete(stats_id, {
             'deleted_at': datetime.now().isoformat(),
             'deleted_by_admin': current_user['id']
-        })
+        }, return_values='NONE')
+        
+        await invalidate_market_cache()
         
         return {
             "message": "Статистика удалена",
@@ -437,15 +541,17 @@ async def delete_exchange_stats(stats_id: str, current_user = Depends(get_admin_
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Статистика не найдена")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка удаления статистики: {str(e)}")
 
 @router.get("/users")
-async def list_users(limit: Optional[int] = Query(default=50), current_user = Depends(get_admin_user)):
+async def list_users(limit: Optional[int] = Query(default=50, ge=1), cursor: Optional[str] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("users")
-        items = repo.scan_items("users", limit=limit)
-        active_users = [user for user in items if user.get('is_active', True)]
+        repo = get_async_generic_repository("users")
+        page = await repo.list_page(limit=limit, cursor=cursor, filter_expression=ACTIVE_USER_FILTER)
+        active_users = page['items']
         
         for user in active_users:
             user.pop('hashed_password', None)
@@ -455,16 +561,19 @@ async def list_users(limit: Optional[int] = Query(default=50), current_user = De
         return {
             "total": len(active_users),
             "users": active_users,
+            "next_cursor": page['next_cursor'],
             "admin": current_user['email']
         }
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения пользователей: {str(e)}")
 
 @router.get("/users/{user_id}")
 async def get_user_by_admin(user_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("users")
-        user = repo.get_by_id(user_id)
+        repo = get_async_generic_repository("users")
+        user = await repo.get_by_id(user_id)
         
         if not user:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
@@ -483,13 +592,9 @@ async def get_user_by_admin(user_id: str, current_user = Depends(get_admin_user)
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения пользователя: {str(e)}")
 
 @router.put("/users/{user_id}")
-async def update_user_by_admin(user_id: str, updates: Dict[str, Any], current_user = Depends(get_admin_user)):
+async def update_user_by_admin(user_id: str, updates: Dict[str, Any], expected_version: Optional[int] = Query(default=None), current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("users")
-        
-        existing_user = repo.get_by_id(user_id)
-        if not existing_user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
+        repo = get_async_generic_repository("users")
         
         if 'hashed_password' in updates or 'password' in updates:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Изменение пароля запрещено через этот эндпоинт")
@@ -499,7 +604,7 @@ async def update_user_by_admin(user_id: str, updates: Dict[str, Any], current_us
             'updated_by_admin': current_user['id']
         })
         
-        updated_user = repo.update_by_id(user_id, updates)
+        updated_user = await repo.update_by_id(user_id, updates, must_exist=True, expected_version=expected_version)
         updated_user.pop('hashed_password', None)
         updated_user.pop('access_token', None)
         updated_user.pop('refresh_token', None)
@@ -511,6 +616,10 @@ async def update_user_by_admin(user_id: str, updates: Dict[str, Any], current_us
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
+    except VersionConflictError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка обновления пользователя: {str(e)}")
 
@@ -539,20 +648,16 @@ async def update_user_role_by_admin(user_id: str, role: str, current_user = Depe
 @router.put("/users/{user_id}/deactivate")
 async def deactivate_user_by_admin(user_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("users")
-        
-        existing_user = repo.get_by_id(user_id)
-        if not existing_user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
+        repo = get_async_generic_repository("users")
         
         if user_id == current_user['id']:
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Нельзя деактивировать самого себя")
         
-        updated_user = repo.update_by_id(user_id, {
+        updated_user = await repo.update_by_id(user_id, {
             'is_active': False,
             'deactivated_at': datetime.now().isoformat(),
             'deactivated_by_admin': current_user['id']
-        })
+        }, must_exist=True, return_values='NONE')
         
         return {
             "message": "Пользователь деактивирован",
@@ -561,23 +666,21 @@ async def deactivate_user_by_admin(user_id: str, current_user = Depends(get_admi
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка деактивации пользователя: {str(e)}")
 
 @router.put("/users/{user_id}/activate")
 async def activate_user_by_admin(user_id: str, current_user = Depends(get_admin_user)):
     try:
-        repo = get_generic_repository("users")
+        repo = get_async_generic_repository("users")
         
-        existing_user = repo.get_by_id(user_id)
-        if not existing_user:
-            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
-        
-        updated_user = repo.update_by_id(user_id, {
+        updated_user = await repo.update_by_id(user_id, {
             'is_active': True,
             'activated_at': datetime.now().isoformat(),
             'activated_by_admin': current_user['id']
-        })
+        }, must_exist=True, return_values='NONE')
         
         return {
             "message": "Пользователь активирован",
@@ -586,5 +689,61 @@ async def activate_user_by_admin(user_id: str, current_user = Depends(get_admin_
         }
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Пользователь не найден")
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка активации пользователя: {str(e)}")
+@router.get("/counters/{table_name}")
+async def get_table_counters(table_name: str, current_user = Depends(get_admin_user)):
+    try:
+        repo = get_async_generic_repository(table_name)
+        stats = await repo.get_stats()
+        
+        return {
+            "stats": stats,
+            "admin": current_user['email']
+        }
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка активации пользователя: {str(e)}")
\ No newline at end of file
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка получения счетчиков: {str(e)}")
+
+@router.post("/counters/{table_name}/reconcile")
+async def reconcile_table_counters(table_name: str, current_user = Depends(require_admin)):
+    try:
+        repo = get_async_generic_repository(table_name)
+        report = await repo.reconcile_counters()
+        
+        return {
+            "message": "Счетчики пересчитаны",
+            "report": report,
+            "admin": current_user['email']
+        }
+    except Exception as e:
+        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=f"Ошибка сверки счетчиков: {str(e)}")
+
+@router.get("/metrics/dynamodb")
+async def get_dynamodb_metrics(
+    sort_by: str = Query("read_capacity_units", description="read_capacity_units | write_capacity_units | calls | items_scanned"),
+    current_user = Depends(get_admin_user)
+):
+    # Маршруты и таблицы по убыванию расхода емкости: видно, кто сканирует больше, чем отдает
+    return {
+        "metrics": dynamodb_metrics.get_stats(sort_by=sort_by),
+        "admin": current_user['email']
+    }
+
+@router.post("/metrics/dynamodb/reset")
+async def reset_dynamodb_metrics(current_user = Depends(require_admin)):
+    dynamodb_metrics.reset()
+    call_budget.reset()
+    return {
+        "message": "Метрики DynamoDB сброшены",
+        "admin": current_user['email']
+    }
+
+@router.get("/metrics/dynamodb/call-budget")
+async def get_dynamodb_call_budget(current_user = Depends(get_admin_user)):
+    # Вызовы DynamoDB на запрос по маршрутам, превышения бюджета и найденные N+1 со стеком
+    return {
+        "call_budget": call_budget.get_stats(),
+        "admin": current_user['email']
+    }
@@ -3,11 +3,21 @@ from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from app.core.security import get_current_user
-from app.core.dynamodb.connector import get_generic_repository, get_db_connector
+from app.core.dynamodb.connector import get_async_generic_repository, get_db_connector
+from app.core.dynamodb.exceptions import InvalidCursorError, ItemNotFoundError, VersionConflictError
 
 router = APIRouter()
 
 
+def _parse_fields(fields: Optional[str]) -> Optional[List[str]]:
+
+    # "?fields=id,name,price" -> ['id', 'name', 'price']; пустое значение - весь элемент
+    if not fields:
+        return None
+    parsed = [field.strip() for field in fields.split(',') if field.strip()]
+    return parsed or None
+
+
 @router.post("/tables/{table_name}/items")
 async def create_item(
     table_name: str,
@@ -16,7 +26,7 @@ async def create_item(
 ):
 
     try:
-        repo = get_generic_repository(table_name)
+        repo = get_async_generic_repository(table_name)
         if not repo:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
@@ -26,7 +36,7 @@ async def create_item(
         item_data['created_by'] = current_user['id']
         item_data['created_by_email'] = current_user['email']
         
-        created_item = repo.create(item_data)
+        created_item = await repo.create(item_data)
         
         
         return {
@@ -51,14 +61,14 @@ async def get_item(
     current_user = Depends(get_current_user)
 ):
     try:
-        repo = get_generic_repository(table_name)
+        repo = get_async_generic_repository(table_name)
         if not repo:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="База данных недоступна"
             )
         
-        item = repo.get_by_id(item_id)
+        item = await repo.get_by_id(item_id)
         if not item:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -86,27 +96,26 @@ async def update_item(
     table_name: str,
     item_id: str,
     updates: Dict[str, Any],
+    expected_version: Optional[int] = Query(default=None, description="Версия элемента для оптимистической блокировки"),
     current_user = Depends(get_current_user)
 ):
     try:
-        repo = get_generic_repository(table_name)
+        repo = get_async_generic_repository(table_name)
         if not repo:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="База данных недоступна"
             )
         
-        existing_item = repo.get_by_id(item_id)
-        if not existing_item:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Элемент не найден"
-            )
-        
         updates['updated_by'] = current_user['id']
         updates['updated_by_email'] = current_user['email']
         
-        updated_item = repo.update_by_id(item_id, updates)
+        updated_item = await repo.update_by_id(
+            item_id,
+            updates,
+            must_exist=True,
+            expected_version=expected_version
+        )
         
         print(f"[INFO][API] - Элемент {item_id} обновлен в таблице {table_name} пользователем {current_user['email']}")
         
@@ -120,6 +129,16 @@ async def update_item(
         
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Элемент не найден"
+        )
+    except VersionConflictError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     except Exception as e:
         print(f"[ERROR][API] - Ошибка обновления элемента {item_id} в {table_name}: {e}")
         raise HTTPException(
@@ -134,21 +153,14 @@ async def delete_item(
     current_user = Depends(get_current_user)
 ):
     try:
-        repo = get_generic_repository(table_name)
+        repo = get_async_generic_repository(table_name)
         if not repo:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="База данных недоступна"
             )
         
-        existing_item = repo.get_by_id(item_id)
-        if not existing_item:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="Элемент не найден"
-            )
-        
-        success = repo.delete_by_id(item_id)
+        success = await repo.delete_by_id(item_id, must_exist=True)
         if not success:
             raise HTTPException(
                 status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -166,6 +178,11 @@ async def delete_item(
         
     except HTTPException:
         raise
+    except ItemNotFoundError:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Элемент не найден"
+        )
     except Exception as e:
         print(f"[ERROR][API] - Ошибка удаления элемента {item_id} из {table_name}: {e}")
         raise HTTPException(
@@ -178,27 +195,38 @@ async def delete_item(
 @router.get("/tables/{table_name}/items")
 async def list_items(
     table_name: str,
-    limit: Optional[int] = Query(default=50, le=1000),
+    limit: Optional[int] = Query(default=50, ge=1, le=1000),
+    cursor: Optional[str] = Query(default=None, description="Курсор следующей страницы (next_cursor)"),
+    fields: Optional[str] = Query(default=None, description="Список атрибутов через запятую"),
     current_user = Depends(get_current_user)
 ):
     try:
-        repo = get_generic_repository(table_name)
+        repo = get_async_generic_repository(table_name)
         if not repo:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="База данных недоступна"
             )
         
-        items = repo.list_all(limit=limit)
+        page = await repo.list_page(limit=limit, cursor=cursor, fields=_parse_fields(fields))
+        items = page['items']
         
         return {
             "table_name": table_name,
             "total_items": len(items),
             "limit": limit,
             "items": items,
+            "next_cursor": page['next_cursor'],
             "requested_by": current_user['email']
         }
         
+    except HTTPException:
+        raise
+    except InvalidCursorError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
     except Exception as e:
         print(f"[ERROR][API] - Ошибка получения списка из {table_name}: {e}")
         raise HTTPException(
@@ -212,6 +240,7 @@ async def search_items(
     field: str = Query(..., description="Поле для поиска"),
     value: str = Query(..., description="Значение для поиска"),
     search_type: str = Query(default="exact", regex="^(exact|contains)$"),
+    fields: Optional[str] = Query(default=None, description="Список атрибутов через запятую"),
     current_user = Depends(get_current_user)
 ):
    
@@ -219,17 +248,20 @@ async def search_items(
     # search_type: exact (точное совпадение) или contains (содержит)
 
     try:
-        repo = get_generic_repository(table_name)
+        repo = get_async_generic_repository(table_name)
         if not repo:
             raise HTTPException(
                 status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
                 detail="База данных недоступна"
             )
         
+        projection = _parse_fields(fields)
         if search_type == "exact":
-            items = repo.find_by_field(field, value)
+            query_plan = await repo.explain_find_by_field(field, projection)
+            items = await repo.find_by_field(field, value, fields=projection)
         elif search_type == "contains":
-            items = repo.search_by_pattern(field, value)
+            query_plan = {"strategy": "scan", "index_name": None, "reason": "contains не поддерживается ключами"}
+            items = await repo.search_by_pattern(field, value, fields=projection)
         else:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
@@ -243,6 +275,7 @@ async def search_items(
             "search_type": search_type,
             "results_count": len(items),
             "items": items,
+            "query_plan": query_plan,
             "searched_by": current_user['email']
         }
         
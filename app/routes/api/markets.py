@@ -31,7 +31,7 @@ async def get_tokens_list(
                 detail="Неверное поле сортировки. Доступные: market_cap, volume"
             )
         
-        result = market_service.get_tokens_list(page=page, limit=limit, sort=sort)
+        result = await market_service.get_tokens_list(page=page, limit=limit, sort=sort)
         
         if not result.data:
             print(f"[WARNING][Market] - Токены не найдены на странице {page}")
@@ -56,7 +56,7 @@ async def check_existing_tables(
     Проверяет подключение к готовым таблицам без создания тестовых данных
     """
     try:
-        result = market_service.create_sample_data()
+        result = await market_service.create_sample_data()
         
         if "error" in result:
             raise HTTPException(
@@ -85,7 +85,7 @@ async def get_database_statistics(
     Показывает количество записей и статус каждой таблицы
     """
     try:
-        result = market_service.get_table_statistics()
+        result = await market_service.get_table_statistics()
         
         if "error" in result:
             raise HTTPException(
@@ -108,10 +108,10 @@ async def get_database_statistics(
 async def market_health_check():
     """Проверка здоровья Market API"""
     try:
-        table_check = market_service.create_sample_data()
+        table_check = await market_service.create_sample_data()
         
-        tokens_result = market_service.get_tokens_list(limit=1)
-        exchanges_result = market_service.get_exchanges_list()
+        tokens_result = await market_service.get_tokens_list(limit=1)
+        exchanges_result = await market_service.get_exchanges_list()
         
         return {
             "status": "healthy",
@@ -154,7 +154,7 @@ async def get_token_detail(
     - **token_id**: Идентификатор токена (например, "bitcoin", "ethereum")
     """
     try:
-        result = market_service.get_token_detail(token_id)
+        result = await market_service.get_token_detail(token_id)
         
         if not result:
             raise HTTPException(
@@ -209,7 +209,7 @@ async def get_token_chart(
 async def get_exchanges_list():
 
     try:
-        result = market_service.get_exchanges_list()
+        result = await market_service.get_exchanges_list()
         
         if not result.data:
             print(f"[WARNING][Market] - Биржи не найдены")
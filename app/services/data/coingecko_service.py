@@ -3,9 +3,17 @@ import asyncio
 from typing import Dict, Any, Optional, List
 from datetime import datetime, timedelta
 import time
+from app.core.cache import shared_cache
 from app.core.config import settings
+from app.core.singleflight import singleflight
 
 class CoinGeckoService:
+
+    # TTL ответов в общем кэше: цены меняются часто, описание монеты - редко
+    PRICE_CACHE_TTL = 15.0
+    CHART_CACHE_TTL = 60.0
+    COIN_INFO_CACHE_TTL = 300.0
+
     def __init__(self):
         self.base_url = "https://api.coingecko.com/api/v3"
         self.pro_base_url = "https://pro-api.coingecko.com/api/v3"
@@ -35,6 +43,30 @@ class CoinGeckoService:
 
         return self.pro_base_url if self.use_pro else self.base_url
         
+    async def _cached_request(self, endpoint: str, params: Dict[str, Any] = None,
+                              ttl: float = None) -> Optional[Dict[str, Any]]:
+
+        # Один запрос к CoinGecko на все воркеры: ответ кладется в общий кэш
+        params_key = "&".join(f"{name}={value}" for name, value in sorted((params or {}).items()))
+        cache_key = f"coingecko:{self.use_pro}:{endpoint}?{params_key}"
+
+        # Одновременные промахи по одному ключу в этом процессе - один HTTP-запрос
+        return await singleflight.do(
+            'coingecko', cache_key, lambda: self._load_cached(cache_key, endpoint, params, ttl)
+        )
+
+    async def _load_cached(self, cache_key: str, endpoint: str, params: Optional[Dict[str, Any]],
+                           ttl: Optional[float]) -> Optional[Dict[str, Any]]:
+
+        cached = await shared_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        data = await self._make_request(endpoint, params)
+        if data is not None:
+            await shared_cache.set(cache_key, data, ttl=ttl)
+        return data
+
     async def _make_request(self, endpoint: str, params: Dict[str, Any] = None) -> Optional[Dict[str, Any]]:
 
         try:
@@ -100,6 +132,13 @@ class CoinGeckoService:
     
     async def get_token_chart_data(self, token_id: str, timeframe: str, currency: str = "usd") -> Optional[Dict[str, Any]]:
 
+        return await singleflight.do(
+            'coingecko:chart', (token_id, timeframe, currency),
+            lambda: self._load_token_chart_data(token_id, timeframe, currency)
+        )
+
+    async def _load_token_chart_data(self, token_id: str, timeframe: str, currency: str) -> Optional[Dict[str, Any]]:
+
         days = self._get_days_from_timeframe(timeframe)
         interval = self._get_interval_from_timeframe(timeframe)
         
@@ -113,11 +152,13 @@ class CoinGeckoService:
         elif not self.use_pro and days != "1":
             params["interval"] = interval
         
-        chart_data = await self._make_request(f"/coins/{token_id}/market_chart", params)
+        chart_data = await self._cached_request(
+            f"/coins/{token_id}/market_chart", params, ttl=self.CHART_CACHE_TTL
+        )
         if not chart_data:
             return None
         
-        coin_info = await self._make_request(f"/coins/{token_id}")
+        coin_info = await self._cached_request(f"/coins/{token_id}", ttl=self.COIN_INFO_CACHE_TTL)
         if not coin_info:
             return None
         
@@ -173,13 +214,13 @@ class CoinGeckoService:
                 "precision": "full"
             })
         
-        data = await self._make_request("/simple/price", params)
+        data = await self._cached_request("/simple/price", params, ttl=self.PRICE_CACHE_TTL)
         if not data or token_id not in data:
             return None
         
         token_data = data[token_id]
         
-        coin_info = await self._make_request(f"/coins/{token_id}")
+        coin_info = await self._cached_request(f"/coins/{token_id}", ttl=self.COIN_INFO_CACHE_TTL)
         symbol = coin_info.get("symbol", "").upper() if coin_info else token_id.upper()
         
         return {
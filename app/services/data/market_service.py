@@ -3,7 +3,11 @@ from decimal import Decimal
 from datetime import datetime
 import uuid
 
-from app.core.dynamodb.connector import get_generic_repository
+from app.core.cache import shared_cache
+from app.core.config import settings
+from app.core.singleflight import singleflight
+from app.core.dynamodb.connector import get_async_generic_repository
+from app.core.dynamodb.views import ExchangeRankingView, view_registry
 from app.schemas.market import (
     TokenResponse, TokenDetailResponse, TokenListResponse,
     ExchangeResponse, ExchangeListResponse,
@@ -11,6 +15,12 @@ from app.schemas.market import (
     HalalStatus, MarketData, Statistics, AllTimeHigh, AllTimeLow, PriceIndicators24h
 )
 
+# Атрибуты, которые реально нужны списку токенов (_simple_convert_token + сортировка)
+TOKEN_LIST_FIELDS = [
+    'coingecko_id', 'symbol', 'coin_name', 'price',
+    'market_cap', 'trading_volume_24h', 'is_deleted'
+]
+
 class MarketDataService:
     def __init__(self):
         self.token_stats_table = "LiberandumAggregationTokenStats"
@@ -19,16 +29,31 @@ class MarketDataService:
         self.exchange_stats_table = "LiberandumAggregationExchangesStats"
         self.exchanges_table = "LiberandumAggregationExchanges"
 
+        self.exchange_ranking_view = view_registry.register(ExchangeRankingView(self.exchange_stats_table))
+
     def _get_repository(self, table_name: str):
 
-        repo = get_generic_repository(table_name)
+        repo = get_async_generic_repository(table_name)
         if not repo:
             raise RuntimeError(f"Репозиторий для таблицы {table_name} недоступен")
         return repo
 
     # =============== TOKENS ===============
 
-    def get_tokens_list(self, page: int = 1, limit: int = 100, sort: Optional[str] = None) -> TokenListResponse:
+    async def get_tokens_list(self, page: int = 1, limit: int = 100, sort: Optional[str] = None) -> TokenListResponse:
+
+        cache_key = f"market:tokens:{page}:{limit}:{sort}"
+        cached = await shared_cache.get(cache_key)
+        if cached is not None:
+            return TokenListResponse.model_validate(cached)
+
+        response = await self._load_tokens_list(page, limit, sort)
+        # Пустой ответ может быть результатом ошибки - такой не кэшируем
+        if response.data:
+            await shared_cache.set(cache_key, response.model_dump(mode='json'), ttl=settings.CACHE_MARKET_TTL)
+        return response
+
+    async def _load_tokens_list(self, page: int, limit: int, sort: Optional[str]) -> TokenListResponse:
 
         try:
             print(f"[DEBUG] === НАЧАЛО get_tokens_list ===")
@@ -43,9 +68,10 @@ class MarketDataService:
             scan_limit = min(limit * 2, 50) 
             print(f"[DEBUG] Сканируем с лимитом {scan_limit}")
             
-            all_token_stats = token_stats_repo.scan_items(
+            all_token_stats = await token_stats_repo.scan_items(
                 self.token_stats_table,
-                limit=scan_limit
+                limit=scan_limit,
+                projection=TOKEN_LIST_FIELDS
             )
             
             print(f"[DEBUG] Получено {len(all_token_stats)} записей из scan")
@@ -158,13 +184,26 @@ class MarketDataService:
                 sparkline_in_7d=TokenSparkline(price=[0.0] * 7)
             )
 
-    def get_token_detail(self, token_id: str) -> Optional[TokenDetailResponse]:
+    async def get_token_detail(self, token_id: str) -> Optional[TokenDetailResponse]:
+
+        cache_key = f"market:token:{token_id}"
+        cached = await shared_cache.get(cache_key)
+        if cached is not None:
+            return TokenDetailResponse.model_validate(cached)
+
+        # Всплеск запросов одной страницы токена - один поход в репозитории
+        response = await singleflight.do('market:token', token_id, lambda: self._load_token_detail(token_id))
+        if response is not None:
+            await shared_cache.set(cache_key, response.model_dump(mode='json'), ttl=settings.CACHE_MARKET_TTL)
+        return response
+
+    async def _load_token_detail(self, token_id: str) -> Optional[TokenDetailResponse]:
 
         try:
             token_stats_repo = self._get_repository(self.token_stats_table)
             tokens_repo = self._get_repository(self.tokens_table)
             
-            token_stats_results = token_stats_repo.find_by_field('coingecko_id', token_id)
+            token_stats_results = await token_stats_repo.find_by_field('coingecko_id', token_id)
             if not token_stats_results:
                 return None
             
@@ -172,7 +211,7 @@ class MarketDataService:
             
             token = None
             if token_stats.get('symbol'):
-                token_results = tokens_repo.find_by_field('symbol', token_stats['symbol'])
+                token_results = await tokens_repo.find_by_field('symbol', token_stats['symbol'])
                 if token_results:
                     token = token_results[0]
             
@@ -217,23 +256,40 @@ class MarketDataService:
 
     # =============== EXCHANGES ===============
 
-    def get_exchanges_list(self) -> ExchangeListResponse:
+    async def get_exchanges_list(self) -> ExchangeListResponse:
+
+        cache_key = "market:exchanges"
+        cached = await shared_cache.get(cache_key)
+        if cached is not None:
+            return ExchangeListResponse.model_validate(cached)
+
+        response = await self._load_exchanges_list()
+        if response.data:
+            await shared_cache.set(cache_key, response.model_dump(mode='json'), ttl=settings.CACHE_MARKET_TTL)
+        return response
+
+    async def _load_exchanges_list(self) -> ExchangeListResponse:
 
         try:
-            exchange_stats_repo = self._get_repository(self.exchange_stats_table)
             exchanges_repo = self._get_repository(self.exchanges_table)
             
-            all_exchange_stats = exchange_stats_repo.scan_items(self.exchange_stats_table)
+            # Неудаленные биржи по убыванию объема - из представления, без скана таблицы
+            exchange_stats = await view_registry.read_async(self.exchange_ranking_view)
             
-            exchange_stats = [es for es in all_exchange_stats if not es.get('is_deleted', False)]
-            exchange_stats.sort(key=lambda x: float(x.get('trading_volume_24h', 0) or 0), reverse=True)
+            exchange_ids = [str(es['exchange_id']) for es in exchange_stats if es.get('exchange_id')]
+            exchanges = await exchanges_repo.get_many(exchange_ids)
+            exchanges_by_id = {
+                exchange_id: exchange
+                for exchange_id, exchange in zip(exchange_ids, exchanges)
+                if exchange
+            }
             
             exchange_responses = []
             for idx, stat in enumerate(exchange_stats, 1):
 
                 exchange = None
                 if stat.get('exchange_id'):
-                    exchange = exchanges_repo.get_by_id(str(stat['exchange_id']))
+                    exchange = exchanges_by_id.get(str(stat['exchange_id']))
                 
                 exchange_response = ExchangeDataConverter.from_db_to_api(stat, exchange, idx)
                 exchange_responses.append(exchange_response)
@@ -245,7 +301,7 @@ class MarketDataService:
             return ExchangeListResponse(data=[])
 
 
-    def create_sample_data(self) -> Dict[str, Any]:
+    async def create_sample_data(self) -> Dict[str, Any]:
 
         try:
 
@@ -260,7 +316,7 @@ class MarketDataService:
             ]:
                 try:
                     repo = self._get_repository(table_name)
-                    items = repo.scan_items(table_name, limit=1)
+                    items = await repo.scan_items(table_name, limit=1, projection=['id'])
                     table_status[table_name] = {
                         "accessible": True,
                         "has_data": len(items) > 0
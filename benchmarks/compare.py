@@ -0,0 +1,71 @@
+import argparse
+import json
+import sys
+from pathlib import Path
+from typing import Any, Dict, List
+
+
+def load(path: str) -> Dict[str, Dict[str, Any]]:
+
+    report = json.loads(Path(path).read_text())
+    return {result['name']: result for result in report['results']}
+
+
+def change(before: float, after: float) -> float:
+
+    if not before:
+        return 0.0
+    return (after - before) / before * 100
+
+
+def compare(before: Dict[str, Dict[str, Any]], after: Dict[str, Dict[str, Any]],
+            metric: str = 'p50', threshold: float = 10.0) -> List[Dict[str, Any]]:
+
+    # Регрессия - рост задержки по metric больше threshold процентов
+    rows = []
+    for name in sorted(set(before) & set(after)):
+        old_latency = before[name]['latency_ms'][metric]
+        new_latency = after[name]['latency_ms'][metric]
+        delta = change(old_latency, new_latency)
+        rows.append({
+            'name': name,
+            'before_ms': old_latency,
+            'after_ms': new_latency,
+            'change_percent': round(delta, 1),
+            'ops_change_percent': round(change(before[name]['ops_per_second'], after[name]['ops_per_second']), 1),
+            'regression': delta > threshold,
+            'improvement': delta < -threshold
+        })
+    return rows
+
+
+def main(argv=None) -> int:
+
+    parser = argparse.ArgumentParser(description="Сравнение двух прогонов бенчмарка")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('--metric', default='p50', choices=['mean', 'p50', 'p90', 'p99', 'max'])
+    parser.add_argument('--threshold', type=float, default=10.0, help="порог регрессии, %%")
+    args = parser.parse_args(argv)
+
+    before, after = load(args.before), load(args.after)
+    rows = compare(before, after, args.metric, args.threshold)
+
+    print(f"{'сценарий':<45} {'было, мс':>12} {'стало, мс':>12} {'изменение':>10} {'ops/s':>9}")
+    for row in rows:
+        mark = ' <- регрессия' if row['regression'] else (' <- ускорение' if row['improvement'] else '')
+        print(
+            f"{row['name']:<45} {row['before_ms']:>12.3f} {row['after_ms']:>12.3f} "
+            f"{row['change_percent']:>+9.1f}% {row['ops_change_percent']:>+8.1f}%{mark}"
+        )
+
+    for name in sorted(set(before) ^ set(after)):
+        print(f"{name:<45} есть только в {'первом' if name in before else 'втором'} прогоне")
+
+    regressions = [row for row in rows if row['regression']]
+    print(f"\nСценариев: {len(rows)}, регрессий: {len(regressions)}, ускорений: {sum(row['improvement'] for row in rows)}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,194 @@
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from decimal import Decimal
+from typing import Any, Dict, List
+
+TOKENS_TABLE = "LiberandumAggregationToken"
+TOKEN_STATS_TABLE = "LiberandumAggregationTokenStats"
+EXCHANGES_TABLE = "LiberandumAggregationExchanges"
+EXCHANGE_STATS_TABLE = "LiberandumAggregationExchangesStats"
+
+# Размеры при scale=1.0 - порядок реальных таблиц
+BASE_SIZES = {
+    'tokens': 20000,
+    'exchanges': 1000,
+    'users': 100000,
+    'otp': 5000
+}
+
+FIAT = ['USD', 'EUR', 'GBP', 'JPY', 'TRY', 'AED', 'RUB', 'KZT']
+PROVIDERS = ['local', 'local', 'local', 'google']
+ROLES = ['user'] * 18 + ['pro_user'] + ['admin']
+OTP_TYPES = ['email_verification', 'password_reset']
+
+
+def _uuid(rng: random.Random) -> str:
+
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _money(rng: random.Random, low: float, high: float, places: int = 2) -> Decimal:
+
+    # Логнормальное распределение: много мелких значений, несколько крупных
+    value = min(high, max(low, rng.lognormvariate(0, 2.5) * low * 10))
+    return Decimal(str(round(value, places)))
+
+
+def _timestamp(rng: random.Random, now: datetime, days: int) -> str:
+
+    return (now - timedelta(seconds=rng.randint(0, days * 86400))).isoformat()
+
+
+def sizes_for(scale: float) -> Dict[str, int]:
+
+    return {name: max(1, int(size * scale)) for name, size in BASE_SIZES.items()}
+
+
+def build_dataset(scale: float = 1.0, seed: int = 42) -> Dict[str, Any]:
+
+    # Детерминированный набор данных: при одном seed прогоны сравнимы между собой
+    rng = random.Random(seed)
+    now = datetime(2025, 6, 1)
+    sizes = sizes_for(scale)
+
+    tokens, token_stats = [], []
+    for i in range(sizes['tokens']):
+        symbol = f"T{i:05d}"
+        coingecko_id = f"token-{i:05d}"
+        created_at = _timestamp(rng, now, 720)
+        is_deleted = rng.random() < 0.02
+        tokens.append({
+            'id': _uuid(rng),
+            'symbol': symbol,
+            'coingecko_id': coingecko_id,
+            'coin_name': f"Token {i}",
+            'avatar_image': f"https://example.com/tokens/{coingecko_id}.png",
+            'is_halal': rng.random() < 0.6,
+            'created_at': created_at,
+            'is_deleted': is_deleted
+        })
+        price = _money(rng, 0.0001, 100000, 6)
+        supply = Decimal(rng.randint(10 ** 5, 10 ** 11))
+        token_stats.append({
+            'id': _uuid(rng),
+            'symbol': symbol,
+            'coingecko_id': coingecko_id,
+            'coin_name': f"Token {i}",
+            'price': price,
+            'market_cap': (price * supply).quantize(Decimal('1')),
+            'trading_volume_24h': _money(rng, 100, 10 ** 10),
+            'volume_24h_change_24h': Decimal(str(round(rng.uniform(-50, 50), 2))),
+            'token_total_supply': supply,
+            'token_max_supply': supply * 2,
+            'ath': price * Decimal('1.8'),
+            'atl': price * Decimal('0.1'),
+            'created_at': created_at,
+            'is_deleted': is_deleted
+        })
+
+    exchanges, exchange_stats = [], []
+    for i in range(sizes['exchanges']):
+        exchange_id = _uuid(rng)
+        name = f"Exchange {i}"
+        exchanges.append({
+            'id': exchange_id,
+            'name': name,
+            'avatar_image': f"https://example.com/exchanges/{i}.png",
+            'created_at': _timestamp(rng, now, 1500)
+        })
+        exchange_stats.append({
+            'id': _uuid(rng),
+            'exchange_id': exchange_id,
+            'name': name,
+            'trading_volume_24h': _money(rng, 1000, 10 ** 11),
+            'reserves': _money(rng, 1000, 10 ** 10),
+            'coins_count': rng.randint(10, 1500),
+            'visitors_30d': rng.randint(0, 200),
+            'list_supported': rng.sample(FIAT, rng.randint(0, len(FIAT))),
+            'is_deleted': rng.random() < 0.03
+        })
+
+    users = []
+    for i in range(sizes['users']):
+        has_tokens = rng.random() < 0.3
+        users.append({
+            'id': _uuid(rng),
+            'email': f"user{i}@example.com",
+            'name': f"user_{i}",
+            'hashed_password': '$2b$12$' + 'x' * 53,
+            'is_verified': rng.random() < 0.7,
+            'is_active': rng.random() < 0.95,
+            'auth_provider': rng.choice(PROVIDERS),
+            'role': rng.choice(ROLES),
+            'access_token': _uuid(rng) if has_tokens else '',
+            'refresh_token': _uuid(rng) if has_tokens else '',
+            'access_token_expires_at': '',
+            'refresh_token_expires_at': '',
+            'created_at': _timestamp(rng, now, 900),
+            'updated_at': now.isoformat()
+        })
+
+    otps = []
+    for i in range(sizes['otp']):
+        created = now - timedelta(minutes=rng.randint(0, 60 * 24 * 7))
+        otps.append({
+            'id': _uuid(rng),
+            'email': f"user{rng.randrange(sizes['users'])}@example.com",
+            'otp_code': f"{rng.randint(0, 999999):06d}",
+            'otp_type': rng.choice(OTP_TYPES),
+            'is_used': rng.random() < 0.5,
+            'created_at': created.isoformat(),
+            'expires_at': (created + timedelta(minutes=10)).isoformat()
+        })
+
+    return {
+        'sizes': sizes,
+        'tables': {
+            TOKENS_TABLE: tokens,
+            TOKEN_STATS_TABLE: token_stats,
+            EXCHANGES_TABLE: exchanges,
+            EXCHANGE_STATS_TABLE: exchange_stats,
+            'users': users,
+            'otp': otps
+        }
+    }
+
+
+def seed_dataset(connector, dataset: Dict[str, Any]) -> Dict[str, Dict[str, Any]]:
+
+    # Загрузка через обычный путь записи коннектора (BulkWriter): заодно обновляются
+    # счетчики и поток изменений, как при реальном наполнении таблиц
+    from app.core.config import settings
+
+    table_names = {'users': settings.DYNAMODB_USERS_TABLE, 'otp': settings.DYNAMODB_OTP_TABLE}
+    report = {}
+    for name, items in dataset['tables'].items():
+        table_name = table_names.get(name, name)
+        started_at = time.perf_counter()
+        stats = connector.bulk_write(table_name, [dict(item) for item in items])
+        report[table_name] = {
+            'items': len(items),
+            'written': stats['written'],
+            'failed': stats['failed'],
+            'seconds': round(time.perf_counter() - started_at, 3)
+        }
+    return report
+
+
+def samples(dataset: Dict[str, Any]) -> Dict[str, List[Any]]:
+
+    # Значения для точечных запросов сценариев (существующие ключи и атрибуты)
+    tables = dataset['tables']
+    return {
+        'token_ids': [item['id'] for item in tables[TOKENS_TABLE]],
+        'coingecko_ids': [item['coingecko_id'] for item in tables[TOKEN_STATS_TABLE] if not item['is_deleted']],
+        'symbols': [item['symbol'] for item in tables[TOKENS_TABLE]],
+        'user_ids': [item['id'] for item in tables['users']],
+        'emails': [item['email'] for item in tables['users']],
+        'user_names': [item['name'] for item in tables['users']],
+        'refresh_tokens': [item['refresh_token'] for item in tables['users'] if item['refresh_token']],
+        'otp_ids': [item['id'] for item in tables['otp']],
+        'otp_emails': [item['email'] for item in tables['otp']]
+    }
@@ -0,0 +1,124 @@
+import asyncio
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+
+class Case:
+
+    # Один измеряемый сценарий: fn(i) получает номер итерации, чтобы перебирать ключи детерминированно.
+    # heavy - сканы и прочие O(таблицы) операции, для них меньше итераций
+
+    def __init__(self, group: str, name: str, fn: Callable[[int], Any], is_async: bool = False,
+                 heavy: bool = False, prepare: Optional[Callable[[int], None]] = None):
+        self.group = group
+        self.name = name
+        self.fn = fn
+        self.is_async = is_async
+        self.heavy = heavy
+        self.prepare = prepare
+
+    @property
+    def full_name(self) -> str:
+
+        return f"{self.group}.{self.name}"
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+
+    if not sorted_values:
+        return 0.0
+    # Метод ближайшего ранга - без интерполяции, как в большинстве дашбордов
+    rank = max(1, math.ceil(q / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(case: Case, latencies: List[float], errors: List[str], elapsed: float,
+              concurrency: int) -> Dict[str, Any]:
+
+    values = sorted(latency * 1000 for latency in latencies)
+    completed = len(values)
+    return {
+        'name': case.full_name,
+        'group': case.group,
+        'operation': case.name,
+        'heavy': case.heavy,
+        'iterations': completed + len(errors),
+        'concurrency': concurrency,
+        'errors': len(errors),
+        'first_error': errors[0] if errors else None,
+        'elapsed_seconds': round(elapsed, 4),
+        'ops_per_second': round(completed / elapsed, 2) if elapsed > 0 else 0.0,
+        'latency_ms': {
+            'mean': round(sum(values) / completed, 4) if completed else 0.0,
+            'p50': round(percentile(values, 50), 4),
+            'p90': round(percentile(values, 90), 4),
+            'p99': round(percentile(values, 99), 4),
+            'max': round(values[-1], 4) if values else 0.0
+        }
+    }
+
+
+def _timed(fn: Callable[[int], Any], i: int, latencies: List[float], errors: List[str]):
+
+    started_at = time.perf_counter()
+    try:
+        fn(i)
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+        return
+    latencies.append(time.perf_counter() - started_at)
+
+
+async def _timed_async(fn: Callable[[int], Awaitable[Any]], i: int, latencies: List[float], errors: List[str]):
+
+    started_at = time.perf_counter()
+    try:
+        await fn(i)
+    except Exception as e:
+        errors.append(f"{type(e).__name__}: {e}")
+        return
+    latencies.append(time.perf_counter() - started_at)
+
+
+def run_case(case: Case, iterations: int, concurrency: int = 1, warmup: int = 0) -> Dict[str, Any]:
+
+    if case.prepare:
+        case.prepare(warmup + iterations)
+
+    if case.is_async:
+        return asyncio.run(_run_async(case, iterations, concurrency, warmup))
+
+    # Прогрев (планировщик запросов, кэши схем) не входит в измерения
+    for i in range(warmup):
+        _timed(case.fn, i, [], [])
+
+    latencies, errors = [], []
+    started_at = time.perf_counter()
+    if concurrency <= 1:
+        for i in range(warmup, warmup + iterations):
+            _timed(case.fn, i, latencies, errors)
+    else:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(lambda i: _timed(case.fn, i, latencies, errors), range(warmup, warmup + iterations)))
+    elapsed = time.perf_counter() - started_at
+    return summarize(case, latencies, errors, elapsed, concurrency)
+
+
+async def _run_async(case: Case, iterations: int, concurrency: int, warmup: int) -> Dict[str, Any]:
+
+    for i in range(warmup):
+        await _timed_async(case.fn, i, [], [])
+
+    latencies, errors = [], []
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def one(i: int):
+        async with semaphore:
+            await _timed_async(case.fn, i, latencies, errors)
+
+    started_at = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(warmup, warmup + iterations)))
+    elapsed = time.perf_counter() - started_at
+    return summarize(case, latencies, errors, elapsed, concurrency)
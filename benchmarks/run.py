@@ -0,0 +1,158 @@
+import argparse
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict
+
+RESULTS_DIR = Path(__file__).resolve().parent / 'results'
+
+
+def parse_args(argv=None) -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description="Бенчмарк репозиториев DynamoDB на движке в памяти")
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help="множитель размера данных (1.0 = 20k токенов, 1k бирж, 100k пользователей)")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--iterations', type=int, default=200, help="итераций точечных операций")
+    parser.add_argument('--heavy-iterations', type=int, default=3, help="итераций сканов и агрегатов")
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=1)
+    parser.add_argument('--only', default='', help="фильтр по имени сценария, через запятую (users,generic.get_by_id)")
+    parser.add_argument('--skip-heavy', action='store_true')
+    parser.add_argument('--latency-ms', type=float, default=0.0, help="искусственная задержка движка на запрос")
+    parser.add_argument('--throttle-rate', type=float, default=0.0, help="доля запросов, отвечающих троттлингом")
+    parser.add_argument('--with-caches', action='store_true',
+                        help="не отключать кэши (по умолчанию меряется путь до DynamoDB)")
+    parser.add_argument('--output', default='', help="путь JSON с результатами")
+    parser.add_argument('--verbose', action='store_true', help="не глушить вывод приложения")
+    return parser.parse_args(argv)
+
+
+def configure_environment(args: argparse.Namespace):
+
+    # Настройки читаются при импорте app.core.config - окружение задается до импорта приложения.
+    # Явно заданные переменные окружения не перезаписываются
+    defaults = {
+        'DYNAMODB_ENGINE': 'memory',
+        'DYNAMODB_MEMORY_LATENCY_MS': str(args.latency_ms),
+        'DYNAMODB_MEMORY_THROTTLE_RATE': str(args.throttle_rate),
+        'DYNAMODB_MEMORY_SEED': str(args.seed),
+        'DYNAMODB_USERS_TABLE': 'users',
+        'DYNAMODB_OTP_TABLE': 'otp_codes',
+        # У движка в памяти нет емкости: клиентский бюджет по схемам превратил бы замер в ожидание
+        'DYNAMODB_CAPACITY_BUDGET_ENABLED': 'false'
+    }
+    if not args.with_caches:
+        defaults.update({
+            'CACHE_BACKEND': 'none',
+            'DYNAMODB_ITEM_CACHE_ENABLED': 'false'
+        })
+    for name, value in defaults.items():
+        os.environ.setdefault(name, value)
+
+
+def git_commit() -> str:
+
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, cwd=Path(__file__).resolve().parent
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ''
+
+
+def progress(message: str):
+
+    print(message, file=sys.stderr, flush=True)
+
+
+def selected(case, only: str) -> bool:
+
+    if not only:
+        return True
+    return any(
+        case.full_name == name or case.group == name or case.full_name.startswith(f"{name}.")
+        for name in (part.strip() for part in only.split(',')) if name
+    )
+
+
+def main(argv=None) -> Dict[str, Any]:
+
+    args = parse_args(argv)
+    configure_environment(args)
+
+    from app.core.config import settings
+    from app.core.dynamodb.connector import get_db_connector
+    from app.core.dynamodb.memory import get_memory_engine
+    from .datasets import build_dataset, samples, seed_dataset
+    from .harness import run_case
+    from .scenarios import build_cases
+
+    quiet = contextlib.redirect_stdout(open(os.devnull, 'w')) if not args.verbose else contextlib.nullcontext()
+    started_at = datetime.utcnow()
+
+    with quiet:
+        connector = get_db_connector()
+        if connector is None:
+            raise RuntimeError("Коннектор DynamoDB не инициализирован")
+
+        progress(f"[BENCH] Генерация данных (scale={args.scale}, seed={args.seed})")
+        dataset = build_dataset(args.scale, args.seed)
+        progress(f"[BENCH] Загрузка: {dataset['sizes']}")
+        seed_report = seed_dataset(connector, dataset)
+        values = samples(dataset)
+        del dataset
+
+        results = []
+        for case in build_cases(connector, values):
+            if not selected(case, args.only) or (case.heavy and args.skip_heavy):
+                continue
+            iterations = args.heavy_iterations if case.heavy else args.iterations
+            warmup = min(1, args.warmup) if case.heavy else args.warmup
+            result = run_case(case, iterations, args.concurrency, warmup)
+            results.append(result)
+            progress(
+                f"[BENCH] {result['name']:<45} {result['ops_per_second']:>10.1f} ops/s  "
+                f"p50 {result['latency_ms']['p50']:>9.3f} ms  p99 {result['latency_ms']['p99']:>9.3f} ms"
+                + (f"  ошибок: {result['errors']}" if result['errors'] else '')
+            )
+
+    report = {
+        'meta': {
+            'started_at': started_at.isoformat(),
+            'duration_seconds': round((datetime.utcnow() - started_at).total_seconds(), 2),
+            'git_commit': git_commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'args': vars(args),
+            'settings': {
+                'DYNAMODB_ENGINE': settings.DYNAMODB_ENGINE,
+                'DYNAMODB_CALL_GUARD_ENABLED': settings.DYNAMODB_CALL_GUARD_ENABLED,
+                'DYNAMODB_CAPACITY_BUDGET_ENABLED': settings.DYNAMODB_CAPACITY_BUDGET_ENABLED,
+                'DYNAMODB_ITEM_CACHE_ENABLED': settings.DYNAMODB_ITEM_CACHE_ENABLED,
+                'CACHE_BACKEND': settings.CACHE_BACKEND,
+                'SINGLEFLIGHT_ENABLED': settings.SINGLEFLIGHT_ENABLED,
+                'DYNAMODB_SCAN_SEGMENTS': settings.DYNAMODB_SCAN_SEGMENTS
+            }
+        },
+        'seed': seed_report,
+        'engine': get_memory_engine().get_stats() if settings.DYNAMODB_ENGINE == 'memory' else None,
+        'results': results
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"bench-{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False, default=str))
+    progress(f"[BENCH] Результаты: {output}")
+    return report
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,169 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from .datasets import TOKEN_STATS_TABLE, TOKENS_TABLE
+from .harness import Case
+
+
+def pick(values: List[Any], i: int) -> Any:
+
+    # Шаг - простое число: итерации расходятся по всему набору, а не идут подряд
+    return values[(i * 7919) % len(values)]
+
+
+def _prepared_ids(connector, table_name: str, prefix: str, extra: Dict[str, Any] = None):
+
+    # prepare(n): заранее записывает n элементов, которые сценарий будет удалять/менять
+    def prepare(count: int):
+        connector.bulk_write(table_name, [
+            {'id': f"{prefix}-{i}", 'created_at': datetime.utcnow().isoformat(), **(extra or {})}
+            for i in range(count)
+        ])
+    return prepare
+
+
+def generic_cases(connector, samples: Dict[str, List[Any]]) -> List[Case]:
+
+    repo = connector.get_repository(TOKENS_TABLE)
+    stats_repo = connector.get_repository(TOKEN_STATS_TABLE)
+    group = 'generic'
+    token_ids = samples['token_ids']
+    batch_size = 25
+
+    def bulk_items(prefix: str, i: int) -> List[Dict[str, Any]]:
+        return [{'id': f"{prefix}-{i}-{j}", 'symbol': f"B{i}-{j}"} for j in range(batch_size)]
+
+    def prepare_bulk_delete(count: int):
+        for i in range(count):
+            connector.bulk_write(TOKENS_TABLE, bulk_items('bench-bulk-del', i))
+
+    return [
+        Case(group, 'create', lambda i: repo.create({'id': f"bench-create-{i}", 'symbol': f"C{i}", 'coingecko_id': f"bench-{i}"})),
+        Case(group, 'get_by_id', lambda i: repo.get_by_id(pick(token_ids, i))),
+        Case(group, 'get_by_id_projection', lambda i: repo.get_by_id(pick(token_ids, i), fields=['symbol', 'coin_name'])),
+        Case(group, 'get_many_50', lambda i: repo.get_many([pick(token_ids, i * 50 + j) for j in range(50)])),
+        Case(group, 'update_by_id', lambda i: repo.update_by_id(pick(token_ids, i), {'bench_touched': i})),
+        Case(group, 'update_by_id_must_exist', lambda i: repo.update_by_id(pick(token_ids, i), {'bench_touched': i}, must_exist=True)),
+        Case(group, 'read_modify_write', lambda i: repo.read_modify_write(pick(token_ids, i), lambda item: {'bench_rmw': i})),
+        Case(group, 'delete_by_id', lambda i: repo.delete_by_id(f"bench-del-{i}"),
+             prepare=_prepared_ids(connector, TOKENS_TABLE, 'bench-del')),
+        Case(group, 'soft_delete', lambda i: repo.soft_delete(f"bench-soft-{i}"),
+             prepare=_prepared_ids(connector, TOKENS_TABLE, 'bench-soft')),
+        Case(group, 'list_page_50', lambda i: repo.list_page(limit=50)),
+        Case(group, 'find_by_field_gsi', lambda i: stats_repo.find_by_field('coingecko_id', pick(samples['coingecko_ids'], i))),
+        Case(group, 'find_by_field_key', lambda i: repo.find_by_field('id', pick(token_ids, i))),
+        Case(group, 'count_total', lambda i: repo.count_total()),
+        Case(group, 'count_by_field', lambda i: repo.count_by_field('is_deleted', False)),
+        Case(group, 'get_stats', lambda i: repo.get_stats()),
+        Case(group, 'bulk_create_25', lambda i: repo.bulk_create(bulk_items('bench-bulk', i))),
+        Case(group, 'bulk_delete_by_ids_25', lambda i: repo.bulk_delete_by_ids(
+            [item['id'] for item in bulk_items('bench-bulk-del', i)]
+        ), prepare=prepare_bulk_delete),
+
+        # O(таблицы): полные сканы с фильтрами и агрегаты
+        Case(group, 'list_all', lambda i: repo.list_all(), heavy=True),
+        Case(group, 'find_by_field_scan', lambda i: stats_repo.find_by_field('coin_name', f"Token {i}"), heavy=True),
+        Case(group, 'find_by_multiple_fields', lambda i: repo.find_by_multiple_fields({'is_halal': True, 'is_deleted': False}), heavy=True),
+        Case(group, 'search_by_pattern', lambda i: repo.search_by_pattern('coin_name', f"{i % 10}1"), heavy=True),
+        Case(group, 'find_in_date_range', lambda i: repo.find_in_date_range('created_at', '2025-01-01', '2025-02-01'), heavy=True),
+        Case(group, 'find_recent', lambda i: repo.find_recent('created_at', limit=10), heavy=True),
+        Case(group, 'get_field_values', lambda i: repo.get_field_values('is_halal'), heavy=True),
+        Case(group, 'sum_field', lambda i: stats_repo.sum_field('market_cap'), heavy=True),
+        Case(group, 'get_stats_detailed', lambda i: repo.get_stats(detailed=True), heavy=True),
+        Case(group, 'export_to_dict', lambda i: repo.export_to_dict(), heavy=True)
+    ]
+
+
+def user_cases(connector, samples: Dict[str, List[Any]]) -> List[Case]:
+
+    users = connector.users
+    group = 'users'
+    user_ids = samples['user_ids']
+    expires = datetime.utcnow() + timedelta(days=1)
+
+    return [
+        Case(group, 'create_user', lambda i: users.create_user({'email': f"bench{i}@example.com", 'name': f"bench_{i}"})),
+        Case(group, 'get_user_by_id', lambda i: users.get_user_by_id(pick(user_ids, i))),
+        Case(group, 'get_user_by_email', lambda i: users.get_user_by_email(pick(samples['emails'], i))),
+        Case(group, 'get_user_by_name', lambda i: users.get_user_by_name(pick(samples['user_names'], i))),
+        Case(group, 'update_user', lambda i: users.update_user(pick(user_ids, i), {'updated_at': datetime.utcnow().isoformat()})),
+        Case(group, 'update_tokens', lambda i: users.update_tokens(pick(user_ids, i), f"access-{i}", f"refresh-{i}", expires, expires)),
+        Case(group, 'clear_tokens', lambda i: users.clear_tokens(pick(user_ids, i))),
+        Case(group, 'verify_user_email', lambda i: users.verify_user_email(pick(user_ids, i))),
+        Case(group, 'deactivate_user', lambda i: users.deactivate_user(pick(user_ids, i))),
+        Case(group, 'activate_user', lambda i: users.activate_user(pick(user_ids, i))),
+        Case(group, 'update_user_role', lambda i: users.update_user_role(pick(user_ids, i), 'pro_user' if i % 2 else 'user')),
+        Case(group, 'get_user_stats', lambda i: users.get_user_stats(pick(user_ids, i))),
+
+        Case(group, 'get_user_by_refresh_token', lambda i: users.get_user_by_refresh_token(pick(samples['refresh_tokens'], i)), heavy=True),
+        Case(group, 'get_users_by_provider', lambda i: users.get_users_by_provider('google'), heavy=True),
+        Case(group, 'get_active_users', lambda i: users.get_active_users(), heavy=True),
+        Case(group, 'get_verified_users', lambda i: users.get_verified_users(), heavy=True),
+        Case(group, 'get_users_by_role', lambda i: users.get_users_by_role('admin'), heavy=True),
+        Case(group, 'search_users_by_name_pattern', lambda i: users.search_users_by_name_pattern(f"_{i % 100}9"), heavy=True)
+    ]
+
+
+def otp_cases(connector, samples: Dict[str, List[Any]]) -> List[Case]:
+
+    otp = connector.otp
+    group = 'otp'
+    now = datetime.utcnow()
+
+    def new_otp(i: int, prefix: str) -> Dict[str, Any]:
+        return {
+            'email': f"{prefix}{i}@example.com",
+            'otp_code': f"{i % 1000000:06d}",
+            'otp_type': 'email_verification',
+            'created_at': now.isoformat(),
+            'expires_at': (now + timedelta(minutes=10)).isoformat()
+        }
+
+    marked: List[str] = []
+
+    def prepare_mark(count: int):
+        marked.clear()
+        marked.extend(otp.create_otp(new_otp(i, 'bench-mark'))['id'] for i in range(count))
+
+    def prepare_delete(count: int):
+        for i in range(count):
+            otp.create_otp(new_otp(i, 'bench-old'))
+
+    return [
+        Case(group, 'create_otp', lambda i: otp.create_otp(new_otp(i, 'bench-otp'))),
+        Case(group, 'get_otp_by_id', lambda i: otp.get_otp_by_id(pick(samples['otp_ids'], i))),
+        Case(group, 'get_valid_otp', lambda i: otp.get_valid_otp(f"bench-otp{i}@example.com", f"{i % 1000000:06d}", 'email_verification')),
+        Case(group, 'mark_otp_as_used', lambda i: otp.mark_otp_as_used(marked[i]), prepare=prepare_mark),
+        Case(group, 'get_otps_by_email', lambda i: otp.get_otps_by_email(pick(samples['otp_emails'], i))),
+        Case(group, 'get_otp_stats_email', lambda i: otp.get_otp_stats(pick(samples['otp_emails'], i))),
+        Case(group, 'delete_old_otps_for_email', lambda i: otp.delete_old_otps_for_email(f"bench-old{i}@example.com", 'email_verification'),
+             prepare=prepare_delete),
+
+        Case(group, 'get_otp_stats', lambda i: otp.get_otp_stats(), heavy=True),
+        Case(group, 'get_recent_otps', lambda i: otp.get_recent_otps(), heavy=True),
+        Case(group, 'cleanup_expired_otps', lambda i: otp.cleanup_expired_otps(), heavy=True)
+    ]
+
+
+def market_cases(samples: Dict[str, List[Any]]) -> List[Case]:
+
+    from app.services.data.market_service import market_service
+
+    group = 'market'
+    sorts = [None, 'market_cap', 'volume']
+
+    return [
+        Case(group, 'get_tokens_list', lambda i: market_service.get_tokens_list(page=1 + i % 3, limit=20, sort=sorts[i % 3]), is_async=True),
+        Case(group, 'get_token_detail', lambda i: market_service.get_token_detail(pick(samples['coingecko_ids'], i)), is_async=True),
+        Case(group, 'get_exchanges_list', lambda i: market_service.get_exchanges_list(), is_async=True)
+    ]
+
+
+def build_cases(connector, samples: Dict[str, List[Any]]) -> List[Case]:
+
+    return (
+        generic_cases(connector, samples)
+        + user_cases(connector, samples)
+        + otp_cases(connector, samples)
+        + market_cases(samples)
+    )
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+# Тесты идут на движке DynamoDB в памяти и без общего кэша - до импорта app (настройки читаются при импорте)
+os.environ.setdefault('DYNAMODB_ENGINE', 'memory')
+os.environ.setdefault('AWS_REGION', 'us-east-1')
+os.environ.setdefault('CACHE_BACKEND', 'none')
+os.environ.setdefault('DYNAMODB_ITEM_CACHE_ENABLED', 'true')
+os.environ.setdefault('DYNAMODB_CAPACITY_BUDGET_ENABLED', 'false')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def memory_engine():
+
+    # Каждый тест начинает с пустых таблиц схем и пустого кэша элементов
+    from app.core.dynamodb.item_cache import item_cache
+    from app.core.dynamodb.memory import get_memory_engine, reset_memory_engine
+
+    engine = get_memory_engine()
+    reset_memory_engine()
+    item_cache.clear()
+    yield engine
+
+
+@pytest.fixture
+def tokens():
+
+    from app.core.dynamodb.connector import get_generic_repository
+    return get_generic_repository('LiberandumAggregationToken')
@@ -0,0 +1,30 @@
+def test_bulk_delete_by_ids_returns_count(tokens):
+
+    tokens.bulk_create([{'id': f"t{i:03d}"} for i in range(60)])
+
+    assert tokens.bulk_delete_by_ids([f"t{i:03d}" for i in range(40)]) == 40
+    assert tokens.count_total() == 20
+
+
+def test_bulk_delete_report(tokens, memory_engine):
+
+    tokens.bulk_create([{'id': f"t{i:03d}"} for i in range(30)])
+
+    report = tokens.bulk_delete_report(f"t{i:03d}" for i in range(30))
+
+    assert report['requested'] == 30
+    assert report['processed'] == 30
+    assert report['failed'] == 0
+    # 30 ключей - два BatchWriteItem по 25
+    assert memory_engine._stats.get('batch_write_item', 0) >= 2
+    assert tokens.count_total() == 0
+
+
+def test_bulk_delete_invalidates_item_cache(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'BTC'}, auto_id=False)
+    assert tokens.get_by_id('t1') is not None
+
+    tokens.bulk_delete_by_ids(['t1'])
+
+    assert tokens.get_by_id('t1') is None
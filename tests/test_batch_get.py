@@ -0,0 +1,34 @@
+def test_get_many_keeps_input_order_across_chunks(tokens, memory_engine):
+
+    tokens.bulk_create([{'id': f"t{i:03d}", 'symbol': f"S{i}"} for i in range(250)])
+    ids = [f"t{i:03d}" for i in reversed(range(250))] + ['missing']
+
+    items = tokens.get_many(ids)
+
+    assert [item['id'] for item in items[:-1]] == ids[:-1]
+    assert items[-1] is None
+    # 251 ключ - три запроса BatchGetItem по 100
+    assert memory_engine._stats.get('batch_get_item') == 3
+
+
+def test_get_many_duplicates_and_projection(tokens):
+
+    tokens.bulk_create([{'id': f"t{i}", 'symbol': f"S{i}", 'rank': i} for i in range(5)])
+
+    items = tokens.get_many(['t3', 't1', 't3'], fields=['symbol'])
+
+    assert [item['id'] for item in items] == ['t3', 't1', 't3']
+    assert all(set(item) == {'id', 'symbol'} for item in items)
+
+
+def test_get_many_retries_unprocessed_keys(tokens, memory_engine):
+
+    tokens.bulk_create([{'id': f"t{i:03d}"} for i in range(150)])
+    memory_engine.throttle_rate = 0.2
+    try:
+        items = tokens.get_many([f"t{i:03d}" for i in range(150)])
+    finally:
+        memory_engine.throttle_rate = 0.0
+
+    assert all(item is not None for item in items)
+    assert memory_engine._stats['throttled'] > 0
@@ -0,0 +1,54 @@
+import asyncio
+
+from app.core.dynamodb.bulk_writer import BulkWriter
+
+
+def test_bulk_write_stats(tokens):
+
+    stats = tokens.bulk_write(tokens.table_name, ({'id': f"t{i:03d}"} for i in range(110)), lanes=3)
+
+    assert stats['submitted'] == 110
+    assert stats['written'] == 110
+    assert stats['failed'] == 0
+    assert stats['batches'] == 5
+    assert tokens.count_total() == 110
+    # Одна метка времени на весь вызов
+    assert len({item['created_at'] for item in tokens.list_all()}) == 1
+
+
+def test_duplicate_keys_in_chunk_keep_last(tokens):
+
+    stats = tokens.bulk_write(tokens.table_name, [
+        {'id': 't1', 'symbol': 'OLD'},
+        {'id': 't2', 'symbol': 'ETH'},
+        {'id': 't1', 'symbol': 'BTC'}
+    ])
+
+    assert stats['submitted'] == 2
+    assert tokens.get_by_id('t1')['symbol'] == 'BTC'
+
+
+def test_unprocessed_items_are_retried(tokens, memory_engine):
+
+    memory_engine.throttle_rate = 0.2
+    try:
+        stats = tokens.bulk_write(tokens.table_name, ({'id': f"t{i:03d}"} for i in range(200)), lanes=4)
+    finally:
+        memory_engine.throttle_rate = 0.0
+
+    assert stats['written'] + stats['failed'] == 200
+    assert stats['throttled_retries'] > 0
+    assert tokens.count_total() == stats['written']
+
+
+def test_write_async_accepts_async_iterables(tokens):
+
+    async def items():
+        for i in range(30):
+            yield {'id': f"t{i:03d}"}
+
+    writer = BulkWriter(tokens, tokens.table_name, lanes=2)
+    stats = asyncio.run(writer.write_async(items()))
+
+    assert stats['written'] == 30
+    assert tokens.count_total() == 30
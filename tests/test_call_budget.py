@@ -0,0 +1,67 @@
+import pytest
+
+from app.core.dynamodb.call_budget import call_budget
+from app.core.dynamodb.exceptions import CallBudgetExceededError
+
+
+@pytest.fixture
+def tracker(monkeypatch):
+
+    monkeypatch.setattr(call_budget, 'enabled', True)
+    monkeypatch.setattr(call_budget, 'enforce', False)
+    monkeypatch.setattr(call_budget, 'n_plus_one_threshold', 5)
+    call_budget.reset()
+    yield call_budget
+    call_budget.reset()
+
+
+def test_repeated_lookups_are_flagged(tracker, tokens):
+
+    tokens.bulk_create([{'id': f"t{i}", 'symbol': f"S{i}"} for i in range(6)])
+
+    with tracker.track('GET /tokens') as calls:
+        for i in range(6):
+            tokens.get_by_id(f"t{i}")
+
+    assert calls.calls == 6
+    repeated = calls.repeated(tracker.n_plus_one_threshold)
+    assert [(entry['operation'], entry['count']) for entry in repeated] == [('get_item', 6)]
+    # В стеке - репозиторий, который делал запросы, а не внутренности коннектора
+    assert repeated[0]['sites'][0]['stack'][0].startswith('app/core/dynamodb/repositories/generic.py')
+    assert tracker.get_stats()['routes']['GET /tokens']['n_plus_one_requests'] == 1
+
+
+def test_batch_and_paginated_reads_are_not_n_plus_one(tracker, tokens):
+
+    tokens.bulk_create([{'id': f"t{i:03d}", 'symbol': f"S{i}"} for i in range(260)])
+
+    with tracker.track('GET /tokens') as calls:
+        tokens.get_many([f"t{i:03d}" for i in range(260)])
+        cursor = None
+        while True:
+            page = tokens.list_page(limit=20, cursor=cursor)
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+
+    # Чанки BatchGetItem и страницы Scan считаются в бюджет, но это одно логическое чтение
+    assert calls.calls > 10
+    assert calls.repeated(tracker.n_plus_one_threshold) == []
+
+
+def test_budget_enforced_only_when_enabled(tracker, tokens, monkeypatch):
+
+    monkeypatch.setitem(tracker.route_budgets, 'GET /tight', 2)
+
+    with tracker.track('GET /tight') as calls:
+        for _ in range(3):
+            tokens.get_by_id('t1')
+    assert calls.over_budget
+
+    monkeypatch.setattr(tracker, 'enforce', True)
+    with pytest.raises(CallBudgetExceededError) as error:
+        with tracker.track('GET /tight'):
+            for _ in range(3):
+                tokens.get_by_id('t1')
+
+    assert (error.value.route, error.value.calls, error.value.budget) == ('GET /tight', 3, 2)
@@ -0,0 +1,145 @@
+import pytest
+from botocore.exceptions import ClientError, ReadTimeoutError
+
+from app.core.dynamodb.exceptions import ServiceUnavailableError, ThrottledError
+from app.core.dynamodb.throttling import AdaptiveConcurrency, CallGuard, call_guard, is_idempotent
+from app.core.dynamodb.transactions import put_op
+
+
+def _guard(**kwargs):
+
+    return CallGuard(base_delay=0.001, max_delay=0.002, initial_limit=8, **kwargs)
+
+
+def _failing(errors, result=None):
+
+    # Операция, которая сначала отвечает переданными ошибками, затем результатом
+    errors = list(errors)
+
+    def update_item(**params):
+        update_item.calls += 1
+        if errors:
+            raise errors.pop(0)
+        return result or {}
+
+    update_item.calls = 0
+    return update_item
+
+
+def _throttled():
+
+    return ClientError({'Error': {'Code': 'ProvisionedThroughputExceededException'}}, 'UpdateItem')
+
+
+def test_throttling_is_retried_and_lowers_limit():
+
+    guard = _guard()
+    operation = _failing([_throttled(), _throttled()], {'ok': True})
+
+    assert guard.call('tokens', operation, UpdateExpression='SET #u0 = :u0') == {'ok': True}
+    stats = guard.get_stats()['tables']['tokens']
+    assert operation.calls == 3
+    assert stats['throttled'] == 2
+    assert stats['retries'] == 2
+    assert stats['concurrency_limit'] < 8
+
+
+def test_exhausted_retries_raise_throttled_error():
+
+    guard = _guard(max_retries=2)
+
+    with pytest.raises(ThrottledError):
+        guard.call('tokens', _failing([_throttled()] * 3))
+
+    assert guard.get_stats()['tables']['tokens']['exhausted'] == 1
+
+
+def test_validation_errors_are_not_retried():
+
+    guard = _guard()
+    operation = _failing([ClientError({'Error': {'Code': 'ValidationException'}}, 'UpdateItem')])
+
+    with pytest.raises(ClientError):
+        guard.call('tokens', operation)
+    assert operation.calls == 1
+
+
+def test_lost_response_of_counter_update_is_not_retried():
+
+    guard = _guard()
+    operation = _failing([ReadTimeoutError(endpoint_url='http://dynamodb')])
+
+    with pytest.raises(ServiceUnavailableError):
+        guard.call('counters', operation, UpdateExpression='ADD #u0 :u0')
+
+    assert operation.calls == 1
+    assert guard.get_stats()['tables']['counters']['not_retried'] == 1
+
+
+def test_lost_response_of_idempotent_update_is_retried():
+
+    guard = _guard()
+    operation = _failing([ReadTimeoutError(endpoint_url='http://dynamodb')])
+
+    guard.call('tokens', operation, UpdateExpression='SET #u0 = :u0')
+
+    assert operation.calls == 2
+
+
+def test_idempotency_rules():
+
+    def update_item(**params):
+        pass
+
+    def transact_write_items(**params):
+        pass
+
+    assert not is_idempotent(update_item, {'UpdateExpression': 'SET #u0 = :u0 ADD #u1 :u1'})
+    assert not is_idempotent(update_item, {'UpdateExpression': 'SET #u0 = #u0 + :u0'})
+    assert is_idempotent(update_item, {'UpdateExpression': 'SET #u0 = if_not_exists(#u0, :u0)'})
+    assert not is_idempotent(transact_write_items, {'TransactItems': []})
+    assert is_idempotent(transact_write_items, {'TransactItems': [], 'ClientRequestToken': 't'})
+
+
+def test_aimd_limit_grows_back_after_success():
+
+    limiter = AdaptiveConcurrency(initial=4, minimum=1, maximum=8)
+    limiter.on_throttle()
+    assert limiter.limit == 2
+
+    for _ in range(10):
+        limiter.on_success()
+    assert limiter.limit > 3
+
+
+def test_transact_write_generates_request_token(tokens, monkeypatch):
+
+    sent = []
+    transact = tokens.client.transact_write_items
+
+    def spy(**params):
+        sent.append(params.get('ClientRequestToken'))
+        return transact(**params)
+
+    monkeypatch.setattr(tokens.client, 'transact_write_items', spy)
+    tokens.transact_write([put_op(tokens.table_name, {'id': 't1'})])
+    tokens.transact_write([put_op(tokens.table_name, {'id': 't2'})], client_token='given')
+
+    assert sent[0] and sent[0] != 'given'
+    assert sent[1] == 'given'
+
+
+def test_engine_throttling_is_absorbed(tokens, memory_engine, monkeypatch):
+
+    monkeypatch.setattr(call_guard, 'base_delay', 0.001)
+    monkeypatch.setattr(call_guard, 'max_delay', 0.002)
+    tokens.create({'id': 't1', 'symbol': 'BTC'}, auto_id=False)
+    memory_engine.throttle_rate = 0.5
+    try:
+        for _ in range(10):
+            tokens.get_item(tokens.table_name, {'id': 't1'}, consistent=True)
+    finally:
+        memory_engine.throttle_rate = 0.0
+
+    assert memory_engine._stats['throttled'] > 0
+    assert call_guard.get_stats()['tables'][tokens.table_name]['retries'] > 0
@@ -0,0 +1,80 @@
+import time
+
+from app.core.dynamodb.capacity import BACKGROUND, CapacityBudget, CapacityBudgeter, capacity_lane
+
+
+def _invoke(table_name, operation, **params):
+
+    return operation(**params)
+
+
+def test_budget_follows_described_throughput(memory_engine):
+
+    # Таблицы нет в реестре схем - емкость берется только из DescribeTable
+    memory_engine.client.create_table(
+        TableName='Provisioned',
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+        ProvisionedThroughput={'ReadCapacityUnits': 400, 'WriteCapacityUnits': 100}
+    )
+    budgeter = CapacityBudgeter()
+    table = memory_engine.resource.Table('Provisioned')
+
+    budgeter.call('Provisioned', table.get_item, {'Key': {'id': 't1'}}, _invoke)
+
+    assert budgeter.budget('Provisioned', 'read').bucket.rate == 400
+    assert budgeter.budget('Provisioned', 'write').bucket.rate == 100
+    assert budgeter.budget('Provisioned', 'read').get_stats()['lanes']['interactive']['requests'] == 1
+
+
+def test_on_demand_table_is_not_budgeted(memory_engine):
+
+    memory_engine.client.create_table(
+        TableName='OnDemand',
+        KeySchema=[{'AttributeName': 'id', 'KeyType': 'HASH'}],
+        AttributeDefinitions=[{'AttributeName': 'id', 'AttributeType': 'S'}],
+        BillingMode='PAY_PER_REQUEST'
+    )
+    budgeter = CapacityBudgeter()
+
+    assert budgeter.budget('OnDemand', 'read', client=memory_engine.client) is None
+    assert budgeter.budget('Missing', 'read', client=memory_engine.client) is None
+
+
+def test_background_wait_is_capped():
+
+    budget = CapacityBudget('tokens', rate=5, burst_seconds=5, background_burst=0, background_max_wait=0.05)
+    # Страница скана в 1 МБ уводит бюджет в глубокий долг
+    budget.charge(BACKGROUND, 128)
+
+    started_at = time.monotonic()
+    budget.wait(BACKGROUND)
+
+    assert time.monotonic() - started_at < 0.5
+    assert budget.get_stats()['lanes'][BACKGROUND]['forced'] == 1
+
+
+def test_background_yields_while_reserve_is_low():
+
+    budget = CapacityBudget('tokens', rate=1000, burst_seconds=1, background_burst=0, background_max_wait=1.0)
+    budget.charge(BACKGROUND, 600)
+
+    waited = budget.wait(BACKGROUND)
+
+    # Ждет восполнения резерва (половина емкости), а не весь потолок
+    assert 0 < waited < 0.5
+    assert budget.get_stats()['lanes'][BACKGROUND]['forced'] == 0
+
+
+def test_scan_in_background_lane_is_charged(tokens):
+
+    tokens.bulk_create([{'id': f"t{i}"} for i in range(10)])
+    budgeter = CapacityBudgeter()
+    table = tokens.get_table(tokens.table_name)
+
+    with capacity_lane(BACKGROUND):
+        budgeter.call(tokens.table_name, table.scan, {}, _invoke)
+
+    lanes = budgeter.budget(tokens.table_name, 'read').get_stats()['lanes']
+    assert lanes[BACKGROUND]['requests'] == 1
+    assert lanes[BACKGROUND]['consumed'] > 0
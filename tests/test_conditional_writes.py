@@ -0,0 +1,42 @@
+import pytest
+from boto3.dynamodb.conditions import Attr
+
+from app.core.dynamodb.exceptions import ConflictError, ItemNotFoundError
+
+
+def test_update_must_exist_raises_not_found(tokens):
+
+    with pytest.raises(ItemNotFoundError):
+        tokens.update_by_id('missing', {'name': 'X'}, must_exist=True)
+
+    # Без must_exist UpdateItem создает элемент - этого и не должно было случиться выше
+    assert tokens.get_by_id('missing') is None
+
+
+def test_update_condition_failure_raises_conflict(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'AAA', 'is_deleted': True})
+
+    with pytest.raises(ConflictError) as error:
+        tokens.update_by_id('t1', {'name': 'X'}, condition=Attr('is_deleted').eq(False))
+
+    assert error.value.current_item['symbol'] == 'AAA'
+    assert 'name' not in tokens.get_by_id('t1')
+
+
+def test_soft_delete_twice_raises_not_found(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'AAA'})
+    assert tokens.soft_delete('t1')['is_deleted'] is True
+
+    with pytest.raises(ItemNotFoundError):
+        tokens.soft_delete('t1')
+
+
+def test_delete_must_exist(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'AAA'})
+    assert tokens.delete_by_id('t1', must_exist=True) is True
+
+    with pytest.raises(ItemNotFoundError):
+        tokens.delete_by_id('t1', must_exist=True)
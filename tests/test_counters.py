@@ -0,0 +1,128 @@
+import asyncio
+
+from app.core.dynamodb.counters import AggregateCounters, aggregate_counters
+
+
+def test_counts_follow_single_writes(tokens):
+
+    tokens.reconcile_counters()
+    tokens.create({'id': 't1', 'symbol': 'AAA', 'is_halal': True})
+    tokens.create({'id': 't2', 'symbol': 'BBB', 'is_halal': False})
+    tokens.create({'id': 't3', 'symbol': 'CCC', 'is_halal': True})
+    # Перезапись существующего элемента не меняет total
+    tokens.create({'id': 't3', 'symbol': 'CCC', 'is_halal': False})
+    tokens.delete_by_id('t2')
+    reads = aggregate_counters.get_stats()['reads']
+
+    assert tokens.count_total() == 2
+    assert tokens.count_by_field('is_halal', True) == 1
+    assert tokens.count_by_field('is_halal', False) == 1
+    assert aggregate_counters.get_stats()['reads'] == reads + 3
+
+
+def test_batch_writes_fall_back_until_reconciled(tokens):
+
+    tokens.reconcile_counters()
+    tokens.create({'id': 't0', 'symbol': 'AAA'})
+    tokens.bulk_create([{'id': f"t{i}", 'symbol': f"S{i}"} for i in range(1, 61)])
+
+    # Пакетная запись не знает старых элементов - счетчики помечены, подсчет идет сканом
+    assert aggregate_counters.is_dirty('LiberandumAggregationToken')
+    assert tokens.count_total() == 61
+
+    report = tokens.reconcile_counters()
+    assert report['counts']['total'] == 61
+    assert not aggregate_counters.is_dirty('LiberandumAggregationToken')
+    assert tokens.count_total() == 61
+
+
+def test_untracked_field_is_counted_by_scan(tokens):
+
+    tokens.reconcile_counters()
+    tokens.create({'id': 't1', 'symbol': 'AAA'})
+
+    assert tokens.count_by_field('symbol', 'AAA') == 1
+
+
+def test_reconcile_lease_is_exclusive(tokens):
+
+    first = AggregateCounters(aggregate_counters.table_name, {})
+    second = AggregateCounters(aggregate_counters.table_name, {})
+
+    assert first.acquire_lease(tokens, 60) is True
+    assert second.acquire_lease(tokens, 60) is False
+    assert first.acquire_lease(tokens, 60) is False
+
+
+def test_expired_lease_is_taken_over(tokens):
+
+    first = AggregateCounters(aggregate_counters.table_name, {})
+    second = AggregateCounters(aggregate_counters.table_name, {})
+
+    assert first.acquire_lease(tokens, -1) is True
+    assert second.acquire_lease(tokens, 60) is True
+
+
+def test_dirty_mark_is_shared_between_workers(tokens):
+
+    tokens.reconcile_counters()
+    tokens.create({'id': 't0', 'symbol': 'AAA'})
+    other_worker = AggregateCounters(aggregate_counters.table_name, dict(aggregate_counters.tracked))
+    assert other_worker.count(tokens, tokens.table_name) == 1
+
+    tokens.bulk_create([{'id': f"t{i}"} for i in range(1, 4)])
+
+    # Пакетная запись на одном воркере видна другому через пометку в таблице счетчиков
+    assert other_worker.count(tokens, tokens.table_name) is None
+    assert other_worker.dirty_tables(tokens) == [tokens.table_name]
+
+    other_worker.reconcile(tokens, tokens.table_name)
+    assert other_worker.dirty_tables(tokens) == []
+    assert other_worker.count(tokens, tokens.table_name) == 4
+
+
+def test_write_during_scan_keeps_reconcile_pending(tokens, monkeypatch):
+
+    tokens.bulk_create([{'id': f"t{i}"} for i in range(5)])
+    scan = tokens.parallel_scan
+
+    def scan_with_concurrent_write(*args, **kwargs):
+        result = scan(*args, **kwargs)
+        tokens.create({'id': 'late', 'symbol': 'ZZZ'}, auto_id=False)
+        return result
+
+    monkeypatch.setattr(tokens, 'parallel_scan', scan_with_concurrent_write)
+    report = tokens.reconcile_counters()
+
+    assert report['applied'] is False
+    assert aggregate_counters.is_dirty(tokens.table_name)
+    assert tokens.count_total() == 6
+
+    monkeypatch.undo()
+    assert tokens.reconcile_counters()['applied'] is True
+    assert tokens.count_total() == 6
+
+
+def test_stale_value_counters_are_reset(tokens):
+
+    tokens.create({'id': 't1', 'is_halal': True})
+    tokens.reconcile_counters()
+    tokens.bulk_delete_by_ids(['t1'])
+    tokens.bulk_create([{'id': 't2', 'is_halal': False}])
+
+    counts = tokens.reconcile_counters()['counts']
+
+    assert counts == {'total': 1, 'is_halal=false': 1}
+    assert tokens.count_by_field('is_halal', True) == 0
+
+
+def test_loop_disables_counters_without_table(memory_engine, monkeypatch):
+
+    from app.core.dynamodb.counters import run_reconcile_loop
+
+    monkeypatch.setattr(aggregate_counters, 'enabled', True)
+    memory_engine.client.delete_table(TableName=aggregate_counters.table_name)
+
+    asyncio.run(asyncio.wait_for(run_reconcile_loop(check_interval=0.01), timeout=5))
+
+    assert aggregate_counters.enabled is False
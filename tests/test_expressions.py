@@ -0,0 +1,74 @@
+from decimal import Decimal
+
+import pytest
+
+from app.core.dynamodb.expressions import apply_update, build_update_expression, update_template_cache_info
+
+
+def test_update_expression_uses_placeholders():
+
+    params = build_update_expression(
+        set_values={'name': 'Bitcoin', 'status': 'active'},
+        remove=['old'],
+        add={'holders': 1},
+        set_if_not_exists={'created_at': '2024-01-01'}
+    )
+
+    assert params['UpdateExpression'] == (
+        "SET #u0 = :u0, #u1 = :u1, #u2 = if_not_exists(#u2, :u2) REMOVE #u3 ADD #u4 :u3"
+    )
+    assert params['ExpressionAttributeNames'] == {
+        '#u0': 'name', '#u1': 'status', '#u2': 'created_at', '#u3': 'old', '#u4': 'holders'
+    }
+    assert params['ExpressionAttributeValues'] == {
+        ':u0': 'Bitcoin', ':u1': 'active', ':u2': '2024-01-01', ':u3': 1
+    }
+
+
+def test_field_set_and_removed_is_only_set():
+
+    params = build_update_expression(set_values={'name': 'X'}, remove=['name'])
+
+    assert params['UpdateExpression'] == 'SET #u0 = :u0'
+
+
+def test_empty_update_is_rejected():
+
+    with pytest.raises(ValueError):
+        build_update_expression()
+
+
+def test_template_is_compiled_once_per_field_set():
+
+    build_update_expression(set_values={'cache_probe_a': 1, 'cache_probe_b': 2})
+    hits = update_template_cache_info()['hits']
+
+    first = build_update_expression(set_values={'cache_probe_a': 3, 'cache_probe_b': 4})
+    second = build_update_expression(set_values={'cache_probe_a': 5, 'cache_probe_b': 6})
+
+    assert update_template_cache_info()['hits'] == hits + 2
+    # Вызывающий получает свою копию имен - изменения не попадают в кэш шаблона
+    first['ExpressionAttributeNames']['#extra'] = 'x'
+    assert '#extra' not in second['ExpressionAttributeNames']
+
+
+def test_apply_update_matches_server_result(tokens):
+
+    tokens.create({'id': 't1', 'name': 'Old', 'label': 'Kept', 'holders': 2, 'tags': {'a'}, 'old': 1}, auto_id=False)
+    old_item = tokens.get_by_id('t1')
+    changes = {
+        'set_values': {'name': 'New'},
+        'remove': ['old'],
+        'add': {'holders': 3, 'tags': {'b'}},
+        'set_if_not_exists': {'label': 'Ignored', 'rank': 1}
+    }
+
+    local = apply_update(old_item, {'id': 't1'}, **changes)
+    table = tokens.get_table(tokens.table_name)
+    server = table.update_item(
+        Key={'id': 't1'}, ReturnValues='ALL_NEW', **build_update_expression(**changes)
+    )['Attributes']
+
+    assert local == server
+    assert local['holders'] == Decimal(5)
+    assert local['label'] == 'Kept'
@@ -0,0 +1,60 @@
+from app.core.dynamodb import item_cache as item_cache_module
+from app.core.dynamodb.item_cache import ItemCache, _resolve_enabled, item_cache
+
+
+def test_auto_enables_only_with_redis():
+
+    assert _resolve_enabled('auto', 'redis') is True
+    assert _resolve_enabled('auto', 'memory') is False
+    assert _resolve_enabled('auto', 'local') is False
+    assert _resolve_enabled('true', 'memory') is True
+    assert _resolve_enabled('false', 'redis') is False
+
+
+def test_excluded_tables_follow_settings(monkeypatch):
+
+    settings = item_cache_module.settings
+    monkeypatch.setattr(settings, 'DYNAMODB_USERS_TABLE', 'prod-users')
+    monkeypatch.setattr(settings, 'DYNAMODB_OTP_TABLE', 'prod-otp')
+    monkeypatch.setattr(settings, 'DYNAMODB_ITEM_CACHE_EXCLUDED_TABLES', 'audit, ')
+
+    assert item_cache_module._excluded_tables() == ['prod-users', 'prod-otp', 'audit']
+
+
+def test_excluded_table_is_never_cached():
+
+    cache = ItemCache(excluded_tables=['prod-users'])
+    cache.set('prod-users', {'id': 'u1'}, {'id': 'u1'})
+    cache.set('tokens', {'id': 't1'}, {'id': 't1'})
+
+    assert cache.get('prod-users', {'id': 'u1'}) is None
+    assert cache.get('tokens', {'id': 't1'}) == {'id': 't1'}
+
+
+def test_ttl_and_lru_limit(monkeypatch):
+
+    now = [100.0]
+    monkeypatch.setattr(item_cache_module.time, 'monotonic', lambda: now[0])
+    cache = ItemCache(ttl=5, max_items=2)
+    for i in range(3):
+        cache.set('tokens', {'id': f"t{i}"}, {'id': f"t{i}"})
+
+    assert cache.get('tokens', {'id': 't0'}) is None
+    assert cache.get('tokens', {'id': 't2'}) is not None
+    now[0] += 6
+    assert cache.get('tokens', {'id': 't2'}) is None
+
+
+def test_reads_are_served_from_cache_and_writes_invalidate(tokens, memory_engine):
+
+    tokens.create({'id': 't1', 'symbol': 'BTC'}, auto_id=False)
+
+    tokens.get_by_id('t1')
+    reads = memory_engine._stats.get('get_item', 0)
+    assert tokens.get_by_id('t1')['symbol'] == 'BTC'
+    assert memory_engine._stats.get('get_item', 0) == reads
+
+    tokens.update_by_id('t1', {'symbol': 'ETH'})
+
+    assert tokens.get_by_id('t1')['symbol'] == 'ETH'
+    assert item_cache.get_stats()['tables'][tokens.table_name]['invalidations'] > 0
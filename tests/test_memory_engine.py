@@ -0,0 +1,228 @@
+from decimal import Decimal
+
+import pytest
+from boto3.dynamodb.conditions import Attr, Key
+from botocore.exceptions import ClientError
+
+from app.core.dynamodb.memory import InMemoryDynamoDB
+
+
+@pytest.fixture
+def engine():
+
+    engine = InMemoryDynamoDB()
+    engine.client.create_table(
+        TableName='Prices',
+        KeySchema=[
+            {'AttributeName': 'symbol', 'KeyType': 'HASH'},
+            {'AttributeName': 'ts', 'KeyType': 'RANGE'}
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'symbol', 'AttributeType': 'S'},
+            {'AttributeName': 'ts', 'AttributeType': 'N'},
+            {'AttributeName': 'exchange', 'AttributeType': 'S'}
+        ],
+        ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5},
+        GlobalSecondaryIndexes=[{
+            'IndexName': 'exchange-index',
+            'KeySchema': [{'AttributeName': 'exchange', 'KeyType': 'HASH'}],
+            'Projection': {'ProjectionType': 'ALL'},
+            'ProvisionedThroughput': {'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+        }]
+    )
+    return engine
+
+
+@pytest.fixture
+def prices(engine):
+
+    table = engine.resource.Table('Prices')
+    for ts in range(10):
+        table.put_item(Item={
+            'symbol': 'BTC', 'ts': ts, 'price': Decimal(100 + ts),
+            **({'exchange': 'binance'} if ts % 2 else {})
+        })
+    table.put_item(Item={'symbol': 'ETH', 'ts': 1, 'price': Decimal(5), 'exchange': 'kraken'})
+    return table
+
+
+def _code(error: pytest.ExceptionInfo) -> str:
+
+    return error.value.response['Error']['Code']
+
+
+def test_crud_round_trip(prices):
+
+    assert prices.get_item(Key={'symbol': 'BTC', 'ts': 3})['Item']['price'] == Decimal(103)
+
+    old = prices.put_item(Item={'symbol': 'BTC', 'ts': 3, 'price': Decimal(1)}, ReturnValues='ALL_OLD')
+    assert old['Attributes']['price'] == Decimal(103)
+
+    prices.delete_item(Key={'symbol': 'BTC', 'ts': 3})
+    assert 'Item' not in prices.get_item(Key={'symbol': 'BTC', 'ts': 3})
+
+
+def test_key_must_match_schema(prices):
+
+    with pytest.raises(ClientError) as error:
+        prices.get_item(Key={'symbol': 'BTC'})
+    assert _code(error) == 'ValidationException'
+
+    with pytest.raises(ClientError) as error:
+        prices.put_item(Item={'symbol': 'BTC', 'ts': 'not-a-number'})
+    assert _code(error) == 'ValidationException'
+
+
+def test_query_range_order_and_pagination(prices):
+
+    response = prices.query(
+        KeyConditionExpression=Key('symbol').eq('BTC') & Key('ts').between(2, 7),
+        ScanIndexForward=False, Limit=4
+    )
+    assert [item['ts'] for item in response['Items']] == [7, 6, 5, 4]
+
+    rest = prices.query(
+        KeyConditionExpression=Key('symbol').eq('BTC') & Key('ts').between(2, 7),
+        ScanIndexForward=False, ExclusiveStartKey=response['LastEvaluatedKey']
+    )
+    assert [item['ts'] for item in rest['Items']] == [3, 2]
+    assert 'LastEvaluatedKey' not in rest
+
+
+def test_sparse_global_secondary_index(prices):
+
+    items = prices.query(IndexName='exchange-index', KeyConditionExpression=Key('exchange').eq('binance'))['Items']
+
+    assert sorted(item['ts'] for item in items) == [1, 3, 5, 7, 9]
+    assert prices.scan(IndexName='exchange-index')['Count'] == 6
+
+
+def test_filter_counts_scanned_items(prices):
+
+    response = prices.query(
+        KeyConditionExpression=Key('symbol').eq('BTC'),
+        FilterExpression=Attr('price').gte(108)
+    )
+
+    assert response['Count'] == 2
+    assert response['ScannedCount'] == 10
+
+
+def test_conditional_put_returns_old_item_on_failure(prices):
+
+    with pytest.raises(ClientError) as error:
+        prices.put_item(
+            Item={'symbol': 'BTC', 'ts': 1, 'price': Decimal(0)},
+            ConditionExpression=Attr('symbol').not_exists(),
+            ReturnValuesOnConditionCheckFailure='ALL_OLD'
+        )
+
+    assert _code(error) == 'ConditionalCheckFailedException'
+    assert error.value.response['Item']['price'] == {'N': '101'}
+
+
+def test_update_expression_actions(prices):
+
+    updated = prices.update_item(
+        Key={'symbol': 'ETH', 'ts': 1},
+        UpdateExpression=(
+            'SET price = price + :one, tags = list_append(if_not_exists(tags, :empty), :tags), '
+            'created = if_not_exists(created, :now) REMOVE exchange ADD venues :venues'
+        ),
+        ExpressionAttributeValues={
+            ':one': 1, ':empty': [], ':tags': ['l1'], ':now': 'today', ':venues': {'kraken', 'okx'}
+        },
+        ReturnValues='ALL_NEW'
+    )['Attributes']
+
+    assert updated['price'] == Decimal(6)
+    assert updated['tags'] == ['l1']
+    assert updated['created'] == 'today'
+    assert updated['venues'] == {'kraken', 'okx'}
+    assert 'exchange' not in updated
+
+
+def test_parallel_scan_segments_partition_table(prices):
+
+    seen = []
+    for segment in range(3):
+        seen.extend(
+            (item['symbol'], item['ts'])
+            for item in prices.scan(Segment=segment, TotalSegments=3)['Items']
+        )
+
+    assert len(seen) == len(set(seen)) == 11
+
+
+def test_scan_page_is_capped_at_one_megabyte(engine):
+
+    table = engine.resource.Table('Prices')
+    for ts in range(25):
+        table.put_item(Item={'symbol': 'BIG', 'ts': ts, 'blob': 'x' * 100_000})
+
+    first = table.scan()
+
+    assert 0 < first['Count'] < 25
+    assert 'LastEvaluatedKey' in first
+
+
+def test_transaction_cancellation_reasons_and_idempotency(engine, prices):
+
+    client = engine.client
+    write = {
+        'TransactItems': [
+            {'Put': {'TableName': 'Prices', 'Item': {'symbol': 'SOL', 'ts': 1}}},
+            {'ConditionCheck': {
+                'TableName': 'Prices', 'Key': {'symbol': 'BTC', 'ts': 1},
+                'ConditionExpression': 'attribute_not_exists(symbol)'
+            }}
+        ]
+    }
+
+    with pytest.raises(ClientError) as error:
+        client.transact_write_items(**write)
+    assert _code(error) == 'TransactionCanceledException'
+    assert [reason['Code'] for reason in error.value.response['CancellationReasons']] == ['None', 'ConditionalCheckFailed']
+    assert 'Item' not in prices.get_item(Key={'symbol': 'SOL', 'ts': 1})
+
+    put = {'TransactItems': write['TransactItems'][:1], 'ClientRequestToken': 'token-1'}
+    client.transact_write_items(**put)
+    client.transact_write_items(**put)
+    with pytest.raises(ClientError) as error:
+        client.transact_write_items(
+            TransactItems=[{'Put': {'TableName': 'Prices', 'Item': {'symbol': 'SOL', 'ts': 2}}}],
+            ClientRequestToken='token-1'
+        )
+    assert _code(error) == 'IdempotentParameterMismatchException'
+
+
+def test_consumed_capacity_is_reported(prices):
+
+    response = prices.get_item(Key={'symbol': 'BTC', 'ts': 1}, ReturnConsumedCapacity='TOTAL')
+
+    assert response['ConsumedCapacity'] == {'TableName': 'Prices', 'CapacityUnits': 0.5}
+
+
+def test_simulated_throttling(engine, prices, monkeypatch):
+
+    engine.throttle_rate = 1.0
+
+    with pytest.raises(ClientError) as error:
+        prices.get_item(Key={'symbol': 'BTC', 'ts': 1})
+    assert _code(error) == 'ProvisionedThroughputExceededException'
+
+    # Пакеты троттлятся частично: ответ без ошибки, элементы возвращаются необработанными
+    monkeypatch.setattr(engine, '_simulate', lambda operation: None)
+    response = engine.client.batch_write_item(RequestItems={
+        'Prices': [{'PutRequest': {'Item': {'symbol': 'SOL', 'ts': 1}}}]
+    })
+    assert len(response['UnprocessedItems']['Prices']) == 1
+    assert engine.get_stats()['calls']['throttled'] == 2
+
+
+def test_reset_drops_tables_and_stats(engine, prices):
+
+    engine.reset()
+
+    assert engine.get_stats()['calls'] == {'throttled': 0}
+    assert engine.client.list_tables()['TableNames'] == []
@@ -0,0 +1,115 @@
+import pytest
+from boto3.dynamodb.conditions import Attr
+
+from app.core.dynamodb.exceptions import ItemNotFoundError
+from app.core.dynamodb.metrics import DynamoDBMetrics, Histogram, dynamodb_metrics, route_scope
+
+
+@pytest.fixture
+def metrics():
+
+    dynamodb_metrics.reset()
+    yield dynamodb_metrics
+    dynamodb_metrics.reset()
+
+
+def test_calls_are_attributed_to_route_and_table(tokens, metrics):
+
+    tokens.bulk_create([{'id': f"t{i}", 'symbol': 'BTC' if i < 2 else 'ETH'} for i in range(10)])
+    metrics.reset()
+
+    with route_scope('/api/tokens/{symbol}'):
+        found = tokens.scan_items(tokens.table_name, filter_expression=Attr('symbol').eq('BTC'))
+
+    stats = metrics.get_stats()
+    route = stats['routes']['/api/tokens/{symbol}']
+    assert len(found) == 2
+    assert route['operations'] == {'scan': 1}
+    assert route['items_returned'] == 2
+    assert route['items_scanned'] == 10
+    assert route['scan_amplification'] == 5.0
+    assert route['read_capacity_units'] > 0
+    assert route['tables'][tokens.table_name]['calls'] == 1
+    assert stats['tables'][tokens.table_name]['calls'] == 1
+
+
+def test_calls_outside_requests_go_to_background(tokens, metrics):
+
+    tokens.create({'id': 't1'}, auto_id=False)
+
+    stats = metrics.get_stats()
+    assert stats['routes']['background']['operations']['put_item'] == 1
+    assert stats['routes']['background']['write_capacity_units'] > 0
+
+
+def test_errors_are_counted_by_code(tokens, metrics):
+
+    tokens.create({'id': 't1'}, auto_id=False)
+    metrics.reset()
+
+    with route_scope('/api/tokens'):
+        with pytest.raises(ItemNotFoundError):
+            tokens.update_by_id('missing', {'symbol': 'BTC'}, must_exist=True)
+
+    route = metrics.get_stats()['routes']['/api/tokens']
+    assert route['errors'] == 1
+    assert route['error_codes'] == {'ConditionalCheckFailedException': 1}
+
+
+def test_requests_join_call_totals():
+
+    metrics = DynamoDBMetrics()
+    with route_scope('/api/exchanges'):
+        for _ in range(4):
+            metrics.record('Exchanges', None, 'get_item', 0.002, {'Item': {'id': 'x'}})
+    metrics.record_request('/api/exchanges', 0.01, 200)
+    metrics.record_request('/api/exchanges', 0.01, 503)
+    metrics.record_request('/api/health', 0.001, 200)
+
+    routes = metrics.get_stats()['routes']
+    assert routes['/api/exchanges']['requests'] == 2
+    assert routes['/api/exchanges']['request_errors'] == 1
+    assert routes['/api/exchanges']['calls_per_request'] == 2.0
+    # Маршрут без обращений к DynamoDB виден с нулевым расходом
+    assert routes['/api/health']['calls'] == 0
+
+
+def test_routes_beyond_limit_are_folded():
+
+    metrics = DynamoDBMetrics(max_routes=2)
+    for route in ('/a', '/b', '/c', '/d'):
+        with route_scope(route):
+            metrics.record('Exchanges', None, 'get_item', 0.001, {})
+
+    routes = metrics.get_stats()['routes']
+    assert set(routes) == {'/a', '/b', 'other'}
+    assert routes['other']['calls'] == 2
+
+
+def test_index_queries_are_keyed_separately():
+
+    metrics = DynamoDBMetrics()
+    metrics.record('Tokens', 'symbol-index', 'query', 0.001, {'Count': 3, 'ScannedCount': 3})
+    metrics.record('Tokens', None, 'query', 0.001, {'Count': 1, 'ScannedCount': 1})
+
+    assert set(metrics.get_stats()['tables']) == {'Tokens/symbol-index', 'Tokens'}
+
+
+def test_disabled_metrics_record_nothing(tokens, metrics, monkeypatch):
+
+    monkeypatch.setattr(metrics, 'enabled', False)
+    tokens.create({'id': 't1'}, auto_id=False)
+
+    assert metrics.get_stats()['routes'] == {}
+
+
+def test_histogram_quantiles_use_bucket_bounds():
+
+    histogram = Histogram((1, 10, 100))
+    for value in (0.5, 0.5, 5, 50, 500):
+        histogram.observe(value)
+
+    snapshot = histogram.snapshot()
+    assert snapshot['p50'] == 10
+    assert snapshot['p99'] == 500
+    assert snapshot['buckets'] == {'le_1': 2, 'le_10': 1, 'le_100': 1, 'inf': 1}
@@ -0,0 +1,49 @@
+from boto3.dynamodb.conditions import Attr
+
+
+def test_segments_cover_table_without_duplicates(tokens):
+
+    tokens.bulk_create([{'id': f"t{i:03d}", 'symbol': f"S{i}"} for i in range(60)])
+
+    scan = tokens.parallel_scan(tokens.table_name, segments=4, page_size=5)
+    ids = [item['id'] for item in scan]
+
+    assert len(ids) == 60
+    assert set(ids) == {f"t{i:03d}" for i in range(60)}
+
+    progress = scan.get_progress()
+    assert progress['completed_segments'] == 4
+    assert progress['returned_count'] == 60
+    assert progress['errors'] == []
+    # Каждый сегмент получил свою часть таблицы
+    assert sum(1 for state in progress['segments'] if state['returned_count']) > 1
+
+
+def test_filter_projection_and_progress_callback(tokens):
+
+    tokens.bulk_create([{'id': f"t{i:03d}", 'symbol': 'BTC' if i % 3 == 0 else 'ETH', 'rank': i} for i in range(30)])
+    reports = []
+
+    items = list(tokens.parallel_scan(
+        tokens.table_name, segments=3, filter_expression=Attr('symbol').eq('BTC'),
+        projection=['id'], on_progress=reports.append
+    ))
+
+    assert sorted(item['id'] for item in items) == [f"t{i:03d}" for i in range(0, 30, 3)]
+    assert all(set(item) == {'id'} for item in items)
+    assert {report['segment'] for report in reports if report['done']} == {0, 1, 2}
+
+
+def test_early_stop_finishes_cleanly(tokens):
+
+    tokens.bulk_create([{'id': f"t{i:03d}"} for i in range(50)])
+
+    scan = tokens.parallel_scan(tokens.table_name, segments=2, page_size=2)
+    first = []
+    for item in scan:
+        first.append(item)
+        if len(first) == 5:
+            break
+
+    assert len(first) == 5
+    assert scan.finished_at is not None
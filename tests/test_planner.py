@@ -0,0 +1,47 @@
+from app.core.dynamodb.planner import (
+    STRATEGY_GET_ITEM, STRATEGY_QUERY_INDEX, STRATEGY_SCAN,
+    query_planner
+)
+
+
+def test_plans_follow_schema_registry(tokens):
+
+    assert tokens.explain_find_by_field('id')['strategy'] == STRATEGY_GET_ITEM
+
+    plan = tokens.explain_find_by_field('coingecko_id')
+    assert plan['strategy'] == STRATEGY_QUERY_INDEX
+    assert plan['index_name'] == 'coingecko-index'
+
+    assert tokens.explain_find_by_field('symbol')['index_name'] == 'symbol-index'
+    assert tokens.explain_find_by_field('name')['strategy'] == STRATEGY_SCAN
+
+
+def test_find_by_field_uses_index(tokens):
+
+    tokens.bulk_create([
+        {'id': 't1', 'symbol': 'BTC', 'coingecko_id': 'bitcoin'},
+        {'id': 't2', 'symbol': 'ETH', 'coingecko_id': 'ethereum'}
+    ])
+    before = query_planner.get_stats()['strategies']
+
+    found = tokens.find_by_field('coingecko_id', 'bitcoin')
+
+    after = query_planner.get_stats()['strategies']
+    assert [item['id'] for item in found] == ['t1']
+    assert after[STRATEGY_QUERY_INDEX] == before[STRATEGY_QUERY_INDEX] + 1
+    assert after[STRATEGY_SCAN] == before[STRATEGY_SCAN]
+
+
+def test_find_by_field_falls_back_to_scan(tokens):
+
+    tokens.bulk_create([{'id': 't1', 'symbol': 'BTC', 'name': 'Bitcoin'}])
+
+    assert [item['id'] for item in tokens.find_by_field('name', 'Bitcoin')] == ['t1']
+    assert tokens.find_by_field('id', 't1')[0]['symbol'] == 'BTC'
+
+
+def test_key_attributes():
+
+    assert query_planner.key_attributes('LiberandumAggregationToken') == ('id',)
+    # Таблица вне реестра и без клиента - ключ по умолчанию
+    assert query_planner.key_attributes('UnknownTable') == ('id',)
@@ -0,0 +1,37 @@
+from app.core.dynamodb.expressions import apply_projection, build_projection
+
+
+def test_build_projection_uses_placeholders():
+
+    expression, names = build_projection(['name', 'status', 'name'])
+
+    assert expression == '#pj0, #pj1'
+    assert names == {'#pj0': 'name', '#pj1': 'status'}
+    assert build_projection(None) == (None, {})
+
+
+def test_apply_projection_keeps_existing_names():
+
+    params = apply_projection({'ExpressionAttributeNames': {'#f': 'symbol'}}, ['name'])
+
+    assert params['ExpressionAttributeNames'] == {'#f': 'symbol', '#pj0': 'name'}
+    assert params['ProjectionExpression'] == '#pj0'
+
+
+def test_reads_return_only_requested_fields(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'BTC', 'name': 'Bitcoin', 'status': 'active', 'rank': 1}, auto_id=False)
+
+    assert tokens.get_by_id('t1', fields=['name', 'status']) == {'name': 'Bitcoin', 'status': 'active'}
+    assert tokens.list_all(fields=['name']) == [{'name': 'Bitcoin'}]
+    assert tokens.find_by_field('symbol', 'BTC', fields=['rank']) == [{'rank': 1}]
+
+
+def test_projected_read_is_not_cached_as_full_item(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'BTC', 'name': 'Bitcoin'}, auto_id=False)
+
+    assert tokens.get_by_id('t1', fields=['symbol']) == {'symbol': 'BTC'}
+    assert tokens.get_by_id('t1')['name'] == 'Bitcoin'
+    # Из полного закэшированного элемента проекция тоже срезается
+    assert tokens.get_by_id('t1', fields=['name']) == {'name': 'Bitcoin'}
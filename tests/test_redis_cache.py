@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+fakeredis = pytest.importorskip('fakeredis')
+
+from app.core.cache import MemoryCacheBackend, RedisCacheBackend, TieredCache
+
+
+def _worker(server) -> TieredCache:
+
+    # Отдельный воркер: свой L1, общий L2 на одном fake-сервере redis
+    backend = RedisCacheBackend('redis://localhost:6379/0')
+    backend._redis = fakeredis.aioredis.FakeRedis(server=server, decode_responses=True)
+    return TieredCache(l1=MemoryCacheBackend(max_items=100), l2=backend, default_ttl=30.0, l1_ttl=5.0)
+
+
+def test_l2_shared_between_workers():
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        first, second = _worker(server), _worker(server)
+
+        await first.set('market:tokens', {'items': [1, 2]})
+        assert await second.get('market:tokens') == {'items': [1, 2]}
+        assert second.get_stats()['l2_hits'] == 1
+
+        await first.invalidate('market:tokens')
+        assert await first.get('market:tokens') is None
+
+    asyncio.run(scenario())
+
+
+def test_invalidate_prefix_clears_l2():
+
+    async def scenario():
+        cache = _worker(fakeredis.FakeServer())
+        await cache.set('market:tokens:1', 1)
+        await cache.set('market:tokens:2', 2)
+        await cache.set('market:exchanges:1', 3)
+
+        await cache.invalidate_prefix('market:tokens:')
+        assert sorted(await cache.l2._redis.keys('*')) == ['market:exchanges:1']
+
+    asyncio.run(scenario())
+
+
+def test_invalidation_drops_l1_on_other_workers():
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        first, second = _worker(server), _worker(server)
+        received = []
+        second.on_invalidate('keys', received.extend)
+        await second.start()
+
+        await first.set('market:tokens', 1)
+        assert await second.get('market:tokens') == 1
+        await first.invalidate('market:tokens')
+
+        for _ in range(50):
+            if received:
+                break
+            await asyncio.sleep(0.02)
+
+        assert received == ['market:tokens']
+        assert second.l1.get_nowait('market:tokens') is None
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(scenario())
+
+
+def test_subscription_survives_disconnect(monkeypatch):
+
+    monkeypatch.setattr(RedisCacheBackend, 'RECONNECT_BASE_DELAY', 0.01)
+
+    async def scenario():
+        server = fakeredis.FakeServer()
+        first, second = _worker(server), _worker(server)
+        received = []
+        second.on_invalidate('keys', received.extend)
+
+        # Первое соединение подписки обрывается сервером - дальше подписка должна восстановиться
+        create_pubsub = second.l2._redis.pubsub
+        dropped = []
+
+        def pubsub():
+            connection = create_pubsub()
+            if not dropped:
+                async def listen():
+                    raise ConnectionError('Connection closed by server.')
+                    yield
+                connection.listen = listen
+                dropped.append(connection)
+            return connection
+
+        second.l2._redis.pubsub = pubsub
+        await second.set('market:tokens', 1)
+        await second.start()
+
+        for _ in range(100):
+            if second.get_stats()['resubscribes']:
+                break
+            await asyncio.sleep(0.02)
+
+        # Инвалидации за время обрыва могли потеряться - L1 сброшен
+        assert second.get_stats()['resubscribes'] == 1
+        assert second.l1.get_nowait('market:tokens') is None
+
+        await first.invalidate('market:exchanges')
+        for _ in range(50):
+            if received:
+                break
+            await asyncio.sleep(0.02)
+        assert received == ['market:exchanges']
+        await first.stop()
+        await second.stop()
+
+    asyncio.run(scenario())
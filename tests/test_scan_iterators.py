@@ -0,0 +1,66 @@
+from boto3.dynamodb.conditions import Attr, Key
+
+
+def _seed(tokens, count, **extra):
+
+    tokens.bulk_create([
+        {'id': f"t{i:03d}", 'symbol': 'BTC' if i % 2 else 'ETH', 'rank': i, **extra}
+        for i in range(count)
+    ])
+
+
+def test_iter_scan_follows_pages(tokens, memory_engine):
+
+    _seed(tokens, 25)
+
+    items = list(tokens.iter_scan(tokens.table_name, page_size=4))
+
+    assert sorted(item['id'] for item in items) == [f"t{i:03d}" for i in range(25)]
+    # 25 элементов по 4 на страницу - 7 запросов Scan
+    assert memory_engine._stats.get('scan') == 7
+
+
+def test_iter_scan_past_one_megabyte_page(tokens):
+
+    # Без Limit DynamoDB всё равно режет ответ на 1 МБ - итератор должен идти дальше
+    _seed(tokens, 30, payload='x' * 50_000)
+
+    assert len(tokens.scan_items(tokens.table_name)) == 30
+
+
+def test_iter_scan_stops_at_max_items(tokens, memory_engine):
+
+    _seed(tokens, 40)
+
+    items = list(tokens.iter_scan(tokens.table_name, page_size=5, max_items=7))
+
+    assert len(items) == 7
+    assert memory_engine._stats.get('scan') == 2
+
+
+def test_iter_scan_filter_and_projection(tokens):
+
+    _seed(tokens, 20)
+
+    items = list(tokens.iter_scan(
+        tokens.table_name, filter_expression=Attr('symbol').eq('BTC'),
+        page_size=3, projection=['id', 'rank']
+    ))
+
+    assert len(items) == 10
+    assert all(set(item) == {'id', 'rank'} for item in items)
+    assert all(item['rank'] % 2 for item in items)
+
+
+def test_iter_query_on_index(tokens):
+
+    _seed(tokens, 12)
+
+    items = list(tokens.iter_query(
+        tokens.table_name, Key('symbol').eq('ETH'), index_name='symbol-index', page_size=2
+    ))
+
+    assert sorted(item['id'] for item in items) == [f"t{i:03d}" for i in range(0, 12, 2)]
+    assert len(list(tokens.iter_query(
+        tokens.table_name, Key('symbol').eq('ETH'), index_name='symbol-index', max_items=3
+    ))) == 3
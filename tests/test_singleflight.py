@@ -0,0 +1,119 @@
+import asyncio
+
+import pytest
+from boto3.dynamodb.conditions import Attr
+
+from app.core.dynamodb.connector import get_async_generic_repository
+from app.core.singleflight import SingleFlight, freeze, singleflight
+
+
+def test_concurrent_calls_share_one_load():
+
+    flights = SingleFlight()
+    loads = []
+
+    async def loader():
+        loads.append(1)
+        await asyncio.sleep(0.02)
+        return {'items': [1, 2, 3]}
+
+    async def scenario():
+        return await asyncio.gather(*(flights.do('market', 'tokens', loader) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert len(loads) == 1
+    assert all(result == {'items': [1, 2, 3]} for result in results)
+    # Каждый склеенный вызов получает свою копию
+    results[0]['items'].append(4)
+    assert results[1]['items'] == [1, 2, 3]
+    assert flights.get_stats()['namespaces']['market'] == {'calls': 5, 'executed': 1, 'coalesced': 4, 'errors': 0}
+
+
+def test_error_reaches_every_caller_and_is_not_cached():
+
+    flights = SingleFlight()
+    loads = []
+
+    async def failing():
+        loads.append(1)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('boom')
+
+    async def scenario():
+        results = await asyncio.gather(*(flights.do('market', 'tokens', failing) for _ in range(3)),
+                                       return_exceptions=True)
+        assert all(isinstance(result, RuntimeError) for result in results)
+        with pytest.raises(RuntimeError):
+            await flights.do('market', 'tokens', failing)
+
+    asyncio.run(scenario())
+    assert len(loads) == 2
+
+
+def test_cancelled_follower_does_not_cancel_load():
+
+    flights = SingleFlight()
+
+    async def loader():
+        await asyncio.sleep(0.03)
+        return 'done'
+
+    async def scenario():
+        leader = asyncio.ensure_future(flights.do('market', 'tokens', loader))
+        follower = asyncio.ensure_future(flights.do('market', 'tokens', loader))
+        await asyncio.sleep(0.005)
+        follower.cancel()
+        return await leader
+
+    assert asyncio.run(scenario()) == 'done'
+
+
+def test_different_keys_are_not_coalesced():
+
+    flights = SingleFlight()
+
+    async def scenario():
+        return await asyncio.gather(
+            flights.do('market', freeze({'page': 1}), lambda: asyncio.sleep(0.01, result=1)),
+            flights.do('market', freeze({'page': 2}), lambda: asyncio.sleep(0.01, result=2))
+        )
+
+    assert asyncio.run(scenario()) == [1, 2]
+    assert flights.get_stats()['namespaces']['market']['coalesced'] == 0
+
+
+def test_conditions_are_keyed_by_expression():
+
+    assert freeze(Attr('symbol').eq('BTC')) == freeze(Attr('symbol').eq('BTC'))
+    assert freeze(Attr('symbol').eq('BTC')) != freeze(Attr('symbol').eq('ETH'))
+    assert freeze({'filter': Attr('a').lt(1) & Attr('b').exists()}) == freeze({'filter': Attr('a').lt(1) & Attr('b').exists()})
+
+
+def test_unhashable_arguments_are_not_frozen():
+
+    class Opaque:
+        __hash__ = None
+
+    with pytest.raises(TypeError):
+        freeze({'value': Opaque()})
+
+
+def test_async_reads_with_conditions_are_coalesced(tokens):
+
+    tokens.bulk_create([{'id': f"t{i}", 'symbol': 'BTC' if i % 2 else 'ETH'} for i in range(6)])
+    repository = get_async_generic_repository(tokens.table_name)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(repository.scan_items(tokens.table_name, filter_expression=Attr('symbol').eq('BTC')) for _ in range(3)),
+            repository.scan_items(tokens.table_name, filter_expression=Attr('symbol').eq('ETH'))
+        )
+
+    before = dict(singleflight.get_stats()['namespaces'].get(f"dynamodb:{tokens.table_name}", {}))
+    results = asyncio.run(scenario())
+    after = singleflight.get_stats()['namespaces'][f"dynamodb:{tokens.table_name}"]
+
+    assert [len(result) for result in results] == [3, 3, 3, 3]
+    assert {item['symbol'] for item in results[3]} == {'ETH'}
+    assert after['executed'] - before.get('executed', 0) == 2
@@ -0,0 +1,57 @@
+import pytest
+from boto3.dynamodb.conditions import Attr
+
+from app.aws.table_schemas import get_table_schema
+from app.core.dynamodb.connector import get_generic_repository
+from app.core.dynamodb.exceptions import TransactionCanceledError
+from app.core.dynamodb.transactions import check_op, put_op, update_op
+
+PLATFORMS = "LiberandumAggregationTokenPlatform"
+
+
+def test_token_with_platforms_is_written_atomically(tokens):
+
+    platforms = get_generic_repository(PLATFORMS)
+
+    tokens.transact_write([
+        put_op(tokens.table_name, {'id': 't1', 'symbol': 'BTC'}, if_not_exists=True),
+        put_op(PLATFORMS, {'id': 'p1', 'token_id': 't1', 'chain': 'ethereum'}, if_not_exists=True)
+    ])
+
+    assert get_table_schema(PLATFORMS) is not None
+    assert platforms.find_by_field('token_id', 't1')[0]['chain'] == 'ethereum'
+
+
+def test_failed_condition_cancels_every_operation(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'BTC'}, auto_id=False)
+
+    with pytest.raises(TransactionCanceledError) as error:
+        tokens.transact_write([
+            put_op(tokens.table_name, {'id': 't2', 'symbol': 'ETH'}),
+            put_op(tokens.table_name, {'id': 't1', 'symbol': 'DUP'}, if_not_exists=True)
+        ])
+
+    assert [reason['code'] for reason in error.value.reasons] == ['None', 'ConditionalCheckFailed']
+    assert tokens.get_by_id('t2') is None
+    assert tokens.get_by_id('t1')['symbol'] == 'BTC'
+
+
+def test_invalid_index_key_is_rejected_before_request(tokens):
+
+    with pytest.raises(ValueError):
+        put_op(tokens.table_name, {'id': 't1', 'symbol': None})
+
+
+def test_client_token_makes_retry_idempotent(tokens):
+
+    tokens.bulk_create([{'id': 't0', 'symbol': 'ETH'}, {'id': 't1', 'symbol': 'BTC'}])
+    operations = [
+        check_op(tokens.table_name, {'id': 't0'}, Attr('symbol').eq('ETH')),
+        update_op(tokens.table_name, {'id': 't1'}, {'name': 'Bitcoin'})
+    ]
+
+    tokens.transact_write(operations, client_token='request-1')
+    tokens.transact_write(operations, client_token='request-1')
+
+    assert tokens.get_by_id('t1')['version'] == 1
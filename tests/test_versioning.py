@@ -0,0 +1,61 @@
+import pytest
+
+from app.core.dynamodb.exceptions import ItemNotFoundError, VersionConflictError
+from app.core.dynamodb.transactions import update_op
+
+
+def test_stale_expected_version_raises_version_conflict(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'AAA'}, versioned=True)
+    updated = tokens.update_by_id('t1', {'name': 'First'}, expected_version=1)
+    assert updated['version'] == 2
+
+    with pytest.raises(VersionConflictError) as error:
+        tokens.update_by_id('t1', {'name': 'Second'}, expected_version=1)
+
+    assert error.value.current_version == 2
+    assert error.value.expected_version == 1
+    assert tokens.get_by_id('t1')['name'] == 'First'
+
+
+def test_every_update_bumps_version(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'AAA'})
+
+    assert tokens.update_by_id('t1', {'name': 'A'})['version'] == 1
+    assert tokens.update_by_id('t1', {'name': 'B', 'version': 100})['version'] == 2
+    assert tokens.soft_delete('t1')['version'] == 3
+
+
+def test_read_modify_write_retries_after_unversioned_concurrent_write(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'AAA', 'holders': 1})
+    calls = []
+
+    def mutate(item):
+        calls.append(item['holders'])
+        if len(calls) == 1:
+            # Конкурентная запись без expected_version между чтением и записью тоже меняет версию
+            tokens.update_by_id('t1', {'holders': 10})
+        return {'holders': item['holders'] + 1}
+
+    result = tokens.read_modify_write('t1', mutate)
+
+    assert calls == [1, 10]
+    assert result['holders'] == 11
+    assert tokens.get_by_id('t1')['holders'] == 11
+
+
+def test_read_modify_write_missing_item(tokens):
+
+    with pytest.raises(ItemNotFoundError):
+        tokens.read_modify_write('missing', lambda item: {'holders': 1})
+
+
+def test_transaction_update_bumps_version(tokens):
+
+    tokens.create({'id': 't1', 'symbol': 'AAA'})
+
+    tokens.transact_write([update_op(tokens.table_name, {'id': 't1'}, {'name': 'X'})])
+
+    assert tokens.get_by_id('t1')['version'] == 1
@@ -0,0 +1,56 @@
+import time
+
+import pytest
+
+from app.core.dynamodb.change_feed import change_feed
+from app.core.dynamodb.connector import get_generic_repository
+from app.core.dynamodb.views import MarketTotalsView, MaterializedView, view_registry
+
+STATS_TABLE = 'LiberandumAggregationTokenStats'
+
+
+def _view(name: str, max_staleness: float = 0) -> MarketTotalsView:
+
+    # Отдельное имя на тест - у реестра свой потребитель потока на каждое представление
+    view_class = type(f"Totals_{name}", (MarketTotalsView,), {'name': name})
+    return view_registry.register(view_class(STATS_TABLE, max_staleness=max_staleness))
+
+
+def test_materialized_view_is_abstract():
+
+    with pytest.raises(TypeError):
+        MaterializedView(STATS_TABLE)
+
+
+def test_view_follows_change_feed():
+
+    stats = get_generic_repository(STATS_TABLE)
+    stats.create({'id': 's1', 'symbol': 'AAA', 'market_cap': 100, 'trading_volume_24h': 10})
+    view = _view('feed_totals')
+
+    assert view_registry.read(view) == {'total_market_cap': 100.0, 'total_volume': 10.0, 'tokens': 1}
+    assert change_feed.captures(STATS_TABLE)
+
+    stats.create({'id': 's2', 'symbol': 'BBB', 'market_cap': 50, 'trading_volume_24h': 5})
+    stats.update_by_id('s1', {'market_cap': 300})
+    stats.soft_delete('s2')
+    rebuilt_at = view.rebuilt_at
+
+    assert view_registry.read(view) == {'total_market_cap': 300.0, 'total_volume': 10.0, 'tokens': 1}
+    # Изменения пришли из потока, без повторного скана
+    assert view.rebuilt_at == rebuilt_at
+
+
+def test_external_writes_visible_after_max_staleness(memory_engine):
+
+    view = _view('stale_totals', max_staleness=0.05)
+    assert view_registry.read(view)['tokens'] == 0
+
+    # Запись в обход коннектора (другой воркер, внешний агрегатор) - в поток не попадает
+    memory_engine.resource.Table(STATS_TABLE).put_item(
+        Item={'id': 's1', 'symbol': 'AAA', 'market_cap': 70, 'trading_volume_24h': 7}
+    )
+    assert view_registry.read(view)['tokens'] == 0
+
+    time.sleep(0.06)
+    assert view_registry.read(view) == {'total_market_cap': 70.0, 'total_volume': 7.0, 'tokens': 1}